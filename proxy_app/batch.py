@@ -0,0 +1,134 @@
+"""
+Batch execution of proxied sub-requests.
+
+Identical sub-requests are deduplicated, cached ones are answered with one
+multi-get, and the remaining misses fan out concurrently with a per-provider
+cap on in-flight upstream calls. Results carry their input index so callers
+can return them in order or stream them as they complete.
+
+Sub-requests are validated one by one: a malformed one, or one asking for a
+fields= projection or a format= other than JSON, which batches do not support,
+gets an error result with status 400 and the rest of the batch still runs.
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from django.conf import settings
+
+from .columnar import FORMAT_PARAM
+from .config import BATCH_PROVIDER_CONCURRENCY
+from .projection import FIELDS_PARAM
+from .proxy import FinancialDataProxy, ProxyResult, UpstreamRequest, proxy
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PROVIDER_CONCURRENCY = 4
+
+
+class BatchExecutor:
+    """Runs batches of (path, params) sub-requests through a FinancialDataProxy"""
+
+    def __init__(self, proxy: FinancialDataProxy, max_workers: int, provider_concurrency: Dict[str, int]):
+        self.proxy = proxy
+        self.max_workers = max_workers
+        self._limits = {
+            provider: threading.BoundedSemaphore(limit) for provider, limit in provider_concurrency.items()
+        }
+        self._limits_lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def run(self, requests_list: List[Any]) -> List[Dict[str, Any]]:
+        """Execute the batch and return results in input order"""
+        return sorted(self.iter_results(requests_list), key=lambda result: result["index"])
+
+    def iter_results(self, requests_list: List[Any]) -> Iterator[Dict[str, Any]]:
+        """Execute the batch, yielding each result as soon as it is known"""
+        # Group identical sub-requests so each is served once
+        groups: Dict[Tuple[str, Tuple], List[int]] = {}
+        for index, req in enumerate(requests_list):
+            error = self._invalid(req)
+            if error is not None:
+                yield {"index": index, "error": error, "status": 400}
+                continue
+            params = self.proxy._dict_to_tuple(req.get("params") or {})
+            groups.setdefault((req["path"], params), []).append(index)
+
+        resolved: Dict[Tuple[str, Tuple], UpstreamRequest] = {}
+        for key, indexes in groups.items():
+            try:
+                resolved[key] = self.proxy.resolve(*key)
+            except Exception as e:
+                yield from self._errors(indexes, e)
+
+        # Answer everything already cached with one multi-get
+        entries = self.proxy.cache.get_many([upstream.cache_key for upstream in resolved.values()], allow_stale=True)
+        misses = []
+        for key, upstream in resolved.items():
+            entry = entries.get(upstream.cache_key)
+            if entry is None:
+                misses.append(key)
+                continue
+            yield from self._results(groups[key], self.proxy.serve_cached(upstream, entry))
+
+        if not misses:
+            return
+
+        futures = {self._get_executor().submit(self._fetch_live, resolved[key]): key for key in misses}
+        for future in as_completed(futures):
+            key = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                logger.warning(f"Batch sub-request {key[0]} failed: {e}")
+                yield from self._errors(groups[key], e)
+            else:
+                yield from self._results(groups[key], result)
+
+    def _invalid(self, req: Any) -> Optional[str]:
+        """Why a sub-request cannot be run, or None if it is valid"""
+        if not isinstance(req, dict) or "path" not in req:
+            return "Missing 'path' in request"
+        if not isinstance(req["path"], str):
+            return "'path' must be a string"
+        params = req.get("params")
+        if params is not None and not isinstance(params, dict):
+            return "'params' must be an object"
+        for option in (FIELDS_PARAM, FORMAT_PARAM):
+            if params and option in params:
+                return f"'{option}' is not supported in batch requests"
+        return None
+
+    def _fetch_live(self, upstream: UpstreamRequest) -> ProxyResult:
+        with self._get_limit(upstream.provider):
+            return self.proxy.fetch_live(upstream)
+
+    def _results(self, indexes: List[int], result: ProxyResult) -> Iterator[Dict[str, Any]]:
+        data = self.proxy.with_metadata(result).data
+        for index in indexes:
+            yield {"index": index, "data": data}
+
+    def _errors(self, indexes: List[int], error: Exception) -> Iterator[Dict[str, Any]]:
+        for index in indexes:
+            yield {"index": index, "error": str(error)}
+
+    def _get_limit(self, provider: str) -> threading.BoundedSemaphore:
+        with self._limits_lock:
+            if provider not in self._limits:
+                self._limits[provider] = threading.BoundedSemaphore(DEFAULT_PROVIDER_CONCURRENCY)
+            return self._limits[provider]
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._limits_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='proxy-batch')
+            return self._executor
+
+
+# Global batch executor; provider caps apply across all batches in this process
+batch_executor = BatchExecutor(
+    proxy,
+    max_workers=getattr(settings, 'PROXY_BATCH_MAX_WORKERS', 32),
+    provider_concurrency=BATCH_PROVIDER_CONCURRENCY,
+)
@@ -0,0 +1,478 @@
+"""
+Two-tier response cache for proxied provider data.
+
+L1 is an in-process LRU with per-entry expiry and a byte budget; L2 is a shared
+Django cache (Redis in production) so every worker reuses the others' fetches.
+Entry lifetimes come from the route's cache class and CACHE_TTL. Past its TTL an
+entry may still be served for the class's STALE_WHILE_REVALIDATE window (capped
+by MAX_STALENESS) while a background refresh repopulates it.
+
+Responses are stored as their encoded JSON body, so a hit can be written to the
+client as-is instead of being unpickled into objects and re-encoded. Bodies of
+precompressed cache classes also get a variant per content encoding, stored under
+its own key with the body's lifetimes (see compression.py). Every body is hashed
+when stored, and the hash is the ETag that conditional GETs are answered with.
+"""
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Hashable, Iterable, NamedTuple, Optional, Tuple
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.utils.http import http_date, parse_etags, parse_http_date_safe
+
+from .codec import codec
+from .compression import CompressedHead, Precompressor, precompressor
+from .config import CACHE_TTL, MAX_STALENESS, STALE_WHILE_REVALIDATE
+
+logger = logging.getLogger(__name__)
+
+
+class CacheEntry(NamedTuple):
+    """A cached provider response"""
+
+    value: Any
+    size: int
+    stored_at: float
+    expires_at: float
+    stale_until: float = 0.0
+    # Content hash of the body (shared by its precompressed variants)
+    etag: str = ""
+
+    def is_fresh(self, now: Optional[float] = None) -> bool:
+        return (now or time.time()) < self.expires_at
+
+    def is_expired(self, now: Optional[float] = None) -> bool:
+        """True once the entry can no longer be served, even as stale"""
+        return (now or time.time()) >= max(self.expires_at, self.stale_until)
+
+    def age(self, now: Optional[float] = None) -> int:
+        return max(0, int((now or time.time()) - self.stored_at))
+
+    def decode(self) -> Any:
+        """The response data held in value as an encoded JSON body"""
+        return codec.loads(self.value)
+
+
+class CacheStats:
+    """Hit/miss and byte counters for one cache tier"""
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.sets = 0
+        self.evictions = 0
+        self.errors = 0
+        self.bytes_written = 0
+
+    def as_dict(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "sets": self.sets,
+            "evictions": self.evictions,
+            "errors": self.errors,
+            "bytes_written": self.bytes_written,
+        }
+
+
+class LocalTTLCache:
+    """In-process LRU cache with per-entry TTLs and byte-size accounting"""
+
+    def __init__(self, max_bytes: int, max_entries: int):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.current_bytes = 0
+        self.stats = CacheStats()
+        self._entries: 'OrderedDict[str, CacheEntry]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0 and self.max_entries > 0
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.stats.misses += 1
+                return None
+            if entry.is_expired():
+                self._remove(key)
+                self.stats.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.stats.hits += 1
+            return entry
+
+    def set(self, key: str, entry: CacheEntry):
+        if not self.enabled or entry.size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = entry
+            self.current_bytes += entry.size
+            self.stats.sets += 1
+            self.stats.bytes_written += entry.size
+            while self.current_bytes > self.max_bytes or len(self._entries) > self.max_entries:
+                oldest_key = next(iter(self._entries))
+                self._remove(oldest_key)
+                self.stats.evictions += 1
+
+    def delete(self, key: str):
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+    def _remove(self, key: str):
+        entry = self._entries.pop(key)
+        self.current_bytes -= entry.size
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats = self.stats.as_dict()
+        stats.update(
+            {
+                "entries": len(self._entries),
+                "bytes": self.current_bytes,
+                "max_bytes": self.max_bytes,
+                "max_entries": self.max_entries,
+            }
+        )
+        return stats
+
+
+class SharedCache:
+    """Shared tier backed by a Django cache alias; failures degrade to misses"""
+
+    def __init__(self, alias: str):
+        self.alias = alias
+        self.stats = CacheStats()
+
+    @property
+    def backend(self):
+        return caches[self.alias]
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        try:
+            entry = self.backend.get(key)
+        except Exception as e:
+            logger.warning(f"Shared cache read failed for {key}: {e}")
+            self.stats.errors += 1
+            return None
+
+        if entry is None or entry.is_expired():
+            self.stats.misses += 1
+            return None
+        self.stats.hits += 1
+        return entry
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, CacheEntry]:
+        keys = list(keys)
+        try:
+            found = self.backend.get_many(keys)
+        except Exception as e:
+            logger.warning(f"Shared cache multi-get failed for {len(keys)} keys: {e}")
+            self.stats.errors += 1
+            return {}
+
+        entries = {key: entry for key, entry in found.items() if not entry.is_expired()}
+        self.stats.hits += len(entries)
+        self.stats.misses += len(keys) - len(entries)
+        return entries
+
+    def set(self, key: str, entry: CacheEntry):
+        timeout = max(1, int(max(entry.expires_at, entry.stale_until) - time.time()))
+        try:
+            self.backend.set(key, entry, timeout)
+        except Exception as e:
+            logger.warning(f"Shared cache write failed for {key}: {e}")
+            self.stats.errors += 1
+            return
+        self.stats.sets += 1
+        self.stats.bytes_written += entry.size
+
+    def delete(self, key: str):
+        try:
+            self.backend.delete(key)
+        except Exception as e:
+            logger.warning(f"Shared cache delete failed for {key}: {e}")
+            self.stats.errors += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats = self.stats.as_dict()
+        stats["alias"] = self.alias
+        return stats
+
+
+class ResponseCache:
+    """Looks up L1 then L2, promoting L2 hits into L1; fills write through both tiers"""
+
+    def __init__(self, local: LocalTTLCache, shared: Optional[SharedCache] = None, precompressor: Optional[Precompressor] = None):
+        self.local = local
+        self.shared = shared
+        self.precompressor = precompressor
+        self.fresh_hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(path: str, params: Tuple[Tuple[str, Any], ...], namespace: str = "proxy") -> str:
+        """Canonical cache key for a route path and its sorted query params"""
+        return f"{namespace}:{path}?{urlencode(params, doseq=True)}"
+
+    @staticmethod
+    def variant_key(key: str, encoding: str) -> str:
+        """Cache key of the precompressed variant of key's body for a content encoding"""
+        return f"{key}#{encoding}"
+
+    @staticmethod
+    def ttl_for(cache_class: str) -> int:
+        return CACHE_TTL.get(cache_class, CACHE_TTL['daily'])
+
+    @staticmethod
+    def stale_window_for(cache_class: str) -> int:
+        return min(STALE_WHILE_REVALIDATE.get(cache_class, 0), MAX_STALENESS)
+
+    def get(self, key: str, allow_stale: bool = False) -> Optional[CacheEntry]:
+        """Return the entry for key; expired-but-recent entries only when allow_stale"""
+        return self._servable(self._lookup(key), allow_stale)
+
+    def get_encoded(self, key: str, cache_class: str, encoding: Optional[str], allow_stale: bool = False) -> Optional[CacheEntry]:
+        """
+        Like get(), but on precompressed cache classes the entry of the body's variant for encoding.
+
+        Its value is then a CompressedHead rather than the body. A missing variant of a
+        cached body (e.g. one stored before its class was precompressed) is made from it.
+        """
+        if encoding is None or self.precompressor is None or not self.precompressor.applies_to(cache_class):
+            return self.get(key, allow_stale)
+
+        variant = self._lookup(self.variant_key(key, encoding))
+        if variant is not None:
+            return self._servable(variant, allow_stale)
+
+        entry = self.get(key, allow_stale)
+        if entry is None:
+            return None
+        return self._store_variant(key, entry, self.precompressor.compress(entry.value, encoding))
+
+    def get_many(self, keys: Iterable[str], allow_stale: bool = False) -> Dict[str, CacheEntry]:
+        """Like get() for many keys, with a single round trip to the shared tier"""
+        keys = list(keys)
+        found = {}
+        for key in keys:
+            entry = self.local.get(key)
+            if entry is not None:
+                found[key] = entry
+
+        missing = [key for key in keys if key not in found]
+        if missing and self.shared is not None:
+            for key, entry in self.shared.get_many(missing).items():
+                self.local.set(key, entry)
+                found[key] = entry
+
+        entries = {}
+        for key in keys:
+            entry = self._servable(found.get(key), allow_stale)
+            if entry is not None:
+                entries[key] = entry
+        return entries
+
+    def _servable(self, entry: Optional[CacheEntry], allow_stale: bool) -> Optional[CacheEntry]:
+        if entry is not None and entry.is_fresh():
+            self.fresh_hits += 1
+            return entry
+        if entry is not None and allow_stale:
+            self.stale_hits += 1
+            return entry
+        self.misses += 1
+        return None
+
+    def _lookup(self, key: str) -> Optional[CacheEntry]:
+        entry = self.local.get(key)
+        if entry is not None:
+            return entry
+
+        if self.shared is None:
+            return None
+
+        entry = self.shared.get(key)
+        if entry is not None:
+            self.local.set(key, entry)
+        return entry
+
+    def set(self, key: str, value: Any, cache_class: str) -> CacheEntry:
+        """Store value encoded as its JSON response body"""
+        return self.set_encoded(key, codec.dumps(value), cache_class)
+
+    def set_encoded(self, key: str, body: bytes, cache_class: str) -> CacheEntry:
+        """Store an already encoded JSON response body"""
+        now = time.time()
+        expires_at = now + self.ttl_for(cache_class)
+        entry = CacheEntry(
+            value=body,
+            size=len(body),
+            stored_at=now,
+            expires_at=expires_at,
+            stale_until=expires_at + self.stale_window_for(cache_class),
+            etag=content_hash(body),
+        )
+        self._store(key, entry)
+        if self.precompressor is not None and self.precompressor.applies_to(cache_class):
+            for head in self.precompressor.compress_all(body).values():
+                self._store_variant(key, entry, head)
+        return entry
+
+    def _store_variant(self, key: str, entry: CacheEntry, head: CompressedHead) -> CacheEntry:
+        variant = entry._replace(value=head, size=len(head.data))
+        self._store(self.variant_key(key, head.encoding), variant)
+        return variant
+
+    def set_derived(self, key: str, body: bytes, source: CacheEntry) -> CacheEntry:
+        """Store a body derived from a cached entry (e.g. a projection of it), expiring along with it"""
+        entry = source._replace(value=body, size=len(body), etag=content_hash(body))
+        self._store(key, entry)
+        return entry
+
+    def _store(self, key: str, entry: CacheEntry):
+        self.local.set(key, entry)
+        if self.shared is not None:
+            self.shared.set(key, entry)
+
+    def delete(self, key: str):
+        keys = [key]
+        if self.precompressor is not None:
+            keys += [self.variant_key(key, encoding) for encoding in self.precompressor.encodings]
+        for cache_key in keys:
+            self.local.delete(cache_key)
+            if self.shared is not None:
+                self.shared.delete(cache_key)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "fresh_hits": self.fresh_hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "l1": self.local.get_stats(),
+            "l2": self.shared.get_stats() if self.shared is not None else None,
+        }
+
+
+class BackgroundRevalidator:
+    """Runs cache refreshes off the request path, at most one per key at a time"""
+
+    def __init__(self, max_workers: int):
+        self.max_workers = max_workers
+        self.scheduled = 0
+        self.failed = 0
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._pending = set()
+        self._lock = threading.Lock()
+
+    def submit(self, key: Hashable, fn: Callable, *args) -> bool:
+        """Schedule fn(*args) unless a refresh for key is already pending"""
+        with self._lock:
+            if key in self._pending:
+                return False
+            self._pending.add(key)
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='cache-revalidate')
+            self.scheduled += 1
+        self._executor.submit(self._run, key, fn, args)
+        return True
+
+    def _run(self, key: Hashable, fn: Callable, args: tuple):
+        try:
+            fn(*args)
+        except Exception as e:
+            logger.warning(f"Background refresh failed for {key}: {e}")
+            self.failed += 1
+        finally:
+            with self._lock:
+                self._pending.discard(key)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {"scheduled": self.scheduled, "failed": self.failed, "pending": len(self._pending)}
+
+
+def content_hash(body: bytes) -> str:
+    """Hash identifying a stored body, used as its ETag"""
+    return hashlib.blake2b(body, digest_size=16).hexdigest()
+
+
+def validator_headers(entry: CacheEntry) -> Dict[str, str]:
+    """
+    ETag and Last-Modified headers for a cached body.
+
+    The ETag is weak: responses may splice per-request metadata into the body or be
+    sent in a content encoding, so only the data they carry is guaranteed the same.
+    """
+    if not entry.etag:
+        return {}
+    return {"ETag": f'W/"{entry.etag}"', "Last-Modified": http_date(entry.stored_at)}
+
+
+def is_not_modified(headers, entry: CacheEntry) -> bool:
+    """Whether a GET's If-None-Match (or, without one, If-Modified-Since) shows the client already has the entry's body"""
+    if not entry.etag:
+        return False
+    if_none_match = headers.get("If-None-Match")
+    if if_none_match is not None:
+        return any(tag == "*" or tag.removeprefix("W/") == f'"{entry.etag}"' for tag in parse_etags(if_none_match))
+    if_modified_since = parse_http_date_safe(headers.get("If-Modified-Since") or "")
+    return if_modified_since is not None and int(entry.stored_at) <= if_modified_since
+
+
+def cache_status_headers(source: str, age: int = 0) -> Dict[str, str]:
+    """Response headers describing where the data came from ("live", "cache" or "stale")"""
+    if source == "live":
+        return {"X-Cache-Status": "MISS"}
+
+    headers = {"X-Cache-Status": "STALE" if source == "stale" else "HIT", "Age": str(age)}
+    if source == "stale":
+        headers["Warning"] = '110 - "Response is Stale"'
+    return headers
+
+
+def build_local_cache() -> LocalTTLCache:
+    """Build the L1 tier from the PROXY_L1_CACHE_* settings"""
+    return LocalTTLCache(
+        max_bytes=getattr(settings, 'PROXY_L1_CACHE_MAX_BYTES', 64 * 1024 * 1024),
+        max_entries=getattr(settings, 'PROXY_L1_CACHE_MAX_ENTRIES', 10000),
+    )
+
+
+def build_response_cache() -> ResponseCache:
+    """Build the response cache from the PROXY_*_CACHE settings"""
+    shared_alias = getattr(settings, 'PROXY_L2_CACHE_ALIAS', 'default')
+    return ResponseCache(build_local_cache(), SharedCache(shared_alias) if shared_alias else None, precompressor)
+
+
+# Global response cache shared by every proxy instance in this process
+response_cache = build_response_cache()
+
+
+@receiver(setting_changed)
+def rebuild_local_cache(setting, **kwargs):
+    """Give the global response cache a new, empty L1 when its settings change (e.g. under override_settings)"""
+    if setting in ('PROXY_L1_CACHE_MAX_BYTES', 'PROXY_L1_CACHE_MAX_ENTRIES'):
+        response_cache.local = build_local_cache()
+
+
+# Global pool for stale-while-revalidate refreshes in this process
+cache_revalidator = BackgroundRevalidator(getattr(settings, 'PROXY_REVALIDATE_WORKERS', 4))
@@ -0,0 +1,80 @@
+"""
+JSON codec shared by provider parsing, the response cache and response rendering.
+
+Uses orjson when it is installed (and PROXY_JSON_CODEC allows it), falling back to
+the stdlib json module. Either way the encoded form is compact UTF-8 bytes, and
+values orjson cannot encode natively (Decimal, dates, lazy strings) go through
+Django's JSON encoder so both backends produce the same output for them.
+"""
+import json
+from typing import Any, Union
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponse
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+_django_encoder = DjangoJSONEncoder()
+
+
+class JSONCodec:
+    """Encodes to compact UTF-8 JSON bytes and decodes bytes or str"""
+
+    def __init__(self, backend: str = "auto"):
+        if backend not in ("auto", "orjson", "json"):
+            raise ImproperlyConfigured(f"Unknown JSON codec: {backend}")
+        if backend == "orjson" and orjson is None:
+            raise ImproperlyConfigured("PROXY_JSON_CODEC is 'orjson' but orjson is not installed")
+        self.backend = "orjson" if backend != "json" and orjson is not None else "json"
+
+    def dumps(self, value: Any) -> bytes:
+        if self.backend == "orjson":
+            try:
+                return orjson.dumps(
+                    value, default=_django_encoder.default, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+                )
+            except TypeError:
+                # e.g. integers wider than 64 bits, which the stdlib encoder handles
+                pass
+        return json.dumps(value, cls=DjangoJSONEncoder, separators=(",", ":"), ensure_ascii=False).encode()
+
+    def loads(self, data: Union[bytes, bytearray, memoryview, str]) -> Any:
+        if self.backend == "orjson":
+            return orjson.loads(data)
+        return json.loads(data)
+
+
+class FastJsonResponse(HttpResponse):
+    """JsonResponse equivalent that encodes with the shared codec"""
+
+    def __init__(self, data: Any, safe: bool = True, **kwargs):
+        if safe and not isinstance(data, dict):
+            raise TypeError("In order to allow non-dict objects to be serialized set the safe parameter to False.")
+        kwargs.setdefault("content_type", "application/json")
+        super().__init__(content=codec.dumps(data), **kwargs)
+
+
+class FastJSONRenderer(JSONRenderer):
+    """DRF JSON renderer using the shared codec; indented output falls back to DRF's own encoder"""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        if self.get_indent(accepted_media_type, renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+        return codec.dumps(data)
+
+
+def build_codec() -> JSONCodec:
+    """Build the codec from the PROXY_JSON_CODEC setting ("auto", "orjson" or "json")"""
+    return JSONCodec(getattr(settings, "PROXY_JSON_CODEC", "auto"))
+
+
+# Global codec used for every proxied JSON payload in this process
+codec = build_codec()
@@ -0,0 +1,119 @@
+"""
+Columnar response formats for the format= query parameter.
+
+Time-series routes name where their rows are in "rows" (a key path into the
+payload, empty for a payload that is the row list itself). format=arrow, parquet or
+csv returns those rows as an Arrow IPC stream, a Parquet file or CSV instead of
+JSON. Rows are converted to columns in one pass inside Arrow (pyarrow.array infers
+a struct of every key seen), so no Python code runs per row; only nested values in
+CSV output are rendered per value, as JSON text.
+
+All three formats need the "columnar" extra (pyarrow). Without it, or on routes
+without rows, they are answered 406 Not Acceptable.
+"""
+from typing import Any, Dict, List, Optional, Tuple
+
+from django.conf import settings
+
+from .codec import codec
+from .config import NotAcceptableError
+
+try:
+    import pyarrow
+    import pyarrow.csv
+    import pyarrow.ipc
+    import pyarrow.parquet
+except ImportError:  # pragma: no cover - optional dependency
+    pyarrow = None
+
+# Query parameter naming the response format; it is never forwarded to the provider
+FORMAT_PARAM = "format"
+JSON_FORMAT = "json"
+
+
+class ArrowWriter:
+    name = "arrow"
+    media_type = "application/vnd.apache.arrow.stream"
+
+    def write(self, table) -> bytes:
+        sink = pyarrow.BufferOutputStream()
+        with pyarrow.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        return sink.getvalue().to_pybytes()
+
+
+class ParquetWriter:
+    name = "parquet"
+    media_type = "application/vnd.apache.parquet"
+
+    def __init__(self, compression: str = "zstd"):
+        self.compression = compression
+
+    def write(self, table) -> bytes:
+        sink = pyarrow.BufferOutputStream()
+        pyarrow.parquet.write_table(table, sink, compression=self.compression)
+        return sink.getvalue().to_pybytes()
+
+
+class CSVWriter:
+    name = "csv"
+    media_type = "text/csv"
+
+    def write(self, table) -> bytes:
+        # CSV has no nested types: lists and objects are written as JSON text
+        for index, field in enumerate(table.schema):
+            if pyarrow.types.is_nested(field.type):
+                values = [None if value is None else codec.dumps(value).decode() for value in table.column(index).to_pylist()]
+                table = table.set_column(index, field.name, pyarrow.array(values, pyarrow.string()))
+        sink = pyarrow.BufferOutputStream()
+        pyarrow.csv.write_csv(table, sink)
+        return sink.getvalue().to_pybytes()
+
+
+def build_writers() -> Dict[str, Any]:
+    """Writers for each columnar format, or none without pyarrow"""
+    if pyarrow is None:
+        return {}
+    writers = (ArrowWriter(), ParquetWriter(getattr(settings, "PROXY_PARQUET_COMPRESSION", "zstd")), CSVWriter())
+    return {writer.name: writer for writer in writers}
+
+
+WRITERS = build_writers()
+
+
+def available_formats() -> Tuple[str, ...]:
+    return (JSON_FORMAT,) + tuple(WRITERS)
+
+
+def get_writer(name: Optional[str]):
+    """The writer for a format= value; None for JSON, NotAcceptableError for anything unavailable"""
+    name = (name or JSON_FORMAT).strip().lower()
+    if name == JSON_FORMAT:
+        return None
+    if name not in WRITERS:
+        raise NotAcceptableError(f"Format {name} is not available; available formats: {', '.join(available_formats())}")
+    return WRITERS[name]
+
+
+def rows_at(data: Any, path: Tuple[str, ...]) -> List[Dict[str, Any]]:
+    """The row list at path in a payload; a missing list (e.g. a page without results) has no rows"""
+    for key in path:
+        data = data.get(key) if isinstance(data, dict) else None
+    if data is None:
+        return []
+    if not isinstance(data, list):
+        raise NotAcceptableError("The response holds no rows to convert to a columnar format")
+    return data
+
+
+def to_columnar(writer, rows: List[Dict[str, Any]]) -> bytes:
+    """Encode rows with writer, as a table with a column for every key in any row"""
+    if not rows:
+        return writer.write(pyarrow.table({}))
+    try:
+        array = pyarrow.array(rows)
+    except pyarrow.ArrowException as e:
+        raise NotAcceptableError(f"The response rows cannot be converted to {writer.name}: {e}")
+    if not pyarrow.types.is_struct(array.type):
+        raise NotAcceptableError("The response holds no rows to convert to a columnar format")
+    return writer.write(pyarrow.Table.from_struct_array(array))
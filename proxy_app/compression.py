@@ -0,0 +1,211 @@
+"""
+Content-Encoding negotiation and precompressed variants of cached response bodies.
+
+Bodies cached for the PROXY_PRECOMPRESS_CACHE_CLASSES are compressed once, when the
+entry is filled, into each encoding of PROXY_PRECOMPRESS_ENCODINGS available here:
+gzip always, br with the brotli package and zstd with the zstandard package.
+
+A response is its cached body with the last byte replaced by a short per-request
+tail (the _metadata member and closing brace), so a variant holds the body's head
+as an open compressed stream. Serving it only frames the tail, uncompressed, onto
+the stored bytes and ends the stream; no compressor runs on the request path:
+
+- gzip: the head is raw deflate ended by a sync flush; the tail follows as stored
+  blocks and the CRC32/size trailer is derived from the head's stored checksum.
+- br: the head is a flushed, unfinished brotli stream; the tail follows as
+  uncompressed meta-blocks and an empty last meta-block ends the stream.
+- zstd: the head is a frame flushed at a block boundary; the tail follows as raw
+  blocks, the last one ending the frame.
+"""
+import struct
+import zlib
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional dependency
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - optional dependency
+    zstandard = None
+
+GZIP_HEADER = b"\x1f\x8b\x08\x00\x00\x00\x00\x00\x00\xff"
+# Zstandard magic number and a frame header with no content size, checksum or dictionary and a 128KB window
+ZSTD_FRAME_HEADER = b"\x28\xb5\x2f\xfd\x00\x38"
+
+
+class CompressedHead(NamedTuple):
+    """A body without its last byte, compressed as an open stream for one encoding"""
+
+    encoding: str
+    data: bytes
+    # Length and CRC32 of the uncompressed head, and the body's last byte
+    length: int
+    checksum: int
+    last: bytes
+
+
+class GzipEncoder:
+    encoding = "gzip"
+
+    def __init__(self, level: int = 9):
+        self.level = level
+
+    def compress(self, head: bytes) -> bytes:
+        compressor = zlib.compressobj(self.level, zlib.DEFLATED, -zlib.MAX_WBITS)
+        return GZIP_HEADER + compressor.compress(head) + compressor.flush(zlib.Z_SYNC_FLUSH)
+
+
+class BrotliEncoder:
+    encoding = "br"
+
+    def __init__(self, quality: int = 9):
+        if brotli is None:
+            raise ImproperlyConfigured("The br encoding needs the brotli package")
+        self.quality = quality
+
+    def compress(self, head: bytes) -> bytes:
+        compressor = brotli.Compressor(quality=self.quality)
+        return compressor.process(head) + compressor.flush()
+
+
+class ZstdEncoder:
+    encoding = "zstd"
+
+    def __init__(self, level: int = 12):
+        if zstandard is None:
+            raise ImproperlyConfigured("The zstd encoding needs the zstandard package")
+        # No content size or checksum in the frame header, so raw blocks can be appended
+        self.compressor = zstandard.ZstdCompressor(level=level, write_content_size=False, write_checksum=False)
+
+    def compress(self, head: bytes) -> bytes:
+        compressor = self.compressor.compressobj()
+        # Nothing at all is written for an empty head, not even the frame header
+        return compressor.compress(head) + compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK) or ZSTD_FRAME_HEADER
+
+
+ENCODERS = {encoder.encoding: encoder for encoder in (GzipEncoder, BrotliEncoder, ZstdEncoder)}
+
+
+def _blocks(data: bytes, size: int) -> List[bytes]:
+    return [data[start:start + size] for start in range(0, len(data), size)]
+
+
+def _finish_gzip(head: CompressedHead, tail: bytes) -> List[bytes]:
+    parts = [head.data]
+    blocks = _blocks(tail, 0xFFFF)
+    for index, block in enumerate(blocks):
+        # BFINAL on the last block, BTYPE 00 (stored), then LEN and its one's complement
+        parts.append(b"\x01" if index == len(blocks) - 1 else b"\x00")
+        parts.append(struct.pack("<HH", len(block), len(block) ^ 0xFFFF))
+        parts.append(block)
+    parts.append(struct.pack("<II", zlib.crc32(tail, head.checksum), (head.length + len(tail)) & 0xFFFFFFFF))
+    return parts
+
+
+def _finish_brotli(head: CompressedHead, tail: bytes) -> List[bytes]:
+    parts = [head.data]
+    for block in _blocks(tail, 1 << 16):
+        # ISLAST 0, MNIBBLES 4, MLEN - 1 and ISUNCOMPRESSED 1, padded to the byte boundary
+        parts.append(((len(block) - 1) << 3 | 1 << 19).to_bytes(3, "little"))
+        parts.append(block)
+    # ISLAST 1, ISLASTEMPTY 1
+    parts.append(b"\x03")
+    return parts
+
+
+def _finish_zstd(head: CompressedHead, tail: bytes) -> List[bytes]:
+    parts = [head.data]
+    blocks = _blocks(tail, 1 << 16)
+    for index, block in enumerate(blocks):
+        # Last_Block bit, Block_Type 0 (raw) and Block_Size
+        parts.append((len(block) << 3 | (index == len(blocks) - 1)).to_bytes(3, "little"))
+        parts.append(block)
+    return parts
+
+
+FINISHERS = {"gzip": _finish_gzip, "br": _finish_brotli, "zstd": _finish_zstd}
+
+
+def finish(head: CompressedHead, tail: bytes) -> bytes:
+    """The complete encoded body of head followed by tail (at least one byte)"""
+    return b"".join(FINISHERS[head.encoding](head, tail))
+
+
+def negotiate(accept_encoding: str, encodings: Iterable[str]) -> Optional[str]:
+    """
+    The encoding of encodings (in order of preference) to answer an Accept-Encoding header with.
+
+    None means identity: no header, nothing acceptable or only identity preferred.
+    """
+    weights = {}
+    for item in accept_encoding.split(","):
+        coding, _, params = item.partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        weight = 1.0
+        for param in params.split(";"):
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    weight = float(value)
+                except ValueError:
+                    weight = 0.0
+        weights[coding] = weight
+
+    best, best_weight = None, 0.0
+    for encoding in encodings:
+        weight = weights.get(encoding, weights.get("*", 0.0))
+        if weight > best_weight:
+            best, best_weight = encoding, weight
+    # On a tie with identity the smaller body wins
+    return best if best_weight >= weights.get("identity", 0.0) else None
+
+
+class Precompressor:
+    """Compresses cached bodies of the configured cache classes into each available encoding"""
+
+    def __init__(self, encoders: Iterable, cache_classes: Iterable[str]):
+        self.encoders = {encoder.encoding: encoder for encoder in encoders}
+        self.cache_classes = frozenset(cache_classes)
+
+    @property
+    def encodings(self) -> Tuple[str, ...]:
+        """Available encodings, most preferred first"""
+        return tuple(self.encoders)
+
+    def applies_to(self, cache_class: str) -> bool:
+        return bool(self.encoders) and cache_class in self.cache_classes
+
+    def compress(self, body: bytes, encoding: str) -> CompressedHead:
+        head = body[:-1]
+        return CompressedHead(encoding, self.encoders[encoding].compress(head), len(head), zlib.crc32(head), body[-1:])
+
+    def compress_all(self, body: bytes) -> Dict[str, CompressedHead]:
+        return {encoding: self.compress(body, encoding) for encoding in self.encoders}
+
+
+def build_precompressor() -> Precompressor:
+    """Build the precompressor from the PROXY_PRECOMPRESS_* settings, skipping encodings whose package is missing"""
+    encoders = []
+    for encoding in _split(getattr(settings, "PROXY_PRECOMPRESS_ENCODINGS", "br,zstd,gzip")):
+        if encoding not in ENCODERS:
+            raise ImproperlyConfigured(f"Unknown precompression encoding: {encoding}")
+        if encoding == "br" and brotli is None or encoding == "zstd" and zstandard is None:
+            continue
+        encoders.append(ENCODERS[encoding]())
+    return Precompressor(encoders, _split(getattr(settings, "PROXY_PRECOMPRESS_CACHE_CLASSES", "static,fundamental")))
+
+
+def _split(value: str) -> List[str]:
+    return [item.strip() for item in value.split(",") if item.strip()]
+
+
+# Global precompressor used by the response cache in this process
+precompressor = build_precompressor()
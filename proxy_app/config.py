@@ -21,14 +21,43 @@ CACHE_TTL = {
     'static': 604800,  # 1 week for static data
 }
 
+# Stale-while-revalidate windows in seconds: how long past its TTL an entry may still be
+# served (flagged as stale) while a background refresh repopulates it
+STALE_WHILE_REVALIDATE = {
+    'real_time': 15,
+    'intraday': 120,
+    'daily': 1800,
+    'fundamental': 43200,
+    'news': 600,
+    'static': 86400,
+}
+
+# Hard bound on how far past its TTL any response may be served
+MAX_STALENESS = 86400
+
+# Maximum concurrent upstream calls per provider from batch fan-out in one process
+BATCH_PROVIDER_CONCURRENCY = {
+    'polygon': 8,
+    'fmp': 16,
+}
+
 # Rate limits (calls per minute)
 RATE_LIMITS = {'polygon': 1000, 'fmp': 3000}
 
+# Calls per provider that may be spent at once out of its per-minute budget; the
+# remainder refills evenly so no rolling minute ever exceeds RATE_LIMITS
+RATE_LIMIT_BURST = {'polygon': 100, 'fmp': 300}
+
 # COMPLETE Endpoint routing configuration - 100% Coverage
+# Routes with large row payloads list the only field paths that can hold provider URLs
+# in "url_fields" (see rewrite.py); an empty tuple means the payload never has any.
+# Routes flagged "stream" forward the provider body as it arrives (see streaming.py).
+# Time-series routes give the key path of their row list in "rows" (empty for a payload
+# that is the list itself), which format=arrow|parquet|csv encodes (see columnar.py)
 ENDPOINT_ROUTES = {
     # ==================== REFERENCE DATA ====================
     # Basic Reference
-    "reference/tickers": {"provider": "fmp", "endpoint": "/v3/stock/list", "cache": "static"},
+    "reference/tickers": {"provider": "fmp", "endpoint": "/v3/stock/list", "cache": "static", "url_fields": (), "stream": True},
     "reference/ticker/{symbol}": {"provider": "fmp", "endpoint": "/v3/profile/{symbol}", "cache": "daily"},
     "reference/ticker/{symbol}/profile": {"provider": "fmp", "endpoint": "/v3/profile/{symbol}", "cache": "daily"},
     "reference/ticker/{symbol}/executives": {"provider": "fmp", "endpoint": "/v3/key-executives/{symbol}", "cache": "static"},
@@ -44,8 +73,9 @@ ENDPOINT_ROUTES = {
     "reference/market-status": {"provider": "polygon", "endpoint": "/v1/marketstatus/now", "cache": "real_time"},
     "reference/market-holidays": {"provider": "polygon", "endpoint": "/v1/marketstatus/upcoming", "cache": "static"},
     # ==================== MARKET DATA ====================
-    # Real-time Quotes
-    "quotes/{symbol}": {"provider": "fmp", "endpoint": "/v3/quote/{symbol}", "cache": "real_time"},
+    # Real-time Quotes ("micro_batch" names the path param merged comma-separated into one
+    # upstream call, and the response field used to split the results back per item)
+    "quotes/{symbol}": {"provider": "fmp", "endpoint": "/v3/quote/{symbol}", "cache": "real_time", "micro_batch": "symbol"},
     "quotes/batch": {"provider": "fmp", "endpoint": "/v3/quote/{symbols}", "cache": "real_time"},
     "quotes/gainers": {"provider": "fmp", "endpoint": "/v3/gainers", "cache": "real_time"},
     "quotes/losers": {"provider": "fmp", "endpoint": "/v3/losers", "cache": "real_time"},
@@ -55,24 +85,70 @@ ENDPOINT_ROUTES = {
     "quotes/{symbol}/last-quote": {"provider": "polygon", "endpoint": "/v2/last/nbbo/{symbol}", "cache": "real_time"},
     "quotes/{symbol}/previous-close": {"provider": "polygon", "endpoint": "/v2/aggs/ticker/{symbol}/prev", "cache": "daily"},
     # Historical Data
-    "historical/{symbol}": {"provider": "fmp", "endpoint": "/v3/historical-price-full/{symbol}", "cache": "daily"},
-    "historical/{symbol}/intraday": {"provider": "fmp", "endpoint": "/v3/historical-chart/{interval}/{symbol}", "cache": "intraday"},
-    "historical/{symbol}/dividends": {"provider": "fmp", "endpoint": "/v3/historical-price-full/stock_dividend/{symbol}", "cache": "daily"},
-    "historical/{symbol}/splits": {"provider": "fmp", "endpoint": "/v3/historical-price-full/stock_split/{symbol}", "cache": "daily"},
+    "historical/{symbol}": {"provider": "fmp", "endpoint": "/v3/historical-price-full/{symbol}", "cache": "daily", "rows": ("historical",)},
+    "historical/{symbol}/intraday": {
+        "provider": "fmp",
+        "endpoint": "/v3/historical-chart/{interval}/{symbol}",
+        "cache": "intraday",
+        "rows": (),
+    },
+    "historical/{symbol}/dividends": {
+        "provider": "fmp",
+        "endpoint": "/v3/historical-price-full/stock_dividend/{symbol}",
+        "cache": "daily",
+        "rows": ("historical",),
+    },
+    "historical/{symbol}/splits": {
+        "provider": "fmp",
+        "endpoint": "/v3/historical-price-full/stock_split/{symbol}",
+        "cache": "daily",
+        "rows": ("historical",),
+    },
     # Grouped Daily (Polygon.io)
-    "historical/grouped/{date}": {"provider": "polygon", "endpoint": "/v2/aggs/grouped/locale/us/market/stocks/{date}", "cache": "daily"},
+    "historical/grouped/{date}": {
+        "provider": "polygon",
+        "endpoint": "/v2/aggs/grouped/locale/us/market/stocks/{date}",
+        "cache": "daily",
+        "url_fields": ("next_url",),
+    },
     # ==================== OPTIONS DATA (Polygon.io Exclusive) ====================
-    "options/contracts": {"provider": "polygon", "endpoint": "/v3/reference/options/contracts", "cache": "daily"},
-    "options/chain/{symbol}": {"provider": "polygon", "endpoint": "/v3/snapshot/options/{symbol}", "cache": "real_time"},
-    "options/{symbol}/greeks": {"provider": "polygon", "endpoint": "/v3/snapshot/options/{symbol}", "cache": "real_time"},
-    "options/{symbol}/open-interest": {"provider": "polygon", "endpoint": "/v3/snapshot/options/{symbol}", "cache": "real_time"},
+    "options/contracts": {
+        "provider": "polygon",
+        "endpoint": "/v3/reference/options/contracts",
+        "cache": "daily",
+        "url_fields": ("next_url",),
+    },
+    "options/chain/{symbol}": {
+        "provider": "polygon",
+        "endpoint": "/v3/snapshot/options/{symbol}",
+        "cache": "real_time",
+        "url_fields": ("next_url",),
+    },
+    "options/{symbol}/greeks": {
+        "provider": "polygon",
+        "endpoint": "/v3/snapshot/options/{symbol}",
+        "cache": "real_time",
+        "url_fields": ("next_url",),
+    },
+    "options/{symbol}/open-interest": {
+        "provider": "polygon",
+        "endpoint": "/v3/snapshot/options/{symbol}",
+        "cache": "real_time",
+        "url_fields": ("next_url",),
+    },
     "options/{contract}/historical": {
         "provider": "polygon",
         "endpoint": "/v2/aggs/ticker/{contract}/range/{multiplier}/{timespan}/{from}/{to}",
         "cache": "daily",
+        "url_fields": ("next_url",),
     },
     # ==================== FUTURES DATA (Polygon.io Exclusive) ====================
-    "futures/contracts": {"provider": "polygon", "endpoint": "/v3/reference/futures/contracts", "cache": "daily"},
+    "futures/contracts": {
+        "provider": "polygon",
+        "endpoint": "/v3/reference/futures/contracts",
+        "cache": "daily",
+        "url_fields": ("next_url",),
+    },
     "futures/{symbol}/snapshot": {
         "provider": "polygon",
         "endpoint": "/v2/snapshot/locale/global/markets/futures/tickers/{symbol}",
@@ -82,14 +158,30 @@ ENDPOINT_ROUTES = {
         "provider": "polygon",
         "endpoint": "/v2/aggs/ticker/{symbol}/range/{multiplier}/{timespan}/{from}/{to}",
         "cache": "daily",
+        "url_fields": ("next_url",),
     },
     # ==================== TICK-LEVEL DATA (Polygon.io Exclusive) ====================
-    "ticks/{symbol}/trades": {"provider": "polygon", "endpoint": "/v3/trades/{symbol}", "cache": "real_time"},
-    "ticks/{symbol}/quotes": {"provider": "polygon", "endpoint": "/v3/quotes/{symbol}", "cache": "real_time"},
+    "ticks/{symbol}/trades": {
+        "provider": "polygon",
+        "endpoint": "/v3/trades/{symbol}",
+        "cache": "real_time",
+        "url_fields": ("next_url",),
+        "stream": True,
+        "rows": ("results",),
+    },
+    "ticks/{symbol}/quotes": {
+        "provider": "polygon",
+        "endpoint": "/v3/quotes/{symbol}",
+        "cache": "real_time",
+        "url_fields": ("next_url",),
+        "rows": ("results",),
+    },
     "ticks/{symbol}/aggregates": {
         "provider": "polygon",
         "endpoint": "/v2/aggs/ticker/{symbol}/range/{multiplier}/{timespan}/{from}/{to}",
         "cache": "intraday",
+        "url_fields": ("next_url",),
+        "rows": ("results",),
     },
     # ==================== FUNDAMENTAL DATA (FMP Exclusive) ====================
     # Financial Statements
@@ -153,7 +245,7 @@ ENDPOINT_ROUTES = {
     "economy/interest-rates": {"provider": "fmp", "endpoint": "/v4/economic", "cache": "fundamental", "params": {"name": "federalFunds"}},
     "economy/treasury-rates": {"provider": "fmp", "endpoint": "/v4/treasury", "cache": "daily"},
     # ==================== ETF & MUTUAL FUNDS (FMP Exclusive) ====================
-    "etf/list": {"provider": "fmp", "endpoint": "/v3/etf/list", "cache": "static"},
+    "etf/list": {"provider": "fmp", "endpoint": "/v3/etf/list", "cache": "static", "url_fields": (), "stream": True},
     "etf/{symbol}/holdings": {"provider": "fmp", "endpoint": "/v3/etf-holder/{symbol}", "cache": "daily"},
     "etf/{symbol}/performance": {"provider": "fmp", "endpoint": "/v4/etf-info", "cache": "daily", "params": {"symbol": "{symbol}"}},
     "mutual-funds/list": {"provider": "fmp", "endpoint": "/v3/mutual-fund/list", "cache": "static"},
@@ -234,9 +326,28 @@ ENDPOINT_ROUTES = {
         "params": {"type": "WILLR"},
     },
     # ==================== BULK DATA (FMP Exclusive) ====================
-    "bulk/eod-prices": {"provider": "fmp", "endpoint": "/v4/batch-request-end-of-day-prices", "cache": "daily"},
-    "bulk/fundamentals": {"provider": "fmp", "endpoint": "/v4/batch-request-financial-statements", "cache": "fundamental"},
-    "bulk/insider-trading": {"provider": "fmp", "endpoint": "/v4/insider-trading-rss-feed", "cache": "daily"},
+    "bulk/eod-prices": {
+        "provider": "fmp",
+        "endpoint": "/v4/batch-request-end-of-day-prices",
+        "cache": "daily",
+        "url_fields": (),
+        "stream": True,
+        "rows": (),
+    },
+    "bulk/fundamentals": {
+        "provider": "fmp",
+        "endpoint": "/v4/batch-request-financial-statements",
+        "cache": "fundamental",
+        "url_fields": (),
+        "stream": True,
+    },
+    "bulk/insider-trading": {
+        "provider": "fmp",
+        "endpoint": "/v4/insider-trading-rss-feed",
+        "cache": "daily",
+        "url_fields": (),
+        "stream": True,
+    },
 }
 
 
@@ -266,3 +377,15 @@ class RateLimitError(FinancialAPIError):
     """Rate limit exceeded error"""
 
     pass
+
+
+class InvalidParameterError(FinancialAPIError):
+    """Invalid request parameter error"""
+
+    pass
+
+
+class NotAcceptableError(FinancialAPIError):
+    """Requested response format is not available"""
+
+    pass
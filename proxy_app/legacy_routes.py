@@ -0,0 +1,701 @@
+"""
+Route table for the legacy unified API view (UnifiedFinancialAPIView).
+
+Compiled once at import: patterns go into a segment trie that captures named
+path parameters, configs are frozen, and provider endpoint templates are split
+into literal and field parts so substitution is a single join.
+"""
+from datetime import date, timedelta
+from string import Formatter
+from types import MappingProxyType
+from typing import Dict, Mapping, Optional, Tuple
+
+from .router import Router
+
+# Polygon routes with large row payloads name the only fields that can carry pagination
+# links in 'url_fields', so response cleaning skips their rows (see rewrite.py). Routes
+# flagged 'stream' forward the provider body as it arrives (see streaming.py). Routes
+# flagged 'all_pages' are Polygon cursor endpoints that all_pages=true walks server-side,
+# streaming every page's rows as NDJSON (see pagination.py). Routes with a 'compact' spec
+# (row kind, key path of the rows) can answer schema=compact (see schemas.py)
+_ENDPOINT_MAPPINGS = {
+    # Reference Data Endpoints
+    'reference/tickers': {
+        'provider': 'polygon',
+        'endpoint': '/v3/reference/tickers',
+        'method': 'GET',
+        'cache_type': 'static',
+        'url_fields': ('next_url',),
+        'all_pages': True,
+        'stream': True,
+    },
+    'marketstatus/upcoming': {
+        'provider': 'polygon',
+        'endpoint': '/v1/marketstatus/upcoming',
+        'method': 'GET',
+        'cache_type': 'daily',
+    },
+    'reference/ticker/{symbol}': {
+        'provider': 'fmp',
+        'endpoint': '/v3/profile/{symbol}',
+        'method': 'GET',
+        'cache_type': 'daily',
+        'compact': ('profile', ()),
+    },
+    'reference/ticker/{symbol}/profile': {
+        'provider': 'fmp',
+        'endpoint': '/v3/profile/{symbol}',
+        'method': 'GET',
+        'cache_type': 'daily',
+        'compact': ('profile', ()),
+    },
+    'reference/ticker/{symbol}/executives': {
+        'provider': 'fmp',
+        'endpoint': '/v3/key-executives/{symbol}',
+        'method': 'GET',
+        'cache_type': 'static',
+    },
+    'reference/ticker/{symbol}/peers': {
+        'provider': 'fmp',
+        'endpoint': '/v3/stock_peers',
+        'method': 'GET',
+        'cache_type': 'daily',
+        'params_map': {'symbol': 'symbol'},
+    },
+    'reference/exchanges': {'provider': 'fmp', 'endpoint': '/v3/exchanges-list', 'method': 'GET', 'cache_type': 'static'},
+    'reference/market-status': {
+        'provider': 'fmp',
+        'endpoint': '/v3/is-the-market-open',
+        'method': 'GET',
+        'cache_type': 'real_time',
+    },
+    # Market Data Endpoints
+    'quotes/{symbol}': {
+        'provider': 'fmp',
+        'endpoint': '/v3/quote/{symbol}',
+        'method': 'GET',
+        'cache_type': 'real_time',
+        'polygon_fallback': '/v2/snapshot/locale/us/markets/stocks/tickers/{symbol}',
+        'compact': ('quote', ()),
+    },
+    'quotes/batch': {
+        'provider': 'fmp',
+        'endpoint': '/v3/quote/{symbols}',
+        'method': 'GET',
+        'cache_type': 'real_time',
+        'compact': ('quote', ()),
+    },
+    'quotes/gainers': {'provider': 'fmp', 'endpoint': '/v3/gainers', 'method': 'GET', 'cache_type': 'real_time', 'compact': ('quote', ())},
+    'quotes/losers': {'provider': 'fmp', 'endpoint': '/v3/losers', 'method': 'GET', 'cache_type': 'real_time', 'compact': ('quote', ())},
+    'quotes/active': {'provider': 'fmp', 'endpoint': '/v3/actives', 'method': 'GET', 'cache_type': 'real_time', 'compact': ('quote', ())},
+    # Historical Data Endpoints
+    'historical/{symbol}': {
+        'provider': 'fmp',
+        'endpoint': '/v3/historical-price-full/{symbol}',
+        'method': 'GET',
+        'cache_type': 'daily',
+        'polygon_fallback': '/v2/aggs/ticker/{symbol}/range/1/day/{from}/{to}',
+        'compact': ('bar', ('historical',)),
+    },
+    'historical/{symbol}/intraday': {
+        'provider': 'fmp',
+        'endpoint': '/v3/historical-chart/{interval}/{symbol}',
+        'method': 'GET',
+        'cache_type': 'intraday',
+        'compact': ('bar', ()),
+    },
+    'historical/{symbol}/splits': {
+        'provider': 'fmp',
+        'endpoint': '/v3/stock_split_calendar',
+        'method': 'GET',
+        'cache_type': 'daily',
+        'polygon_fallback': '/v3/reference/splits',
+    },
+    'historical/{symbol}/dividends': {
+        'provider': 'fmp',
+        'endpoint': '/v3/historical-price-full/stock_dividend/{symbol}',
+        'method': 'GET',
+        'cache_type': 'daily',
+        'polygon_fallback': '/v3/reference/dividends',
+    },
+    # Tick-level Data (Polygon.io exclusive)
+    'ticks/{symbol}/trades': {
+        'provider': 'polygon',
+        'endpoint': '/v3/trades/{symbol}',
+        'method': 'GET',
+        'cache_type': 'real_time',
+        'url_fields': ('next_url',),
+        'all_pages': True,
+        'stream': True,
+        'compact': ('trade', ('results',)),
+    },
+    'ticks/{symbol}/quotes': {
+        'provider': 'polygon',
+        'endpoint': '/v3/quotes/{symbol}',
+        'method': 'GET',
+        'cache_type': 'real_time',
+        'url_fields': ('next_url',),
+        'all_pages': True,
+    },
+    'ticks/{symbol}/aggregates': {
+        'provider': 'polygon',
+        'endpoint': '/v2/aggs/ticker/{symbol}/range/{multiplier}/{timespan}/{from}/{to}',
+        'method': 'GET',
+        'cache_type': 'intraday',
+        'url_fields': ('next_url',),
+        'compact': ('bar', ('results',)),
+    },
+    'aggs/ticker/{symbol}/range/{multiplier}/{timespan}/{from}/{to}': {
+        'provider': 'polygon',
+        'endpoint': '/v2/aggs/ticker/{symbol}/range/{multiplier}/{timespan}/{from}/{to}',
+        'method': 'GET',
+        'cache_type': 'intraday',
+        'url_fields': ('next_url',),
+        'compact': ('bar', ('results',)),
+    },
+    # Options Data (Polygon.io exclusive)
+    'options/contracts': {
+        'provider': 'polygon',
+        'endpoint': '/v3/reference/options/contracts',
+        'method': 'GET',
+        'cache_type': 'daily',
+        'url_fields': ('next_url',),
+        'all_pages': True,
+    },
+    'reference/options/contracts': {
+        'provider': 'polygon',
+        'endpoint': '/v3/reference/options/contracts',
+        'method': 'GET',
+        'cache_type': 'daily',
+        'url_fields': ('next_url',),
+        'all_pages': True,
+    },
+    'options/chain/{symbol}': {
+        'provider': 'polygon',
+        'endpoint': '/v3/snapshot/options/{symbol}',
+        'method': 'GET',
+        'cache_type': 'real_time',
+        'url_fields': ('next_url',),
+        'all_pages': True,
+    },
+    'options/{symbol}/snapshot': {
+        'provider': 'polygon',
+        'endpoint': '/v3/snapshot/options/{symbol}',
+        'method': 'GET',
+        'cache_type': 'real_time',
+        'url_fields': ('next_url',),
+        'all_pages': True,
+    },
+    'options/{contract}/details': {
+        'provider': 'polygon',
+        'endpoint': '/v3/reference/options/contracts/{contract}',
+        'method': 'GET',
+        'cache_type': 'daily',
+    },
+    'options/{contract}/historical': {
+        'provider': 'polygon',
+        'endpoint': '/v2/aggs/ticker/{contract}/range/{multiplier}/{timespan}/{from}/{to}',
+        'method': 'GET',
+        'cache_type': 'daily',
+        'url_fields': ('next_url',),
+    },
+    # Futures Data (Polygon.io exclusive)
+    'futures/contracts': {
+        'provider': 'polygon',
+        'endpoint': '/v3/reference/futures/contracts',
+        'method': 'GET',
+        'cache_type': 'daily',
+        'url_fields': ('next_url',),
+        'all_pages': True,
+    },
+    'futures/{symbol}/snapshot': {
+        'provider': 'polygon',
+        'endpoint': '/v2/snapshot/locale/global/markets/futures/tickers/{symbol}',
+        'method': 'GET',
+        'cache_type': 'real_time',
+    },
+    'futures/{symbol}/historical': {
+        'provider': 'polygon',
+        'endpoint': '/v2/aggs/ticker/{symbol}/range/{multiplier}/{timespan}/{from}/{to}',
+        'method': 'GET',
+        'cache_type': 'daily',
+        'url_fields': ('next_url',),
+    },
+    # Forex Data
+    'forex/rates': {
+        'provider': 'fmp',
+        'endpoint': '/v3/fx',
+        'method': 'GET',
+        'cache_type': 'real_time',
+        'polygon_fallback': '/v1/last/currencies/{from}/{to}',
+    },
+    'forex/{pair}/historical': {
+        'provider': 'fmp',
+        'endpoint': '/v3/historical-price-full/{pair}',
+        'method': 'GET',
+        'cache_type': 'daily',
+        'compact': ('bar', ('historical',)),
+    },
+    'forex/{pair}/intraday': {
+        'provider': 'fmp',
+        'endpoint': '/v3/historical-chart/{interval}/{pair}',
+        'method': 'GET',
+        'cache_type': 'intraday',
+        'compact': ('bar', ()),
+    },
+    # Cryptocurrency Data
+    'crypto/prices': {
+        'provider': 'fmp',
+        'endpoint': '/v3/cryptocurrencies',
+        'method': 'GET',
+        'cache_type': 'real_time',
+        'polygon_fallback': '/v1/last/crypto/{from}/{to}',
+    },
+    'crypto/{symbol}/historical': {
+        'provider': 'fmp',
+        'endpoint': '/v3/historical-price-full/{symbol}',
+        'method': 'GET',
+        'cache_type': 'daily',
+        'compact': ('bar', ('historical',)),
+    },
+    'crypto/{symbol}/intraday': {
+        'provider': 'fmp',
+        'endpoint': '/v3/historical-chart/{interval}/{symbol}',
+        'method': 'GET',
+        'cache_type': 'intraday',
+        'compact': ('bar', ()),
+    },
+    # Fundamental Data (FMP exclusive)
+    'fundamentals/{symbol}/income-statement': {
+        'provider': 'fmp',
+        'endpoint': '/v3/income-statement/{symbol}',
+        'method': 'GET',
+        'cache_type': 'fundamental',
+    },
+    'fundamentals/{symbol}/balance-sheet': {
+        'provider': 'fmp',
+        'endpoint': '/v3/balance-sheet-statement/{symbol}',
+        'method': 'GET',
+        'cache_type': 'fundamental',
+    },
+    'fundamentals/{symbol}/cash-flow': {
+        'provider': 'fmp',
+        'endpoint': '/v3/cash-flow-statement/{symbol}',
+        'method': 'GET',
+        'cache_type': 'fundamental',
+    },
+    'fundamentals/{symbol}/ratios': {
+        'provider': 'fmp',
+        'endpoint': '/v3/ratios/{symbol}',
+        'method': 'GET',
+        'cache_type': 'fundamental',
+    },
+    'fundamentals/{symbol}/metrics': {
+        'provider': 'fmp',
+        'endpoint': '/v3/key-metrics/{symbol}',
+        'method': 'GET',
+        'cache_type': 'fundamental',
+    },
+    'fundamentals/{symbol}/growth': {
+        'provider': 'fmp',
+        'endpoint': '/v3/financial-growth/{symbol}',
+        'method': 'GET',
+        'cache_type': 'fundamental',
+    },
+    # Valuation Data (FMP exclusive)
+    'valuation/{symbol}/dcf': {
+        'provider': 'fmp',
+        'endpoint': '/v3/discounted-cash-flow/{symbol}',
+        'method': 'GET',
+        'cache_type': 'fundamental',
+    },
+    'valuation/{symbol}/ratios': {
+        'provider': 'fmp',
+        'endpoint': '/v3/ratios-ttm/{symbol}',
+        'method': 'GET',
+        'cache_type': 'fundamental',
+    },
+    'valuation/{symbol}/enterprise-value': {
+        'provider': 'fmp',
+        'endpoint': '/v3/enterprise-values/{symbol}',
+        'method': 'GET',
+        'cache_type': 'fundamental',
+    },
+    'valuation/screener': {'provider': 'fmp', 'endpoint': '/v3/stock-screener', 'method': 'GET', 'cache_type': 'daily'},
+    # News & Sentiment (FMP exclusive)
+    'news': {'provider': 'fmp', 'endpoint': '/v3/stock_news', 'method': 'GET', 'cache_type': 'news'},
+    'news/{symbol}': {
+        'provider': 'fmp',
+        'endpoint': '/v3/stock_news',
+        'method': 'GET',
+        'cache_type': 'news',
+        'params_map': {'symbol': 'tickers'},
+    },
+    'news/sentiment/{symbol}': {'provider': 'fmp', 'endpoint': '/v4/sentiment-analysis', 'method': 'GET', 'cache_type': 'news'},
+    'news/press-releases/{symbol}': {
+        'provider': 'fmp',
+        'endpoint': '/v3/press-releases/{symbol}',
+        'method': 'GET',
+        'cache_type': 'news',
+    },
+    # Analyst Data (FMP exclusive)
+    'analysts/{symbol}/estimates': {
+        'provider': 'fmp',
+        'endpoint': '/v3/analyst-estimates/{symbol}',
+        'method': 'GET',
+        'cache_type': 'daily',
+    },
+    'analysts/{symbol}/recommendations': {
+        'provider': 'fmp',
+        'endpoint': '/v3/analyst-stock-recommendations/{symbol}',
+        'method': 'GET',
+        'cache_type': 'daily',
+    },
+    'analysts/{symbol}/price-targets': {
+        'provider': 'fmp',
+        'endpoint': '/v4/price-target/{symbol}',
+        'method': 'GET',
+        'cache_type': 'daily',
+    },
+    'analysts/{symbol}/upgrades-downgrades': {
+        'provider': 'fmp',
+        'endpoint': '/v4/upgrades-downgrades/{symbol}',
+        'method': 'GET',
+        'cache_type': 'daily',
+    },
+    # Earnings Data (FMP exclusive)
+    'earnings/{symbol}/calendar': {
+        'provider': 'fmp',
+        'endpoint': '/v3/earning_calendar',
+        'method': 'GET',
+        'cache_type': 'daily',
+        'params_map': {'symbol': 'symbol'},
+    },
+    'earnings/{symbol}/history': {
+        'provider': 'fmp',
+        'endpoint': '/v3/historical/earning_calendar/{symbol}',
+        'method': 'GET',
+        'cache_type': 'fundamental',
+    },
+    'earnings/{symbol}/surprises': {
+        'provider': 'fmp',
+        'endpoint': '/v3/earnings-surprises/{symbol}',
+        'method': 'GET',
+        'cache_type': 'fundamental',
+    },
+    'earnings/{symbol}/transcripts': {
+        'provider': 'fmp',
+        'endpoint': '/v4/batch_earning_call_transcript/{symbol}',
+        'method': 'GET',
+        'cache_type': 'fundamental',
+    },
+    'earnings/calendar': {'provider': 'fmp', 'endpoint': '/v3/earning_calendar', 'method': 'GET', 'cache_type': 'daily'},
+    # Institutional Data (FMP exclusive)
+    'institutional/{symbol}/holdings': {
+        'provider': 'fmp',
+        'endpoint': '/v3/institutional-holder/{symbol}',
+        'method': 'GET',
+        'cache_type': 'fundamental',
+    },
+    'institutional/{symbol}/13f': {
+        'provider': 'fmp',
+        'endpoint': '/v3/form-thirteen/{symbol}',
+        'method': 'GET',
+        'cache_type': 'fundamental',
+    },
+    'institutional/funds/{cik}': {
+        'provider': 'fmp',
+        'endpoint': '/v3/form-thirteen/{cik}',
+        'method': 'GET',
+        'cache_type': 'fundamental',
+    },
+    # Insider Trading (FMP exclusive)
+    'insider/{symbol}/transactions': {
+        'provider': 'fmp',
+        'endpoint': '/v4/insider-trading',
+        'method': 'GET',
+        'cache_type': 'daily',
+        'params_map': {'symbol': 'symbol'},
+    },
+    'insider/{symbol}/ownership': {
+        'provider': 'fmp',
+        'endpoint': '/v3/insider-trading/{symbol}',
+        'method': 'GET',
+        'cache_type': 'fundamental',
+    },
+    # Economic Data (FMP exclusive)
+    'economy/gdp': {
+        'provider': 'fmp',
+        'endpoint': '/v4/economic',
+        'method': 'GET',
+        'cache_type': 'fundamental',
+        'static_params': {'name': 'GDP'},
+    },
+    'economy/inflation': {
+        'provider': 'fmp',
+        'endpoint': '/v4/economic',
+        'method': 'GET',
+        'cache_type': 'fundamental',
+        'static_params': {'name': 'CPI'},
+    },
+    'economy/unemployment': {
+        'provider': 'fmp',
+        'endpoint': '/v4/economic',
+        'method': 'GET',
+        'cache_type': 'fundamental',
+        'static_params': {'name': 'unemploymentRate'},
+    },
+    'economy/interest-rates': {
+        'provider': 'fmp',
+        'endpoint': '/v4/economic',
+        'method': 'GET',
+        'cache_type': 'fundamental',
+        'static_params': {'name': 'federalFundsRate'},
+    },
+    'economy/treasury-rates': {'provider': 'fmp', 'endpoint': '/v4/treasury', 'method': 'GET', 'cache_type': 'daily'},
+    # Technical Analysis
+    'technical/{symbol}/sma': {
+        'provider': 'fmp',
+        'endpoint': '/v3/technical_indicator/{timespan}/{symbol}',
+        'method': 'GET',
+        'cache_type': 'intraday',
+        'static_params': {'type': 'SMA'},
+        'polygon_fallback': '/v1/indicators/sma/{symbol}',
+    },
+    'technical/{symbol}/ema': {
+        'provider': 'fmp',
+        'endpoint': '/v3/technical_indicator/{timespan}/{symbol}',
+        'method': 'GET',
+        'cache_type': 'intraday',
+        'static_params': {'type': 'EMA'},
+        'polygon_fallback': '/v1/indicators/ema/{symbol}',
+    },
+    'technical/{symbol}/rsi': {
+        'provider': 'fmp',
+        'endpoint': '/v3/technical_indicator/{timespan}/{symbol}',
+        'method': 'GET',
+        'cache_type': 'intraday',
+        'static_params': {'type': 'RSI'},
+        'polygon_fallback': '/v1/indicators/rsi/{symbol}',
+    },
+    'technical/{symbol}/macd': {
+        'provider': 'fmp',
+        'endpoint': '/v3/technical_indicator/{timespan}/{symbol}',
+        'method': 'GET',
+        'cache_type': 'intraday',
+        'static_params': {'type': 'MACD'},
+        'polygon_fallback': '/v1/indicators/macd/{symbol}',
+    },
+    'technical/{symbol}/bollinger-bands': {
+        'provider': 'fmp',
+        'endpoint': '/v3/technical_indicator/{timespan}/{symbol}',
+        'method': 'GET',
+        'cache_type': 'intraday',
+        'static_params': {'type': 'BBANDS'},
+    },
+    'technical/{symbol}/stochastic': {
+        'provider': 'fmp',
+        'endpoint': '/v3/technical_indicator/{timespan}/{symbol}',
+        'method': 'GET',
+        'cache_type': 'intraday',
+        'static_params': {'type': 'STOCH'},
+    },
+    'technical/{symbol}/adx': {
+        'provider': 'fmp',
+        'endpoint': '/v3/technical_indicator/{timespan}/{symbol}',
+        'method': 'GET',
+        'cache_type': 'intraday',
+        'static_params': {'type': 'ADX'},
+    },
+    'technical/{symbol}/williams-r': {
+        'provider': 'fmp',
+        'endpoint': '/v3/technical_indicator/{timespan}/{symbol}',
+        'method': 'GET',
+        'cache_type': 'intraday',
+        'static_params': {'type': 'WILLR'},
+    },
+    # SEC Filings (FMP exclusive)
+    'sec/{symbol}/filings': {
+        'provider': 'fmp',
+        'endpoint': '/v3/sec_filings/{symbol}',
+        'method': 'GET',
+        'cache_type': 'fundamental',
+    },
+    'sec/{symbol}/10k': {
+        'provider': 'fmp',
+        'endpoint': '/v3/sec_filings/{symbol}',
+        'method': 'GET',
+        'cache_type': 'fundamental',
+        'static_params': {'type': '10-K'},
+    },
+    'sec/{symbol}/10q': {
+        'provider': 'fmp',
+        'endpoint': '/v3/sec_filings/{symbol}',
+        'method': 'GET',
+        'cache_type': 'fundamental',
+        'static_params': {'type': '10-Q'},
+    },
+    'sec/{symbol}/8k': {
+        'provider': 'fmp',
+        'endpoint': '/v3/sec_filings/{symbol}',
+        'method': 'GET',
+        'cache_type': 'fundamental',
+        'static_params': {'type': '8-K'},
+    },
+    'sec/rss-feed': {'provider': 'fmp', 'endpoint': '/v4/rss_feed', 'method': 'GET', 'cache_type': 'news'},
+    # ETF & Mutual Funds (FMP exclusive)
+    'etf/list': {'provider': 'fmp', 'endpoint': '/v3/etf/list', 'method': 'GET', 'cache_type': 'static', 'stream': True},
+    'etf/{symbol}/holdings': {
+        'provider': 'fmp',
+        'endpoint': '/v3/etf-holder/{symbol}',
+        'method': 'GET',
+        'cache_type': 'fundamental',
+    },
+    'etf/{symbol}/performance': {
+        'provider': 'fmp',
+        'endpoint': '/v3/etf-info',
+        'method': 'GET',
+        'cache_type': 'daily',
+        'params_map': {'symbol': 'symbol'},
+    },
+    'funds/list': {'provider': 'fmp', 'endpoint': '/v3/mutual-fund/list', 'method': 'GET', 'cache_type': 'static'},
+    'funds/{symbol}/holdings': {
+        'provider': 'fmp',
+        'endpoint': '/v3/mutual-fund-holder/{symbol}',
+        'method': 'GET',
+        'cache_type': 'fundamental',
+    },
+    # Commodities (FMP exclusive)
+    'commodities/metals': {'provider': 'fmp', 'endpoint': '/v3/commodities', 'method': 'GET', 'cache_type': 'real_time'},
+    'commodities/energy': {'provider': 'fmp', 'endpoint': '/v3/commodities', 'method': 'GET', 'cache_type': 'real_time'},
+    'commodities/agriculture': {'provider': 'fmp', 'endpoint': '/v3/commodities', 'method': 'GET', 'cache_type': 'real_time'},
+    'commodities/{symbol}/historical': {
+        'provider': 'fmp',
+        'endpoint': '/v3/historical-price-full/{symbol}',
+        'method': 'GET',
+        'cache_type': 'daily',
+        'compact': ('bar', ('historical',)),
+    },
+    # Indices
+    'indices/list': {
+        'provider': 'fmp',
+        'endpoint': '/v3/quotes/index',
+        'method': 'GET',
+        'cache_type': 'real_time',
+        'polygon_fallback': '/v2/snapshot/locale/global/markets/indices',
+    },
+    'indices/{symbol}/historical': {
+        'provider': 'fmp',
+        'endpoint': '/v3/historical-price-full/{symbol}',
+        'method': 'GET',
+        'cache_type': 'daily',
+        'polygon_fallback': '/v2/aggs/ticker/{symbol}/range/{multiplier}/{timespan}/{from}/{to}',
+        'compact': ('bar', ('historical',)),
+    },
+    'indices/{symbol}/components': {
+        'provider': 'fmp',
+        'endpoint': '/v3/sp500_constituent',
+        'method': 'GET',
+        'cache_type': 'static',
+    },
+    # Bulk Data (FMP exclusive)
+    'bulk/eod/{date}': {
+        'provider': 'fmp',
+        'endpoint': '/v4/batch-request-end-of-day-prices',
+        'method': 'GET',
+        'cache_type': 'daily',
+        'stream': True,
+    },
+    'bulk/fundamentals/{date}': {
+        'provider': 'fmp',
+        'endpoint': '/v4/batch-request-financial-statements',
+        'method': 'GET',
+        'cache_type': 'fundamental',
+        'stream': True,
+    },
+    'bulk/insider-trading/{date}': {
+        'provider': 'fmp',
+        'endpoint': '/v4/insider-trading',
+        'method': 'GET',
+        'cache_type': 'daily',
+        'stream': True,
+    },
+    # Legacy Polygon.io endpoints for backward compatibility
+    'snapshot': {
+        'provider': 'polygon',
+        'endpoint': '/v2/snapshot/locale/us/markets/stocks/tickers',
+        'method': 'GET',
+        'cache_type': 'real_time',
+        'url_fields': ('next_url',),
+        'compact': ('quote', ('tickers',)),
+    },
+    'aggs/ticker/{ticker}/range/{multiplier}/{timespan}/{from}/{to}': {
+        'provider': 'polygon',
+        'endpoint': '/v2/aggs/ticker/{ticker}/range/{multiplier}/{timespan}/{from}/{to}',
+        'method': 'GET',
+        'cache_type': 'daily',
+        'url_fields': ('next_url',),
+        'compact': ('bar', ('results',)),
+    },
+    'reference/tickers/{ticker}': {
+        'provider': 'polygon',
+        'endpoint': '/v3/reference/tickers/{ticker}',
+        'method': 'GET',
+        'cache_type': 'static',
+        'compact': ('profile', ('results',)),
+    },
+}
+
+# Defaults for template fields the request path does not supply
+STATIC_PARAM_DEFAULTS = {'interval': '1day', 'timespan': 'day', 'multiplier': '1'}
+DEFAULT_RANGE_DAYS = 30
+
+
+class PathParams(dict):
+    """Named path parameters, falling back to defaults for fields the route does not capture"""
+
+    def __missing__(self, key: str) -> str:
+        if key in STATIC_PARAM_DEFAULTS:
+            return STATIC_PARAM_DEFAULTS[key]
+        if key == 'from':
+            value = (date.today() - timedelta(days=DEFAULT_RANGE_DAYS)).isoformat()
+        elif key == 'to':
+            value = date.today().isoformat()
+        else:
+            # Unknown fields are left in place, as before
+            return f"{{{key}}}"
+        self[key] = value
+        return value
+
+
+class EndpointTemplate:
+    """Provider endpoint template split once into (literal, field) parts"""
+
+    __slots__ = ('template', 'parts')
+
+    def __init__(self, template: str):
+        self.template = template
+        self.parts: Tuple[Tuple[str, Optional[str]], ...] = tuple(
+            (literal, field) for literal, field, _, _ in Formatter().parse(template)
+        )
+
+    def render(self, params: Mapping[str, str]) -> str:
+        return "".join(literal + params[field] if field is not None else literal for literal, field in self.parts)
+
+
+def _compile(mappings: Dict[str, Dict]) -> Mapping[str, Mapping]:
+    return MappingProxyType({pattern: MappingProxyType(dict(config)) for pattern, config in mappings.items()})
+
+
+# Frozen route table, trie and endpoint templates shared by every view instance
+LEGACY_ENDPOINT_MAPPINGS = _compile(_ENDPOINT_MAPPINGS)
+legacy_router = Router(LEGACY_ENDPOINT_MAPPINGS)
+ENDPOINT_TEMPLATES: Mapping[str, EndpointTemplate] = MappingProxyType(
+    {config['endpoint']: EndpointTemplate(config['endpoint']) for config in LEGACY_ENDPOINT_MAPPINGS.values()}
+)
+
+
+def render_endpoint(template: str, path_params: Dict[str, str]) -> str:
+    """Substitute named path parameters (and defaults) into a provider endpoint template"""
+    compiled = ENDPOINT_TEMPLATES.get(template) or EndpointTemplate(template)
+    return compiled.render(PathParams(path_params))
@@ -0,0 +1,401 @@
+"""
+Micro-benchmarks for the hot paths of the financial data proxy.
+Run with: python manage.py benchmark_proxy routing (or legacy-routing, rewriter, codec, streaming, compression)
+"""
+import json
+import re
+import time
+import timeit
+import tracemalloc
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils.text import compress_string
+from rest_framework.renderers import JSONRenderer
+
+from proxy_app.codec import FastJSONRenderer, codec
+from proxy_app.compression import ENCODERS, Precompressor, brotli, finish, zstandard
+from proxy_app.config import ENDPOINT_ROUTES
+from proxy_app.legacy_routes import LEGACY_ENDPOINT_MAPPINGS, legacy_router, render_endpoint
+from proxy_app.rewrite import PolygonPaginationRewriter, compile_field_paths, provider_url_rewriter
+from proxy_app.router import router
+from proxy_app.streaming import JSONMemberFilter, iter_transformed
+
+# Sample values used to turn route patterns into concrete request paths
+SAMPLE_PATH_PARAMS = {
+    'symbol': 'AAPL',
+    'contract': 'O:AAPL250117C00150000',
+    'date': '2024-01-02',
+    'exchange': 'NASDAQ',
+    'pair': 'EURUSD',
+    'ticker': 'AAPL',
+    'cik': '0000320193',
+    'multiplier': '5',
+    'timespan': 'minute',
+    'from': '2024-01-02',
+    'to': '2024-02-01',
+}
+
+
+def sample_path(pattern: str) -> str:
+    """Build a concrete request path for a route pattern"""
+    return re.sub(r'\{([^}]+)\}', lambda m: SAMPLE_PATH_PARAMS.get(m.group(1), 'X'), pattern)
+
+
+def linear_scan_lookup(path: str):
+    """Route lookup as done before the trie: regex scan for the route, then a second scan for its params"""
+    route_config = None
+    for pattern, config in ENDPOINT_ROUTES.items():
+        regex_pattern = pattern.replace('{', '(?P<').replace('}', '>[^/]+)')
+        if re.match(f"^{regex_pattern}$", path):
+            route_config = config
+            break
+    if route_config is None:
+        return None, {}
+
+    for pattern, config in ENDPOINT_ROUTES.items():
+        if config == route_config:
+            regex_pattern = pattern.replace('{', '(?P<').replace('}', '>[^/]+)')
+            match = re.match(f"^{regex_pattern}$", path)
+            return route_config, match.groupdict() if match else {}
+    return route_config, {}
+
+
+def legacy_linear_lookup(unified_path: str):
+    """Legacy view lookup as done before compilation: rebuild the table, then exact match or regex scan"""
+    mappings = {pattern: dict(config) for pattern, config in LEGACY_ENDPOINT_MAPPINGS.items()}
+    if unified_path in mappings:
+        return mappings[unified_path]
+    for pattern, config in mappings.items():
+        regex_pattern = re.sub(r'\{[^}]+\}', r'[^/]+', pattern)
+        if re.match(f'^{regex_pattern}$', unified_path):
+            return config
+    return None
+
+
+def legacy_positional_substitute(endpoint_template: str, unified_path: str) -> str:
+    """Legacy parameter substitution as done before compilation: guess params by position"""
+    path_parts = unified_path.split('/')
+    result = endpoint_template
+    for name, index in (('symbol', 1), ('contract', 1), ('cik', 2), ('date', 2), ('pair', 1), ('ticker', 2)):
+        if f'{{{name}}}' in result and len(path_parts) >= 2 and (index == 1 or len(path_parts) >= 3):
+            result = result.replace(f'{{{name}}}', path_parts[index])
+    for name, value in (('interval', '1day'), ('timespan', 'day'), ('multiplier', '1')):
+        result = result.replace(f'{{{name}}}', value)
+    if '{from}' in result:
+        result = result.replace('{from}', (datetime.now() - timedelta(days=30)).strftime('%Y-%m-%d'))
+    if '{to}' in result:
+        result = result.replace('{to}', datetime.now().strftime('%Y-%m-%d'))
+    return result
+
+
+def recursive_replace_provider_urls(data):
+    """FinancialDataProxy URL replacement as done before the rewriter: rebuild every container"""
+    if isinstance(data, dict):
+        return {
+            key: convert_provider_url(value)
+            if key.lower() in ['url', 'link', 'href', 'endpoint', 'next_url', 'previous_url']
+            else recursive_replace_provider_urls(value)
+            for key, value in data.items()
+        }
+    elif isinstance(data, list):
+        return [recursive_replace_provider_urls(item) for item in data]
+    elif isinstance(data, str) and is_provider_url(data):
+        return convert_provider_url(data)
+    return data
+
+
+def is_provider_url(text: str) -> bool:
+    return any(domain in text.lower() for domain in ['polygon.io', 'financialmodelingprep.com', 'api.polygon.io', 'fmp-cloud-io'])
+
+
+def convert_provider_url(url):
+    if not isinstance(url, str) or 'financialdata.online' in url.lower() or not is_provider_url(url):
+        return url
+    from urllib.parse import urlparse
+
+    parsed = urlparse(url)
+    path = parsed.path[4:] if parsed.path.startswith(('/v1/', '/v2/', '/v3/')) else parsed.path
+    return f"{settings.FINANCIALDATA_BASE_URL}/api/v1{path}" + (f"?{parsed.query}" if parsed.query else "")
+
+
+def recursive_clean_polygon_response(data, proxy_domain: str):
+    """Legacy view cleaning as done before the rewriter: four re.sub calls per link, full recursion"""
+    if not isinstance(data, dict):
+        return data
+    for field in ["status", "request_id", "queryCount"]:
+        data.pop(field, None)
+    for field in ["next_url", "previous_url", "next", "previous"]:
+        if field in data and isinstance(data[field], str) and "polygon.io" in data[field]:
+            url = data[field].replace("api.polygon.io", proxy_domain)
+            url = re.sub(r"[?&]apiKey=[^&]*&?", "", url, flags=re.IGNORECASE)
+            url = re.sub(r"/v[1-3]/", "/v1/", url)
+            url = re.sub(r"[&?]+$", "", url)
+            if not url.startswith("https://"):
+                url = f"https://{url}" if not url.startswith("http") else url.replace("http://", "https://")
+            data[field] = url
+    for key, value in data.items():
+        if isinstance(value, dict):
+            data[key] = recursive_clean_polygon_response(value, proxy_domain)
+        elif isinstance(value, list):
+            data[key] = [recursive_clean_polygon_response(item, proxy_domain) if isinstance(item, dict) else item for item in value]
+    return data
+
+
+def tick_trades_fixture(rows: int) -> dict:
+    """A Polygon /v3/trades page: flat numeric rows plus a next_url"""
+    return {
+        "status": "OK",
+        "request_id": "b3f1",
+        "next_url": "https://api.polygon.io/v3/trades/AAPL?cursor=YWN0aXZlPXRydWU&apiKey=secret",
+        "results": [
+            {
+                "conditions": [12, 37],
+                "exchange": 11,
+                "id": str(index),
+                "participant_timestamp": 1704205800000000000 + index,
+                "price": 185.64,
+                "sequence_number": index,
+                "sip_timestamp": 1704205800000100000 + index,
+                "size": 100,
+                "tape": 3,
+            }
+            for index in range(rows)
+        ],
+    }
+
+
+def bulk_prices_fixture(rows: int) -> list:
+    """An FMP bulk end-of-day page: a list of flat rows without URLs"""
+    return [
+        {"symbol": f"SYM{index}", "date": "2024-01-02", "open": 10.5, "high": 11.0, "low": 10.1, "close": 10.9, "volume": 120000}
+        for index in range(rows)
+    ]
+
+
+def options_chain_fixture(contracts: int) -> dict:
+    """A Polygon options chain snapshot: nested per-contract objects"""
+    return {
+        "status": "OK",
+        "request_id": "9c2e",
+        "results": [
+            {
+                "break_even_price": 151.25 + index,
+                "day": {"change": 0.5, "close": 5.2, "high": 5.6, "low": 4.9, "open": 5.0, "volume": 1200, "vwap": 5.18},
+                "details": {
+                    "contract_type": "call" if index % 2 else "put",
+                    "exercise_style": "american",
+                    "expiration_date": "2025-01-17",
+                    "shares_per_contract": 100,
+                    "strike_price": 100 + index,
+                    "ticker": f"O:AAPL250117C{100000 + index:08d}",
+                },
+                "greeks": {"delta": 0.52, "gamma": 0.03, "theta": -0.04, "vega": 0.21},
+                "implied_volatility": 0.27,
+                "open_interest": 5400,
+                "underlying_asset": {"price": 185.64, "ticker": "AAPL"},
+            }
+            for index in range(contracts)
+        ],
+    }
+
+
+def stock_list_fixture(rows: int) -> list:
+    """An FMP stock list: short rows with names and exchange strings"""
+    return [
+        {
+            "symbol": f"SYM{index}",
+            "name": f"Company Number {index} Holdings Inc.",
+            "price": 12.34,
+            "exchange": "NASDAQ Global Select",
+            "exchangeShortName": "NASDAQ",
+            "type": "stock",
+        }
+        for index in range(rows)
+    ]
+
+
+class Command(BaseCommand):
+    help = 'Run micro-benchmarks for the proxy hot paths'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'target',
+            choices=['routing', 'legacy-routing', 'rewriter', 'codec', 'streaming', 'compression'],
+            help='Which hot path to benchmark',
+        )
+        parser.add_argument(
+            '--iterations',
+            type=int,
+            default=200,
+            help='Passes over the sample set per measurement',
+        )
+
+    def handle(self, *args, **options):
+        getattr(self, f"benchmark_{options['target'].replace('-', '_')}")(options['iterations'])
+
+    def _report(self, label: str, seconds: float, operations: int):
+        self.stdout.write(f'  {label:<28} {seconds * 1e9 / operations:>10.0f} ns/op')
+
+    def _compare(self, baseline: tuple, candidate: tuple, operations: int):
+        (baseline_label, baseline_seconds), (candidate_label, candidate_seconds) = baseline, candidate
+        self._report(baseline_label, baseline_seconds, operations)
+        self._report(candidate_label, candidate_seconds, operations)
+        self.stdout.write(self.style.SUCCESS(f'  speedup: {baseline_seconds / candidate_seconds:.1f}x'))
+
+    def benchmark_routing(self, iterations: int):
+        paths = [sample_path(pattern) for pattern in ENDPOINT_ROUTES]
+        self.stdout.write(f'Routing {len(paths)} sample paths x {iterations} iterations')
+
+        def run_linear():
+            for path in paths:
+                linear_scan_lookup(path)
+
+        def run_trie():
+            for path in paths:
+                router.match(path)
+
+        operations = len(paths) * iterations
+        self._compare(
+            ('linear regex scan', timeit.timeit(run_linear, number=iterations)),
+            ('segment trie', timeit.timeit(run_trie, number=iterations)),
+            operations,
+        )
+
+    def benchmark_legacy_routing(self, iterations: int):
+        paths = [sample_path(pattern) for pattern in LEGACY_ENDPOINT_MAPPINGS]
+        self.stdout.write(f'Legacy view routing and substitution, {len(paths)} sample paths x {iterations} iterations')
+
+        def run_linear():
+            for path in paths:
+                config = legacy_linear_lookup(path)
+                legacy_positional_substitute(config['endpoint'], path)
+
+        def run_compiled():
+            for path in paths:
+                route_match = legacy_router.match(path)
+                render_endpoint(route_match.config['endpoint'], route_match.params)
+
+        operations = len(paths) * iterations
+        self._compare(
+            ('rebuild + regex + positional', timeit.timeit(run_linear, number=iterations)),
+            ('compiled trie + template', timeit.timeit(run_compiled, number=iterations)),
+            operations,
+        )
+
+    def benchmark_rewriter(self, iterations: int):
+        rows = 20000
+        passes = max(1, iterations // 20)
+        trades, bulk = tick_trades_fixture(rows), bulk_prices_fixture(rows)
+        trades_spec = compile_field_paths(ENDPOINT_ROUTES['ticks/{symbol}/trades']['url_fields'])
+        bulk_spec = compile_field_paths(ENDPOINT_ROUTES['bulk/eod-prices']['url_fields'])
+        cleaner = PolygonPaginationRewriter('api.financialdata.online')
+        self.stdout.write(f'Response rewriting, {rows}-row payloads x {passes} passes (ns per row)')
+
+        self.stdout.write('Proxy URL replacement, tick trades (full walk vs declared url_fields):')
+        self._compare(
+            ('recursive rebuild', timeit.timeit(lambda: recursive_replace_provider_urls(trades), number=passes)),
+            ('in-place, full walk', timeit.timeit(lambda: provider_url_rewriter.rewrite(trades), number=passes)),
+            rows * passes,
+        )
+        self._report('in-place, url_fields', timeit.timeit(lambda: provider_url_rewriter.rewrite(trades, trades_spec), number=passes), rows * passes)
+
+        self.stdout.write('Proxy URL replacement, bulk prices:')
+        self._compare(
+            ('recursive rebuild', timeit.timeit(lambda: recursive_replace_provider_urls(bulk), number=passes)),
+            ('in-place, url_fields', timeit.timeit(lambda: provider_url_rewriter.rewrite(bulk, bulk_spec), number=passes)),
+            rows * passes,
+        )
+
+        self.stdout.write('Legacy Polygon cleaning, tick trades:')
+        self._compare(
+            ('recursive re.sub', timeit.timeit(lambda: recursive_clean_polygon_response(trades, 'api.financialdata.online'), number=passes)),
+            ('in-place, full walk', timeit.timeit(lambda: cleaner.rewrite(trades), number=passes)),
+            rows * passes,
+        )
+        self._report('in-place, url_fields', timeit.timeit(lambda: cleaner.rewrite(trades, trades_spec), number=passes), rows * passes)
+
+    def benchmark_codec(self, iterations: int):
+        payloads = {
+            'bulk/eod-prices': bulk_prices_fixture(20000),
+            'options/chain/{symbol}': options_chain_fixture(2000),
+            'reference/tickers': stock_list_fixture(20000),
+        }
+        passes = max(1, iterations // 20)
+        self.stdout.write(f'JSON codec ({codec.backend}) vs stdlib json, {passes} passes (ns per payload byte)')
+
+        drf_renderer, fast_renderer = JSONRenderer(), FastJSONRenderer()
+        for route, payload in payloads.items():
+            body = json.dumps(payload).encode()
+            operations = len(body) * passes
+            self.stdout.write(f'{route} ({len(body) // 1024} KiB):')
+
+            self.stdout.write('  parse provider response')
+            self._compare(
+                ('json.loads', timeit.timeit(lambda: json.loads(body), number=passes)),
+                ('codec.loads', timeit.timeit(lambda: codec.loads(body), number=passes)),
+                operations,
+            )
+            self.stdout.write('  encode response')
+            self._compare(
+                ('DRF JSONRenderer', timeit.timeit(lambda: drf_renderer.render(payload), number=passes)),
+                ('FastJSONRenderer', timeit.timeit(lambda: fast_renderer.render(payload), number=passes)),
+                operations,
+            )
+
+    def benchmark_streaming(self, iterations: int):
+        rows = 100000
+        chunk_size = 64 * 1024
+        body = codec.dumps(tick_trades_fixture(rows))
+        chunks = [body[start:start + chunk_size] for start in range(0, len(body), chunk_size)]
+        url_fields = ENDPOINT_ROUTES['ticks/{symbol}/trades']['url_fields']
+        self.stdout.write(f'Tick trades passthrough, {len(body) // 1024} KiB in {chunk_size // 1024} KiB chunks')
+
+        def buffered():
+            data = codec.loads(b''.join(chunks))
+            yield codec.dumps(provider_url_rewriter.rewrite(data, compile_field_paths(url_fields)))
+
+        def streamed():
+            member_filter = JSONMemberFilter.for_rewriter(provider_url_rewriter, compile_field_paths(url_fields))
+            return iter_transformed(iter(chunks), [member_filter])
+
+        for label, produce in (('buffered', buffered), ('streamed', streamed)):
+            started = time.perf_counter()
+            response = produce()
+            next(response)
+            first_byte = time.perf_counter() - started
+            for _ in response:
+                pass
+            total = time.perf_counter() - started
+
+            # Memory is traced in a separate pass, tracing slows allocation-heavy code down
+            tracemalloc.start()
+            for _ in produce():
+                pass
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            self.stdout.write(
+                f'  {label:<10} first byte {first_byte * 1e3:>7.1f} ms'
+                f'  total {total * 1e3:>7.1f} ms  peak memory {peak / 1024 / 1024:>6.1f} MiB'
+            )
+
+    def benchmark_compression(self, iterations: int):
+        body = codec.dumps({"results": stock_list_fixture(20000)})
+        tail = b',"_metadata":' + codec.dumps({"source": "cache", "provider": "fmp", "timestamp": "2024-01-02T03:04:05Z"}) + b"}"
+        encodings = ["gzip"] + (["br"] if brotli is not None else []) + (["zstd"] if zstandard is not None else [])
+        precompressor = Precompressor([ENCODERS[encoding]() for encoding in encodings], ["static"])
+        passes = max(1, iterations // 20)
+        self.stdout.write(f'Compressed cache hits, {len(body) // 1024} KiB static body x {passes} passes (ns per hit)')
+
+        start = time.perf_counter()
+        heads = precompressor.compress_all(body)
+        self.stdout.write(f'  precompress at fill ({", ".join(encodings)}): {(time.perf_counter() - start) * 1000:.0f} ms')
+        for encoding, head in heads.items():
+            self.stdout.write(f'  {encoding}: {len(body) // 1024} KiB -> {len(finish(head, tail)) // 1024} KiB')
+
+        self._compare(
+            ('gzip each hit (middleware)', timeit.timeit(lambda: compress_string(body[:-1] + tail), number=passes)),
+            ('precompressed gzip', timeit.timeit(lambda: finish(heads["gzip"], tail), number=passes)),
+            passes,
+        )
@@ -0,0 +1,105 @@
+"""
+Micro-batching of single-item upstream calls.
+
+The first caller for a group opens a batch and holds it open for a short
+window; callers arriving within the window join it. The leader then makes one
+upstream call for every item in the batch and hands each waiter its share.
+A batch closes early once adding another item would exceed its length budget.
+"""
+import threading
+from typing import Any, Callable, Dict, Hashable, List, Optional
+
+from django.conf import settings
+
+
+class _Batch:
+    """Items collected for one upstream call and the outcome shared with waiters"""
+
+    __slots__ = ('items', 'length', 'full', 'done', 'results', 'error')
+
+    def __init__(self):
+        self.items: List[str] = []
+        self.length = 0
+        self.full = threading.Event()
+        self.done = threading.Event()
+        self.results: Dict[str, Any] = {}
+        self.error: Optional[BaseException] = None
+
+
+class MicroBatcher:
+    """Merges concurrent single-item calls into multi-item calls"""
+
+    def __init__(self, window: float, max_length: int):
+        self.window = window
+        self.max_length = max_length
+        self._open: Dict[Hashable, _Batch] = {}
+        self._lock = threading.Lock()
+        self.batches = 0
+        self.items = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.window > 0
+
+    def get(self, group: Hashable, item: str, fetch_many: Callable[[Hashable, List[str]], Dict[str, Any]]) -> Any:
+        """
+        Return item's share of a batched fetch_many(group, items) call.
+
+        fetch_many must return a dict keyed by item; items it leaves out map to None.
+        """
+        if not self.enabled:
+            return fetch_many(group, [item]).get(item)
+
+        with self._lock:
+            batch = self._open.get(group)
+            if batch is not None and item not in batch.items and batch.length + len(item) + 1 > self.max_length:
+                # Close the full batch so its leader flushes now; this caller starts the next one
+                batch.full.set()
+                del self._open[group]
+                batch = None
+
+            leader = batch is None
+            if leader:
+                batch = self._open[group] = _Batch()
+                self.batches += 1
+            if item not in batch.items:
+                batch.items.append(item)
+                batch.length += len(item) + (1 if batch.length else 0)
+                self.items += 1
+
+        if leader:
+            batch.full.wait(self.window)
+            with self._lock:
+                if self._open.get(group) is batch:
+                    del self._open[group]
+            try:
+                batch.results = fetch_many(group, list(batch.items))
+            except BaseException as e:
+                batch.error = e
+            finally:
+                batch.done.set()
+        else:
+            batch.done.wait()
+
+        if batch.error is not None:
+            raise batch.error
+        return batch.results.get(item)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "batches": self.batches,
+            "items": self.items,
+            "items_per_batch": round(self.items / self.batches, 2) if self.batches else 0.0,
+        }
+
+
+def build_quote_batcher() -> MicroBatcher:
+    """Build the quote batcher from the PROXY_QUOTE_BATCH_* settings"""
+    return MicroBatcher(
+        window=getattr(settings, 'PROXY_QUOTE_BATCH_WINDOW_MS', 5) / 1000,
+        max_length=getattr(settings, 'PROXY_QUOTE_BATCH_MAX_SYMBOLS_LENGTH', 1500),
+    )
+
+
+# Global batcher for single-symbol quote misses in this process
+quote_batcher = build_quote_batcher()
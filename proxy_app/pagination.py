@@ -0,0 +1,189 @@
+"""
+Server-side walking of Polygon cursor pagination for all_pages=true requests.
+
+Cursor endpoints (legacy routes flagged "all_pages") answer one page of "results"
+and a "next_url" for the page after it. Rather than handing the cleaned link back
+for another client round trip per page, all_pages=true follows the cursors here and
+streams the rows of every page as newline-delimited JSON, one row per line:
+
+- The next page is fetched while the current one is written, so at most two pages
+  are held at once however many the walk covers.
+- Each request stops at its plan's page and row caps (PROXY_ALL_PAGES_MAX_PAGES and
+  PROXY_ALL_PAGES_MAX_ROWS by default). Pages are written whole, so a page that
+  would cross the row cap ends the walk instead (unless it is the first).
+- The last line is a {"_metadata": ...} object with the pages and rows written,
+  whether the walk completed and, if not, the cleaned next_url to resume from and
+  any error that ended it.
+"""
+import asyncio
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterator, NamedTuple, Optional
+
+from django.conf import settings
+
+from .codec import codec
+from .config import ProviderError
+
+logger = logging.getLogger(__name__)
+
+ALL_PAGES_PARAM = "all_pages"
+TRUE_VALUES = frozenset(["1", "true", "yes"])
+
+
+def wants_all_pages(params) -> bool:
+    """Whether a request's query parameters ask for every page"""
+    return params.get(ALL_PAGES_PARAM, "").lower() in TRUE_VALUES
+
+
+class PageLimits(NamedTuple):
+    max_pages: int
+    max_rows: int
+
+
+def default_page_limits() -> PageLimits:
+    return PageLimits(
+        getattr(settings, "PROXY_ALL_PAGES_MAX_PAGES", 20),
+        getattr(settings, "PROXY_ALL_PAGES_MAX_ROWS", 100000),
+    )
+
+
+def page_limits_for(user) -> PageLimits:
+    """The caps of the user's plan, falling back to the defaults for anything it leaves unset"""
+    defaults = default_page_limits()
+    plan = getattr(user, "current_plan", None)
+    if plan is None:
+        return defaults
+    return PageLimits(plan.max_pages_per_request or defaults.max_pages, plan.max_rows_per_request or defaults.max_rows)
+
+
+def page_data(response_data: Dict) -> Dict:
+    """The payload of a fetched page, raising ProviderError for anything but a 200"""
+    status_code = response_data.get("status_code", 200)
+    data = response_data.get("data")
+    if status_code != 200 or not isinstance(data, dict):
+        message = (data.get("error") or data.get("message")) if isinstance(data, dict) else None
+        raise ProviderError(response_data.get("provider", ""), message or f"Upstream status {status_code}", status_code)
+    return data
+
+
+class PageWalk:
+    """Counts the pages and rows of one walk and renders them as NDJSON lines"""
+
+    def __init__(self, limits: PageLimits, clean_url: Callable[[str], str], row_mapper: Optional[Callable[[Dict], Dict]] = None):
+        self.limits = limits
+        self.clean_url = clean_url
+        # Maps each row before it is written (e.g. to a compact schema, see schemas.py)
+        self.row_mapper = row_mapper
+        self.pages = 0
+        self.rows = 0
+        # Polygon link to the page after the last one written
+        self.cursor: Optional[str] = None
+        self.error: Optional[ProviderError] = None
+
+    def admit(self, page: Dict) -> bool:
+        """Whether page fits within the row cap; the first page always does"""
+        return self.pages == 0 or self.rows + len(page.get("results") or ()) <= self.limits.max_rows
+
+    def write(self, page: Dict) -> bytes:
+        """Count page and render its rows, one per line"""
+        rows = page.get("results") or []
+        self.pages += 1
+        self.rows += len(rows)
+        self.cursor = page.get("next_url") or None
+        if self.row_mapper is not None:
+            rows = map(self.row_mapper, rows)
+        return b"".join(codec.dumps(row) + b"\n" for row in rows)
+
+    def next_cursor(self) -> Optional[str]:
+        """The link to fetch next, or None once the walk is over or at its caps"""
+        if self.pages >= self.limits.max_pages or self.rows >= self.limits.max_rows:
+            return None
+        return self.cursor
+
+    def trailer(self) -> bytes:
+        metadata: Dict[str, Any] = {"pages": self.pages, "rows": self.rows, "complete": self.cursor is None}
+        if self.cursor is not None:
+            metadata["next_url"] = self.clean_url(self.cursor)
+        if self.error is not None:
+            metadata["error"] = {"message": str(self.error), "status_code": self.error.status_code}
+        return codec.dumps({"_metadata": metadata}) + b"\n"
+
+
+class AllPagesStreamer:
+    """Streams walks over cursor pages, prefetching each next page on a shared pool"""
+
+    def __init__(self, max_workers: int):
+        self.max_workers = max_workers
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def stream(self, first_page: Dict, fetch_page: Callable[[str], Dict], walk: PageWalk) -> Iterator[bytes]:
+        """NDJSON lines for first_page and the pages after it; fetch_page(url) returns a page or raises ProviderError"""
+        page: Optional[Dict] = first_page
+        pending: Optional[Future] = None
+        try:
+            while page is not None and walk.admit(page):
+                lines = walk.write(page)
+                cursor = walk.next_cursor()
+                if cursor is not None:
+                    pending = self._get_executor().submit(fetch_page, cursor)
+                if lines:
+                    yield lines
+                page = None
+                if pending is not None:
+                    page = self._result(pending, walk)
+                    pending = None
+        finally:
+            # An abandoned walk does not fetch the page it was waiting for
+            if pending is not None:
+                pending.cancel()
+        yield walk.trailer()
+
+    async def astream(
+        self, first_page: Dict, fetch_page: Callable[[str], Awaitable[Dict]], walk: PageWalk
+    ) -> AsyncIterator[bytes]:
+        """Async variant of stream(), prefetching on the event loop"""
+        page: Optional[Dict] = first_page
+        pending: Optional[asyncio.Task] = None
+        try:
+            while page is not None and walk.admit(page):
+                lines = walk.write(page)
+                cursor = walk.next_cursor()
+                if cursor is not None:
+                    pending = asyncio.ensure_future(fetch_page(cursor))
+                if lines:
+                    yield lines
+                page = None
+                if pending is not None:
+                    try:
+                        page = await pending
+                    except ProviderError as e:
+                        self._failed(walk, e)
+                    pending = None
+        finally:
+            if pending is not None:
+                pending.cancel()
+        yield walk.trailer()
+
+    def _result(self, pending: Future, walk: PageWalk) -> Optional[Dict]:
+        try:
+            return pending.result()
+        except ProviderError as e:
+            self._failed(walk, e)
+            return None
+
+    def _failed(self, walk: PageWalk, error: ProviderError):
+        logger.warning(f"All-pages walk stopped after {walk.pages} pages: {error}")
+        walk.error = error
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="all-pages")
+            return self._executor
+
+
+# Global streamer; its pool bounds the page prefetches in flight in this process
+all_pages_streamer = AllPagesStreamer(max_workers=getattr(settings, "PROXY_ALL_PAGES_PREFETCH_WORKERS", 16))
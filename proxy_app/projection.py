@@ -0,0 +1,70 @@
+"""
+Server-side field projection for the fields= query parameter.
+
+fields is a comma-separated list of dotted paths, e.g. "symbol,price,profile.ceo".
+Lists are transparent: a path is applied to every element, so "results.price"
+keeps the price of each row and "symbol" keeps the symbol of each quote in a list.
+"*" matches every key of an object. Paths are canonicalised, so the same
+selection written in a different order maps to the same cache entry.
+"""
+from typing import Any, Tuple
+
+from .config import InvalidParameterError
+from .rewrite import FieldSpec
+
+# Query parameter holding the projection; it is never forwarded to the provider
+FIELDS_PARAM = "fields"
+
+MAX_FIELD_PATHS = 64
+MAX_FIELD_PATH_DEPTH = 8
+
+# Marks values with nothing selected, which are left out of their container
+_MISSING = object()
+
+
+def parse_fields(value: str) -> Tuple[str, ...]:
+    """Validate a fields= value and return its paths in canonical (sorted, de-duplicated) order"""
+    paths = {path.strip() for path in value.split(",") if path.strip()}
+    if not paths:
+        raise InvalidParameterError("fields must name at least one field")
+    if len(paths) > MAX_FIELD_PATHS:
+        raise InvalidParameterError(f"fields may name at most {MAX_FIELD_PATHS} paths")
+    for path in paths:
+        keys = path.split(".")
+        if len(keys) > MAX_FIELD_PATH_DEPTH or not all(keys):
+            raise InvalidParameterError(f"Invalid field path: {path}")
+    return tuple(sorted(paths))
+
+
+def project(data: Any, spec: FieldSpec) -> Any:
+    """New payload holding only the parts of data selected by spec; data is not modified"""
+    projected = _project(data, spec)
+    if projected is _MISSING:
+        return {} if type(data) is dict else []
+    return projected
+
+
+def _project(value: Any, spec: FieldSpec) -> Any:
+    if spec is None:
+        return value
+    value_type = type(value)
+    if value_type is list:
+        items = [_project(item, spec) for item in value]
+        return [item for item in items if item is not _MISSING]
+    if value_type is not dict:
+        # A scalar where the path expects more keys
+        return _MISSING
+
+    wildcard = spec.get("*", _MISSING)
+    if wildcard is not _MISSING:
+        selected = ((key, spec.get(key, wildcard)) for key in value)
+    else:
+        # Keys keep the payload's order rather than the (sorted) order of the paths
+        selected = ((key, spec[key]) for key in value if key in spec)
+
+    result = {}
+    for key, child in selected:
+        projected = _project(value[key], child)
+        if projected is not _MISSING:
+            result[key] = projected
+    return result
@@ -1,36 +1,58 @@
 """
 Simple provider classes for Polygon.io and FMP Ultimate
 """
-import time
-from typing import Any, Dict, Optional
+from typing import Any, AsyncIterator, Dict, Iterator, Optional
 
+import httpx
 import requests
 
-from .config import ProviderError, RateLimitError
+from .codec import codec
+from .config import RATE_LIMITS, ProviderError, RateLimitError
+from .ratelimit import RateLimitDecision, upstream_limiter
+from .streaming import aiter_response_body, iter_response_body
+from .transport import get_async_client, upstream_transport
 
 
 class BaseProvider:
     """Base provider class with common functionality"""
 
+    # Name used in provider errors and rate limit messages (defaults to the class name)
+    name: Optional[str] = None
+    rate_limit_message = "Rate limit exceeded"
+
     def __init__(self, api_key: str, base_url: str, rate_limit: int = 1000):
         self.api_key = api_key
         self.base_url = base_url
         self.rate_limit = rate_limit
-        self.last_request_time = 0
-        self.request_count = 0
-        self.session = requests.Session()
+        # Shared, pooled per provider across the process
+        self.session = upstream_transport.session(self.provider_name.lower())
 
-    def _check_rate_limit(self):
-        """Simple rate limiting"""
-        current_time = time.time()
-        if current_time - self.last_request_time < 60:  # Within 1 minute
-            if self.request_count >= self.rate_limit:
-                raise RateLimitError(f"Rate limit exceeded: {self.rate_limit} requests per minute")
-        else:
-            self.request_count = 0
-            self.last_request_time = current_time
+    @property
+    def provider_name(self) -> str:
+        return self.name or self.__class__.__name__
 
-        self.request_count += 1
+    def _check_rate_limit(self):
+        """Take a token from the provider's cluster-wide bucket, waiting briefly if it is empty"""
+        self._raise_if_limited(upstream_limiter.acquire(self.provider_name.lower()))
+
+    async def _check_rate_limit_async(self):
+        self._raise_if_limited(await upstream_limiter.acquire_async(self.provider_name.lower()))
+
+    def _raise_if_limited(self, decision: RateLimitDecision):
+        if not decision.allowed:
+            raise RateLimitError(
+                f"Rate limit exceeded: {self.rate_limit} requests per minute, retry in {decision.wait:.1f}s"
+            )
+
+    def _http_error(self, status_code: int, error: Any) -> Exception:
+        """Map an upstream HTTP error status to the exception raised to callers"""
+        if status_code == 429:
+            return RateLimitError(f"{self.rate_limit_message}: {error}")
+        elif status_code == 401:
+            return ProviderError(self.provider_name, "Invalid API key", status_code)
+        elif status_code == 404:
+            return ProviderError(self.provider_name, "Endpoint not found", status_code)
+        return ProviderError(self.provider_name, f"HTTP {status_code}: {error}", status_code)
 
     def make_request(self, endpoint: str, params: Dict[str, Any] = None) -> Dict[str, Any]:
         """Make HTTP request to provider API"""
@@ -46,92 +68,99 @@ class BaseProvider:
         try:
             response = self.session.get(url, params=params, timeout=30)
             response.raise_for_status()
-            return response.json()
+            return codec.loads(response.content)
 
         except requests.exceptions.HTTPError as e:
-            if response.status_code == 429:
-                raise RateLimitError(f"Rate limit exceeded: {e}")
-            elif response.status_code == 401:
-                raise ProviderError(self.__class__.__name__, "Invalid API key", response.status_code)
-            elif response.status_code == 404:
-                raise ProviderError(self.__class__.__name__, "Endpoint not found", response.status_code)
-            else:
-                raise ProviderError(self.__class__.__name__, f"HTTP {response.status_code}: {e}", response.status_code)
+            raise self._http_error(response.status_code, e)
 
         except requests.exceptions.RequestException as e:
-            raise ProviderError(self.__class__.__name__, f"Request failed: {e}")
+            raise ProviderError(self.provider_name, f"Request failed: {e}")
 
+    async def make_request_async(self, endpoint: str, params: Dict[str, Any] = None) -> Dict[str, Any]:
+        """Make HTTP request to provider API without blocking the event loop"""
+        await self._check_rate_limit_async()
 
-class PolygonProvider(BaseProvider):
-    """Polygon.io provider for US market data, options, futures, and tick data"""
+        # Add API key to params
+        if params is None:
+            params = {}
+        params['apikey'] = self.api_key
 
-    def __init__(self, api_key: str):
-        super().__init__(api_key, 'https://api.polygon.io', rate_limit=1000)
+        try:
+            response = await get_async_client(self.base_url).get(endpoint, params=params)
+        except httpx.HTTPError as e:
+            raise ProviderError(self.provider_name, f"Request failed: {e}")
 
-    def make_request(self, endpoint: str, params: Dict[str, Any] = None) -> Dict[str, Any]:
-        """Override to handle Polygon.io specific API key format"""
+        if response.is_error:
+            raise self._http_error(response.status_code, f"{response.status_code} {response.reason_phrase}")
+        return codec.loads(response.content)
+
+    def stream_request(self, endpoint: str, params: Dict[str, Any] = None) -> Iterator[bytes]:
+        """
+        Make HTTP request to provider API and return an iterator over its JSON body.
+
+        Rate limits and HTTP errors are raised here, before any of the body is read.
+        """
         self._check_rate_limit()
 
         url = f"{self.base_url}{endpoint}"
-
-        # Polygon.io uses apikey parameter
-        if params is None:
-            params = {}
-        params['apikey'] = self.api_key
+        params = dict(params or {}, apikey=self.api_key)
 
         try:
-            response = self.session.get(url, params=params, timeout=30)
-            response.raise_for_status()
-            return response.json()
+            response = self.session.get(url, params=params, timeout=30, stream=True)
+        except requests.exceptions.RequestException as e:
+            raise ProviderError(self.provider_name, f"Request failed: {e}")
 
-        except requests.exceptions.HTTPError as e:
-            if response.status_code == 429:
-                raise RateLimitError(f"Polygon.io rate limit exceeded: {e}")
-            elif response.status_code == 401:
-                raise ProviderError("Polygon", "Invalid API key", response.status_code)
-            elif response.status_code == 404:
-                raise ProviderError("Polygon", "Endpoint not found", response.status_code)
-            else:
-                raise ProviderError("Polygon", f"HTTP {response.status_code}: {e}", response.status_code)
+        error = self._stream_error(response.status_code, response.reason, response.headers.get("Content-Type", ""))
+        if error is not None:
+            response.close()
+            raise error
+        return iter_response_body(response)
 
-        except requests.exceptions.RequestException as e:
-            raise ProviderError("Polygon", f"Request failed: {e}")
+    async def stream_request_async(self, endpoint: str, params: Dict[str, Any] = None) -> AsyncIterator[bytes]:
+        """Async variant of stream_request()"""
+        await self._check_rate_limit_async()
 
+        params = dict(params or {}, apikey=self.api_key)
+        client = get_async_client(self.base_url)
 
-class FMPProvider(BaseProvider):
-    """Financial Modeling Prep provider for global markets, fundamentals, and news"""
+        try:
+            response = await client.send(client.build_request("GET", endpoint, params=params), stream=True)
+        except httpx.HTTPError as e:
+            raise ProviderError(self.provider_name, f"Request failed: {e}")
 
-    def __init__(self, api_key: str):
-        super().__init__(api_key, 'https://financialmodelingprep.com/api', rate_limit=3000)
+        error = self._stream_error(response.status_code, response.reason_phrase, response.headers.get("Content-Type", ""))
+        if error is not None:
+            await response.aclose()
+            raise error
+        return aiter_response_body(response)
 
-    def make_request(self, endpoint: str, params: Dict[str, Any] = None) -> Dict[str, Any]:
-        """Override to handle FMP specific API key format"""
-        self._check_rate_limit()
+    def _stream_error(self, status_code: int, reason: str, content_type: str) -> Optional[Exception]:
+        """Error for an upstream response that cannot be streamed: an HTTP error or a non-JSON body"""
+        if status_code >= 400:
+            return self._http_error(status_code, f"{status_code} {reason}")
+        if "json" not in content_type:
+            return ProviderError(self.provider_name, f"Unexpected content type: {content_type or 'none'}", 502)
+        return None
 
-        url = f"{self.base_url}{endpoint}"
 
-        # FMP uses apikey parameter
-        if params is None:
-            params = {}
-        params['apikey'] = self.api_key
+class PolygonProvider(BaseProvider):
+    """Polygon.io provider for US market data, options, futures, and tick data"""
 
-        try:
-            response = self.session.get(url, params=params, timeout=30)
-            response.raise_for_status()
-            return response.json()
+    name = "Polygon"
+    rate_limit_message = "Polygon.io rate limit exceeded"
 
-        except requests.exceptions.HTTPError as e:
-            if response.status_code == 429:
-                raise RateLimitError(f"FMP rate limit exceeded: {e}")
-            elif response.status_code == 401:
-                raise ProviderError("FMP", "Invalid API key", response.status_code)
-            elif response.status_code == 404:
-                raise ProviderError("FMP", "Endpoint not found", response.status_code)
-            else:
-                raise ProviderError("FMP", f"HTTP {response.status_code}: {e}", response.status_code)
+    def __init__(self, api_key: str):
+        super().__init__(api_key, 'https://api.polygon.io', rate_limit=RATE_LIMITS['polygon'])
 
-        except requests.exceptions.RequestException as e:
-            raise ProviderError("FMP", f"Request failed: {e}")
+
+class FMPProvider(BaseProvider):
+    """Financial Modeling Prep provider for global markets, fundamentals, and news"""
+
+    name = "FMP"
+    rate_limit_message = "FMP rate limit exceeded"
+
+    def __init__(self, api_key: str):
+        super().__init__(api_key, 'https://financialmodelingprep.com/api', rate_limit=RATE_LIMITS['fmp'])
 
 
 # Provider factory
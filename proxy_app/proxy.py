@@ -2,124 +2,437 @@
 Main proxy logic for routing requests, caching, and response transformation
 """
 import logging
-import re
-from functools import lru_cache
-from typing import Any, Dict, Optional, Tuple
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
 from datetime import datetime
 
-from django.conf import settings
+from asgiref.sync import sync_to_async
 
+from .cache import (
+    BackgroundRevalidator,
+    CacheEntry,
+    ResponseCache,
+    cache_revalidator,
+    response_cache,
+)
+from .codec import codec
+from .columnar import FORMAT_PARAM, get_writer, rows_at, to_columnar
+from .compression import CompressedHead, finish
 from .config import (
     ENDPOINT_ROUTES,
     FMP_API_KEY,
     POLYGON_API_KEY,
     EndpointNotFoundError,
     FinancialAPIError,
+    NotAcceptableError,
 )
+from .microbatch import MicroBatcher, quote_batcher
+from .projection import FIELDS_PARAM, parse_fields, project
 from .providers import get_provider
+from .rewrite import compile_field_paths, provider_url_rewriter
+from .router import router
+from .singleflight import AsyncSingleFlight, SingleFlight, async_upstream_flight, upstream_flight
+from .streaming import (
+    BodyCapture,
+    JSONMemberFilter,
+    MemberAppender,
+    aiter_transformed,
+    iter_transformed,
+    stream_cache_max_bytes,
+)
 
 # Set up logging
 logger = logging.getLogger(__name__)
 
 
+class ProxyResult(NamedTuple):
+    """Response data and where it came from: "live", "cache" or "stale" """
+
+    data: Any
+    provider: str
+    source: str
+    age: int = 0
+    # Encoded JSON body of a cached result; data stays None until decoded()
+    body: Optional[bytes] = None
+    # Encoded JSON body of a live result on a streamed route, as a (sync or async) iterator of chunks
+    chunks: Any = None
+    # Precompressed variant of a cached body, in place of body when fetched with an encoding
+    compressed: Optional[CompressedHead] = None
+    # Cache entry a cached result was served from, for its ETag and Last-Modified validators
+    entry: Optional[CacheEntry] = None
+    # Media type of a body in a columnar format (see columnar.py) rather than JSON
+    media_type: Optional[str] = None
+
+    def decoded(self) -> "ProxyResult":
+        """This result with data decoded from its cached body"""
+        if self.body is None or self.media_type is not None:
+            return self
+        return self._replace(data=codec.loads(self.body), body=None)
+
+
+class UpstreamRequest(NamedTuple):
+    """A resolved route: its cache key and the provider call that fills it"""
+
+    cache_key: str
+    provider: str
+    endpoint: str
+    params: Dict[str, Any]
+    cache_class: str
+    flight_key: Tuple
+    batch_item: Optional[Tuple[str, str]] = None
+    url_fields: Optional[Tuple[str, ...]] = None
+    stream: bool = False
+    # Key path of the route's row list, for columnar formats
+    rows: Optional[Tuple[str, ...]] = None
+
+
 class FinancialDataProxy:
     """Main proxy class that handles all request routing and processing"""
 
-    def __init__(self, providers: Optional[dict] = None):
+    def __init__(
+        self,
+        providers: Optional[dict] = None,
+        cache: Optional[ResponseCache] = None,
+        flight: Optional[SingleFlight] = None,
+        revalidator: Optional[BackgroundRevalidator] = None,
+        batcher: Optional[MicroBatcher] = None,
+        async_flight: Optional[AsyncSingleFlight] = None,
+    ):
         if providers:
             self.providers = providers
         else:
             self.providers = {'polygon': get_provider('polygon', POLYGON_API_KEY), 'fmp': get_provider('fmp', FMP_API_KEY)}
+        self.cache = cache or response_cache
+        self.flight = flight or upstream_flight
+        self.revalidator = revalidator or cache_revalidator
+        self.batcher = batcher or quote_batcher
+        self.async_flight = async_flight or async_upstream_flight
+
+    def resolve(self, path: str, params_tuple: Tuple[Tuple[str, str], ...]) -> UpstreamRequest:
+        """Match path to its route and build the provider call and cache key for it"""
+        # Find route configuration and path parameters in one lookup
+        route_match = router.match(path)
+        if not route_match:
+            raise EndpointNotFoundError(f"Endpoint not found: {path}")
+        route_config = route_match.config
+        provider_name = route_config["provider"]
 
-
-    def process_request(self, path: str, params: Dict[str, Any] = None) -> Dict[str, Any]:
+        # Transform request for provider
+        provider_endpoint, provider_params = self._transform_request(route_match.params, dict(params_tuple), route_config)
+
+        # Plain single-item requests on micro-batched routes can share a multi-item upstream call
+        batch_item = None
+        batch_param = route_config.get("micro_batch")
+        if batch_param and not params_tuple and "," not in route_match.params[batch_param]:
+            batch_item = (route_match.route.pattern, route_match.params[batch_param])
+
+        return UpstreamRequest(
+            cache_key=self.cache.make_key(path, params_tuple),
+            provider=provider_name,
+            endpoint=provider_endpoint,
+            params=provider_params,
+            cache_class=route_config["cache"],
+            flight_key=(provider_name, provider_endpoint, self._dict_to_tuple(provider_params)),
+            batch_item=batch_item,
+            url_fields=route_config.get("url_fields"),
+            stream=route_config.get("stream", False),
+            rows=route_config.get("rows"),
+        )
+
+    def _get_data(
+        self, path: str, params_tuple: Tuple[Tuple[str, str], ...], stream: bool = False, encoding: Optional[str] = None
+    ) -> ProxyResult:
+        """Get data from the response cache or the provider"""
+        upstream = self.resolve(path, params_tuple)
+
+        entry = self.cache.get_encoded(upstream.cache_key, upstream.cache_class, encoding, allow_stale=True)
+        if entry is not None:
+            return self.serve_cached(upstream, entry)
+        if stream and upstream.stream:
+            return self.fetch_stream(upstream)
+        return self.fetch_live(upstream)
+
+    def _get_derived(self, path: str, params_tuple: Tuple[Tuple[str, str], ...], paths: Tuple[str, ...], writer: Any) -> ProxyResult:
         """
-        Main method to process incoming requests
+        Get a projection and/or columnar encoding of the route's data.
 
-        Args:
-            path: API endpoint path (e.g., "quotes/AAPL")
-            params: Query parameters
+        It is derived from the route's cached full payload when there is one.
+        """
+        upstream, derived_key = self._resolve_derived(path, params_tuple, paths, writer)
+        cached = self._cached_derived(upstream, derived_key, writer)
+        if cached is not None:
+            return cached
+
+        entry = self.cache.get(upstream.cache_key, allow_stale=True)
+        result = self.serve_cached(upstream, entry) if entry is not None else self.fetch_live(upstream)
+        return self._derive(upstream, derived_key, paths, writer, result, entry)
+
+    def _resolve_derived(
+        self, path: str, params_tuple: Tuple[Tuple[str, str], ...], paths: Tuple[str, ...], writer: Any
+    ) -> Tuple[UpstreamRequest, str]:
+        """Resolve the route of a derived result and the cache key it is kept under"""
+        upstream = self.resolve(path, params_tuple)
+        derived = params_tuple + (((FIELDS_PARAM, ",".join(paths)),) if paths else ())
+        if writer is None:
+            return upstream, self.cache.make_key(path, derived, namespace="projection")
+        if upstream.rows is None:
+            raise NotAcceptableError(f"{path} is only available as JSON")
+        return upstream, self.cache.make_key(path, derived + ((FORMAT_PARAM, writer.name),), namespace="columnar")
+
+    def _cached_derived(self, upstream: UpstreamRequest, derived_key: str, writer: Any) -> Optional[ProxyResult]:
+        """A fresh cached derived result; stale ones are derived again from the full payload, which handles its refresh"""
+        entry = self.cache.get(derived_key)
+        if entry is None:
+            return None
+        media_type = writer.media_type if writer is not None else None
+        return ProxyResult(None, upstream.provider, "cache", entry.age(), body=entry.value, entry=entry, media_type=media_type)
+
+    def _derive(
+        self,
+        upstream: UpstreamRequest,
+        derived_key: str,
+        paths: Tuple[str, ...],
+        writer: Any,
+        result: ProxyResult,
+        source: Optional[CacheEntry],
+    ) -> ProxyResult:
+        """Project and/or encode a result's data and cache it so that it expires with the payload it came from"""
+        data = result.decoded().data
+        if paths:
+            data = project(data, compile_field_paths(paths))
+        if writer is None:
+            body, media_type = codec.dumps(data), None
+        else:
+            body, media_type = to_columnar(writer, rows_at(data, upstream.rows)), writer.media_type
+        if source is not None:
+            entry = self.cache.set_derived(derived_key, body, source)
+        else:
+            entry = self.cache.set_encoded(derived_key, body, upstream.cache_class)
+        return result._replace(data=None, body=body, entry=entry, media_type=media_type)
+
+    def serve_cached(self, upstream: UpstreamRequest, entry: CacheEntry) -> ProxyResult:
+        """Answer from a cache entry (or a precompressed variant's), scheduling a background refresh if it is stale"""
+        source = "cache" if entry.is_fresh() else "stale"
+        if source == "stale":
+            # Serve the stale copy now and refresh it off the request path
+            self.revalidator.submit(upstream.cache_key, self.flight.do, upstream.flight_key, self._fetch, upstream)
+
+        if isinstance(entry.value, CompressedHead):
+            return ProxyResult(None, upstream.provider, source, entry.age(), compressed=entry.value, entry=entry)
+        return ProxyResult(None, upstream.provider, source, entry.age(), body=entry.value, entry=entry)
+
+    def fetch_live(self, upstream: UpstreamRequest) -> ProxyResult:
+        """Call the provider, coalescing concurrent misses for the same upstream request"""
+        fetch = self._fetch_batched if upstream.batch_item else self._fetch
+        transformed_data, _ = self.flight.do(upstream.flight_key, fetch, upstream)
+        return ProxyResult(transformed_data, upstream.provider, "live")
+
+    def fetch_stream(self, upstream: UpstreamRequest) -> ProxyResult:
+        """
+        Call the provider for a streamed route, returning its rewritten body as chunks.
 
-        Returns:
-            JSON response data
+        Concurrent misses are not coalesced: each streams its own upstream response.
         """
-        try:
-            # Get data from cache or provider
-            data, provider_name, from_cache = self._get_data(path, params or {})
+        chunks = self.providers[upstream.provider].stream_request(upstream.endpoint, dict(upstream.params))
+        return ProxyResult(None, upstream.provider, "live", chunks=iter_transformed(chunks, self._stream_transforms(upstream)))
+
+    def _fetch(self, upstream: UpstreamRequest) -> Dict[str, Any]:
+        """Call the provider, transform the response and cache it for the route's cache class"""
+        response_data = self.providers[upstream.provider].make_request(upstream.endpoint, dict(upstream.params))
+        transformed_data = self._transform_response(response_data, upstream.url_fields)
+        self.cache.set(upstream.cache_key, transformed_data, upstream.cache_class)
+        return transformed_data
+
+    def _fetch_batched(self, upstream: UpstreamRequest) -> Any:
+        """Fetch a single item as part of a micro-batched multi-item upstream call"""
+        pattern, item = upstream.batch_item
+        return self.batcher.get(pattern, item, self._fetch_many)
+
+    def _fetch_many(self, pattern: str, items: List[str]) -> Dict[str, Any]:
+        """Call the provider once for several items, then split and cache each item's share"""
+        route_config = ENDPOINT_ROUTES[pattern]
+        placeholder = "{" + route_config["micro_batch"] + "}"
+        paths = {item: pattern.replace(placeholder, item) for item in items}
+        if len(items) == 1:
+            upstream = self.resolve(paths[items[0]], ())
+            return {items[0]: self._fetch(upstream)}
+
+        upstream = self.resolve(pattern.replace(placeholder, ",".join(items)), ())
+        response_data = self.providers[upstream.provider].make_request(upstream.endpoint, dict(upstream.params))
+        transformed_data = self._transform_response(response_data, upstream.url_fields)
+
+        # Anything but a list of records (e.g. a provider error) is shared unchanged by every item
+        if isinstance(transformed_data, list):
+            shares = {item.upper(): [] for item in items}
+            for record in transformed_data:
+                if isinstance(record, dict):
+                    shares.get(str(record.get(route_config["micro_batch"], "")).upper(), []).append(record)
+            results = {item: shares[item.upper()] for item in items}
+        else:
+            results = {item: transformed_data for item in items}
 
-            # Add metadata and return
-            return self._add_metadata(data, provider_name, from_cache)
+        for item, data in results.items():
+            self.cache.set(self.cache.make_key(paths[item], ()), data, upstream.cache_class)
+        return results
 
+    def fetch(self, path: str, params: Dict[str, Any] = None) -> ProxyResult:
+        """Process request, returning the data with metadata and its cache source"""
+        return self.with_metadata(self.fetch_raw(path, params))
+
+    def fetch_raw(
+        self, path: str, params: Dict[str, Any] = None, stream: bool = False, encoding: Optional[str] = None
+    ) -> ProxyResult:
+        """
+        Like fetch(), but cache hits keep their encoded body for encode_response().
+
+        With stream, misses on routes flagged "stream" return the provider's body as
+        chunks, rewritten as they arrive; send them with stream_response(). A fields
+        param selects a projection of the data (see projection.py) and a format param a
+        columnar encoding of its rows (see columnar.py); neither is ever streamed.
+        With a (negotiated) content encoding, hits on precompressed cache classes are
+        answered from the body's variant in that encoding.
+        """
+        params = dict(params or {})
+        fields = params.pop(FIELDS_PARAM, None)
+        output_format = params.pop(FORMAT_PARAM, None)
+        # Convert params to hashable tuple for caching
+        params_tuple = self._dict_to_tuple(params)
+
+        try:
+            paths = parse_fields(fields) if fields is not None else ()
+            writer = get_writer(output_format)
+            if paths or writer is not None:
+                return self._get_derived(path, params_tuple, paths, writer)
+            return self._get_data(path, params_tuple, stream, encoding)
         except FinancialAPIError:
             raise
         except Exception as e:
-            logger.error(f"Unexpected error processing {path}: {e}")
+            logger.error(f"Error processing {path}: {e}")
             raise FinancialAPIError(f"Internal error: {e}")
 
-    @lru_cache(maxsize=1024)
-    def _get_data(self, path: str, params_tuple: Tuple[Tuple[str, str], ...]) -> Tuple[Dict[str, Any], str, bool]:
-        """Get data from provider (cached)"""
-        # Check if we got cache hit
-        cache_info_before = self._get_data.cache_info()
-
-        # Find route configuration
-        route_config = self._find_route(path)
-        if not route_config:
-            raise EndpointNotFoundError(f"Endpoint not found: {path}")
-
-        # Convert params back to dict
-        params = dict(params_tuple)
-
-        # Transform request for provider
-        provider_endpoint, provider_params = self._transform_request(path, params, route_config)
-
-        # Call provider
-        provider = self.providers[route_config["provider"]]
-        response_data = provider.make_request(provider_endpoint, provider_params)
-
-        # Transform response
-        transformed_data = self._transform_response(response_data)
+    async def fetch_async(self, path: str, params: Dict[str, Any] = None) -> ProxyResult:
+        """
+        Async variant of fetch() for ASGI views.
 
-        # Check if this was a cache hit
-        cache_info_after = self._get_data.cache_info()
-        from_cache = cache_info_after.hits > cache_info_before.hits
+        Misses await the provider's async client instead of blocking a thread; cache
+        reads and writes, which may go to Redis, run in worker threads off the event loop.
+        """
+        return self.with_metadata(await self.fetch_raw_async(path, params))
 
-        return transformed_data, route_config["provider"], from_cache
-
-    def process_request(self, path: str, params: Dict[str, Any] = None) -> Dict[str, Any]:
-        """Process request - public interface"""
-        # Convert params to hashable tuple for caching
-        params_tuple = self._dict_to_tuple(params or {})
+    async def fetch_raw_async(
+        self, path: str, params: Dict[str, Any] = None, stream: bool = False, encoding: Optional[str] = None
+    ) -> ProxyResult:
+        """Async variant of fetch_raw()"""
+        params = dict(params or {})
+        fields = params.pop(FIELDS_PARAM, None)
+        output_format = params.pop(FORMAT_PARAM, None)
+        params_tuple = self._dict_to_tuple(params)
 
         try:
-            data, provider_name, from_cache = self._get_data(path, params_tuple)
-            return self._add_metadata(data, provider_name, from_cache)
+            paths = parse_fields(fields) if fields is not None else ()
+            writer = get_writer(output_format)
+            if paths or writer is not None:
+                upstream, derived_key = self._resolve_derived(path, params_tuple, paths, writer)
+                cached = await sync_to_async(self._cached_derived, thread_sensitive=False)(upstream, derived_key, writer)
+                if cached is not None:
+                    return cached
+                entry = await sync_to_async(self.cache.get, thread_sensitive=False)(upstream.cache_key, allow_stale=True)
+                result = self.serve_cached(upstream, entry) if entry is not None else await self._fetch_live_async(upstream)
+                return await sync_to_async(self._derive, thread_sensitive=False)(upstream, derived_key, paths, writer, result, entry)
+
+            upstream = self.resolve(path, params_tuple)
+            entry = await sync_to_async(self.cache.get_encoded, thread_sensitive=False)(
+                upstream.cache_key, upstream.cache_class, encoding, allow_stale=True
+            )
+            if entry is not None:
+                return self.serve_cached(upstream, entry)
+            if stream and upstream.stream:
+                return await self.fetch_stream_async(upstream)
+            return await self._fetch_live_async(upstream)
         except FinancialAPIError:
             raise
         except Exception as e:
             logger.error(f"Error processing {path}: {e}")
             raise FinancialAPIError(f"Internal error: {e}")
 
+    async def _fetch_live_async(self, upstream: UpstreamRequest) -> ProxyResult:
+        """Async variant of fetch_live()"""
+        transformed_data, _ = await self.async_flight.do(upstream.flight_key, self._fetch_async, upstream)
+        return ProxyResult(transformed_data, upstream.provider, "live")
+
+    async def fetch_stream_async(self, upstream: UpstreamRequest) -> ProxyResult:
+        """Async variant of fetch_stream()"""
+        chunks = await self.providers[upstream.provider].stream_request_async(upstream.endpoint, dict(upstream.params))
+        return ProxyResult(None, upstream.provider, "live", chunks=aiter_transformed(chunks, self._stream_transforms(upstream)))
+
+    async def _fetch_async(self, upstream: UpstreamRequest) -> Dict[str, Any]:
+        """Async variant of _fetch()"""
+        response_data = await self.providers[upstream.provider].make_request_async(upstream.endpoint, dict(upstream.params))
+        transformed_data = self._transform_response(response_data, upstream.url_fields)
+        await sync_to_async(self.cache.set, thread_sensitive=False)(upstream.cache_key, transformed_data, upstream.cache_class)
+        return transformed_data
+
+    def _stream_transforms(self, upstream: UpstreamRequest) -> List[Any]:
+        """Rewrite a streamed body's URL fields, caching it once complete if it is small enough"""
+        member_filter = JSONMemberFilter.for_rewriter(provider_url_rewriter, compile_field_paths(upstream.url_fields))
+        capture = BodyCapture(
+            stream_cache_max_bytes(), lambda body: self.cache.set_encoded(upstream.cache_key, body, upstream.cache_class)
+        )
+        return [member_filter, capture] if member_filter is not None else [capture]
+
+    def with_metadata(self, result: ProxyResult) -> ProxyResult:
+        """Attach the _metadata block describing provider and cache source"""
+        result = result.decoded()
+        return result._replace(data=self._add_metadata(result.data, result.provider, result.source))
+
+    def encode_response(self, result: ProxyResult) -> bytes:
+        """
+        JSON response body for a result, with _metadata attached.
+
+        Cached bodies are not decoded: the metadata is spliced in as the object's last member.
+        A result served from a precompressed variant is returned in the variant's encoding,
+        with the spliced tail framed onto its stored stream. Columnar bodies are sent as is.
+        """
+        if result.media_type is not None:
+            return result.body
+        if result.compressed is not None:
+            head = result.compressed
+            return finish(head, self._response_tail(result, head.last, head.length == 1))
+        if result.body is None:
+            return codec.dumps(self.with_metadata(result).data)
+        if not result.body.startswith(b"{"):
+            return result.body
+        return b"".join((result.body[:-1], self._response_tail(result, b"}", result.body == b"{}")))
+
+    def _response_tail(self, result: ProxyResult, last: bytes, empty: bool) -> bytes:
+        """What replaces a cached body's last byte: the _metadata member and closing brace of an object"""
+        if last != b"}":
+            return last
+        member = b'"_metadata":' + codec.dumps(self._metadata(result.provider, result.source)) + b"}"
+        return member if empty else b"," + member
+
+    def stream_response(self, result: ProxyResult) -> Any:
+        """Chunks of a streamed result's response body, with _metadata attached"""
+        transforms = [MemberAppender({"_metadata": self._metadata(result.provider, result.source)})]
+        if hasattr(result.chunks, "__aiter__"):
+            return aiter_transformed(result.chunks, transforms)
+        return iter_transformed(result.chunks, transforms)
+
+    def process_request(self, path: str, params: Dict[str, Any] = None) -> Dict[str, Any]:
+        """Process request - public interface"""
+        return self.fetch(path, params).data
+
     def _find_route(self, path: str) -> Optional[Dict[str, Any]]:
         """Find matching route for path"""
-        for pattern, config in ENDPOINT_ROUTES.items():
-            if self._path_matches_pattern(path, pattern):
-                return config
-        return None
+        route_match = router.match(path)
+        return route_match.config if route_match else None
 
-    def _path_matches_pattern(self, path: str, pattern: str) -> bool:
-        """Check if path matches route pattern"""
-        regex_pattern = pattern.replace('{', '(?P<').replace('}', '>[^/]+)')
-        return bool(re.match(f"^{regex_pattern}$", path))
-
-    def _transform_request(self, path: str, params: Dict[str, Any], route_config: Dict[str, Any]) -> Tuple[str, Dict[str, Any]]:
+    def _transform_request(
+        self, path_params: Dict[str, str], params: Dict[str, Any], route_config: Dict[str, Any]
+    ) -> Tuple[str, Dict[str, Any]]:
         """Transform the request path and parameters for the target provider"""
         provider_endpoint = route_config["endpoint"]
         provider_params = params.copy()
 
-        # Extract path parameters (e.g., {symbol} from quotes/{symbol})
-        path_params = self._extract_path_params(path, route_config)
-
         # Replace placeholders in endpoint
         for param_name, param_value in path_params.items():
             provider_endpoint = provider_endpoint.replace(f"{{{param_name}}}", param_value)
@@ -134,87 +447,19 @@ class FinancialDataProxy:
 
         return provider_endpoint, provider_params
 
-    def _extract_path_params(self, path: str, route_config: Dict[str, Any]) -> Dict[str, str]:
-        """Extract parameters from path using route pattern"""
-        # Find the route pattern for this config
-        route_pattern = None
-        for pattern, config in ENDPOINT_ROUTES.items():
-            if config == route_config:
-                route_pattern = pattern
-                break
-
-        if not route_pattern:
-            return {}
-
-        # Extract parameters
-        regex_pattern = route_pattern.replace('{', '(?P<').replace('}', '>[^/]+)')
-        match = re.match(f"^{regex_pattern}$", path)
-
-        return match.groupdict() if match else {}
+    def _transform_response(self, response_data: Any, url_fields: Optional[Tuple[str, ...]] = None) -> Any:
+        """Replace provider URLs in place, visiting only the route's URL field paths if it declares them"""
+        return provider_url_rewriter.rewrite(response_data, compile_field_paths(url_fields))
 
-    def _transform_response(self, response_data: Dict[str, Any]) -> Dict[str, Any]:
-        """Transform provider response to replace URLs"""
-        return self._replace_provider_urls(response_data)
-
-    def _replace_provider_urls(self, data: Any) -> Any:
-        """Recursively replace provider URLs with financialdata.online URLs"""
+    def _add_metadata(self, data: Dict[str, Any], provider: str, source: str) -> Dict[str, Any]:
+        """Add metadata to response (on a shallow copy, live data is shared by coalesced callers)"""
         if isinstance(data, dict):
-            return {
-                key: self._convert_url(value) if self._is_url_field(key) else self._replace_provider_urls(value)
-                for key, value in data.items()
-            }
-        elif isinstance(data, list):
-            return [self._replace_provider_urls(item) for item in data]
-        elif isinstance(data, str) and self._is_provider_url(data):
-            return self._convert_url(data)
+            data = dict(data)
+            data["_metadata"] = self._metadata(provider, source)
         return data
 
-    def _is_url_field(self, field_name: str) -> bool:
-        """Check if field contains URLs"""
-        url_fields = ['url', 'link', 'href', 'endpoint', 'next_url', 'previous_url']
-        return field_name.lower() in url_fields
-
-    def _is_provider_url(self, text: str) -> bool:
-        """Check if string is a provider URL"""
-        provider_domains = ['polygon.io', 'financialmodelingprep.com', 'api.polygon.io', 'fmp-cloud-io']
-        return any(domain in text.lower() for domain in provider_domains)
-
-    def _convert_url(self, url: str) -> str:
-        """Convert provider URL to financialdata.online URL"""
-        if not isinstance(url, str) or 'financialdata.online' in url.lower():
-            return url
-
-        if not self._is_provider_url(url):
-            return url
-
-        try:
-            from urllib.parse import urlparse
-            parsed = urlparse(url)
-
-            # Remove version prefix from path
-            path = parsed.path
-            if path.startswith(('/v1/', '/v2/', '/v3/')):
-                path = path[4:]
-
-            # Build new URL
-            new_url = f"{settings.FINANCIALDATA_BASE_URL}/api/v1{path}"
-            if parsed.query:
-                new_url += f"?{parsed.query}"
-
-            return new_url
-        except Exception as e:
-            logger.warning(f"Failed to convert URL {url}: {e}")
-            return url
-
-    def _add_metadata(self, data: Dict[str, Any], provider: str, from_cache: bool) -> Dict[str, Any]:
-        """Add metadata to response"""
-        if isinstance(data, dict):
-            data["_metadata"] = {
-                "source": "cache" if from_cache else "live",
-                "provider": provider,
-                "timestamp": datetime.utcnow().isoformat() + "Z"
-            }
-        return data
+    def _metadata(self, provider: str, source: str) -> Dict[str, str]:
+        return {"source": source, "provider": provider, "timestamp": datetime.utcnow().isoformat() + "Z"}
 
     def _get_current_timestamp(self) -> str:
         """Get current timestamp in ISO format"""
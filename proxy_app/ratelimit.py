@@ -0,0 +1,199 @@
+"""
+Cluster-wide token-bucket limiter for upstream provider quotas.
+
+Every worker draws from one bucket per provider, held in Redis and updated by an
+atomic Lua script, so the RATE_LIMITS budgets hold across the whole deployment.
+A bucket holds RATE_LIMIT_BURST tokens and refills with the rest of the minute's
+budget. A caller that would overdraw it may reserve a token up to max_wait ahead
+and sleep until it is due, so short bursts are queued instead of rejected. Without
+a Redis cache the same algorithm runs in-process.
+"""
+import asyncio
+import logging
+import math
+import threading
+import time
+from typing import Any, Dict, NamedTuple, Optional, Tuple
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+
+from .config import RATE_LIMIT_BURST, RATE_LIMITS
+
+logger = logging.getLogger(__name__)
+
+# KEYS[1] bucket hash; ARGV: capacity, refill per ms, max wait ms.
+# Uses the Redis clock so every worker agrees on refill time. The token count may go
+# negative by up to max wait worth of refill: those are reservations queued behind it.
+TOKEN_BUCKET_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local refill_per_ms = tonumber(ARGV[2])
+local max_wait_ms = tonumber(ARGV[3])
+local clock = redis.call('TIME')
+local now = clock[1] * 1000 + math.floor(clock[2] / 1000)
+
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or capacity
+local ts = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * refill_per_ms)
+
+local wait_ms = 0
+if tokens < 1 then
+    wait_ms = math.ceil((1 - tokens) / refill_per_ms)
+    if wait_ms > max_wait_ms then
+        return {0, wait_ms}
+    end
+end
+
+tokens = tokens - 1
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', now)
+redis.call('PEXPIRE', KEYS[1], math.ceil((capacity - tokens) / refill_per_ms) + 1000)
+return {1, wait_ms}
+"""
+
+
+class RateLimitDecision(NamedTuple):
+    """Outcome of taking a token: when allowed, wait is the delay before the call may go out"""
+
+    allowed: bool
+    wait: float
+
+
+class LocalTokenBuckets:
+    """In-process equivalent of TOKEN_BUCKET_SCRIPT for deployments without Redis"""
+
+    def __init__(self):
+        self._buckets: Dict[str, Tuple[float, float]] = {}
+        self._lock = threading.Lock()
+
+    def take(self, key: str, capacity: float, refill_per_ms: float, max_wait_ms: int) -> Tuple[int, int]:
+        now = time.time() * 1000
+        with self._lock:
+            tokens, ts = self._buckets.get(key, (capacity, now))
+            tokens = min(capacity, tokens + max(0.0, now - ts) * refill_per_ms)
+
+            wait_ms = 0
+            if tokens < 1:
+                wait_ms = math.ceil((1 - tokens) / refill_per_ms)
+                if wait_ms > max_wait_ms:
+                    return 0, wait_ms
+
+            self._buckets[key] = (tokens - 1, now)
+            return 1, wait_ms
+
+    def clear(self):
+        with self._lock:
+            self._buckets.clear()
+
+
+class TokenBucketLimiter:
+    """Per-provider token buckets shared by every worker through a Redis cache alias"""
+
+    key_prefix = "upstream_bucket"
+
+    def __init__(self, alias: str, limits: Dict[str, int], burst: Dict[str, int], max_wait: float):
+        self.alias = alias
+        self.limits = dict(limits)
+        self.burst = dict(burst)
+        self.max_wait = max_wait
+        self.allowed = 0
+        self.delayed = 0
+        self.rejected = 0
+        self.errors = 0
+        self.local = LocalTokenBuckets()
+        self._script = None
+        self._script_lock = threading.Lock()
+
+    def bucket_for(self, provider: str) -> Tuple[float, float]:
+        """(capacity, refill per ms) so that no rolling minute exceeds the provider's budget"""
+        limit = self.limits[provider]
+        capacity = max(1, min(self.burst.get(provider, limit), limit))
+        # A full bucket drained at the start of a minute plus a minute of refill equals the limit
+        refill_per_ms = max(limit - capacity, 1) / 60000.0
+        return capacity, refill_per_ms
+
+    def _redis_script(self):
+        """The registered script when the cache alias is Redis, otherwise None"""
+        if self._script is None:
+            with self._script_lock:
+                if self._script is None:
+                    try:
+                        from django_redis import get_redis_connection
+                        from django_redis.cache import RedisCache
+                    except ImportError:
+                        self._script = False
+                    else:
+                        if isinstance(caches[self.alias], RedisCache):
+                            self._script = get_redis_connection(self.alias).register_script(TOKEN_BUCKET_SCRIPT)
+                        else:
+                            self._script = False
+        return self._script or None
+
+    def reserve(self, provider: str) -> RateLimitDecision:
+        """Take one token from provider's bucket, queueing for up to max_wait if it is empty"""
+        if provider not in self.limits:
+            return RateLimitDecision(True, 0.0)
+
+        capacity, refill_per_ms = self.bucket_for(provider)
+        max_wait_ms = int(self.max_wait * 1000)
+        key = f"{self.key_prefix}:{provider}"
+
+        script = self._redis_script()
+        if script is None:
+            allowed, wait_ms = self.local.take(key, capacity, refill_per_ms, max_wait_ms)
+        else:
+            try:
+                allowed, wait_ms = script(keys=[key], args=[capacity, refill_per_ms, max_wait_ms])
+            except Exception as e:
+                # Fail open: an unreachable limiter should not take the proxy down with it
+                logger.warning(f"Upstream rate limiter unavailable for {provider}: {e}")
+                self.errors += 1
+                return RateLimitDecision(True, 0.0)
+
+        if not allowed:
+            self.rejected += 1
+            return RateLimitDecision(False, wait_ms / 1000.0)
+        self.allowed += 1
+        if wait_ms:
+            self.delayed += 1
+        return RateLimitDecision(True, wait_ms / 1000.0)
+
+    def acquire(self, provider: str) -> RateLimitDecision:
+        """reserve(), then sleep until the reserved token is due"""
+        decision = self.reserve(provider)
+        if decision.allowed and decision.wait > 0:
+            time.sleep(decision.wait)
+        return decision
+
+    async def acquire_async(self, provider: str) -> RateLimitDecision:
+        """acquire() without blocking the event loop"""
+        decision = await sync_to_async(self.reserve, thread_sensitive=False)(provider)
+        if decision.allowed and decision.wait > 0:
+            await asyncio.sleep(decision.wait)
+        return decision
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "backend": "redis" if self._redis_script() is not None else "local",
+            "allowed": self.allowed,
+            "delayed": self.delayed,
+            "rejected": self.rejected,
+            "errors": self.errors,
+            "max_wait_ms": int(self.max_wait * 1000),
+            "limits_per_minute": self.limits,
+        }
+
+
+def build_upstream_limiter(limits: Optional[Dict[str, int]] = None) -> TokenBucketLimiter:
+    """Build the upstream limiter from RATE_LIMITS and the PROXY_UPSTREAM_RATE_LIMIT_* settings"""
+    return TokenBucketLimiter(
+        alias=getattr(settings, 'PROXY_UPSTREAM_RATE_LIMIT_CACHE_ALIAS', 'default'),
+        limits=limits if limits is not None else RATE_LIMITS,
+        burst=RATE_LIMIT_BURST,
+        max_wait=getattr(settings, 'PROXY_UPSTREAM_RATE_LIMIT_MAX_WAIT_MS', 250) / 1000.0,
+    )
+
+
+# Global limiter for upstream provider calls, shared cluster-wide through Redis
+upstream_limiter = build_upstream_limiter()
@@ -0,0 +1,230 @@
+"""
+In-place rewriting of provider URLs in response payloads.
+
+Responses are walked iteratively with an explicit stack, and strings are updated
+inside the existing containers, so large bulk and tick payloads are not copied or
+recursed through. All patterns are compiled once. A route may declare the field
+paths that can hold URLs ("url_fields"). In that case only those paths are visited,
+so row arrays that cannot contain a URL are never scanned.
+
+Field paths are dotted keys, with "*" matching every list item or dict value,
+e.g. ("next_url", "results.*.branding"). Everything below a path's last key is
+walked in full. An empty tuple means the payload holds no URLs at all. Field paths
+only limit where URLs are rewritten: a rewriter that strips fields still strips them
+from every dict of the payload.
+"""
+import logging
+import re
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import urlparse
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# Compiled field-path tree: key -> subtree, where None means "walk everything below"
+FieldSpec = Optional[Dict[str, Any]]
+
+# Spec of containers outside the field paths, walked only to strip fields
+STRIP_ONLY: Dict[str, Any] = {}
+
+PROVIDER_URL_RE = re.compile(r"polygon\.io|financialmodelingprep\.com|fmp-cloud-io", re.IGNORECASE)
+OWN_DOMAIN_RE = re.compile(r"financialdata\.online", re.IGNORECASE)
+API_KEY_PARAM_RE = re.compile(r"[?&]apiKey=[^&]*&?", re.IGNORECASE)
+API_VERSION_RE = re.compile(r"/v[1-3]/")
+TRAILING_SEPARATORS_RE = re.compile(r"[&?]+$")
+
+
+@lru_cache(maxsize=512)
+def compile_field_paths(paths: Optional[Tuple[str, ...]]) -> FieldSpec:
+    """Build the field-path tree for dotted paths such as a route's url_fields (None walks the whole payload)"""
+    if paths is None:
+        return None
+    spec: Dict[str, Any] = {}
+    for path in paths:
+        node = spec
+        keys = path.split(".")
+        for key in keys[:-1]:
+            child = node.setdefault(key, {})
+            if child is None:
+                break
+            node = child
+        else:
+            node[keys[-1]] = None
+    return spec
+
+
+class ResponseRewriter:
+    """Iterative in-place walk over a JSON payload, optionally limited to a field-path tree"""
+
+    # Keys dropped from every visited dict
+    strip_fields: Tuple[str, ...] = ()
+    # Only strings under these keys are offered to rewrite_field (None offers every string)
+    field_names: Optional[frozenset] = None
+    # Whether strings directly inside lists are offered to rewrite_item
+    rewrite_list_items = True
+
+    def rewrite(self, data: Any, spec: FieldSpec = None) -> Any:
+        """Rewrite data in place and return it (scalars are returned rewritten)"""
+        if type(data) is not dict and type(data) is not list:
+            return self.rewrite_root(data)
+
+        strip_fields, field_names, rewrite_list_items = self.strip_fields, self.field_names, self.rewrite_list_items
+        rewrite_field, rewrite_item = self.rewrite_field, self.rewrite_item
+        descend_into, descend_into_item = self.descend_into, self.descend_into_item
+
+        # JSON payloads only hold exact dicts, lists and strs, so exact type checks are safe
+        stack: List[Tuple[Any, FieldSpec]] = [(data, spec)]
+        push = stack.append
+        while stack:
+            node, node_spec = stack.pop()
+            if node_spec is STRIP_ONLY:
+                self._push_strip_only(node, push)
+                continue
+            if type(node) is dict:
+                for field in strip_fields:
+                    if field in node:
+                        del node[field]
+                if node_spec is None:
+                    entries: Iterable = node.items()
+                elif "*" in node_spec:
+                    entries = list(node.items())
+                else:
+                    entries = [(key, node[key]) for key in node_spec if key in node]
+                    if strip_fields:
+                        # Containers off the field paths are still walked to strip fields
+                        for key, value in node.items():
+                            if key not in node_spec and (type(value) is dict or type(value) is list):
+                                push((value, STRIP_ONLY))
+                for key, value in entries:
+                    value_type = type(value)
+                    if value_type is str:
+                        if field_names is None or key in field_names:
+                            rewritten = rewrite_field(key, value)
+                            if rewritten is not value:
+                                node[key] = rewritten
+                    elif (value_type is dict or value_type is list) and descend_into(key):
+                        push((value, None if node_spec is None else node_spec.get(key, node_spec.get("*"))))
+            elif node_spec is None or "*" in node_spec:
+                child_spec = None if node_spec is None else node_spec["*"]
+                for index, item in enumerate(node):
+                    item_type = type(item)
+                    if item_type is str:
+                        if rewrite_list_items:
+                            rewritten = rewrite_item(item)
+                            if rewritten is not item:
+                                node[index] = rewritten
+                    elif (item_type is dict or item_type is list) and descend_into_item(item):
+                        push((item, child_spec))
+            elif strip_fields:
+                self._push_strip_only(node, push)
+        return data
+
+    def _push_strip_only(self, node: Any, push) -> None:
+        """Strip fields from a container off the field paths, and queue its containers for the same"""
+        if type(node) is dict:
+            for field in self.strip_fields:
+                if field in node:
+                    del node[field]
+            children: Iterable = node.values()
+        else:
+            children = (item for item in node if self.descend_into_item(item))
+        for child in children:
+            if type(child) is dict or type(child) is list:
+                push((child, STRIP_ONLY))
+
+    def rewrite_root(self, value: Any) -> Any:
+        return value
+
+    def rewrite_field(self, key: str, value: str) -> str:
+        return value
+
+    def rewrite_item(self, value: str) -> str:
+        return value
+
+    def descend_into(self, key: str) -> bool:
+        return True
+
+    def descend_into_item(self, item: Any) -> bool:
+        return True
+
+
+class ProviderURLRewriter(ResponseRewriter):
+    """Rewrites provider URLs anywhere in a payload to financialdata.online URLs"""
+
+    url_fields = frozenset(['url', 'link', 'href', 'endpoint', 'next_url', 'previous_url'])
+
+    def rewrite_root(self, value: Any) -> Any:
+        return self.convert_url(value) if isinstance(value, str) else value
+
+    def rewrite_field(self, key: str, value: str) -> str:
+        return self.convert_url(value)
+
+    def rewrite_item(self, value: str) -> str:
+        return self.convert_url(value)
+
+    def descend_into(self, key: str) -> bool:
+        # Containers under URL-named fields are passed through untouched
+        return key.lower() not in self.url_fields
+
+    @staticmethod
+    def convert_url(url: str) -> str:
+        """Convert a provider URL to its financialdata.online equivalent; other strings pass through"""
+        if not PROVIDER_URL_RE.search(url) or OWN_DOMAIN_RE.search(url):
+            return url
+
+        try:
+            parsed = urlparse(url)
+
+            # Remove version prefix from path, keeping its leading slash
+            path = parsed.path
+            if path.startswith(('/v1/', '/v2/', '/v3/')):
+                path = path[3:]
+
+            new_url = f"{settings.FINANCIALDATA_BASE_URL}/api/v1{path}"
+            if parsed.query:
+                new_url += f"?{parsed.query}"
+            return new_url
+        except Exception as e:
+            logger.warning(f"Failed to convert URL {url}: {e}")
+            return url
+
+
+class PolygonPaginationRewriter(ResponseRewriter):
+    """
+    Points Polygon pagination links at the proxy domain and strips Polygon bookkeeping.
+
+    Used by the legacy unified view: only dicts and dicts inside lists are visited.
+    """
+
+    field_names = frozenset(["next_url", "previous_url", "next", "previous"])
+    rewrite_list_items = False
+
+    def __init__(self, proxy_domain: str, strip_fields: Tuple[str, ...] = ("status", "request_id", "queryCount")):
+        self.proxy_domain = proxy_domain
+        self.strip_fields = strip_fields
+
+    def rewrite(self, data: Any, spec: FieldSpec = None) -> Any:
+        # Only object payloads carry pagination links
+        if not isinstance(data, dict):
+            return data
+        return super().rewrite(data, spec)
+
+    def rewrite_field(self, key: str, value: str) -> str:
+        if "polygon.io" not in value:
+            return value
+        url = value.replace("api.polygon.io", self.proxy_domain)
+        url = API_KEY_PARAM_RE.sub("", url)
+        url = API_VERSION_RE.sub("/v1/", url)
+        url = TRAILING_SEPARATORS_RE.sub("", url)
+        if not url.startswith("https://"):
+            url = f"https://{url}" if not url.startswith("http") else url.replace("http://", "https://")
+        return url
+
+    def descend_into_item(self, item: Any) -> bool:
+        return type(item) is dict
+
+
+# Shared rewriter for FinancialDataProxy responses
+provider_url_rewriter = ProviderURLRewriter()
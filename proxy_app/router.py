@@ -0,0 +1,107 @@
+"""
+Segment trie router for the financial data API routes
+"""
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+from .config import ENDPOINT_ROUTES
+
+
+class Route(NamedTuple):
+    """A compiled route pattern"""
+
+    pattern: str
+    config: Dict[str, Any]
+    param_names: Tuple[str, ...]
+
+
+class RouteMatch(NamedTuple):
+    """Result of a successful route lookup"""
+
+    route: Route
+    params: Dict[str, str]
+
+    @property
+    def config(self) -> Dict[str, Any]:
+        return self.route.config
+
+
+class _Node:
+    """Trie node: literal children, one placeholder child and the route ending here"""
+
+    __slots__ = ('static', 'param', 'route')
+
+    def __init__(self):
+        self.static: Dict[str, '_Node'] = {}
+        self.param: Optional['_Node'] = None
+        self.route: Optional[Route] = None
+
+
+class Router:
+    """
+    Routes request paths to their configuration in a single walk over the path segments.
+
+    Literal segments take precedence over placeholders, so "quotes/gainers" resolves to its
+    own route instead of "quotes/{symbol}". When a literal branch dead-ends the lookup falls
+    back to the placeholder branch at that level.
+    """
+
+    def __init__(self, routes: Optional[Dict[str, Dict[str, Any]]] = None):
+        self._root = _Node()
+        self.routes: List[Route] = []
+        for pattern, config in (routes or {}).items():
+            self.add(pattern, config)
+
+    def add(self, pattern: str, config: Dict[str, Any]) -> Route:
+        """Register a route pattern such as 'quotes/{symbol}/last-trade'"""
+        node = self._root
+        param_names = []
+        for segment in pattern.split('/'):
+            if segment.startswith('{') and segment.endswith('}'):
+                param_names.append(segment[1:-1])
+                if node.param is None:
+                    node.param = _Node()
+                node = node.param
+            else:
+                node = node.static.setdefault(segment, _Node())
+
+        route = Route(pattern, config, tuple(param_names))
+        # Keep the first registration, matching the ordered scan of the route table
+        if node.route is None:
+            node.route = route
+        self.routes.append(route)
+        return route
+
+    def match(self, path: str) -> Optional[RouteMatch]:
+        """Return the matching route and its named path parameters, or None"""
+        values: List[str] = []
+        route = self._match(self._root, path.split('/'), 0, values)
+        if route is None:
+            return None
+        return RouteMatch(route, dict(zip(route.param_names, values)))
+
+    def _match(self, node: _Node, segments: List[str], index: int, values: List[str]) -> Optional[Route]:
+        if index == len(segments):
+            return node.route
+
+        segment = segments[index]
+        child = node.static.get(segment)
+        if child is not None:
+            route = self._match(child, segments, index + 1, values)
+            if route is not None:
+                return route
+
+        if node.param is not None and segment:
+            values.append(segment)
+            route = self._match(node.param, segments, index + 1, values)
+            if route is not None:
+                return route
+            values.pop()
+
+        return None
+
+    def __len__(self) -> int:
+        return len(self.routes)
+
+
+# Global router for the /api/v1/ route table, built once at import
+router = Router(ENDPOINT_ROUTES)
@@ -0,0 +1,176 @@
+"""
+Compact normalized schemas for schema=compact on the legacy unified view.
+
+The legacy view returns raw provider shapes. With schema=compact, quotes, bars,
+trades and profiles from either provider are mapped into one short-keyed row
+schema per kind, so clients decode a single shape whatever the route's provider:
+
+    quote    s symbol, p price, c change, cp change %, o open, h high, l low,
+             pc previous close, v volume, t time
+    bar      t start time, o open, h high, l low, c close, v volume, vw VWAP
+    trade    t time (ns), p price, z size, x exchange, c conditions, i id
+    profile  s symbol, n name, x exchange, sec sector, ind industry, cap market
+             cap, ccy currency, url website
+
+Times are epoch milliseconds, except trades, which keep Polygon's nanoseconds.
+FMP's exchange-local dates are read as America/New_York, matching Polygon's bar
+timestamps. Fields a provider does not have are null, so every row of a kind has
+the same keys.
+
+Routes name their row kind and the key path of their rows in "compact". Each
+(kind, provider) field map is compiled once into a function that builds a row with
+a single dict display, so normalizing costs one call per row and no per-key
+dispatch. The normalized payload is {"results": [rows]}, keeping next_url when the
+provider sent one.
+"""
+from datetime import datetime
+from types import MappingProxyType
+from typing import Any, Callable, Dict, Optional, Tuple
+from zoneinfo import ZoneInfo
+
+SCHEMA_PARAM = "schema"
+RAW_SCHEMA = "raw"
+COMPACT_SCHEMA = "compact"
+
+EXCHANGE_TZ = ZoneInfo("America/New_York")
+
+
+def seconds_to_ms(value: Optional[int]) -> Optional[int]:
+    return None if value is None else int(value * 1000)
+
+
+def ns_to_ms(value: Optional[int]) -> Optional[int]:
+    return None if value is None else value // 1_000_000
+
+
+def exchange_time_to_ms(value: Optional[str]) -> Optional[int]:
+    """Epoch milliseconds of an FMP date or date-time in exchange-local time"""
+    if not value:
+        return None
+    return int(datetime.fromisoformat(value).replace(tzinfo=EXCHANGE_TZ).timestamp() * 1000)
+
+
+# (compact key, dotted source path or None, optional converter) per field, in output order
+FIELD_MAPS: Dict[Tuple[str, str], Tuple[tuple, ...]] = {
+    ("quote", "fmp"): (
+        ("s", "symbol"),
+        ("p", "price"),
+        ("c", "change"),
+        ("cp", "changesPercentage"),
+        ("o", "open"),
+        ("h", "dayHigh"),
+        ("l", "dayLow"),
+        ("pc", "previousClose"),
+        ("v", "volume"),
+        ("t", "timestamp", seconds_to_ms),
+    ),
+    ("quote", "polygon"): (
+        ("s", "ticker"),
+        ("p", "lastTrade.p"),
+        ("c", "todaysChange"),
+        ("cp", "todaysChangePerc"),
+        ("o", "day.o"),
+        ("h", "day.h"),
+        ("l", "day.l"),
+        ("pc", "prevDay.c"),
+        ("v", "day.v"),
+        ("t", "updated", ns_to_ms),
+    ),
+    ("bar", "fmp"): (
+        ("t", "date", exchange_time_to_ms),
+        ("o", "open"),
+        ("h", "high"),
+        ("l", "low"),
+        ("c", "close"),
+        ("v", "volume"),
+        ("vw", "vwap"),
+    ),
+    ("bar", "polygon"): (("t", "t"), ("o", "o"), ("h", "h"), ("l", "l"), ("c", "c"), ("v", "v"), ("vw", "vw")),
+    ("trade", "polygon"): (
+        ("t", "sip_timestamp"),
+        ("p", "price"),
+        ("z", "size"),
+        ("x", "exchange"),
+        ("c", "conditions"),
+        ("i", "id"),
+    ),
+    ("profile", "fmp"): (
+        ("s", "symbol"),
+        ("n", "companyName"),
+        ("x", "exchangeShortName"),
+        ("sec", "sector"),
+        ("ind", "industry"),
+        ("cap", "mktCap"),
+        ("ccy", "currency"),
+        ("url", "website"),
+    ),
+    ("profile", "polygon"): (
+        ("s", "ticker"),
+        ("n", "name"),
+        ("x", "primary_exchange"),
+        ("sec", None),
+        ("ind", "sic_description"),
+        ("cap", "market_cap"),
+        ("ccy", "currency_name"),
+        ("url", "homepage_url"),
+    ),
+}
+
+_EMPTY = MappingProxyType({})
+
+
+def compile_mapper(fields: Tuple[tuple, ...]) -> Callable[[Dict[str, Any]], Dict[str, Any]]:
+    """Compile a field map into a function from a provider row to a compact row"""
+    namespace: Dict[str, Any] = {"EMPTY": _EMPTY}
+    items = []
+    for index, (key, path, *convert) in enumerate(fields):
+        if path is None:
+            expression = "None"
+        else:
+            first, *rest = path.split(".")
+            expression = f"row.get({first!r})"
+            for part in rest:
+                expression = f"({expression} or EMPTY).get({part!r})"
+        if convert:
+            namespace[f"convert{index}"] = convert[0]
+            expression = f"convert{index}({expression})"
+        items.append(f"{key!r}: {expression}")
+    # The source is built from the static field maps above, never from request data
+    return eval(f"lambda row: {{{', '.join(items)}}}", namespace)
+
+
+MAPPERS = MappingProxyType({key: compile_mapper(fields) for key, fields in FIELD_MAPS.items()})
+
+
+def parse_schema(params) -> Optional[str]:
+    """The schema a request asks for (None for raw provider shapes), raising ValueError for an unknown one"""
+    schema = params.get(SCHEMA_PARAM) or RAW_SCHEMA
+    if schema not in (RAW_SCHEMA, COMPACT_SCHEMA):
+        raise ValueError(f"Unknown schema: {schema}; use {RAW_SCHEMA} or {COMPACT_SCHEMA}")
+    return None if schema == RAW_SCHEMA else schema
+
+
+def row_mapper(spec: Tuple[str, Tuple[str, ...]], provider: str) -> Callable[[Dict[str, Any]], Dict[str, Any]]:
+    """The compiled mapper for a route's compact spec and provider"""
+    return MAPPERS[(spec[0], provider)]
+
+
+def normalize_compact(data: Any, spec: Tuple[str, Tuple[str, ...]], provider: str) -> Any:
+    """
+    The compact form of a provider payload, for a route's (kind, rows path) spec.
+
+    Payloads without a row list where the route keeps it (e.g. provider errors) are returned unchanged.
+    """
+    rows = data
+    for key in spec[1]:
+        rows = rows.get(key) if isinstance(rows, dict) else None
+    # Single-item endpoints keep their one row in an object
+    if spec[1] and isinstance(rows, dict):
+        rows = [rows]
+    if not isinstance(rows, list):
+        return data
+
+    compact = {"results": list(map(row_mapper(spec, provider), rows))}
+    if isinstance(data, dict) and data.get("next_url"):
+        compact["next_url"] = data["next_url"]
+    return compact
@@ -0,0 +1,130 @@
+"""
+Single-flight coalescing of concurrent identical upstream calls.
+
+While a call for a key is in flight, later callers for the same key wait for it
+and receive its result (or its exception) instead of issuing their own request.
+"""
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+
+
+class _Call:
+    """An in-flight call and the outcome shared with its waiters"""
+
+    __slots__ = ('done', 'result', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Coalesces concurrent calls that share a key into one execution"""
+
+    def __init__(self):
+        self._calls: Dict[Hashable, _Call] = {}
+        self._lock = threading.Lock()
+        self.executions = 0
+        self.coalesced = 0
+
+    def do(self, key: Hashable, fn: Callable, *args, **kwargs) -> Tuple[Any, bool]:
+        """
+        Run fn once per key at a time.
+
+        Returns:
+            (result, shared) where shared is True if the result came from another caller's call
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is None:
+                call = self._calls[key] = _Call()
+                self.executions += 1
+                leader = True
+            else:
+                self.coalesced += 1
+                leader = False
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = fn(*args, **kwargs)
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+
+        return call.result, False
+
+    def get_stats(self) -> Dict[str, Any]:
+        total = self.executions + self.coalesced
+        return {
+            "executions": self.executions,
+            "calls_saved": self.coalesced,
+            "saved_ratio": round(self.coalesced / total, 4) if total else 0.0,
+            "in_flight": len(self._calls),
+        }
+
+
+class AsyncSingleFlight:
+    """Coalesces concurrent coroutine calls that share a key within one event loop"""
+
+    def __init__(self):
+        self._calls: Dict[Tuple[asyncio.AbstractEventLoop, Hashable], asyncio.Future] = {}
+        self.executions = 0
+        self.coalesced = 0
+
+    async def do(self, key: Hashable, fn: Callable[..., Awaitable], *args, **kwargs) -> Tuple[Any, bool]:
+        """
+        Await fn once per key at a time.
+
+        Returns:
+            (result, shared) where shared is True if the result came from another caller's call
+        """
+        loop = asyncio.get_running_loop()
+        call_key = (loop, key)
+        future = self._calls.get(call_key)
+        if future is not None:
+            self.coalesced += 1
+            # Shield so a cancelled follower does not cancel the leader's call
+            return await asyncio.shield(future), True
+
+        future = self._calls[call_key] = loop.create_future()
+        self.executions += 1
+        try:
+            result = await fn(*args, **kwargs)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            # Mark the exception retrieved when nobody else was waiting for it
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result, False
+        finally:
+            self._calls.pop(call_key, None)
+
+    def get_stats(self) -> Dict[str, Any]:
+        total = self.executions + self.coalesced
+        return {
+            "executions": self.executions,
+            "calls_saved": self.coalesced,
+            "saved_ratio": round(self.coalesced / total, 4) if total else 0.0,
+            "in_flight": len(self._calls),
+        }
+
+
+# Global coalescers for upstream provider calls in this process
+upstream_flight = SingleFlight()
+async_upstream_flight = AsyncSingleFlight()
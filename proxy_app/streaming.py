@@ -0,0 +1,365 @@
+"""
+Incremental processing of large upstream JSON bodies for streamed routes.
+
+Routes flagged "stream" forward the provider's body to the client as it arrives,
+so neither the payload nor its parsed form is ever held in full. Each chunk goes
+through a chain of transforms with a feed()/close() interface:
+
+- JSONMemberFilter splits a top-level object into its members. Members that may need
+  rewriting (e.g. "next_url") are parsed one at a time and passed to a callback.
+  Every other member, such as the large "results" array, is forwarded byte for
+  byte. Only bracket nesting and string boundaries are tracked.
+- MemberAppender adds members (the proxy's _metadata) before the closing brace.
+- BodyCapture keeps a copy of bodies up to a byte budget, so that complete
+  payloads below it can still be cached.
+
+Documents that are not objects (e.g. FMP row arrays) pass through unchanged.
+"""
+import re
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, Iterator, List, Optional, Sequence
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+from .codec import codec
+from .rewrite import FieldSpec, ResponseRewriter
+
+WHITESPACE_RE = re.compile(rb"[ \t\r\n]*")
+# A complete member name and its colon
+MEMBER_KEY_RE = re.compile(rb'("[^"\\]*(?:\\.[^"\\]*)*")[ \t\r\n]*:', re.DOTALL)
+# A complete string value
+STRING_RE = re.compile(rb'"[^"\\]*(?:\\.[^"\\]*)*"', re.DOTALL)
+# A number or literal value, complete once followed by a delimiter
+SCALAR_RE = re.compile(rb"[^,}\] \t\r\n]+(?=[,}\] \t\r\n])")
+# Everything up to the next bracket or unterminated string, skipping whole strings
+STRUCTURE_SKIP_RE = re.compile(rb'[^"\[\]{}]*(?:"[^"\\]*(?:\\.[^"\\]*)*"[^"\[\]{}]*)*', re.DOTALL)
+
+OPENERS = frozenset(b"[{")
+# Every byte but brackets, for bytes.translate() to delete
+NON_BRACKETS = bytes(byte for byte in range(256) if byte not in b"[]{}")
+
+# Parser states
+START, MEMBER, VALUE, DONE, PASSTHROUGH = range(5)
+
+
+class JSONMemberFilter:
+    """
+    Rewrites selected top-level members of a streamed JSON object.
+
+    Members named in parse_keys are decoded and replaced by the members that
+    rewrite_member(key, value) returns (an empty dict drops them); all others are
+    forwarded without being parsed.
+    """
+
+    def __init__(self, parse_keys: Iterable[str], rewrite_member: Callable[[str, Any], Dict[str, Any]]):
+        self.parse_keys = frozenset(parse_keys)
+        self.rewrite_member = rewrite_member
+        self._buffer = b""
+        self._state = START
+        self._members_written = 0
+        # Current member: whether it is parsed, its name, bytes collected so far and nesting depth
+        self._parse = False
+        self._key = ""
+        self._value: List[bytes] = []
+        self._depth = 0
+
+    @classmethod
+    def for_rewriter(cls, rewriter: ResponseRewriter, spec: FieldSpec) -> Optional["JSONMemberFilter"]:
+        """
+        Filter that applies rewriter to the members named at the top of spec.
+
+        Returns None if the rewriter would leave the payload unchanged.
+        """
+        if spec is None or "*" in spec:
+            raise ValueError("Streamed routes must declare their url_fields without a top-level wildcard")
+        parse_keys = set(spec) | set(rewriter.strip_fields)
+        if not parse_keys:
+            return None
+        return cls(parse_keys, lambda key, value: rewriter.rewrite({key: value}, spec))
+
+    def feed(self, chunk: bytes) -> bytes:
+        if self._state == PASSTHROUGH:
+            return chunk
+        self._buffer += chunk
+        out: List[bytes] = []
+        pos = self._run(self._buffer, 0, out)
+        self._buffer = self._buffer[pos:]
+        return b"".join(out)
+
+    def close(self) -> bytes:
+        if self._state == PASSTHROUGH:
+            return b""
+        if self._state != DONE or self._buffer.strip():
+            raise ValueError("Incomplete or malformed JSON document")
+        return b""
+
+    def _run(self, buf: bytes, pos: int, out: List[bytes]) -> int:
+        """Consume as much of buf as possible, returning the position of the first unconsumed byte"""
+        end = len(buf)
+        while pos < end:
+            if self._state == VALUE:
+                pos, complete = self._scan_value(buf, pos, out)
+                if not complete:
+                    return pos
+                self._finish_member(out)
+                self._state = MEMBER
+                continue
+
+            pos = WHITESPACE_RE.match(buf, pos).end()
+            if pos == end:
+                return pos
+            byte = buf[pos]
+
+            if self._state == START:
+                if byte != 0x7B:  # not "{": forward the document untouched
+                    self._state = PASSTHROUGH
+                    out.append(buf[pos:])
+                    return end
+                out.append(b"{")
+                self._state = MEMBER
+                pos += 1
+            elif self._state == MEMBER:
+                if byte == 0x2C:  # ","
+                    pos += 1
+                elif byte == 0x7D:  # "}"
+                    out.append(b"}")
+                    self._state = DONE
+                    pos += 1
+                else:
+                    match = MEMBER_KEY_RE.match(buf, pos)
+                    if match is None:
+                        return pos
+                    self._start_member(match.group(1), out)
+                    self._state = VALUE
+                    pos = match.end()
+            else:
+                # Trailing whitespace is consumed above; anything else is left for close()
+                return pos
+        return pos
+
+    def _start_member(self, raw_key: bytes, out: List[bytes]):
+        self._key = codec.loads(raw_key)
+        self._parse = self._key in self.parse_keys
+        self._depth = 0
+        if not self._parse:
+            out.append(b"," + raw_key + b":" if self._members_written else raw_key + b":")
+            self._members_written += 1
+
+    def _finish_member(self, out: List[bytes]):
+        if not self._parse:
+            return
+        value = codec.loads(b"".join(self._value))
+        self._value = []
+        for key, rewritten in self.rewrite_member(self._key, value).items():
+            out.append(b"," if self._members_written else b"")
+            out.append(codec.dumps(key) + b":" + codec.dumps(rewritten))
+            self._members_written += 1
+
+    def _scan_value(self, buf: bytes, pos: int, out: List[bytes]):
+        """Find the end of the current member's value, returning (next position, whether it is complete)"""
+        start = pos
+        end = len(buf)
+        if self._depth == 0:
+            pos = WHITESPACE_RE.match(buf, pos).end()
+            start = pos
+            if pos == end:
+                return pos, False
+            byte = buf[pos]
+            if byte not in OPENERS:
+                match = (STRING_RE if byte == 0x22 else SCALAR_RE).match(buf, pos)
+                if match is None:
+                    return pos, False
+                self._emit_value(buf[pos:match.end()], out)
+                return match.end(), True
+
+        skipped = self._skip_unclosed(buf, pos)
+        if skipped is not None:
+            self._emit_value(buf[start:skipped], out)
+            return skipped, False
+
+        # Inside a container only brackets matter; strings are skipped whole
+        depth = self._depth
+        skip = STRUCTURE_SKIP_RE.match
+        while True:
+            pos = skip(buf, pos).end()
+            if pos == end or buf[pos] == 0x22:  # out of data, or a string continuing in the next chunk
+                break
+            depth += 1 if buf[pos] in OPENERS else -1
+            pos += 1
+            if depth == 0:
+                self._depth = 0
+                self._emit_value(buf[start:pos], out)
+                return pos, True
+        self._depth = depth
+        self._emit_value(buf[start:pos], out)
+        return pos, False
+
+    def _skip_unclosed(self, buf: bytes, pos: int) -> Optional[int]:
+        """
+        End of the buffered data if the current container cannot close within it.
+
+        Fast path for large values: strings are removed and balanced bracket pairs
+        cancelled with C-level bytes operations, leaving only the unmatched brackets.
+        Returns None if the container may close here, so it is scanned bracket by bracket.
+        """
+        if self._depth == 0:
+            return None
+        data = buf[pos:]
+        end = len(buf)
+        if b"\\" not in data:
+            # Without escapes every other quote opens a string, and an odd count leaves the last one open
+            parts = data.split(b'"')
+            if len(parts) % 2 == 0:
+                end = buf.rindex(b'"')
+            structure = b"".join(parts[0::2])
+        else:
+            structure = STRING_RE.sub(b"", data)
+            unterminated = structure.find(b'"')
+            if unterminated != -1:
+                # Nothing after an unterminated string was removed, so its offset maps back directly
+                end -= len(structure) - unterminated
+                structure = structure[:unterminated]
+        brackets = structure.translate(None, NON_BRACKETS)
+        while b"[]" in brackets or b"{}" in brackets:
+            brackets = brackets.replace(b"[]", b"").replace(b"{}", b"")
+        closers = len(brackets) - len(brackets.lstrip(b"]}"))
+        if closers >= self._depth:
+            return None
+        self._depth += len(brackets) - 2 * closers
+        return end
+
+    def _emit_value(self, data: bytes, out: List[bytes]):
+        if self._parse:
+            self._value.append(data)
+        elif data:
+            out.append(data)
+
+
+class MemberAppender:
+    """Adds encoded members before the closing brace of a streamed JSON object"""
+
+    def __init__(self, members: Dict[str, Any]):
+        self.members = b",".join(codec.dumps(key) + b":" + codec.dumps(value) for key, value in members.items())
+        self._is_object: Optional[bool] = None
+        # Held back until the next chunk shows it is not the document's end
+        self._tail = b""
+        self._empty = True
+
+    def feed(self, chunk: bytes) -> bytes:
+        if self._is_object is None:
+            stripped = chunk.lstrip()
+            if not stripped:
+                return chunk
+            self._is_object = stripped.startswith(b"{")
+        if not self._is_object:
+            return chunk
+
+        data = self._tail + chunk
+        # Keep the last non-whitespace byte (and anything after it) back
+        cut = len(data.rstrip()) - 1
+        if cut < 0:
+            self._tail = data
+            return b""
+        self._tail = data[cut:]
+        sent = data[:cut]
+        if self._empty and sent.strip() not in (b"", b"{"):
+            self._empty = False
+        return sent
+
+    def close(self) -> bytes:
+        if not self._is_object:
+            return b""
+        tail = self._tail.rstrip()
+        if not tail.endswith(b"}"):
+            raise ValueError("Incomplete JSON object")
+        separator = b"" if self._empty else b","
+        return tail[:-1] + separator + self.members + b"}"
+
+
+class BodyCapture:
+    """Keeps a copy of a streamed body until it exceeds max_bytes, then passes it to on_complete"""
+
+    def __init__(self, max_bytes: int, on_complete: Callable[[bytes], Any]):
+        self.max_bytes = max_bytes
+        self.on_complete = on_complete
+        self.size = 0
+        self._parts: Optional[List[bytes]] = [] if max_bytes > 0 else None
+
+    def feed(self, chunk: bytes) -> bytes:
+        if self._parts is not None:
+            self.size += len(chunk)
+            if self.size > self.max_bytes:
+                self._parts = None
+            else:
+                self._parts.append(chunk)
+        return chunk
+
+    def close(self) -> bytes:
+        if self._parts is not None:
+            self.on_complete(b"".join(self._parts))
+        return b""
+
+
+def _close_transforms(transforms: Sequence[Any]) -> bytes:
+    # Each stage's final output goes through the stages after it before they close
+    data = b""
+    for transform in transforms:
+        data = transform.feed(data) + transform.close() if data else transform.close()
+    return data
+
+
+def iter_transformed(chunks: Iterable[bytes], transforms: Sequence[Any]) -> Iterator[bytes]:
+    """Pass chunks through transforms in order, yielding non-empty output"""
+    try:
+        for chunk in chunks:
+            for transform in transforms:
+                chunk = transform.feed(chunk)
+            if chunk:
+                yield chunk
+        tail = _close_transforms(transforms)
+        if tail:
+            yield tail
+    finally:
+        close = getattr(chunks, "close", None)
+        if close is not None:
+            close()
+
+
+async def aiter_transformed(chunks: AsyncIterator[bytes], transforms: Sequence[Any]) -> AsyncIterator[bytes]:
+    """Async variant of iter_transformed()"""
+    try:
+        async for chunk in chunks:
+            for transform in transforms:
+                chunk = transform.feed(chunk)
+            if chunk:
+                yield chunk
+        # Closing may cache the captured body, so it runs off the event loop
+        tail = await sync_to_async(_close_transforms, thread_sensitive=False)(transforms)
+        if tail:
+            yield tail
+    finally:
+        aclose = getattr(chunks, "aclose", None)
+        if aclose is not None:
+            await aclose()
+
+
+def iter_response_body(response) -> Iterator[bytes]:
+    """Body chunks of a streamed requests response, closing it once read or abandoned"""
+    try:
+        yield from response.iter_content(getattr(settings, 'PROXY_STREAM_CHUNK_SIZE', 64 * 1024))
+    finally:
+        response.close()
+
+
+async def aiter_response_body(response) -> AsyncIterator[bytes]:
+    """Body chunks of a streamed httpx response, closing it once read or abandoned"""
+    try:
+        async for chunk in response.aiter_bytes(getattr(settings, 'PROXY_STREAM_CHUNK_SIZE', 64 * 1024)):
+            yield chunk
+    finally:
+        await response.aclose()
+
+
+def stream_cache_max_bytes() -> int:
+    """Largest streamed body that is still cached once complete (0 disables caching)"""
+    return getattr(settings, 'PROXY_STREAM_CACHE_MAX_BYTES', 8 * 1024 * 1024)
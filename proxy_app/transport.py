@@ -0,0 +1,209 @@
+"""
+Process-wide pooled HTTP transport for upstream provider calls.
+
+Each provider gets one shared requests.Session whose connection pool is sized
+by PROXY_UPSTREAM_MAX_CONNECTIONS_PER_HOST, so keep-alive connections (and the
+TLS handshakes done on them) are reused across requests and threads instead of
+being rebuilt by every view instance. Host names are resolved through a small
+TTL cache, and async callers get a shared httpx.AsyncClient per event loop.
+"""
+import asyncio
+import logging
+import socket
+import threading
+import time
+import weakref
+from typing import Any, Dict, Tuple
+
+import httpx
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.exceptions import ConnectTimeoutError, NewConnectionError
+
+logger = logging.getLogger(__name__)
+
+
+class DNSCache:
+    """Caches the resolved addresses of (host, port) pairs for a fixed TTL"""
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries: Dict[Tuple[str, int], Tuple[Tuple[str, ...], float]] = {}
+        self._lock = threading.Lock()
+
+    def resolve(self, host: str, port: int) -> Tuple[str, ...]:
+        """Every address of host (A and AAAA records), in the order getaddrinfo returns them"""
+        key = (host, port)
+        now = time.time()
+        with self._lock:
+            cached = self._entries.get(key)
+            if cached is not None and cached[1] > now:
+                self.hits += 1
+                return cached[0]
+
+        addresses = tuple(dict.fromkeys(info[4][0] for info in socket.getaddrinfo(host, port, type=socket.SOCK_STREAM)))
+        with self._lock:
+            self._entries[key] = (addresses, now + self.ttl)
+            self.misses += 1
+        return addresses
+
+    def invalidate(self, host: str, port: int):
+        with self._lock:
+            self._entries.pop((host, port), None)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries), "ttl": self.ttl}
+
+
+# Global DNS cache for upstream hosts in this process
+dns_cache = DNSCache(getattr(settings, 'PROXY_DNS_CACHE_TTL', 300))
+
+
+class _CachedDNSMixin:
+    """
+    Connects to the cached addresses of the host; TLS still verifies the host name.
+
+    Addresses are tried in turn, as urllib3 does when it resolves the host itself, so one
+    unreachable address does not fail every new connection until the entry expires.
+    """
+
+    def _new_conn(self):
+        if not self.dns_cache_enabled or getattr(self, '_tunnel_host', None) is not None:
+            return super()._new_conn()
+        try:
+            addresses = dns_cache.resolve(self.host, self.port)
+        except OSError:
+            # Let urllib3 resolve (and report) it as usual
+            addresses = (self.host,)
+
+        for address in addresses[:-1]:
+            self._dns_host = address
+            try:
+                return super()._new_conn()
+            except (NewConnectionError, ConnectTimeoutError) as e:
+                logger.info(f"Connecting to {self.host} at {address} failed, trying its next address: {e}")
+        self._dns_host = addresses[-1]
+        try:
+            return super()._new_conn()
+        except Exception:
+            # The cached addresses may be stale; resolve again on the next attempt
+            dns_cache.invalidate(self.host, self.port)
+            raise
+
+    @property
+    def dns_cache_enabled(self) -> bool:
+        return dns_cache.ttl > 0
+
+
+class CachedDNSHTTPConnection(_CachedDNSMixin, HTTPConnection):
+    pass
+
+
+class CachedDNSHTTPSConnection(_CachedDNSMixin, HTTPSConnection):
+    pass
+
+
+class CachedDNSHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = CachedDNSHTTPConnection
+
+
+class CachedDNSHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = CachedDNSHTTPSConnection
+
+
+class PooledHTTPAdapter(HTTPAdapter):
+    """HTTPAdapter whose connection pools resolve hosts through the DNS cache"""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': CachedDNSHTTPConnectionPool,
+            'https': CachedDNSHTTPSConnectionPool,
+        }
+
+
+class UpstreamTransport:
+    """Owns one pooled session per upstream provider for the whole process"""
+
+    def __init__(self, max_connections_per_host: int, pool_block: bool = False):
+        self.max_connections_per_host = max_connections_per_host
+        self.pool_block = pool_block
+        self._sessions: Dict[str, requests.Session] = {}
+        self._adapters: Dict[str, PooledHTTPAdapter] = {}
+        self._lock = threading.Lock()
+
+    def session(self, provider: str) -> requests.Session:
+        """Return the shared session for provider, creating it on first use"""
+        session = self._sessions.get(provider)
+        if session is not None:
+            return session
+
+        with self._lock:
+            if provider not in self._sessions:
+                adapter = PooledHTTPAdapter(
+                    pool_connections=4, pool_maxsize=self.max_connections_per_host, pool_block=self.pool_block
+                )
+                session = requests.Session()
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+                self._adapters[provider] = adapter
+                self._sessions[provider] = session
+            return self._sessions[provider]
+
+    def get_stats(self) -> Dict[str, Any]:
+        providers = {}
+        for provider, adapter in list(self._adapters.items()):
+            hosts = {}
+            pools = adapter.poolmanager.pools
+            for pool_key in pools.keys():
+                pool = pools.get(pool_key)
+                if pool is None:
+                    continue
+                idle = [conn for conn in list(pool.pool.queue) if conn is not None] if pool.pool is not None else []
+                hosts[f"{pool.scheme}://{pool.host}:{pool.port}"] = {
+                    "requests": pool.num_requests,
+                    "connections_opened": pool.num_connections,
+                    "idle_connections": len(idle),
+                }
+            providers[provider] = hosts
+        return {
+            "max_connections_per_host": self.max_connections_per_host,
+            "providers": providers,
+            "dns_cache": dns_cache.get_stats(),
+        }
+
+
+def build_upstream_transport() -> UpstreamTransport:
+    """Build the upstream transport from the PROXY_UPSTREAM_* settings"""
+    return UpstreamTransport(
+        max_connections_per_host=getattr(settings, 'PROXY_UPSTREAM_MAX_CONNECTIONS_PER_HOST', 50),
+        pool_block=getattr(settings, 'PROXY_UPSTREAM_POOL_BLOCK', False),
+    )
+
+
+# Global transport shared by providers and views in this process
+upstream_transport = build_upstream_transport()
+
+# Shared async clients per event loop and base URL, so upstream connections are reused
+_async_clients: 'weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, httpx.AsyncClient]]' = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def get_async_client(base_url: str) -> httpx.AsyncClient:
+    """Return the AsyncClient for base_url bound to the running event loop"""
+    clients = _async_clients.setdefault(asyncio.get_running_loop(), {})
+    client = clients.get(base_url)
+    if client is None or client.is_closed:
+        max_connections = getattr(settings, 'PROXY_ASYNC_MAX_CONNECTIONS', 256)
+        client = clients[base_url] = httpx.AsyncClient(
+            base_url=base_url,
+            timeout=getattr(settings, 'PROXY_TIMEOUT', 30),
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+        )
+    return client
@@ -1,26 +1,36 @@
+from django.conf import settings
 from django.http import JsonResponse
 from django.urls import path, re_path
 
-from .views import UnifiedFinancialAPIView, api_documentation
-from .views_new import EndpointsView, FinancialAPIView, HealthView
+from .views import AsyncUnifiedFinancialAPIView, UnifiedFinancialAPIView, api_documentation
+from .views_new import AsyncFinancialAPIView, EndpointsView, FinancialAPIView, HealthView, StatsView
 
 app_name = "proxy_app"
 
+# Async views keep upstream calls on the event loop when served by Daphne/ASGI
+if getattr(settings, "PROXY_ASYNC_VIEWS", False):
+    ProxyView, LegacyProxyView = AsyncFinancialAPIView, AsyncUnifiedFinancialAPIView
+else:
+    ProxyView, LegacyProxyView = FinancialAPIView, UnifiedFinancialAPIView
+
+
 def root():
     return JsonResponse({"status": "ok"}, status=200)
 
+
 urlpatterns = [
     path("", root, name="root"),
     path("health/", root, name="health"),
     # API Documentation - available at /api/docs/
     path("docs/", api_documentation, name="api_docs"),
     path("api/v1/endpoints/", EndpointsView.as_view(), name="endpoints"),
+    path("api/v1/stats/", StatsView.as_view(), name="stats"),
     # New unified API using the proxy system
-    re_path(r"^api/v1/(?P<path>.*)$", FinancialAPIView.as_view(), name="unified_financial_api_new"),
+    re_path(r"^api/v1/(?P<path>.*)$", ProxyView.as_view(), name="unified_financial_api_new"),
     # Backward compatibility - all other requests go to original implementation
     re_path(
         r"^(?!docs/|api/)(?P<path>.*)$",
-        UnifiedFinancialAPIView.as_view(),
+        LegacyProxyView.as_view(),
         name="unified_financial_api_legacy",
     ),
 ]
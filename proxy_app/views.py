@@ -1,15 +1,16 @@
+import asyncio
 import json
 import logging
-import re
-from datetime import datetime, timedelta
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Dict, List, Mapping, Optional, Tuple
 from urllib.parse import urlencode, urlparse
 
+import httpx
 import requests
+from asgiref.sync import sync_to_async
 from django.conf import settings
-from django.core.cache import cache
-from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.http import HttpResponse, HttpResponseNotModified, JsonResponse, StreamingHttpResponse
 from django.shortcuts import render
+from django.utils.cache import patch_vary_headers
 from django.utils.decorators import method_decorator
 from django.views import View
 from django.views.decorators.cache import cache_page
@@ -17,14 +18,33 @@ from django.views.decorators.csrf import csrf_exempt
 from rest_framework import status
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import AllowAny, IsAuthenticated
-from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from rest_framework_simplejwt.authentication import JWTAuthentication
 
-from users.authentication import RequestTokenAuthentication
+from users.authentication import CachedJWTAuthentication, RequestTokenAuthentication
 from users.permissions import DailyLimitPermission
 
+from .cache import cache_revalidator, cache_status_headers, is_not_modified, response_cache, validator_headers
+from .codec import FastJSONRenderer, codec
+from .compression import CompressedHead, finish, negotiate, precompressor
+from .config import RATE_LIMITS, ProviderError
+from .legacy_routes import LEGACY_ENDPOINT_MAPPINGS, legacy_router, render_endpoint
+from .pagination import ALL_PAGES_PARAM, PageLimits, PageWalk, all_pages_streamer, page_data, page_limits_for, wants_all_pages
+from .ratelimit import upstream_limiter
+from .rewrite import PolygonPaginationRewriter, compile_field_paths
+from .schemas import SCHEMA_PARAM, normalize_compact, parse_schema, row_mapper
+from .singleflight import async_upstream_flight, upstream_flight
+from .streaming import (
+    BodyCapture,
+    JSONMemberFilter,
+    aiter_response_body,
+    aiter_transformed,
+    iter_response_body,
+    iter_transformed,
+    stream_cache_max_bytes,
+)
+from .transport import get_async_client, upstream_transport
+
 logger = logging.getLogger(__name__)
 
 
@@ -37,7 +57,7 @@ def get_permission_classes():
 def get_authentication_classes():
     if getattr(settings, 'ENV', 'local') == "local" or getattr(settings, 'TESTING', False):
         return []
-    return [JWTAuthentication, RequestTokenAuthentication]
+    return [CachedJWTAuthentication, RequestTokenAuthentication]
 
 
 _permissions = get_permission_classes()
@@ -56,10 +76,13 @@ class UnifiedFinancialAPIView(APIView):
     Maintains /api/v1/ structure regardless of backend provider
     """
 
-    renderer_classes = [JSONRenderer]
+    renderer_classes = [FastJSONRenderer]
     authentication_classes = _authentications
     permission_classes = _permissions
 
+    # Complete endpoint mapping, compiled once per process
+    endpoint_mappings = LEGACY_ENDPOINT_MAPPINGS
+
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
 
@@ -77,17 +100,9 @@ class UnifiedFinancialAPIView(APIView):
         self.fmp_base_url = getattr(settings, 'FMP_BASE_URL', 'https://financialmodelingprep.com/api')
         self.polygon_base_url = getattr(settings, 'POLYGON_BASE_URL', 'https://api.polygon.io')
 
-        # Complete endpoint mapping
-        self.endpoint_mappings = self._initialize_endpoint_mappings()
-
-        # Rate limiting
-        self.rate_limits = {'fmp': {'calls': 3000, 'period': 60}, 'polygon': {'calls': 1000, 'period': 60}}
+        # Rate limiting (calls per minute, enforced cluster-wide by upstream_limiter)
+        self.rate_limits = {provider: {'calls': calls, 'period': 60} for provider, calls in RATE_LIMITS.items()}
 
-        # Cache TTL settings
-        self.cache_ttl = {'real_time': 30, 'intraday': 300, 'daily': 3600, 'fundamental': 86400, 'news': 1800, 'static': 604800}
-
-        # Initialize requests session
-        self.session = requests.Session()
         self.timeout = getattr(settings, 'PROXY_TIMEOUT', 30)
         self.proxy_domain = getattr(settings, 'PROXY_DOMAIN', 'api.financialdata.online')
 
@@ -96,565 +111,17 @@ class UnifiedFinancialAPIView(APIView):
             self.authentication_classes = []
             self.permission_classes = [AllowAny]
 
-    def _initialize_endpoint_mappings(self) -> Dict[str, Dict]:
-        """Initialize complete endpoint mapping configuration"""
-        return {
-            # Reference Data Endpoints
-            'reference/tickers': {'provider': 'polygon', 'endpoint': '/v3/reference/tickers', 'method': 'GET', 'cache_type': 'static'},
-            'marketstatus/upcoming': {
-                'provider': 'polygon',
-                'endpoint': '/v1/marketstatus/upcoming',
-                'method': 'GET',
-                'cache_type': 'daily',
-            },
-            'reference/ticker/{symbol}': {'provider': 'fmp', 'endpoint': '/v3/profile/{symbol}', 'method': 'GET', 'cache_type': 'daily'},
-            'reference/ticker/{symbol}/profile': {
-                'provider': 'fmp',
-                'endpoint': '/v3/profile/{symbol}',
-                'method': 'GET',
-                'cache_type': 'daily',
-            },
-            'reference/ticker/{symbol}/executives': {
-                'provider': 'fmp',
-                'endpoint': '/v3/key-executives/{symbol}',
-                'method': 'GET',
-                'cache_type': 'static',
-            },
-            'reference/ticker/{symbol}/peers': {
-                'provider': 'fmp',
-                'endpoint': '/v3/stock_peers',
-                'method': 'GET',
-                'cache_type': 'daily',
-                'params_map': {'symbol': 'symbol'},
-            },
-            'reference/exchanges': {'provider': 'fmp', 'endpoint': '/v3/exchanges-list', 'method': 'GET', 'cache_type': 'static'},
-            'reference/market-status': {
-                'provider': 'fmp',
-                'endpoint': '/v3/is-the-market-open',
-                'method': 'GET',
-                'cache_type': 'real_time',
-            },
-            # Market Data Endpoints
-            'quotes/{symbol}': {
-                'provider': 'fmp',
-                'endpoint': '/v3/quote/{symbol}',
-                'method': 'GET',
-                'cache_type': 'real_time',
-                'polygon_fallback': '/v2/snapshot/locale/us/markets/stocks/tickers/{symbol}',
-            },
-            'quotes/batch': {'provider': 'fmp', 'endpoint': '/v3/quote/{symbols}', 'method': 'GET', 'cache_type': 'real_time'},
-            'quotes/gainers': {'provider': 'fmp', 'endpoint': '/v3/gainers', 'method': 'GET', 'cache_type': 'real_time'},
-            'quotes/losers': {'provider': 'fmp', 'endpoint': '/v3/losers', 'method': 'GET', 'cache_type': 'real_time'},
-            'quotes/active': {'provider': 'fmp', 'endpoint': '/v3/actives', 'method': 'GET', 'cache_type': 'real_time'},
-            # Historical Data Endpoints
-            'historical/{symbol}': {
-                'provider': 'fmp',
-                'endpoint': '/v3/historical-price-full/{symbol}',
-                'method': 'GET',
-                'cache_type': 'daily',
-                'polygon_fallback': '/v2/aggs/ticker/{symbol}/range/1/day/{from}/{to}',
-            },
-            'historical/{symbol}/intraday': {
-                'provider': 'fmp',
-                'endpoint': '/v3/historical-chart/{interval}/{symbol}',
-                'method': 'GET',
-                'cache_type': 'intraday',
-            },
-            'historical/{symbol}/splits': {
-                'provider': 'fmp',
-                'endpoint': '/v3/stock_split_calendar',
-                'method': 'GET',
-                'cache_type': 'daily',
-                'polygon_fallback': '/v3/reference/splits',
-            },
-            'historical/{symbol}/dividends': {
-                'provider': 'fmp',
-                'endpoint': '/v3/historical-price-full/stock_dividend/{symbol}',
-                'method': 'GET',
-                'cache_type': 'daily',
-                'polygon_fallback': '/v3/reference/dividends',
-            },
-            # Tick-level Data (Polygon.io exclusive)
-            'ticks/{symbol}/trades': {'provider': 'polygon', 'endpoint': '/v3/trades/{symbol}', 'method': 'GET', 'cache_type': 'real_time'},
-            'ticks/{symbol}/quotes': {'provider': 'polygon', 'endpoint': '/v3/quotes/{symbol}', 'method': 'GET', 'cache_type': 'real_time'},
-            'ticks/{symbol}/aggregates': {
-                'provider': 'polygon',
-                'endpoint': '/v2/aggs/ticker/{symbol}/range/{multiplier}/{timespan}/{from}/{to}',
-                'method': 'GET',
-                'cache_type': 'intraday',
-            },
-            'aggs/ticker/{symbol}/range/{multiplier}/{timespan}/{from}/{to}': {
-                'provider': 'polygon',
-                'endpoint': '/v2/aggs/ticker/{symbol}/range/{multiplier}/{timespan}/{from}/{to}',
-                'method': 'GET',
-                'cache_type': 'intraday',
-            },
-            # Options Data (Polygon.io exclusive)
-            'options/contracts': {
-                'provider': 'polygon',
-                'endpoint': '/v3/reference/options/contracts',
-                'method': 'GET',
-                'cache_type': 'daily',
-            },
-            'reference/options/contracts': {
-                'provider': 'polygon',
-                'endpoint': '/v3/reference/options/contracts',
-                'method': 'GET',
-                'cache_type': 'daily',
-            },
-            'options/chain/{symbol}': {
-                'provider': 'polygon',
-                'endpoint': '/v3/snapshot/options/{symbol}',
-                'method': 'GET',
-                'cache_type': 'real_time',
-            },
-            'options/{symbol}/snapshot': {
-                'provider': 'polygon',
-                'endpoint': '/v3/snapshot/options/{symbol}',
-                'method': 'GET',
-                'cache_type': 'real_time',
-            },
-            'options/{contract}/details': {
-                'provider': 'polygon',
-                'endpoint': '/v3/reference/options/contracts/{contract}',
-                'method': 'GET',
-                'cache_type': 'daily',
-            },
-            'options/{contract}/historical': {
-                'provider': 'polygon',
-                'endpoint': '/v2/aggs/ticker/{contract}/range/{multiplier}/{timespan}/{from}/{to}',
-                'method': 'GET',
-                'cache_type': 'daily',
-            },
-            # Futures Data (Polygon.io exclusive)
-            'futures/contracts': {
-                'provider': 'polygon',
-                'endpoint': '/v3/reference/futures/contracts',
-                'method': 'GET',
-                'cache_type': 'daily',
-            },
-            'futures/{symbol}/snapshot': {
-                'provider': 'polygon',
-                'endpoint': '/v2/snapshot/locale/global/markets/futures/tickers/{symbol}',
-                'method': 'GET',
-                'cache_type': 'real_time',
-            },
-            'futures/{symbol}/historical': {
-                'provider': 'polygon',
-                'endpoint': '/v2/aggs/ticker/{symbol}/range/{multiplier}/{timespan}/{from}/{to}',
-                'method': 'GET',
-                'cache_type': 'daily',
-            },
-            # Forex Data
-            'forex/rates': {
-                'provider': 'fmp',
-                'endpoint': '/v3/fx',
-                'method': 'GET',
-                'cache_type': 'real_time',
-                'polygon_fallback': '/v1/last/currencies/{from}/{to}',
-            },
-            'forex/{pair}/historical': {
-                'provider': 'fmp',
-                'endpoint': '/v3/historical-price-full/{pair}',
-                'method': 'GET',
-                'cache_type': 'daily',
-            },
-            'forex/{pair}/intraday': {
-                'provider': 'fmp',
-                'endpoint': '/v3/historical-chart/{interval}/{pair}',
-                'method': 'GET',
-                'cache_type': 'intraday',
-            },
-            # Cryptocurrency Data
-            'crypto/prices': {
-                'provider': 'fmp',
-                'endpoint': '/v3/cryptocurrencies',
-                'method': 'GET',
-                'cache_type': 'real_time',
-                'polygon_fallback': '/v1/last/crypto/{from}/{to}',
-            },
-            'crypto/{symbol}/historical': {
-                'provider': 'fmp',
-                'endpoint': '/v3/historical-price-full/{symbol}',
-                'method': 'GET',
-                'cache_type': 'daily',
-            },
-            'crypto/{symbol}/intraday': {
-                'provider': 'fmp',
-                'endpoint': '/v3/historical-chart/{interval}/{symbol}',
-                'method': 'GET',
-                'cache_type': 'intraday',
-            },
-            # Fundamental Data (FMP exclusive)
-            'fundamentals/{symbol}/income-statement': {
-                'provider': 'fmp',
-                'endpoint': '/v3/income-statement/{symbol}',
-                'method': 'GET',
-                'cache_type': 'fundamental',
-            },
-            'fundamentals/{symbol}/balance-sheet': {
-                'provider': 'fmp',
-                'endpoint': '/v3/balance-sheet-statement/{symbol}',
-                'method': 'GET',
-                'cache_type': 'fundamental',
-            },
-            'fundamentals/{symbol}/cash-flow': {
-                'provider': 'fmp',
-                'endpoint': '/v3/cash-flow-statement/{symbol}',
-                'method': 'GET',
-                'cache_type': 'fundamental',
-            },
-            'fundamentals/{symbol}/ratios': {
-                'provider': 'fmp',
-                'endpoint': '/v3/ratios/{symbol}',
-                'method': 'GET',
-                'cache_type': 'fundamental',
-            },
-            'fundamentals/{symbol}/metrics': {
-                'provider': 'fmp',
-                'endpoint': '/v3/key-metrics/{symbol}',
-                'method': 'GET',
-                'cache_type': 'fundamental',
-            },
-            'fundamentals/{symbol}/growth': {
-                'provider': 'fmp',
-                'endpoint': '/v3/financial-growth/{symbol}',
-                'method': 'GET',
-                'cache_type': 'fundamental',
-            },
-            # Valuation Data (FMP exclusive)
-            'valuation/{symbol}/dcf': {
-                'provider': 'fmp',
-                'endpoint': '/v3/discounted-cash-flow/{symbol}',
-                'method': 'GET',
-                'cache_type': 'fundamental',
-            },
-            'valuation/{symbol}/ratios': {
-                'provider': 'fmp',
-                'endpoint': '/v3/ratios-ttm/{symbol}',
-                'method': 'GET',
-                'cache_type': 'fundamental',
-            },
-            'valuation/{symbol}/enterprise-value': {
-                'provider': 'fmp',
-                'endpoint': '/v3/enterprise-values/{symbol}',
-                'method': 'GET',
-                'cache_type': 'fundamental',
-            },
-            'valuation/screener': {'provider': 'fmp', 'endpoint': '/v3/stock-screener', 'method': 'GET', 'cache_type': 'daily'},
-            # News & Sentiment (FMP exclusive)
-            'news': {'provider': 'fmp', 'endpoint': '/v3/stock_news', 'method': 'GET', 'cache_type': 'news'},
-            'news/{symbol}': {
-                'provider': 'fmp',
-                'endpoint': '/v3/stock_news',
-                'method': 'GET',
-                'cache_type': 'news',
-                'params_map': {'symbol': 'tickers'},
-            },
-            'news/sentiment/{symbol}': {'provider': 'fmp', 'endpoint': '/v4/sentiment-analysis', 'method': 'GET', 'cache_type': 'news'},
-            'news/press-releases/{symbol}': {
-                'provider': 'fmp',
-                'endpoint': '/v3/press-releases/{symbol}',
-                'method': 'GET',
-                'cache_type': 'news',
-            },
-            # Analyst Data (FMP exclusive)
-            'analysts/{symbol}/estimates': {
-                'provider': 'fmp',
-                'endpoint': '/v3/analyst-estimates/{symbol}',
-                'method': 'GET',
-                'cache_type': 'daily',
-            },
-            'analysts/{symbol}/recommendations': {
-                'provider': 'fmp',
-                'endpoint': '/v3/analyst-stock-recommendations/{symbol}',
-                'method': 'GET',
-                'cache_type': 'daily',
-            },
-            'analysts/{symbol}/price-targets': {
-                'provider': 'fmp',
-                'endpoint': '/v4/price-target/{symbol}',
-                'method': 'GET',
-                'cache_type': 'daily',
-            },
-            'analysts/{symbol}/upgrades-downgrades': {
-                'provider': 'fmp',
-                'endpoint': '/v4/upgrades-downgrades/{symbol}',
-                'method': 'GET',
-                'cache_type': 'daily',
-            },
-            # Earnings Data (FMP exclusive)
-            'earnings/{symbol}/calendar': {
-                'provider': 'fmp',
-                'endpoint': '/v3/earning_calendar',
-                'method': 'GET',
-                'cache_type': 'daily',
-                'params_map': {'symbol': 'symbol'},
-            },
-            'earnings/{symbol}/history': {
-                'provider': 'fmp',
-                'endpoint': '/v3/historical/earning_calendar/{symbol}',
-                'method': 'GET',
-                'cache_type': 'fundamental',
-            },
-            'earnings/{symbol}/surprises': {
-                'provider': 'fmp',
-                'endpoint': '/v3/earnings-surprises/{symbol}',
-                'method': 'GET',
-                'cache_type': 'fundamental',
-            },
-            'earnings/{symbol}/transcripts': {
-                'provider': 'fmp',
-                'endpoint': '/v4/batch_earning_call_transcript/{symbol}',
-                'method': 'GET',
-                'cache_type': 'fundamental',
-            },
-            'earnings/calendar': {'provider': 'fmp', 'endpoint': '/v3/earning_calendar', 'method': 'GET', 'cache_type': 'daily'},
-            # Institutional Data (FMP exclusive)
-            'institutional/{symbol}/holdings': {
-                'provider': 'fmp',
-                'endpoint': '/v3/institutional-holder/{symbol}',
-                'method': 'GET',
-                'cache_type': 'fundamental',
-            },
-            'institutional/{symbol}/13f': {
-                'provider': 'fmp',
-                'endpoint': '/v3/form-thirteen/{symbol}',
-                'method': 'GET',
-                'cache_type': 'fundamental',
-            },
-            'institutional/funds/{cik}': {
-                'provider': 'fmp',
-                'endpoint': '/v3/form-thirteen/{cik}',
-                'method': 'GET',
-                'cache_type': 'fundamental',
-            },
-            # Insider Trading (FMP exclusive)
-            'insider/{symbol}/transactions': {
-                'provider': 'fmp',
-                'endpoint': '/v4/insider-trading',
-                'method': 'GET',
-                'cache_type': 'daily',
-                'params_map': {'symbol': 'symbol'},
-            },
-            'insider/{symbol}/ownership': {
-                'provider': 'fmp',
-                'endpoint': '/v3/insider-trading/{symbol}',
-                'method': 'GET',
-                'cache_type': 'fundamental',
-            },
-            # Economic Data (FMP exclusive)
-            'economy/gdp': {
-                'provider': 'fmp',
-                'endpoint': '/v4/economic',
-                'method': 'GET',
-                'cache_type': 'fundamental',
-                'static_params': {'name': 'GDP'},
-            },
-            'economy/inflation': {
-                'provider': 'fmp',
-                'endpoint': '/v4/economic',
-                'method': 'GET',
-                'cache_type': 'fundamental',
-                'static_params': {'name': 'CPI'},
-            },
-            'economy/unemployment': {
-                'provider': 'fmp',
-                'endpoint': '/v4/economic',
-                'method': 'GET',
-                'cache_type': 'fundamental',
-                'static_params': {'name': 'unemploymentRate'},
-            },
-            'economy/interest-rates': {
-                'provider': 'fmp',
-                'endpoint': '/v4/economic',
-                'method': 'GET',
-                'cache_type': 'fundamental',
-                'static_params': {'name': 'federalFundsRate'},
-            },
-            'economy/treasury-rates': {'provider': 'fmp', 'endpoint': '/v4/treasury', 'method': 'GET', 'cache_type': 'daily'},
-            # Technical Analysis
-            'technical/{symbol}/sma': {
-                'provider': 'fmp',
-                'endpoint': '/v3/technical_indicator/{timespan}/{symbol}',
-                'method': 'GET',
-                'cache_type': 'intraday',
-                'static_params': {'type': 'SMA'},
-                'polygon_fallback': '/v1/indicators/sma/{symbol}',
-            },
-            'technical/{symbol}/ema': {
-                'provider': 'fmp',
-                'endpoint': '/v3/technical_indicator/{timespan}/{symbol}',
-                'method': 'GET',
-                'cache_type': 'intraday',
-                'static_params': {'type': 'EMA'},
-                'polygon_fallback': '/v1/indicators/ema/{symbol}',
-            },
-            'technical/{symbol}/rsi': {
-                'provider': 'fmp',
-                'endpoint': '/v3/technical_indicator/{timespan}/{symbol}',
-                'method': 'GET',
-                'cache_type': 'intraday',
-                'static_params': {'type': 'RSI'},
-                'polygon_fallback': '/v1/indicators/rsi/{symbol}',
-            },
-            'technical/{symbol}/macd': {
-                'provider': 'fmp',
-                'endpoint': '/v3/technical_indicator/{timespan}/{symbol}',
-                'method': 'GET',
-                'cache_type': 'intraday',
-                'static_params': {'type': 'MACD'},
-                'polygon_fallback': '/v1/indicators/macd/{symbol}',
-            },
-            'technical/{symbol}/bollinger-bands': {
-                'provider': 'fmp',
-                'endpoint': '/v3/technical_indicator/{timespan}/{symbol}',
-                'method': 'GET',
-                'cache_type': 'intraday',
-                'static_params': {'type': 'BBANDS'},
-            },
-            'technical/{symbol}/stochastic': {
-                'provider': 'fmp',
-                'endpoint': '/v3/technical_indicator/{timespan}/{symbol}',
-                'method': 'GET',
-                'cache_type': 'intraday',
-                'static_params': {'type': 'STOCH'},
-            },
-            'technical/{symbol}/adx': {
-                'provider': 'fmp',
-                'endpoint': '/v3/technical_indicator/{timespan}/{symbol}',
-                'method': 'GET',
-                'cache_type': 'intraday',
-                'static_params': {'type': 'ADX'},
-            },
-            'technical/{symbol}/williams-r': {
-                'provider': 'fmp',
-                'endpoint': '/v3/technical_indicator/{timespan}/{symbol}',
-                'method': 'GET',
-                'cache_type': 'intraday',
-                'static_params': {'type': 'WILLR'},
-            },
-            # SEC Filings (FMP exclusive)
-            'sec/{symbol}/filings': {
-                'provider': 'fmp',
-                'endpoint': '/v3/sec_filings/{symbol}',
-                'method': 'GET',
-                'cache_type': 'fundamental',
-            },
-            'sec/{symbol}/10k': {
-                'provider': 'fmp',
-                'endpoint': '/v3/sec_filings/{symbol}',
-                'method': 'GET',
-                'cache_type': 'fundamental',
-                'static_params': {'type': '10-K'},
-            },
-            'sec/{symbol}/10q': {
-                'provider': 'fmp',
-                'endpoint': '/v3/sec_filings/{symbol}',
-                'method': 'GET',
-                'cache_type': 'fundamental',
-                'static_params': {'type': '10-Q'},
-            },
-            'sec/{symbol}/8k': {
-                'provider': 'fmp',
-                'endpoint': '/v3/sec_filings/{symbol}',
-                'method': 'GET',
-                'cache_type': 'fundamental',
-                'static_params': {'type': '8-K'},
-            },
-            'sec/rss-feed': {'provider': 'fmp', 'endpoint': '/v4/rss_feed', 'method': 'GET', 'cache_type': 'news'},
-            # ETF & Mutual Funds (FMP exclusive)
-            'etf/list': {'provider': 'fmp', 'endpoint': '/v3/etf/list', 'method': 'GET', 'cache_type': 'static'},
-            'etf/{symbol}/holdings': {
-                'provider': 'fmp',
-                'endpoint': '/v3/etf-holder/{symbol}',
-                'method': 'GET',
-                'cache_type': 'fundamental',
-            },
-            'etf/{symbol}/performance': {
-                'provider': 'fmp',
-                'endpoint': '/v3/etf-info',
-                'method': 'GET',
-                'cache_type': 'daily',
-                'params_map': {'symbol': 'symbol'},
-            },
-            'funds/list': {'provider': 'fmp', 'endpoint': '/v3/mutual-fund/list', 'method': 'GET', 'cache_type': 'static'},
-            'funds/{symbol}/holdings': {
-                'provider': 'fmp',
-                'endpoint': '/v3/mutual-fund-holder/{symbol}',
-                'method': 'GET',
-                'cache_type': 'fundamental',
-            },
-            # Commodities (FMP exclusive)
-            'commodities/metals': {'provider': 'fmp', 'endpoint': '/v3/commodities', 'method': 'GET', 'cache_type': 'real_time'},
-            'commodities/energy': {'provider': 'fmp', 'endpoint': '/v3/commodities', 'method': 'GET', 'cache_type': 'real_time'},
-            'commodities/agriculture': {'provider': 'fmp', 'endpoint': '/v3/commodities', 'method': 'GET', 'cache_type': 'real_time'},
-            'commodities/{symbol}/historical': {
-                'provider': 'fmp',
-                'endpoint': '/v3/historical-price-full/{symbol}',
-                'method': 'GET',
-                'cache_type': 'daily',
-            },
-            # Indices
-            'indices/list': {
-                'provider': 'fmp',
-                'endpoint': '/v3/quotes/index',
-                'method': 'GET',
-                'cache_type': 'real_time',
-                'polygon_fallback': '/v2/snapshot/locale/global/markets/indices',
-            },
-            'indices/{symbol}/historical': {
-                'provider': 'fmp',
-                'endpoint': '/v3/historical-price-full/{symbol}',
-                'method': 'GET',
-                'cache_type': 'daily',
-                'polygon_fallback': '/v2/aggs/ticker/{symbol}/range/{multiplier}/{timespan}/{from}/{to}',
-            },
-            'indices/{symbol}/components': {
-                'provider': 'fmp',
-                'endpoint': '/v3/sp500_constituent',
-                'method': 'GET',
-                'cache_type': 'static',
-            },
-            # Bulk Data (FMP exclusive)
-            'bulk/eod/{date}': {
-                'provider': 'fmp',
-                'endpoint': '/v4/batch-request-end-of-day-prices',
-                'method': 'GET',
-                'cache_type': 'daily',
-            },
-            'bulk/fundamentals/{date}': {
-                'provider': 'fmp',
-                'endpoint': '/v4/batch-request-financial-statements',
-                'method': 'GET',
-                'cache_type': 'fundamental',
-            },
-            'bulk/insider-trading/{date}': {'provider': 'fmp', 'endpoint': '/v4/insider-trading', 'method': 'GET', 'cache_type': 'daily'},
-            # Legacy Polygon.io endpoints for backward compatibility
-            'snapshot': {
-                'provider': 'polygon',
-                'endpoint': '/v2/snapshot/locale/us/markets/stocks/tickers',
-                'method': 'GET',
-                'cache_type': 'real_time',
-            },
-            'aggs/ticker/{ticker}/range/{multiplier}/{timespan}/{from}/{to}': {
-                'provider': 'polygon',
-                'endpoint': '/v2/aggs/ticker/{ticker}/range/{multiplier}/{timespan}/{from}/{to}',
-                'method': 'GET',
-                'cache_type': 'daily',
-            },
-            'reference/tickers/{ticker}': {
-                'provider': 'polygon',
-                'endpoint': '/v3/reference/tickers/{ticker}',
-                'method': 'GET',
-                'cache_type': 'static',
-            },
-        }
-
     @method_decorator(csrf_exempt)
     def dispatch(self, request, *args, **kwargs):
         return super().dispatch(request, *args, **kwargs)
 
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        # Cached GETs may be answered from a precompressed variant, depending on Accept-Encoding
+        if request.method == 'GET' and precompressor.encodings:
+            patch_vary_headers(response, ('Accept-Encoding',))
+        return response
+
     def get(self, request, path="", *args, **kwargs):
         """Handle all GET requests for financial data"""
         return self._handle_request(request, path, 'GET')
@@ -676,7 +143,8 @@ class UnifiedFinancialAPIView(APIView):
         try:
             # Increment user request counter if authenticated
             # This serves as a fallback for cases where middleware might not have handled it
-            if hasattr(request, 'user') and request.user.is_authenticated and not hasattr(request, '_count_incremented'):
+            # (revalidations it deferred are charged by the middleware once the response is known)
+            if self._should_count_request(request):
                 request.user.increment_request_count()
                 request._count_incremented = True
 
@@ -695,39 +163,71 @@ class UnifiedFinancialAPIView(APIView):
                     status=404,
                 )
 
-            # Check rate limits
-            provider = endpoint_config['provider']
-            if not self._check_rate_limit(provider):
-                return Response({'error': 'Rate limit exceeded', 'provider': provider}, status=429)
+            schema_error = self._schema_error(request, endpoint_config, unified_path)
+            if schema_error is not None:
+                return schema_error
+
+            # Serve GETs from the response cache; stale entries are served while a background refresh runs
+            headers = None
+            if method == 'GET' and wants_all_pages(request.GET):
+                # Every page of a cursor endpoint, streamed as NDJSON and never cached
+                if not endpoint_config.get('all_pages'):
+                    return Response({'error': f'{ALL_PAGES_PARAM} is not supported on this endpoint', 'path': unified_path}, status=400)
+                call = self._build_upstream_call(endpoint_config, unified_path, request)
+                return self._all_pages_response(
+                    self._send_limited_call(call),
+                    call,
+                    endpoint_config,
+                    unified_path,
+                    page_limits_for(request.user),
+                    compact=self._wants_compact(request),
+                )
 
-            # Check cache for GET requests
             if method == 'GET':
                 cache_key = self._generate_cache_key(unified_path, request.GET)
-                cached_response = cache.get(cache_key)
-                if cached_response:
-                    logger.info(f"Cache hit for {cache_key}")
-                    return Response(cached_response)
+                cached = self._cached_response(request, cache_key, endpoint_config, unified_path)
+                if cached is not None:
+                    return cached
 
-            # Route request to provider
-            response_data = self._route_request(endpoint_config, unified_path, request)
+                # Compact responses are built from the parsed payload, so they are not streamed
+                if endpoint_config.get('stream') and not self._wants_compact(request):
+                    call = self._build_upstream_call(endpoint_config, unified_path, request)
+                    return self._streamed_response(self._send_limited_call(call, stream=True), cache_key, endpoint_config, unified_path)
 
-            # Transform response to unified format
-            unified_response = self._transform_response(response_data, endpoint_config, unified_path)
+                response_data, unified_response = self._fetch_and_cache(cache_key, endpoint_config, unified_path, request)
+                headers = cache_status_headers('live')
+            else:
+                response_data, unified_response = self._fetch_unified_response(endpoint_config, unified_path, request)
 
             # Get status code from response data
             status_code = response_data.get('status_code', 200)
 
-            # Cache the response for GET requests (only if successful)
-            if method == 'GET' and status_code == 200:
-                cache_ttl = self._get_cache_ttl(endpoint_config['cache_type'])
-                cache.set(cache_key, unified_response, cache_ttl)
-
-            return Response(unified_response, status=status_code)
+            return Response(unified_response, status=status_code, headers=headers)
 
         except Exception as e:
             logger.error(f"Error processing request: {str(e)}")
             return Response({'error': 'Internal server error', 'message': str(e), 'path': path}, status=500)
 
+    def _should_count_request(self, request) -> bool:
+        """Whether the view still has to count this request against the user's daily total"""
+        if not (hasattr(request, 'user') and request.user.is_authenticated):
+            return False
+        return not hasattr(request, '_count_incremented') and not hasattr(request, '_deferred_usage')
+
+    def _schema_error(self, request, endpoint_config: Mapping, unified_path: str) -> Optional[Response]:
+        """A 400 response if the request asks for a schema the route cannot answer with"""
+        try:
+            schema = parse_schema(request.GET)
+        except ValueError as e:
+            return Response({'error': str(e), 'path': unified_path}, status=400)
+        if schema is not None and 'compact' not in endpoint_config:
+            return Response({'error': f'{SCHEMA_PARAM}={schema} is not supported on this endpoint', 'path': unified_path}, status=400)
+        return None
+
+    def _wants_compact(self, request) -> bool:
+        """Whether the (validated) request asks for the compact schema instead of the provider's shape"""
+        return parse_schema(request.GET) is not None
+
     def _extract_unified_path(self, full_path: str) -> str:
         """Extract the unified path from full request path"""
         # Remove leading/trailing slashes
@@ -739,28 +239,54 @@ class UnifiedFinancialAPIView(APIView):
 
         return clean_path
 
-    def _match_endpoint(self, unified_path: str) -> Optional[Dict]:
+    def _match_endpoint(self, unified_path: str) -> Optional[Mapping]:
         """Match unified path to endpoint configuration"""
-
-        # Direct match first
-        if unified_path in self.endpoint_mappings:
-            return self.endpoint_mappings[unified_path]
-
-        # Pattern matching for parameterized endpoints
-        for pattern, config in self.endpoint_mappings.items():
-            if self._path_matches_pattern(unified_path, pattern):
-                return config
-
-        return None
-
-    def _path_matches_pattern(self, path: str, pattern: str) -> bool:
-        """Check if path matches pattern with parameters"""
-        # Convert pattern to regex
-        regex_pattern = pattern
-        regex_pattern = re.sub(r'\{[^}]+\}', r'[^/]+', regex_pattern)
-        regex_pattern = f'^{regex_pattern}$'
-
-        return bool(re.match(regex_pattern, path))
+        route_match = legacy_router.match(unified_path)
+        return route_match.config if route_match else None
+
+    def _cached_response(self, request, cache_key: str, endpoint_config: Dict, unified_path: str) -> Optional[HttpResponse]:
+        """
+        Answer a GET from the response cache, if it holds the response, scheduling a refresh if it is stale.
+
+        Conditional GETs for a body the client already has get a 304 without it.
+        """
+        encoding = negotiate(request.headers.get('Accept-Encoding', ''), precompressor.encodings)
+        entry = response_cache.get_encoded(cache_key, endpoint_config['cache_type'], encoding, allow_stale=True)
+        if entry is None:
+            return None
+
+        source = 'cache' if entry.is_fresh() else 'stale'
+        if source == 'stale':
+            cache_revalidator.submit(cache_key, self._fetch_and_cache, cache_key, endpoint_config, unified_path, request)
+        logger.info(f"Cache {source} hit for {cache_key}")
+
+        headers = cache_status_headers(source, entry.age())
+        headers.update(validator_headers(entry))
+        if is_not_modified(request.headers, entry):
+            return HttpResponseNotModified(headers=headers)
+
+        # The stored body is the encoded response (or a precompressed variant of it), so it is sent without re-rendering
+        if isinstance(entry.value, CompressedHead):
+            headers['Content-Encoding'] = entry.value.encoding
+            return HttpResponse(finish(entry.value, entry.value.last), content_type='application/json', headers=headers)
+        return HttpResponse(entry.value, content_type='application/json', headers=headers)
+
+    def _fetch_and_cache(self, cache_key: str, endpoint_config: Dict, unified_path: str, request) -> Tuple[Dict, Dict]:
+        """Fetch a GET once across concurrent callers and cache it if successful"""
+        flight_key = self._generate_upstream_key(endpoint_config['provider'], unified_path, request.GET)
+        (response_data, unified_response), shared = upstream_flight.do(
+            flight_key, self._fetch_unified_response, endpoint_config, unified_path, request
+        )
+
+        if not shared and response_data.get('status_code', 200) == 200:
+            response_cache.set(cache_key, unified_response, endpoint_config['cache_type'])
+
+        return response_data, unified_response
+
+    def _fetch_unified_response(self, endpoint_config: Dict, unified_path: str, request) -> Tuple[Dict, Dict]:
+        """Call the provider and transform its response to the unified format"""
+        response_data = self._route_request(endpoint_config, unified_path, request)
+        return response_data, self._transform_response(response_data, endpoint_config, unified_path, self._wants_compact(request))
 
     def _route_request(self, endpoint_config: Dict, unified_path: str, request) -> Dict:
         """Route request to appropriate provider"""
@@ -776,15 +302,28 @@ class UnifiedFinancialAPIView(APIView):
 
     def _call_polygon_api(self, endpoint_config: Dict, unified_path: str, request) -> Dict:
         """Make API call to Polygon.io"""
+        return self._send_limited_call(self._build_upstream_call(endpoint_config, unified_path, request))
+
+    def _call_fmp_api(self, endpoint_config: Dict, unified_path: str, request) -> Dict:
+        """Make API call to FMP Ultimate"""
+        return self._send_limited_call(self._build_upstream_call(endpoint_config, unified_path, request))
+
+    def _build_upstream_call(self, endpoint_config: Dict, unified_path: str, request) -> Dict:
+        """Build the provider URL, query parameters, headers and body for a request"""
+        provider = endpoint_config['provider']
+        if provider == 'polygon':
+            base_url, api_key = self.polygon_base_url, self.polygon_api_key
+        else:
+            base_url, api_key = self.fmp_base_url, self.fmp_api_key
 
         # Build endpoint URL with path parameters
         endpoint = self._substitute_path_parameters(endpoint_config['endpoint'], unified_path)
 
-        url = f"{self.polygon_base_url}{endpoint}"
-
         # Add API key and query parameters
         api_params = dict(request.GET)
-        api_params['apiKey'] = self.polygon_api_key
+        api_params.pop(ALL_PAGES_PARAM, None)
+        api_params.pop(SCHEMA_PARAM, None)
+        api_params['apiKey'] = api_key
 
         # Apply parameter mapping if specified
         if 'params_map' in endpoint_config:
@@ -806,202 +345,225 @@ class UnifiedFinancialAPIView(APIView):
         if request.method in ['POST', 'PUT', 'PATCH']:
             json_data = getattr(request, 'data', None)
 
-        logger.info(f"Calling Polygon API: {url}")
-
-        try:
-            response = self.session.request(
-                method=request.method, url=url, params=api_params, headers=headers, json=json_data, timeout=self.timeout
-            )
-
-            # Don't raise for status - preserve error codes for testing
-            # response.raise_for_status()
-
-            try:
-                response_json = response.json() if response.content else {}
-            except ValueError:
-                response_json = {'raw_content': response.text}
-
-            return {'data': response_json, 'provider': 'polygon', 'endpoint': endpoint, 'status_code': response.status_code}
-        except requests.Timeout:
-            return {'data': {'error': 'Request timed out'}, 'provider': 'polygon', 'endpoint': endpoint, 'status_code': 504}
-        except requests.ConnectionError:
-            return {'data': {'error': 'Connection failed'}, 'provider': 'polygon', 'endpoint': endpoint, 'status_code': 503}
-
-    def _call_fmp_api(self, endpoint_config: Dict, unified_path: str, request) -> Dict:
-        """Make API call to FMP Ultimate"""
-
-        # Build endpoint URL with path parameters
-        endpoint = self._substitute_path_parameters(endpoint_config['endpoint'], unified_path)
-
-        url = f"{self.fmp_base_url}{endpoint}"
+        return {
+            'provider': provider,
+            'endpoint': endpoint,
+            'method': request.method,
+            'base_url': base_url,
+            'url': f"{base_url}{endpoint}",
+            'params': api_params,
+            'headers': headers,
+            'json': json_data,
+        }
 
-        # Add API key and query parameters
-        api_params = dict(request.GET)
-        api_params['apiKey'] = self.fmp_api_key
+    def _send_limited_call(self, call: Dict, stream: bool = False) -> Dict:
+        """
+        Send an upstream call once the provider's bucket gives it a token, else answer it with a 429.
 
-        # Apply parameter mapping if specified
-        if 'params_map' in endpoint_config:
-            api_params.update(endpoint_config['params_map'])
+        Only calls that reach the provider take a token, so cache hits, stale serves and 304s cost none.
+        """
+        if not self._check_rate_limit(call['provider']):
+            return self._rate_limited_data(call)
+        return self._send_upstream_call(call, stream=stream)
 
-        # Apply static parameters if specified
-        if 'static_params' in endpoint_config:
-            api_params.update(endpoint_config['static_params'])
+    async def _send_limited_call_async(self, call: Dict, stream: bool = False) -> Dict:
+        if not await self._check_rate_limit_async(call['provider']):
+            return self._rate_limited_data(call)
+        return await self._send_upstream_call_async(call, stream=stream)
 
-        # Clean headers
-        headers = {
-            k: v
-            for k, v in request.headers.items()
-            if k.lower() not in {'host', 'connection', 'content-length', 'authorization', 'x-request-token'}
-        }
+    def _rate_limited_data(self, call: Dict) -> Dict:
+        """Response data for an upstream call the provider's bucket had no token for"""
+        provider = call['provider']
+        data = {'error': 'Rate limit exceeded', 'provider': provider}
+        return {'data': data, 'provider': provider, 'endpoint': call['endpoint'], 'status_code': 429}
 
-        # Prepare request data
-        json_data = None
-        if request.method in ['POST', 'PUT', 'PATCH']:
-            json_data = getattr(request, 'data', None)
+    def _send_upstream_call(self, call: Dict, stream: bool = False) -> Dict:
+        """
+        Send a built upstream call, preserving the provider's status code.
 
-        logger.info(f"Calling FMP API: {url}")
+        With stream, a successful JSON response is returned unread as 'chunks' instead of 'data'.
+        """
+        provider, endpoint = call['provider'], call['endpoint']
+        logger.info(f"Calling {provider} API: {call['url']}")
 
         try:
-            response = self.session.request(
-                method=request.method, url=url, params=api_params, headers=headers, json=json_data, timeout=self.timeout
+            response = upstream_transport.session(provider).request(
+                method=call['method'],
+                url=call['url'],
+                params=call['params'],
+                headers=call['headers'],
+                json=call['json'],
+                timeout=self.timeout,
+                stream=stream,
             )
 
             # Don't raise for status - preserve error codes for testing
             # response.raise_for_status()
 
+            if stream and self._is_streamable(response.status_code, response.headers):
+                return {'chunks': iter_response_body(response), 'provider': provider, 'endpoint': endpoint, 'status_code': 200}
+
             try:
-                response_json = response.json() if response.content else {}
+                response_json = codec.loads(response.content) if response.content else {}
             except ValueError:
                 response_json = {'raw_content': response.text}
 
-            return {'data': response_json, 'provider': 'fmp', 'endpoint': endpoint, 'status_code': response.status_code}
+            return {'data': response_json, 'provider': provider, 'endpoint': endpoint, 'status_code': response.status_code}
         except requests.Timeout:
-            return {'data': {'error': 'Request timed out'}, 'provider': 'fmp', 'endpoint': endpoint, 'status_code': 504}
+            return {'data': {'error': 'Request timed out'}, 'provider': provider, 'endpoint': endpoint, 'status_code': 504}
         except requests.ConnectionError:
-            return {'data': {'error': 'Connection failed'}, 'provider': 'fmp', 'endpoint': endpoint, 'status_code': 503}
-
-    def _substitute_path_parameters(self, endpoint_template: str, unified_path: str) -> str:
-        """Substitute path parameters in endpoint template"""
-
-        # Extract parameters from unified path
-        path_parts = unified_path.split('/')
+            return {'data': {'error': 'Connection failed'}, 'provider': provider, 'endpoint': endpoint, 'status_code': 503}
 
-        # Simple parameter substitution
-        result = endpoint_template
+    async def _send_upstream_call_async(self, call: Dict, stream: bool = False) -> Dict:
+        """Async variant of _send_upstream_call using the shared async client"""
+        provider, endpoint = call['provider'], call['endpoint']
+        logger.info(f"Calling {provider} API: {call['url']}")
 
-        # Replace common parameters
-        if '{symbol}' in result and len(path_parts) >= 2:
-            # Find symbol in path (usually second part)
-            symbol = path_parts[1] if len(path_parts) > 1 else path_parts[0]
-            result = result.replace('{symbol}', symbol)
-
-        if '{contract}' in result and len(path_parts) >= 2:
-            contract = path_parts[1]
-            result = result.replace('{contract}', contract)
-
-        if '{cik}' in result and len(path_parts) >= 3:
-            cik = path_parts[2]
-            result = result.replace('{cik}', cik)
-
-        if '{date}' in result and len(path_parts) >= 3:
-            date = path_parts[2]
-            result = result.replace('{date}', date)
-
-        if '{pair}' in result and len(path_parts) >= 2:
-            pair = path_parts[1]
-            result = result.replace('{pair}', pair)
-
-        if '{ticker}' in result and len(path_parts) >= 3:
-            ticker = path_parts[2]
-            result = result.replace('{ticker}', ticker)
-
-        if '{interval}' in result:
-            # Default interval or from query params
-            interval = '1day'  # default
-            result = result.replace('{interval}', interval)
-
-        if '{timespan}' in result:
-            timespan = 'day'  # default
-            result = result.replace('{timespan}', timespan)
+        try:
+            client = get_async_client(call['base_url'])
+            request_kwargs = dict(
+                method=call['method'],
+                url=call['url'],
+                params=call['params'],
+                headers=call['headers'],
+                json=call['json'],
+                timeout=self.timeout,
+            )
+            if stream:
+                response = await client.send(client.build_request(**request_kwargs), stream=True)
+                if self._is_streamable(response.status_code, response.headers):
+                    return {'chunks': aiter_response_body(response), 'provider': provider, 'endpoint': endpoint, 'status_code': 200}
+                await response.aread()
+            else:
+                response = await client.request(**request_kwargs)
 
-        if '{multiplier}' in result:
-            multiplier = '1'  # default
-            result = result.replace('{multiplier}', multiplier)
+            try:
+                response_json = codec.loads(response.content) if response.content else {}
+            except ValueError:
+                response_json = {'raw_content': response.text}
 
-        if '{from}' in result:
-            from_date = (datetime.now() - timedelta(days=30)).strftime('%Y-%m-%d')
-            result = result.replace('{from}', from_date)
+            return {'data': response_json, 'provider': provider, 'endpoint': endpoint, 'status_code': response.status_code}
+        except httpx.TimeoutException:
+            return {'data': {'error': 'Request timed out'}, 'provider': provider, 'endpoint': endpoint, 'status_code': 504}
+        except httpx.TransportError:
+            return {'data': {'error': 'Connection failed'}, 'provider': provider, 'endpoint': endpoint, 'status_code': 503}
+
+    def _is_streamable(self, status_code: int, headers) -> bool:
+        """Only successful JSON bodies are streamed; errors and other content are read and answered as usual"""
+        return status_code == 200 and 'json' in headers.get('Content-Type', '')
+
+    def _streamed_response(self, response_data: Dict, cache_key: str, endpoint_config: Dict, unified_path: str):
+        """
+        Respond to a streamed upstream call, forwarding its body as it arrives.
+
+        Polygon pagination links are cleaned on the fly, and the body is cached
+        once complete if it fits PROXY_STREAM_CACHE_MAX_BYTES.
+        """
+        headers = cache_status_headers('live')
+        if 'chunks' not in response_data:
+            unified_response = self._transform_response(response_data, endpoint_config, unified_path)
+            status_code = response_data.get('status_code', 200)
+            if status_code == 200:
+                response_cache.set(cache_key, unified_response, endpoint_config['cache_type'])
+            return Response(unified_response, status=status_code, headers=headers)
+
+        transforms = [
+            BodyCapture(
+                stream_cache_max_bytes(),
+                lambda body: response_cache.set_encoded(cache_key, body, endpoint_config['cache_type']),
+            )
+        ]
+        if endpoint_config['provider'] == 'polygon':
+            member_filter = JSONMemberFilter.for_rewriter(
+                PolygonPaginationRewriter(self.proxy_domain), compile_field_paths(endpoint_config.get('url_fields'))
+            )
+            if member_filter is not None:
+                transforms.insert(0, member_filter)
 
-        if '{to}' in result:
-            to_date = datetime.now().strftime('%Y-%m-%d')
-            result = result.replace('{to}', to_date)
+        chunks = response_data['chunks']
+        if hasattr(chunks, '__aiter__'):
+            body = aiter_transformed(chunks, transforms)
+        else:
+            body = iter_transformed(chunks, transforms)
+        return StreamingHttpResponse(body, content_type='application/json', headers=headers)
+
+    def _all_pages_response(
+        self,
+        response_data: Dict,
+        call: Dict,
+        endpoint_config: Dict,
+        unified_path: str,
+        limits: PageLimits,
+        compact: bool = False,
+        asynchronous: bool = False,
+    ):
+        """
+        Respond to all_pages=true with the rows of the first page and every page after it as NDJSON.
+
+        An error on the first page is answered as usual. Later pages are fetched
+        from Polygon's cursors, each one while the page before it is written.
+        """
+        headers = cache_status_headers('live')
+        status_code = response_data.get('status_code', 200)
+        if status_code != 200:
+            return Response(self._transform_response(response_data, endpoint_config, unified_path), status=status_code, headers=headers)
+
+        rewriter = PolygonPaginationRewriter(self.proxy_domain)
+        mapper = row_mapper(endpoint_config['compact'], endpoint_config['provider']) if compact else None
+        walk = PageWalk(limits, lambda url: rewriter.rewrite_field('next_url', url), mapper)
+        if asynchronous:
+            body = all_pages_streamer.astream(response_data['data'], lambda url: self._fetch_page_async(call, url), walk)
+        else:
+            body = all_pages_streamer.stream(response_data['data'], lambda url: self._fetch_page(call, url), walk)
+        return StreamingHttpResponse(body, content_type='application/x-ndjson', headers=headers)
+
+    def _fetch_page(self, call: Dict, url: str) -> Dict:
+        """Fetch the page a Polygon cursor links to, taking an upstream token for it"""
+        if not self._check_rate_limit(call['provider']):
+            raise ProviderError(call['provider'], 'Rate limit exceeded', 429)
+        return page_data(self._send_upstream_call(self._page_call(call, url)))
+
+    async def _fetch_page_async(self, call: Dict, url: str) -> Dict:
+        if not await self._check_rate_limit_async(call['provider']):
+            raise ProviderError(call['provider'], 'Rate limit exceeded', 429)
+        return page_data(await self._send_upstream_call_async(self._page_call(call, url)))
+
+    def _page_call(self, call: Dict, url: str) -> Dict:
+        """The upstream call for a cursor link, which carries every parameter but the API key"""
+        if urlparse(url).netloc != urlparse(call['base_url']).netloc:
+            raise ProviderError(call['provider'], f'Unexpected pagination link host: {urlparse(url).netloc}', 502)
+        return dict(call, url=url, params={'apiKey': call['params']['apiKey']}, json=None)
 
-        return result
+    def _substitute_path_parameters(self, endpoint_template: str, unified_path: str) -> str:
+        """Substitute the path's named parameters (or their defaults) into the endpoint template"""
+        route_match = legacy_router.match(unified_path)
+        return render_endpoint(endpoint_template, route_match.params if route_match else {})
 
-    def _transform_response(self, response_data: Dict, endpoint_config: Dict, unified_path: str) -> Dict:
-        """Transform provider response to unified format"""
+    def _transform_response(self, response_data: Dict, endpoint_config: Dict, unified_path: str, compact: bool = False) -> Dict:
+        """Transform provider response to unified format, or to the route's compact schema"""
 
         provider = endpoint_config['provider']
         data = response_data['data']
 
         # Clean Polygon.io URLs if present
         if provider == 'polygon':
-            data = self._clean_polygon_response(data)
+            data = self._clean_polygon_response(data, endpoint_config.get('url_fields'))
+
+        if compact and response_data.get('status_code', 200) == 200:
+            return normalize_compact(data, endpoint_config['compact'], provider)
 
         # For backward compatibility, return the cleaned data directly
         # instead of the unified wrapper format
         return data
 
-    def _clean_polygon_response(self, data):
-        """Clean Polygon.io specific response data (legacy from PolygonProxyView)"""
-        if not isinstance(data, dict):
-            return data
-
-        for field in ["status", "request_id", "queryCount"]:
-            data.pop(field, None)
-
-        for field in ["next_url", "previous_url", "next", "previous"]:
-            if field in data and isinstance(data[field], str) and "polygon.io" in data[field]:
-                url = data[field].replace("api.polygon.io", self.proxy_domain)
-                url = re.sub(r"[?&]apiKey=[^&]*&?", "", url, flags=re.IGNORECASE)
-                url = re.sub(r"/v[1-3]/", "/v1/", url)
-                url = re.sub(r"[&?]+$", "", url)
-                if not url.startswith("https://"):
-                    url = f"https://{url}" if not url.startswith("http") else url.replace("http://", "https://")
-                data[field] = url
-
-        for key, value in data.items():
-            if isinstance(value, dict):
-                data[key] = self._clean_polygon_response(value)
-            elif isinstance(value, list):
-                data[key] = [self._clean_polygon_response(item) if isinstance(item, dict) else item for item in value]
-
-        return data
+    def _clean_polygon_response(self, data, url_fields: Optional[Tuple[str, ...]] = None):
+        """Clean Polygon.io specific response data in place (legacy from PolygonProxyView)"""
+        return PolygonPaginationRewriter(self.proxy_domain).rewrite(data, compile_field_paths(url_fields))
 
     def _replace_polygon_urls(self, data, request):
         """Replace Polygon.io URLs with proxy domain URLs (for test compatibility)"""
-        if not isinstance(data, dict):
-            return data
-
         # Only replace URLs, don't remove status/request_id fields
-        for field in ["next_url", "previous_url", "next", "previous"]:
-            if field in data and isinstance(data[field], str) and "polygon.io" in data[field]:
-                url = data[field].replace("api.polygon.io", self.proxy_domain)
-                url = re.sub(r"[?&]apiKey=[^&]*&?", "", url, flags=re.IGNORECASE)
-                url = re.sub(r"/v[1-3]/", "/v1/", url)
-                url = re.sub(r"[&?]+$", "", url)
-                if not url.startswith("https://"):
-                    url = f"https://{url}" if not url.startswith("http") else url.replace("http://", "https://")
-                data[field] = url
-
-        # Recursively handle nested objects
-        for key, value in data.items():
-            if isinstance(value, dict):
-                data[key] = self._replace_polygon_urls(value, request)
-            elif isinstance(value, list):
-                data[key] = [self._replace_polygon_urls(item, request) if isinstance(item, dict) else item for item in value]
-
-        return data
+        return PolygonPaginationRewriter(self.proxy_domain, strip_fields=()).rewrite(data)
 
     def _process_response(self, response_data, request):
         """Process response data including URL replacement and field cleaning"""
@@ -1030,30 +592,153 @@ class UnifiedFinancialAPIView(APIView):
         return MockResponse(cleaned_data, status_code)
 
     def _check_rate_limit(self, provider: str) -> bool:
-        """Check rate limits for provider"""
+        """Take a token from the provider's cluster-wide bucket, waiting briefly if it is empty"""
+        return upstream_limiter.acquire(provider).allowed
 
-        cache_key = f"rate_limit:{provider}:{datetime.now().strftime('%Y%m%d%H%M')}"
-        current_count = cache.get(cache_key, 0)
+    async def _check_rate_limit_async(self, provider: str) -> bool:
+        return (await upstream_limiter.acquire_async(provider)).allowed
 
-        limit = self.rate_limits[provider]['calls']
+    def _generate_cache_key(self, unified_path: str, params) -> str:
+        """Generate cache key for request, stable across worker processes"""
+        return response_cache.make_key(unified_path, tuple(sorted(params.lists())), namespace='unified_api')
 
-        if current_count >= limit:
-            return False
+    def _generate_upstream_key(self, provider: str, unified_path: str, params) -> str:
+        """Canonical key identifying an upstream GET, used to coalesce concurrent misses"""
+        return f"{provider}:{unified_path}?{urlencode(sorted(params.lists()), doseq=True)}"
 
-        cache.set(cache_key, current_count + 1, 60)
-        return True
 
-    def _generate_cache_key(self, unified_path: str, params: Dict) -> str:
-        """Generate cache key for request"""
+class AsyncUnifiedFinancialAPIView(UnifiedFinancialAPIView):
+    """
+    Async variant of UnifiedFinancialAPIView for the ASGI deployment.
+
+    DRF authentication and permission checks still run synchronously (in a worker
+    thread, as they touch the database), as do response cache reads and writes,
+    which may go to Redis; upstream calls are awaited on the event loop so one
+    worker can keep many of them in flight.
+    """
+
+    async def dispatch(self, request, *args, **kwargs):
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+
+        try:
+            await sync_to_async(self.initial)(request, *args, **kwargs)
+
+            if request.method.lower() in self.http_method_names:
+                handler = getattr(self, request.method.lower(), self.http_method_not_allowed)
+            else:
+                handler = self.http_method_not_allowed
+
+            response = handler(request, *args, **kwargs)
+            if asyncio.iscoroutine(response):
+                response = await response
+
+        except Exception as exc:
+            response = self.handle_exception(exc)
+
+        self.response = self.finalize_response(request, response, *args, **kwargs)
+        return self.response
+
+    async def get(self, request, path="", *args, **kwargs):
+        """Handle all GET requests for financial data"""
+        return await self._handle_request_async(request, path, 'GET')
 
-        sorted_params = sorted(params.items())
-        params_str = urlencode(sorted_params)
+    async def post(self, request, path="", *args, **kwargs):
+        """Handle all POST requests for financial data"""
+        return await self._handle_request_async(request, path, 'POST')
+
+    async def put(self, request, path="", *args, **kwargs):
+        """Handle all PUT requests for financial data"""
+        return await self._handle_request_async(request, path, 'PUT')
+
+    async def delete(self, request, path="", *args, **kwargs):
+        """Handle all DELETE requests for financial data"""
+        return await self._handle_request_async(request, path, 'DELETE')
+
+    async def _handle_request_async(self, request, path, method):
+        """Async variant of _handle_request"""
+        try:
+            if self._should_count_request(request):
+                await sync_to_async(request.user.increment_request_count)()
+                request._count_incremented = True
+
+            unified_path = self._extract_unified_path(path)
+
+            endpoint_config = self._match_endpoint(unified_path)
+            if not endpoint_config:
+                return Response(
+                    {
+                        'error': 'Endpoint not found',
+                        'path': unified_path,
+                        'available_endpoints': list(self.endpoint_mappings.keys())[:10],
+                    },
+                    status=404,
+                )
+
+            schema_error = self._schema_error(request, endpoint_config, unified_path)
+            if schema_error is not None:
+                return schema_error
+
+            provider = endpoint_config['provider']
+            headers = None
+            if method == 'GET' and wants_all_pages(request.GET):
+                if not endpoint_config.get('all_pages'):
+                    return Response({'error': f'{ALL_PAGES_PARAM} is not supported on this endpoint', 'path': unified_path}, status=400)
+                call = self._build_upstream_call(endpoint_config, unified_path, request)
+                response_data = await self._send_limited_call_async(call)
+                limits = await sync_to_async(page_limits_for)(request.user)
+                return self._all_pages_response(
+                    response_data, call, endpoint_config, unified_path, limits, compact=self._wants_compact(request), asynchronous=True
+                )
+
+            if method == 'GET':
+                cache_key = self._generate_cache_key(unified_path, request.GET)
+                cached = await sync_to_async(self._cached_response, thread_sensitive=False)(
+                    request, cache_key, endpoint_config, unified_path
+                )
+                if cached is not None:
+                    return cached
+
+                if endpoint_config.get('stream') and not self._wants_compact(request):
+                    call = self._build_upstream_call(endpoint_config, unified_path, request)
+                    response_data = await self._send_limited_call_async(call, stream=True)
+                    return await sync_to_async(self._streamed_response, thread_sensitive=False)(
+                        response_data, cache_key, endpoint_config, unified_path
+                    )
+
+                flight_key = self._generate_upstream_key(provider, unified_path, request.GET)
+                (response_data, unified_response), shared = await async_upstream_flight.do(
+                    flight_key, self._fetch_unified_response_async, endpoint_config, unified_path, request
+                )
+                if not shared and response_data.get('status_code', 200) == 200:
+                    await sync_to_async(response_cache.set, thread_sensitive=False)(
+                        cache_key, unified_response, endpoint_config['cache_type']
+                    )
+                headers = cache_status_headers('live')
+            else:
+                response_data, unified_response = await self._fetch_unified_response_async(
+                    endpoint_config, unified_path, request
+                )
+
+            status_code = response_data.get('status_code', 200)
+
+            return Response(unified_response, status=status_code, headers=headers)
+
+        except Exception as e:
+            logger.error(f"Error processing request: {str(e)}")
+            return Response({'error': 'Internal server error', 'message': str(e), 'path': path}, status=500)
 
-        return f"unified_api:{unified_path}:{hash(params_str)}"
+    async def _fetch_unified_response_async(self, endpoint_config: Dict, unified_path: str, request) -> Tuple[Dict, Dict]:
+        """Async variant of _fetch_unified_response"""
+        if endpoint_config['provider'] not in ('polygon', 'fmp'):
+            raise ValueError(f"Unknown provider: {endpoint_config['provider']}")
 
-    def _get_cache_ttl(self, cache_type: str) -> int:
-        """Get cache TTL based on data type"""
-        return self.cache_ttl.get(cache_type, self.cache_ttl['daily'])
+        call = self._build_upstream_call(endpoint_config, unified_path, request)
+        response_data = await self._send_limited_call_async(call)
+        return response_data, self._transform_response(response_data, endpoint_config, unified_path, self._wants_compact(request))
 
 
 # Keep the legacy PolygonProxyView for backward compatibility (alias)
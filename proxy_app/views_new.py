@@ -4,19 +4,34 @@ Django views for the Financial Data API
 import json
 import logging
 
+from asgiref.sync import sync_to_async
 from django.conf import settings
-from django.http import JsonResponse
+from django.http import HttpResponse, HttpResponseNotModified, StreamingHttpResponse
+from django.utils.cache import patch_vary_headers
 from django.utils.decorators import method_decorator
 from django.views import View
 from django.views.decorators.csrf import csrf_exempt
+from rest_framework.permissions import IsAdminUser
+from rest_framework.views import APIView
 
 from .config import (
     EndpointNotFoundError,
     FinancialAPIError,
+    InvalidParameterError,
+    NotAcceptableError,
     ProviderError,
     RateLimitError,
 )
+from .batch import batch_executor
+from .cache import cache_revalidator, cache_status_headers, is_not_modified, response_cache, validator_headers
+from .codec import FastJsonResponse, codec
+from .columnar import available_formats
+from .compression import negotiate, precompressor
+from .microbatch import quote_batcher
 from .proxy import proxy
+from .ratelimit import upstream_limiter
+from .singleflight import async_upstream_flight, upstream_flight
+from .transport import upstream_transport
 
 # Set up logging
 logger = logging.getLogger(__name__)
@@ -29,31 +44,10 @@ class FinancialAPIView(View):
     def get(self, request, *args, **kwargs):
         """Handle GET requests"""
         try:
-            # Extract path from request
-            path = self._extract_path(request.path)
-
-            # Get query parameters
-            params = dict(request.GET.items())
-
-            # Log the request
-            logger.info(f"Processing request: {path} with params: {params}")
-
-            # Process through proxy
-            response_data = proxy.process_request(path, params)
-
-            return JsonResponse(response_data, safe=False)
-
-        except EndpointNotFoundError as e:
-            return self._error_response("Endpoint not found", str(e), 404)
-        except RateLimitError as e:
-            return self._error_response("Rate limit exceeded", str(e), 429, {"retry_after": 60})
-        except ProviderError as e:
-            return self._error_response("Provider error", str(e), e.status_code or 500, {"provider": e.provider})
-        except FinancialAPIError as e:
-            return self._error_response("API error", str(e), 500)
+            path, params = self._parse_get(request)
+            return self._proxy_response(request, proxy.fetch_raw(path, params, stream=True, encoding=self._accepted_encoding(request)))
         except Exception as e:
-            logger.error(f"Unexpected error: {e}")
-            return self._error_response("Internal server error", "An unexpected error occurred", 500)
+            return self._exception_response(e)
 
     def post(self, request, *args, **kwargs):
         """Handle POST requests (for batch operations)"""
@@ -61,25 +55,87 @@ class FinancialAPIView(View):
             path = self._extract_path(request.path)
 
             # Parse JSON body
-            try:
-                body = json.loads(request.body.decode('utf-8')) if request.body else {}
-            except json.JSONDecodeError:
+            body = self._parse_json_body(request)
+            if body is None:
                 return self._error_response("Invalid JSON", "Request body must be valid JSON", 400)
 
             # Handle batch requests
             if path == "batch":
-                return self._handle_batch(body)
+                return self._handle_batch_request(body)
 
             # Regular POST request
             logger.info(f"POST {path} - body: {body}")
             response_data = proxy.process_request(path, body)
 
-            return JsonResponse(response_data, safe=False)
+            return FastJsonResponse(response_data, safe=False)
 
         except Exception as e:
             logger.error(f"POST error: {e}")
             return self._error_response("Internal server error", str(e), 500)
 
+    def _parse_get(self, request):
+        """Extract the API path and query parameters of a GET request"""
+        # Extract path from request
+        path = self._extract_path(request.path)
+
+        # Get query parameters
+        params = dict(request.GET.items())
+
+        # Log the request
+        logger.info(f"Processing request: {path} with params: {params}")
+        return path, params
+
+    def _accepted_encoding(self, request):
+        """The precompressed content encoding to answer with, if the client accepts one"""
+        return negotiate(request.headers.get("Accept-Encoding", ""), precompressor.encodings)
+
+    def _parse_json_body(self, request):
+        """Parse the JSON request body, returning None if it is invalid"""
+        try:
+            return codec.loads(request.body) if request.body else {}
+        except json.JSONDecodeError:
+            return None
+
+    def _proxy_response(self, request, result) -> HttpResponse:
+        """
+        Render a ProxyResult with headers describing its cache source; cached, streamed and columnar bodies are sent as is.
+
+        Conditional GETs for a cached body the client already has get a 304 without it.
+        """
+        if result.entry is not None and is_not_modified(request.headers, result.entry):
+            response = HttpResponseNotModified()
+        elif result.chunks is not None:
+            response = StreamingHttpResponse(proxy.stream_response(result), content_type="application/json")
+        else:
+            response = HttpResponse(proxy.encode_response(result), content_type=result.media_type or "application/json")
+        if result.compressed is not None and response.status_code == 200:
+            response["Content-Encoding"] = result.compressed.encoding
+        if precompressor.encodings:
+            patch_vary_headers(response, ("Accept-Encoding",))
+        headers = cache_status_headers(result.source, result.age)
+        if result.entry is not None:
+            headers.update(validator_headers(result.entry))
+        for header, value in headers.items():
+            response[header] = value
+        return response
+
+    def _exception_response(self, e: Exception) -> FastJsonResponse:
+        """Map proxy exceptions to error responses"""
+        if isinstance(e, EndpointNotFoundError):
+            return self._error_response("Endpoint not found", str(e), 404)
+        if isinstance(e, RateLimitError):
+            return self._error_response("Rate limit exceeded", str(e), 429, {"retry_after": 60})
+        if isinstance(e, InvalidParameterError):
+            return self._error_response("Invalid parameter", str(e), 400)
+        if isinstance(e, NotAcceptableError):
+            return self._error_response("Not acceptable", str(e), 406, {"formats": list(available_formats())})
+        if isinstance(e, ProviderError):
+            return self._error_response("Provider error", str(e), e.status_code or 500, {"provider": e.provider})
+        if isinstance(e, FinancialAPIError):
+            return self._error_response("API error", str(e), 500)
+        logger.error(f"Unexpected error: {e}")
+        return self._error_response("Internal server error", "An unexpected error occurred", 500)
+
     def _extract_path(self, request_path: str) -> str:
         """Extract API path from request"""
         # Remove API prefix
@@ -88,7 +144,7 @@ class FinancialAPIView(View):
                 return request_path[len(prefix):]
         return request_path.lstrip('/')
 
-    def _handle_batch_request(self, body: dict) -> JsonResponse:
+    def _handle_batch_request(self, body: dict) -> FastJsonResponse:
         """Handle batch requests for multiple endpoints"""
         if "requests" not in body or not isinstance(body["requests"], list):
             return self._error_response("Invalid batch request", "'requests' must be an array", 400)
@@ -97,37 +153,82 @@ class FinancialAPIView(View):
         if len(requests_list) > 100:
             return self._error_response("Batch too large", "Maximum 100 requests per batch", 400)
 
-        results = []
-        for i, req in enumerate(requests_list):
-            try:
-                if "path" not in req:
-                    results.append({"index": i, "error": "Missing 'path' in request"})
-                    continue
-
-                path = req["path"]
-                params = req.get("params", {})
-
-                response_data = proxy.process_request(path, params)
-                results.append({"index": i, "data": response_data})
+        # Stream results as newline-delimited JSON in completion order when asked to
+        if body.get("stream"):
+            lines = (codec.dumps(result) + b"\n" for result in batch_executor.iter_results(requests_list))
+            return StreamingHttpResponse(lines, content_type="application/x-ndjson")
 
-            except Exception as e:
-                results.append({"index": i, "error": str(e)})
+        results = batch_executor.run(requests_list)
+        return FastJsonResponse({"results": results, "total": len(results)})
 
-        return JsonResponse({"results": results, "total": len(results)})
-
-    def _error_response(self, error_type: str, message: str, status_code: int, extra_data: dict = None) -> JsonResponse:
+    def _error_response(self, error_type: str, message: str, status_code: int, extra_data: dict = None) -> FastJsonResponse:
         """Create standardized error response"""
         response_data = {"error": error_type, "message": message}
         if extra_data:
             response_data.update(extra_data)
-        return JsonResponse(response_data, status=status_code)
+        return FastJsonResponse(response_data, status=status_code)
+
+
+class AsyncFinancialAPIView(FinancialAPIView):
+    """Async variant of FinancialAPIView; upstream calls run on the event loop"""
+
+    async def get(self, request, *args, **kwargs):
+        """Handle GET requests"""
+        try:
+            path, params = self._parse_get(request)
+            encoding = self._accepted_encoding(request)
+            return self._proxy_response(request, await proxy.fetch_raw_async(path, params, stream=True, encoding=encoding))
+        except Exception as e:
+            return self._exception_response(e)
+
+    async def post(self, request, *args, **kwargs):
+        """Handle POST requests (for batch operations)"""
+        try:
+            path = self._extract_path(request.path)
+
+            body = self._parse_json_body(request)
+            if body is None:
+                return self._error_response("Invalid JSON", "Request body must be valid JSON", 400)
+
+            # The batch executor fans out on its own thread pool
+            if path == "batch":
+                return await sync_to_async(self._handle_batch_request, thread_sensitive=False)(body)
+
+            logger.info(f"POST {path} - body: {body}")
+            result = await proxy.fetch_async(path, body)
+
+            return FastJsonResponse(result.data, safe=False)
+
+        except Exception as e:
+            logger.error(f"POST error: {e}")
+            return self._error_response("Internal server error", str(e), 500)
 
 
 class HealthView(View):
     """Health check endpoint"""
 
     def get(self, request, *args, **kwargs):
-        return JsonResponse({"status": "ok"}, status=200)
+        return FastJsonResponse({"status": "ok"}, status=200)
+
+
+class StatsView(APIView):
+    """Proxy cache and upstream coalescing statistics for this worker; staff only, as they expose its internals"""
+
+    permission_classes = [IsAdminUser]
+
+    def get(self, request, *args, **kwargs):
+        return FastJsonResponse(
+            {
+                "cache": response_cache.get_stats(),
+                "revalidation": cache_revalidator.get_stats(),
+                "upstream_coalescing": upstream_flight.get_stats(),
+                "async_upstream_coalescing": async_upstream_flight.get_stats(),
+                "quote_batching": quote_batcher.get_stats(),
+                "upstream_pools": upstream_transport.get_stats(),
+                "upstream_rate_limits": upstream_limiter.get_stats(),
+            }
+        )
+
 
 class EndpointsView(View):
     """Endpoint documentation"""
@@ -136,11 +237,11 @@ class EndpointsView(View):
         """Return list of all available endpoints"""
         try:
             endpoints_data = proxy.get_endpoint_list()
-            return JsonResponse(endpoints_data)
+            return FastJsonResponse(endpoints_data)
 
         except Exception as e:
             logger.error(f"Endpoints list error: {e}")
-            return JsonResponse({"error": "Failed to retrieve endpoints", "message": str(e)}, status=500)
+            return FastJsonResponse({"error": "Failed to retrieve endpoints", "message": str(e)}, status=500)
 
 
 # Maintain backward compatibility with existing implementations
@@ -116,6 +116,65 @@ FMP_API_KEY = config("FMP_API_KEY", default="your-fmp-api-key-here")
 PROXY_TIMEOUT = config("PROXY_TIMEOUT", default=30, cast=int)
 PROXY_DOMAIN = config("PROXY_DOMAIN", default="api.financialdata.online")
 
+# Response cache: per-process L1 in front of the shared cache alias used as L2
+PROXY_L1_CACHE_MAX_BYTES = config("PROXY_L1_CACHE_MAX_BYTES", default=64 * 1024 * 1024, cast=int)
+PROXY_L1_CACHE_MAX_ENTRIES = config("PROXY_L1_CACHE_MAX_ENTRIES", default=10000, cast=int)
+PROXY_L2_CACHE_ALIAS = config("PROXY_L2_CACHE_ALIAS", default="default")
+PROXY_REVALIDATE_WORKERS = config("PROXY_REVALIDATE_WORKERS", default=4, cast=int)
+PROXY_BATCH_MAX_WORKERS = config("PROXY_BATCH_MAX_WORKERS", default=32, cast=int)
+
+# Quote micro-batching: how long a miss waits for others to join, and the budget for the
+# comma-joined symbol list so the merged upstream URL stays well under common 2KB limits
+PROXY_QUOTE_BATCH_WINDOW_MS = config("PROXY_QUOTE_BATCH_WINDOW_MS", default=5, cast=int)
+PROXY_QUOTE_BATCH_MAX_SYMBOLS_LENGTH = config("PROXY_QUOTE_BATCH_MAX_SYMBOLS_LENGTH", default=1500, cast=int)
+
+# Serve the proxy through async views (for the Daphne/ASGI deployment) and cap the
+# connections each provider's async client keeps open
+PROXY_ASYNC_VIEWS = config("PROXY_ASYNC_VIEWS", default=False, cast=bool)
+PROXY_ASYNC_MAX_CONNECTIONS = config("PROXY_ASYNC_MAX_CONNECTIONS", default=256, cast=int)
+
+# Shared upstream connection pools: connections kept per provider host, whether callers
+# wait for a free connection when the pool is exhausted, and how long resolved addresses are reused
+PROXY_UPSTREAM_MAX_CONNECTIONS_PER_HOST = config("PROXY_UPSTREAM_MAX_CONNECTIONS_PER_HOST", default=50, cast=int)
+PROXY_UPSTREAM_POOL_BLOCK = config("PROXY_UPSTREAM_POOL_BLOCK", default=False, cast=bool)
+PROXY_DNS_CACHE_TTL = config("PROXY_DNS_CACHE_TTL", default=300, cast=int)
+
+# Cluster-wide upstream quotas: the cache alias whose Redis holds the token buckets, and how
+# long a call may queue for a token before it is rejected with 429 (0 disables queueing)
+PROXY_UPSTREAM_RATE_LIMIT_CACHE_ALIAS = config("PROXY_UPSTREAM_RATE_LIMIT_CACHE_ALIAS", default="default")
+PROXY_UPSTREAM_RATE_LIMIT_MAX_WAIT_MS = config("PROXY_UPSTREAM_RATE_LIMIT_MAX_WAIT_MS", default=250, cast=int)
+
+# JSON codec for provider payloads and proxy responses: "auto" uses orjson when installed
+PROXY_JSON_CODEC = config("PROXY_JSON_CODEC", default="auto")
+
+# Streamed routes: bytes read from the provider at a time, and the largest streamed body
+# that is still cached once complete (0 never caches streamed routes)
+PROXY_STREAM_CHUNK_SIZE = config("PROXY_STREAM_CHUNK_SIZE", default=64 * 1024, cast=int)
+PROXY_STREAM_CACHE_MAX_BYTES = config("PROXY_STREAM_CACHE_MAX_BYTES", default=8 * 1024 * 1024, cast=int)
+
+# Cache classes whose bodies are precompressed at fill time, and the content encodings to
+# precompress them in, most preferred first (br and zstd need the "compression" extra)
+PROXY_PRECOMPRESS_CACHE_CLASSES = config("PROXY_PRECOMPRESS_CACHE_CLASSES", default="static,fundamental")
+PROXY_PRECOMPRESS_ENCODINGS = config("PROXY_PRECOMPRESS_ENCODINGS", default="br,zstd,gzip")
+
+# Compression codec of format=parquet responses (the "columnar" extra provides all formats)
+PROXY_PARQUET_COMPRESSION = config("PROXY_PARQUET_COMPRESSION", default="zstd")
+
+# all_pages=true walks over Polygon cursor endpoints: page and row caps for plans that set
+# none, and the threads prefetching next pages while the current one streams
+PROXY_ALL_PAGES_MAX_PAGES = config("PROXY_ALL_PAGES_MAX_PAGES", default=20, cast=int)
+PROXY_ALL_PAGES_MAX_ROWS = config("PROXY_ALL_PAGES_MAX_ROWS", default=100000, cast=int)
+PROXY_ALL_PAGES_PREFETCH_WORKERS = config("PROXY_ALL_PAGES_PREFETCH_WORKERS", default=16, cast=int)
+
+# Per-user and per-IP quota counters: the cache alias whose Redis holds them, and the seconds
+# between write-behind flushes into RateLimitCounter rows (0 leaves flushing to the hourly tasks)
+USAGE_COUNTER_CACHE_ALIAS = config("USAGE_COUNTER_CACHE_ALIAS", default="default")
+USAGE_COUNTER_FLUSH_INTERVAL = config("USAGE_COUNTER_FLUSH_INTERVAL", default=10, cast=float)
+
+# Authenticated users cached by token hash: the cache alias and the seconds an entry lives (0 disables)
+PRINCIPAL_CACHE_ALIAS = config("PRINCIPAL_CACHE_ALIAS", default="default")
+PRINCIPAL_CACHE_TIMEOUT = config("PRINCIPAL_CACHE_TIMEOUT", default=60, cast=int)
+
 
 STRIPE_PUBLISHABLE_KEY = config("STRIPE_PUBLISHABLE_KEY", default="")
 STRIPE_SECRET_KEY = config("STRIPE_SECRET_KEY", default="")
@@ -219,7 +278,6 @@ else:
         "django.middleware.csrf.CsrfViewMiddleware",
         "django.contrib.auth.middleware.AuthenticationMiddleware",
         "users.middleware.DatabaseRateLimitMiddleware",
-        "users.middleware.UserRequestCountMiddleware",
         "users.middleware.RateLimitHeaderMiddleware",
         "django.contrib.messages.middleware.MessageMiddleware",
         "django.middleware.clickjacking.XFrameOptionsMiddleware",
@@ -321,6 +379,8 @@ if 'test' in sys.argv:
             'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
         },
     }
+    # Count usage in the rate_limit cache that tests clear
+    USAGE_COUNTER_CACHE_ALIAS = 'rate_limit'
 else:
     CACHES = {
         "default": {
@@ -398,7 +458,7 @@ LOGGING = {
 
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        "users.authentication.CachedJWTAuthentication",
         "users.authentication.RequestTokenAuthentication",
         "rest_framework.authentication.SessionAuthentication",
     ),
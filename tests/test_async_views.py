@@ -0,0 +1,221 @@
+import asyncio
+import json
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import httpx
+from asgiref.sync import async_to_sync
+from django.core.cache import cache
+from django.test import AsyncRequestFactory, SimpleTestCase, override_settings
+
+from proxy_app.cache import LocalTTLCache, ResponseCache, response_cache
+from proxy_app.config import ProviderError, RateLimitError
+from proxy_app.providers import FMPProvider, PolygonProvider
+from proxy_app.proxy import FinancialDataProxy, ProxyResult
+from proxy_app.singleflight import AsyncSingleFlight
+from proxy_app.views import AsyncUnifiedFinancialAPIView
+from proxy_app.views_new import AsyncFinancialAPIView
+
+
+def mock_client(handler, base_url):
+    """AsyncClient that answers every request with handler instead of the network"""
+    return httpx.AsyncClient(transport=httpx.MockTransport(handler), base_url=base_url)
+
+
+def on_event_loop():
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return False
+    return True
+
+
+def record_loop_calls(test, target, names):
+    """Names of target's methods called on an event loop thread; the methods keep working"""
+    calls = []
+    for name in names:
+        method = getattr(target, name)
+
+        def recorded(*args, _name=name, _method=method, **kwargs):
+            if on_event_loop():
+                calls.append(_name)
+            return _method(*args, **kwargs)
+
+        patcher = patch.object(target, name, side_effect=recorded)
+        patcher.start()
+        test.addCleanup(patcher.stop)
+    return calls
+
+
+class AsyncSingleFlightTest(SimpleTestCase):
+    """
+    Test suite for coalescing concurrent coroutine calls.
+    """
+
+    def test_concurrent_callers_share_one_execution(self):
+        flight = AsyncSingleFlight()
+        calls = []
+
+        async def fetch():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return {"price": 1}
+
+        async def run():
+            return await asyncio.gather(*(flight.do("quotes/AAPL", fetch) for _ in range(5)))
+
+        results = asyncio.run(run())
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual([shared for _, shared in results].count(False), 1)
+        self.assertTrue(all(result == {"price": 1} for result, _ in results))
+        self.assertEqual(flight.get_stats()["in_flight"], 0)
+
+    def test_followers_receive_the_leaders_exception(self):
+        flight = AsyncSingleFlight()
+
+        async def fetch():
+            await asyncio.sleep(0.01)
+            raise ValueError("upstream failed")
+
+        async def run():
+            return await asyncio.gather(*(flight.do("quotes/AAPL", fetch) for _ in range(3)), return_exceptions=True)
+
+        results = asyncio.run(run())
+
+        self.assertTrue(all(isinstance(result, ValueError) for result in results))
+
+
+class AsyncProviderTest(SimpleTestCase):
+    """
+    Test suite for the async provider client.
+    """
+
+    def test_makes_request_with_api_key(self):
+        seen = []
+
+        def handler(request):
+            seen.append(request.url)
+            return httpx.Response(200, json=[{"symbol": "AAPL"}])
+
+        provider = FMPProvider("secret")
+        with patch("proxy_app.providers.get_async_client", return_value=mock_client(handler, provider.base_url)):
+            data = asyncio.run(provider.make_request_async("/v3/quote/AAPL"))
+
+        self.assertEqual(data, [{"symbol": "AAPL"}])
+        self.assertEqual(seen[0].path, "/api/v3/quote/AAPL")
+        self.assertEqual(seen[0].params["apikey"], "secret")
+
+    def test_maps_error_statuses_like_the_sync_client(self):
+        provider = PolygonProvider("secret")
+        for status_code, error_type in [(429, RateLimitError), (401, ProviderError), (500, ProviderError)]:
+            client = mock_client(lambda request, code=status_code: httpx.Response(code), provider.base_url)
+            with self.subTest(status_code=status_code), patch("proxy_app.providers.get_async_client", return_value=client):
+                with self.assertRaises(error_type):
+                    asyncio.run(provider.make_request_async("/v1/marketstatus/now"))
+
+
+class AsyncProxyTest(SimpleTestCase):
+    """
+    Test suite for FinancialDataProxy.fetch_async.
+    """
+
+    def setUp(self):
+        self.fmp = MagicMock()
+        self.proxy = FinancialDataProxy(
+            providers={"fmp": self.fmp, "polygon": MagicMock()},
+            cache=ResponseCache(LocalTTLCache(max_bytes=1024 * 1024, max_entries=100)),
+            async_flight=AsyncSingleFlight(),
+        )
+
+    def test_concurrent_misses_make_one_async_call_then_hit_cache(self):
+        async def make_request_async(endpoint, params):
+            await asyncio.sleep(0.01)
+            return {"endpoint": endpoint}
+
+        self.fmp.make_request_async = AsyncMock(side_effect=make_request_async)
+
+        async def run():
+            return await asyncio.gather(*(self.proxy.fetch_async("quotes/AAPL", {"a": "1"}) for _ in range(5)))
+
+        results = asyncio.run(run())
+        cached = asyncio.run(self.proxy.fetch_async("quotes/AAPL", {"a": "1"}))
+
+        self.assertEqual(self.fmp.make_request_async.await_count, 1)
+        self.assertTrue(all(result.source == "live" for result in results))
+        self.assertEqual(cached.source, "cache")
+        self.fmp.make_request.assert_not_called()
+
+    def test_cache_calls_run_off_the_event_loop(self):
+        self.fmp.make_request_async = AsyncMock(return_value={"price": 1})
+        loop_calls = record_loop_calls(self, self.proxy.cache, ("get", "get_encoded", "set", "set_encoded", "set_derived"))
+
+        asyncio.run(self.proxy.fetch_async("quotes/AAPL"))
+        asyncio.run(self.proxy.fetch_async("quotes/AAPL"))
+        asyncio.run(self.proxy.fetch_async("quotes/AAPL", {"fields": "price"}))
+
+        self.assertEqual(self.proxy.cache.set.call_count, 1)
+        self.assertEqual(self.proxy.cache.set_derived.call_count, 1)
+        self.assertEqual(loop_calls, [])
+
+
+# tearDown clears the default cache, which an in-process L1 would outlive
+@override_settings(PROXY_L1_CACHE_MAX_BYTES=0)
+class AsyncViewsTest(SimpleTestCase):
+    """
+    Test suite for the async API views.
+    """
+
+    def setUp(self):
+        self.factory = AsyncRequestFactory()
+
+    def tearDown(self):
+        cache.clear()
+
+    @patch("proxy_app.views_new.proxy.fetch_raw_async", new_callable=AsyncMock)
+    def test_async_financial_view_awaits_proxy(self, fetch_raw_async):
+        fetch_raw_async.return_value = ProxyResult({"price": 1}, "fmp", "live")
+
+        response = async_to_sync(AsyncFinancialAPIView.as_view())(self.factory.get("/api/v1/quotes/AAPL"))
+
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.content)
+        self.assertEqual(data["price"], 1)
+        self.assertEqual(data["_metadata"]["source"], "live")
+        self.assertEqual(response["X-Cache-Status"], "MISS")
+        fetch_raw_async.assert_awaited_once_with("quotes/AAPL", {}, stream=True, encoding=None)
+
+    @patch("proxy_app.views.AsyncUnifiedFinancialAPIView._send_upstream_call_async", new_callable=AsyncMock)
+    def test_async_legacy_view_caches_successful_responses(self, send):
+        send.return_value = {"data": {"price": 1}, "provider": "fmp", "endpoint": "/v3/quote/AAPL", "status_code": 200}
+        view = AsyncUnifiedFinancialAPIView.as_view()
+
+        first = async_to_sync(view)(self.factory.get("/quotes/AAPL"), path="quotes/AAPL")
+        second = async_to_sync(view)(self.factory.get("/quotes/AAPL"), path="quotes/AAPL")
+
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(first.data, {"price": 1})
+        self.assertEqual(first["X-Cache-Status"], "MISS")
+        self.assertEqual(second["X-Cache-Status"], "HIT")
+        self.assertEqual(send.await_count, 1)
+
+    @patch("proxy_app.views.AsyncUnifiedFinancialAPIView._send_upstream_call_async", new_callable=AsyncMock)
+    def test_async_legacy_view_uses_the_cache_off_the_event_loop(self, send):
+        send.return_value = {"data": {"price": 1}, "provider": "fmp", "endpoint": "/v3/quote/AAPL", "status_code": 200}
+        loop_calls = record_loop_calls(self, response_cache, ("get_encoded", "set"))
+        view = AsyncUnifiedFinancialAPIView.as_view()
+
+        async_to_sync(view)(self.factory.get("/quotes/AAPL"), path="quotes/AAPL")
+        second = async_to_sync(view)(self.factory.get("/quotes/AAPL"), path="quotes/AAPL")
+
+        self.assertEqual(second["X-Cache-Status"], "HIT")
+        self.assertEqual(loop_calls, [])
+
+    @patch("proxy_app.views.AsyncUnifiedFinancialAPIView._send_upstream_call_async", new_callable=AsyncMock)
+    def test_async_legacy_view_preserves_upstream_errors(self, send):
+        send.return_value = {"data": {"error": "x"}, "provider": "fmp", "endpoint": "/v3/quote/AAPL", "status_code": 503}
+
+        response = async_to_sync(AsyncUnifiedFinancialAPIView.as_view())(
+            self.factory.get("/quotes/AAPL"), path="quotes/AAPL"
+        )
+
+        self.assertEqual(response.status_code, 503)
@@ -0,0 +1,150 @@
+import json
+import threading
+from unittest.mock import MagicMock, patch
+
+from django.test import RequestFactory, SimpleTestCase
+
+from proxy_app.batch import BatchExecutor
+from proxy_app.cache import LocalTTLCache, ResponseCache
+from proxy_app.microbatch import MicroBatcher
+from proxy_app.proxy import FinancialDataProxy
+from proxy_app.singleflight import SingleFlight
+from proxy_app.views_new import FinancialAPIView
+
+
+class BatchExecutorTest(SimpleTestCase):
+    """
+    Test suite for batch execution of proxied sub-requests.
+
+    Covers deduplication, multi-get cache hits, per-provider concurrency
+    caps, error isolation and input ordering.
+    """
+
+    def setUp(self):
+        self.fmp = MagicMock()
+        self.fmp.make_request.side_effect = lambda endpoint, params: {"endpoint": endpoint}
+        self.polygon = MagicMock()
+        self.polygon.make_request.side_effect = lambda endpoint, params: {"endpoint": endpoint}
+        self.proxy = FinancialDataProxy(
+            providers={"fmp": self.fmp, "polygon": self.polygon},
+            cache=ResponseCache(LocalTTLCache(max_bytes=1024 * 1024, max_entries=100)),
+            flight=SingleFlight(),
+            batcher=MicroBatcher(window=0, max_length=100),
+        )
+        self.executor = BatchExecutor(self.proxy, max_workers=8, provider_concurrency={"fmp": 2, "polygon": 2})
+
+    def test_results_are_returned_in_input_order(self):
+        results = self.executor.run(
+            [{"path": "quotes/AAPL"}, {"path": "quotes/MSFT"}, {"path": "reference/market-status"}]
+        )
+
+        self.assertEqual([result["index"] for result in results], [0, 1, 2])
+        self.assertEqual(results[0]["data"]["endpoint"], "/v3/quote/AAPL")
+        self.assertEqual(results[2]["data"]["endpoint"], "/v1/marketstatus/now")
+
+    def test_identical_sub_requests_are_fetched_once(self):
+        results = self.executor.run(
+            [
+                {"path": "quotes/AAPL", "params": {"a": "1"}},
+                {"path": "quotes/AAPL", "params": {"a": "1"}},
+                {"path": "quotes/AAPL", "params": {"a": "2"}},
+            ]
+        )
+
+        self.assertEqual(self.fmp.make_request.call_count, 2)
+        self.assertEqual(results[0]["data"], results[1]["data"])
+
+    def test_cached_sub_requests_use_one_multi_get(self):
+        self.executor.run([{"path": "quotes/AAPL"}, {"path": "quotes/MSFT"}])
+
+        with patch.object(self.proxy.cache, "get", side_effect=AssertionError("single get")):
+            results = self.executor.run([{"path": "quotes/AAPL"}, {"path": "quotes/MSFT"}])
+
+        self.assertEqual(self.fmp.make_request.call_count, 2)
+        self.assertEqual({result["data"]["_metadata"]["source"] for result in results}, {"cache"})
+
+    def test_errors_are_isolated_per_sub_request(self):
+        results = self.executor.run([{"params": {}}, {"path": "unknown/path"}, {"path": "quotes/AAPL"}])
+
+        self.assertEqual(results[0]["error"], "Missing 'path' in request")
+        self.assertIn("Endpoint not found", results[1]["error"])
+        self.assertIn("data", results[2])
+
+    def test_invalid_sub_requests_get_a_400_without_failing_the_batch(self):
+        results = self.executor.run(
+            [
+                {"path": "quotes/AAPL", "params": ["symbol", "AAPL"]},
+                {"path": "quotes/AAPL", "params": {"fields": "price"}},
+                {"path": "quotes/AAPL", "params": {"format": "csv"}},
+                {"path": "quotes/AAPL"},
+            ]
+        )
+
+        self.assertEqual(results[0], {"index": 0, "error": "'params' must be an object", "status": 400})
+        self.assertEqual(results[1]["error"], "'fields' is not supported in batch requests")
+        self.assertEqual(results[2]["error"], "'format' is not supported in batch requests")
+        self.assertIn("data", results[3])
+        self.assertEqual(self.fmp.make_request.call_count, 1)
+
+    def test_upstream_calls_respect_provider_concurrency_cap(self):
+        lock = threading.Lock()
+        active = {"now": 0, "peak": 0}
+        release = threading.Event()
+
+        def make_request(endpoint, params):
+            with lock:
+                active["now"] += 1
+                active["peak"] = max(active["peak"], active["now"])
+            release.wait(timeout=0.05)
+            with lock:
+                active["now"] -= 1
+            return {"endpoint": endpoint}
+
+        self.fmp.make_request.side_effect = make_request
+        results = self.executor.run([{"path": f"quotes/SYM{i}"} for i in range(8)])
+
+        self.assertEqual(len(results), 8)
+        self.assertLessEqual(active["peak"], 2)
+
+
+class BatchViewTest(SimpleTestCase):
+    """
+    Test suite for POST /api/v1/batch.
+    """
+
+    def setUp(self):
+        self.factory = RequestFactory()
+
+    def _post(self, body):
+        request = self.factory.post("/api/v1/batch", data=json.dumps(body), content_type="application/json")
+        return FinancialAPIView.as_view()(request)
+
+    @patch("proxy_app.views_new.batch_executor")
+    def test_batch_is_dispatched_to_executor(self, executor):
+        executor.run.return_value = [{"index": 0, "data": {"price": 1}}]
+
+        response = self._post({"requests": [{"path": "quotes/AAPL"}]})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.content), {"results": [{"index": 0, "data": {"price": 1}}], "total": 1})
+
+    @patch("proxy_app.views_new.batch_executor")
+    def test_streamed_batch_returns_ndjson(self, executor):
+        executor.iter_results.return_value = iter([{"index": 1, "data": {}}, {"index": 0, "error": "boom"}])
+
+        response = self._post({"requests": [{"path": "a"}, {"path": "b"}], "stream": True})
+        lines = b"".join(response.streaming_content).decode().splitlines()
+
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        self.assertEqual([json.loads(line)["index"] for line in lines], [1, 0])
+
+    def test_invalid_sub_requests_do_not_fail_the_batch(self):
+        response = self._post({"requests": [{"path": "quotes/AAPL", "params": "symbol=AAPL"}]})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.content)["results"][0]["status"], 400)
+
+    def test_rejects_batches_over_the_limit(self):
+        response = self._post({"requests": [{"path": "quotes/AAPL"}] * 101})
+
+        self.assertEqual(response.status_code, 400)
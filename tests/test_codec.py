@@ -0,0 +1,70 @@
+import json
+from datetime import datetime
+from decimal import Decimal
+
+from django.core.exceptions import ImproperlyConfigured
+from django.test import SimpleTestCase
+
+from proxy_app.codec import FastJSONRenderer, FastJsonResponse, JSONCodec, orjson
+
+
+class JSONCodecTest(SimpleTestCase):
+    """
+    Test suite for the shared JSON codec.
+
+    Both backends must produce the same compact bytes for provider-style payloads
+    and for the Django types orjson does not encode natively.
+    """
+
+    payload = {"symbol": "AAPL", "price": 185.64, "name": "Société Générale", "tags": [1, None, True], "nested": {"a": []}}
+
+    def _backends(self):
+        return [JSONCodec("json")] + ([JSONCodec("orjson")] if orjson is not None else [])
+
+    def test_round_trips_payloads_as_compact_utf8(self):
+        for codec in self._backends():
+            body = codec.dumps(self.payload)
+            self.assertIsInstance(body, bytes)
+            self.assertNotIn(b", ", body)
+            self.assertIn("Société".encode(), body)
+            self.assertEqual(codec.loads(body), self.payload)
+            self.assertEqual(codec.loads(body.decode()), self.payload)
+
+    def test_backends_agree_on_django_types(self):
+        value = {"amount": Decimal("1.50"), "at": datetime(2024, 1, 2, 3, 4, 5, 678901), 1: "int key"}
+
+        encoded = {codec.backend: codec.dumps(value) for codec in self._backends()}
+
+        self.assertEqual(json.loads(encoded["json"]), {"amount": "1.50", "at": "2024-01-02T03:04:05.678", "1": "int key"})
+        self.assertEqual(len(set(encoded.values())), 1)
+
+    def test_integers_beyond_64_bits_fall_back_to_stdlib(self):
+        for codec in self._backends():
+            self.assertEqual(codec.dumps([2**70]), b"[1180591620717411303424]")
+
+    def test_unknown_backend_is_rejected(self):
+        with self.assertRaises(ImproperlyConfigured):
+            JSONCodec("simdjson")
+
+
+class FastResponsesTest(SimpleTestCase):
+    """
+    Test suite for the codec-backed JsonResponse and DRF renderer.
+    """
+
+    def test_fast_json_response_matches_json_response_semantics(self):
+        response = FastJsonResponse({"price": 1}, status=201)
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response["Content-Type"], "application/json")
+        self.assertEqual(json.loads(response.content), {"price": 1})
+        self.assertEqual(json.loads(FastJsonResponse([1, 2], safe=False).content), [1, 2])
+        with self.assertRaises(TypeError):
+            FastJsonResponse([1, 2])
+
+    def test_renderer_encodes_compactly_and_honours_indent(self):
+        renderer = FastJSONRenderer()
+
+        self.assertEqual(renderer.render(None), b"")
+        self.assertEqual(renderer.render({"a": [1, 2]}), b'{"a":[1,2]}')
+        self.assertEqual(renderer.render({"a": 1}, "application/json; indent=2"), b'{\n  "a": 1\n}')
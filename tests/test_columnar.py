@@ -0,0 +1,109 @@
+import json
+import unittest
+from unittest.mock import MagicMock, patch
+
+from django.test import RequestFactory, SimpleTestCase
+
+from proxy_app.cache import LocalTTLCache, ResponseCache
+from proxy_app.columnar import CSVWriter, ParquetWriter, get_writer, pyarrow, rows_at, to_columnar
+from proxy_app.config import NotAcceptableError
+from proxy_app.proxy import FinancialDataProxy
+from proxy_app.views_new import FinancialAPIView
+
+
+def price_history(days=3):
+    return {
+        "symbol": "AAPL",
+        "historical": [{"date": f"2024-01-0{day + 1}", "close": 185.5 + day, "volume": 1000 * day} for day in range(days)],
+    }
+
+
+def read_arrow(body):
+    return pyarrow.ipc.open_stream(body).read_all()
+
+
+@unittest.skipIf(pyarrow is None, "pyarrow is not installed")
+class ColumnarWritersTest(SimpleTestCase):
+    """
+    Test suite for encoding row lists as Arrow, Parquet and CSV.
+    """
+
+    def test_columns_cover_every_key_of_any_row(self):
+        table = read_arrow(to_columnar(get_writer("arrow"), [{"t": 1, "p": 2}, {"t": 2, "p": 2.5, "x": "a"}]))
+
+        self.assertEqual(table.column_names, ["t", "p", "x"])
+        self.assertEqual(table.column("p").to_pylist(), [2.0, 2.5])
+        self.assertEqual(table.column("x").to_pylist(), [None, "a"])
+
+    def test_parquet_and_csv(self):
+        rows = [{"id": "1", "conditions": [12, 37]}, {"id": "2", "conditions": None}]
+
+        parquet = pyarrow.parquet.read_table(pyarrow.BufferReader(to_columnar(ParquetWriter(), rows)))
+        csv = to_columnar(CSVWriter(), rows)
+
+        self.assertEqual(parquet.to_pylist(), rows)
+        self.assertEqual(csv, b'"id","conditions"\n"1","[12,37]"\n"2",\n')
+
+    def test_empty_and_invalid_rows(self):
+        self.assertEqual(read_arrow(to_columnar(get_writer("arrow"), [])).num_rows, 0)
+        for rows in ([1, 2], [{"a": 1}, {"a": "x"}]):
+            with self.subTest(rows=rows), self.assertRaises(NotAcceptableError):
+                to_columnar(get_writer("csv"), rows)
+
+
+class ColumnarProxyTest(SimpleTestCase):
+    """
+    Test suite for format= in FinancialDataProxy.
+
+    Encoded bodies are derived from the cached payload and cached alongside it.
+    """
+
+    def setUp(self):
+        self.fmp = MagicMock()
+        self.fmp.make_request.return_value = price_history()
+        self.cache = ResponseCache(LocalTTLCache(max_bytes=1024 * 1024, max_entries=100))
+        self.proxy = FinancialDataProxy(providers={"fmp": self.fmp, "polygon": MagicMock()}, cache=self.cache)
+
+    @unittest.skipIf(pyarrow is None, "pyarrow is not installed")
+    def test_formats_share_one_upstream_fetch_and_are_cached(self):
+        arrow = self.proxy.fetch_raw("historical/AAPL", {"format": "arrow"})
+        again = self.proxy.fetch_raw("historical/AAPL", {"format": "ARROW"})
+        csv = self.proxy.fetch_raw("historical/AAPL", {"format": "csv", "fields": "historical.close"})
+        full = self.proxy.fetch("historical/AAPL")
+
+        self.assertEqual(arrow.media_type, "application/vnd.apache.arrow.stream")
+        self.assertEqual(read_arrow(self.proxy.encode_response(arrow)).to_pylist(), price_history()["historical"])
+        self.assertEqual((arrow.source, again.source, csv.source), ("live", "cache", "cache"))
+        self.assertEqual(again.body, arrow.body)
+        self.assertEqual(csv.body, b'"close"\n185.5\n186.5\n187.5\n')
+        self.assertEqual(full.data["historical"], price_history()["historical"])
+        self.fmp.make_request.assert_called_once()
+
+    def test_unavailable_formats_and_routes_without_rows_are_not_acceptable(self):
+        with patch.dict("proxy_app.columnar.WRITERS", {"csv": MagicMock()}):
+            for path, params in (("historical/AAPL", {"format": "xml"}), ("reference/ticker/AAPL", {"format": "csv"})):
+                with self.subTest(path=path, params=params), self.assertRaises(NotAcceptableError):
+                    self.proxy.fetch_raw(path, params)
+
+        self.assertIsNone(get_writer("json"))
+        self.assertEqual(rows_at({"results": None}, ("results",)), [])
+        self.fmp.make_request.assert_not_called()
+
+    @patch.dict("proxy_app.columnar.WRITERS", clear=True)
+    def test_view_answers_406_without_pyarrow(self):
+        response = FinancialAPIView.as_view()(RequestFactory().get("/api/v1/historical/AAPL", {"format": "parquet"}))
+
+        self.assertEqual(response.status_code, 406)
+        self.assertEqual(json.loads(response.content)["formats"], ["json"])
+
+    @unittest.skipIf(pyarrow is None, "pyarrow is not installed")
+    @patch("proxy_app.views_new.proxy")
+    def test_view_sends_the_format_media_type(self, proxy):
+        proxy.fetch_raw.side_effect = self.proxy.fetch_raw
+        proxy.encode_response.side_effect = self.proxy.encode_response
+
+        response = FinancialAPIView.as_view()(RequestFactory().get("/api/v1/historical/AAPL", {"format": "csv"}))
+
+        self.assertEqual(response["Content-Type"], "text/csv")
+        self.assertTrue(response.content.startswith(b'"date","close","volume"\n'))
+        self.assertTrue(response.has_header("ETag"))
@@ -0,0 +1,197 @@
+import gzip
+import json
+from unittest.mock import MagicMock, patch
+
+from django.test import RequestFactory, SimpleTestCase
+
+from proxy_app.cache import LocalTTLCache, ResponseCache, response_cache
+from proxy_app.compression import (
+    BrotliEncoder,
+    CompressedHead,
+    GzipEncoder,
+    Precompressor,
+    ZstdEncoder,
+    brotli,
+    finish,
+    negotiate,
+    zstandard,
+)
+from proxy_app.proxy import FinancialDataProxy
+from proxy_app.views import UnifiedFinancialAPIView
+from proxy_app.views_new import FinancialAPIView
+
+
+def decompress(encoding, body):
+    if encoding == "br":
+        return brotli.decompress(body)
+    if encoding == "zstd":
+        return zstandard.ZstdDecompressor().decompressobj().decompress(body)
+    return gzip.decompress(body)
+
+
+def available_encoders():
+    return [GzipEncoder()] + ([BrotliEncoder()] if brotli is not None else []) + ([ZstdEncoder()] if zstandard is not None else [])
+
+
+class NegotiateTest(SimpleTestCase):
+    """
+    Test suite for Accept-Encoding negotiation.
+    """
+
+    encodings = ("br", "zstd", "gzip")
+
+    def test_server_preference_breaks_ties(self):
+        self.assertEqual(negotiate("gzip, deflate, br, zstd", self.encodings), "br")
+        self.assertEqual(negotiate("gzip, identity", self.encodings), "gzip")
+        self.assertEqual(negotiate("*", ("gzip",)), "gzip")
+
+    def test_quality_values_are_honoured(self):
+        self.assertEqual(negotiate("br;q=0.5, gzip;q=0.8", self.encodings), "gzip")
+        self.assertEqual(negotiate("br;q=0, *;q=0.1", self.encodings), "zstd")
+        self.assertEqual(negotiate("GZIP ; Q=1", self.encodings), "gzip")
+
+    def test_identity_when_nothing_better_is_accepted(self):
+        for header in ("", "deflate", "gzip;q=0", "gzip;q=0.5, identity", "br;q=bad"):
+            with self.subTest(header=header):
+                self.assertIsNone(negotiate(header, self.encodings))
+
+
+class CompressedHeadTest(SimpleTestCase):
+    """
+    Test suite for finishing precompressed streams.
+
+    The stored head plus a framed tail must decode to the head followed by the tail,
+    whatever the tail's size.
+    """
+
+    body = json.dumps({"results": [{"symbol": f"S{index}", "price": index / 7} for index in range(2000)]}).encode()
+
+    def test_finished_streams_decode_to_head_and_tail(self):
+        precompressor = Precompressor(available_encoders(), ["static"])
+        for encoding in precompressor.encodings:
+            head = precompressor.compress(self.body, encoding)
+            self.assertLess(len(head.data), len(self.body) / 3)
+            self.assertEqual(head.last, b"}")
+
+            for tail in (b"}", b',"_metadata":{"source":"cache"}}', b"x" * 200000):
+                with self.subTest(encoding=encoding, tail=tail[:10]):
+                    self.assertEqual(decompress(encoding, finish(head, tail)), self.body[:-1] + tail)
+
+    def test_single_byte_bodies(self):
+        for encoder in available_encoders():
+            head = Precompressor([encoder], ["static"]).compress(b"1", encoder.encoding)
+
+            self.assertEqual(decompress(encoder.encoding, finish(head, b"2}")), b"2}")
+
+
+class PrecompressedCacheTest(SimpleTestCase):
+    """
+    Test suite for precompressed variants in ResponseCache.
+    """
+
+    def setUp(self):
+        self.cache = ResponseCache(
+            LocalTTLCache(max_bytes=1024 * 1024, max_entries=100), precompressor=Precompressor([GzipEncoder()], ["static"])
+        )
+
+    def test_fills_of_precompressed_classes_store_a_variant_per_encoding(self):
+        entry = self.cache.set("proxy:a?", {"a": 1}, "static")
+        self.cache.set("proxy:b?", {"b": 1}, "real_time")
+
+        variant = self.cache.get_encoded("proxy:a?", "static", "gzip")
+        self.assertIsInstance(variant.value, CompressedHead)
+        self.assertEqual((variant.expires_at, variant.stale_until), (entry.expires_at, entry.stale_until))
+        self.assertEqual(gzip.decompress(finish(variant.value, variant.value.last)), b'{"a":1}')
+
+        self.assertEqual(self.cache.get_encoded("proxy:b?", "real_time", "gzip").value, b'{"b":1}')
+        self.assertEqual(self.cache.get_encoded("proxy:a?", "static", None).value, b'{"a":1}')
+        self.assertIsNone(self.cache.get(self.cache.variant_key("proxy:b?", "gzip")))
+
+    def test_missing_variants_are_made_from_the_cached_body(self):
+        ResponseCache(self.cache.local).set("proxy:a?", [1, 2], "static")
+
+        variant = self.cache.get_encoded("proxy:a?", "static", "gzip")
+
+        self.assertEqual(gzip.decompress(finish(variant.value, variant.value.last)), b"[1,2]")
+        self.assertIsNotNone(self.cache.get(self.cache.variant_key("proxy:a?", "gzip")))
+        self.assertIsNone(self.cache.get_encoded("proxy:missing?", "static", "gzip"))
+
+    def test_delete_removes_variants(self):
+        self.cache.set("proxy:a?", {"a": 1}, "static")
+
+        self.cache.delete("proxy:a?")
+
+        self.assertIsNone(self.cache.get(self.cache.variant_key("proxy:a?", "gzip")))
+
+
+class PrecompressedResponseTest(SimpleTestCase):
+    """
+    Test suite for precompressed responses from the proxy and both views.
+    """
+
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.fmp = MagicMock()
+        self.fmp.make_request.return_value = [{"name": "NASDAQ"}]
+        self.cache = ResponseCache(
+            LocalTTLCache(max_bytes=1024 * 1024, max_entries=100), precompressor=Precompressor([GzipEncoder()], ["static"])
+        )
+        self.proxy = FinancialDataProxy(providers={"fmp": self.fmp, "polygon": MagicMock()}, cache=self.cache)
+
+    def tearDown(self):
+        response_cache.delete(response_cache.make_key("reference/exchanges", ()))
+        response_cache.delete(response_cache.make_key("fundamentals/AAPL/income-statement", (), namespace="unified_api"))
+
+    def test_hits_splice_metadata_into_the_stored_stream(self):
+        self.fmp.make_request.return_value = {"exchanges": ["NASDAQ"]}
+        self.proxy.fetch_raw("reference/exchanges")
+
+        result = self.proxy.fetch_raw("reference/exchanges", encoding="gzip")
+        data = json.loads(gzip.decompress(self.proxy.encode_response(result)))
+
+        self.assertEqual(result.compressed.encoding, "gzip")
+        self.assertEqual(data["exchanges"], ["NASDAQ"])
+        self.assertEqual(data["_metadata"]["source"], "cache")
+
+    def test_empty_objects_and_lists(self):
+        for payload in ({}, [{"name": "NASDAQ"}]):
+            self.cache.set(self.cache.make_key("reference/exchanges", ()), payload, "static")
+
+            result = self.proxy.fetch_raw("reference/exchanges", encoding="gzip")
+            data = json.loads(gzip.decompress(self.proxy.encode_response(result)))
+
+            with self.subTest(payload=payload):
+                if isinstance(payload, dict):
+                    self.assertEqual(data.pop("_metadata")["source"], "cache")
+                self.assertEqual(data, payload)
+
+    @patch("proxy_app.views_new.proxy")
+    def test_view_negotiates_the_encoding(self, proxy):
+        self.proxy.fetch_raw("reference/exchanges")
+        proxy.fetch_raw.side_effect = self.proxy.fetch_raw
+        proxy.encode_response.side_effect = self.proxy.encode_response
+
+        with patch("proxy_app.views_new.precompressor", self.cache.precompressor):
+            compressed = FinancialAPIView.as_view()(self.factory.get("/api/v1/reference/exchanges", HTTP_ACCEPT_ENCODING="br, gzip"))
+            plain = FinancialAPIView.as_view()(self.factory.get("/api/v1/reference/exchanges"))
+
+        self.assertEqual(compressed["Content-Encoding"], "gzip")
+        self.assertEqual(compressed["Vary"], "Accept-Encoding")
+        self.assertEqual(json.loads(gzip.decompress(compressed.content)), [{"name": "NASDAQ"}])
+        self.assertFalse(plain.has_header("Content-Encoding"))
+        self.assertEqual(plain["Vary"], "Accept-Encoding")
+
+    @patch("proxy_app.views.UnifiedFinancialAPIView._fetch_unified_response")
+    def test_legacy_view_serves_the_stored_variant(self, fetch):
+        fetch.return_value = ({"status_code": 200}, {"symbol": "AAPL", "revenue": 1})
+        request = self.factory.get("/fundamentals/AAPL/income-statement", HTTP_ACCEPT_ENCODING="gzip")
+
+        live = UnifiedFinancialAPIView.as_view()(request, path="fundamentals/AAPL/income-statement")
+        cached = UnifiedFinancialAPIView.as_view()(request, path="fundamentals/AAPL/income-statement")
+
+        self.assertEqual(live["X-Cache-Status"], "MISS")
+        self.assertFalse(live.has_header("Content-Encoding"))
+        self.assertEqual(cached["X-Cache-Status"], "HIT")
+        self.assertEqual(cached["Content-Encoding"], "gzip")
+        self.assertIn("Accept-Encoding", cached["Vary"])
+        self.assertEqual(json.loads(gzip.decompress(cached.content)), {"symbol": "AAPL", "revenue": 1})
@@ -0,0 +1,150 @@
+import json
+from unittest.mock import MagicMock, patch
+
+from django.contrib.auth.models import AnonymousUser
+from django.http import HttpResponse, HttpResponseNotModified
+from django.test import RequestFactory, SimpleTestCase
+from django.utils.http import http_date
+
+from proxy_app.cache import LocalTTLCache, ResponseCache, is_not_modified, response_cache, validator_headers
+from proxy_app.proxy import FinancialDataProxy
+from proxy_app.views import UnifiedFinancialAPIView
+from proxy_app.views_new import FinancialAPIView
+from users.counters import LimitDecision
+from users.middleware import DatabaseRateLimitMiddleware
+
+
+class CacheValidatorsTest(SimpleTestCase):
+    """
+    Test suite for content hashes of cached bodies and conditional request matching.
+    """
+
+    def setUp(self):
+        self.cache = ResponseCache(LocalTTLCache(max_bytes=1024 * 1024, max_entries=100))
+
+    def test_bodies_are_hashed_when_stored(self):
+        first = self.cache.set("proxy:a?", {"a": 1}, "static")
+        again = self.cache.set("proxy:a?", {"a": 1}, "static")
+        other = self.cache.set("proxy:b?", {"a": 2}, "static")
+        derived = self.cache.set_derived("projection:a?", b"{}", first)
+
+        self.assertEqual(first.etag, again.etag)
+        self.assertNotEqual(first.etag, other.etag)
+        self.assertNotEqual(derived.etag, first.etag)
+        self.assertEqual(validator_headers(first), {"ETag": f'W/"{first.etag}"', "Last-Modified": http_date(first.stored_at)})
+
+    def test_if_none_match_uses_weak_comparison(self):
+        entry = self.cache.set("proxy:a?", {"a": 1}, "static")
+
+        for header, expected in (
+            (f'W/"{entry.etag}"', True),
+            (f'"{entry.etag}"', True),
+            (f'"other", W/"{entry.etag}"', True),
+            ("*", True),
+            ('"other"', False),
+        ):
+            with self.subTest(header=header):
+                self.assertEqual(is_not_modified({"If-None-Match": header}, entry), expected)
+
+    def test_if_modified_since_applies_without_if_none_match(self):
+        entry = self.cache.set("proxy:a?", {"a": 1}, "static")
+
+        self.assertTrue(is_not_modified({"If-Modified-Since": http_date(entry.stored_at + 60)}, entry))
+        self.assertFalse(is_not_modified({"If-Modified-Since": http_date(entry.stored_at - 60)}, entry))
+        self.assertFalse(is_not_modified({"If-None-Match": '"other"', "If-Modified-Since": http_date(entry.stored_at)}, entry))
+        self.assertFalse(is_not_modified({}, entry))
+        self.assertFalse(is_not_modified({"If-None-Match": "*"}, entry._replace(etag="")))
+
+
+class ConditionalViewTest(SimpleTestCase):
+    """
+    Test suite for ETag validators and 304 responses in both views.
+    """
+
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.fmp = MagicMock()
+        self.fmp.make_request.return_value = {"exchanges": ["NASDAQ"]}
+        self.proxy = FinancialDataProxy(
+            providers={"fmp": self.fmp, "polygon": MagicMock()}, cache=ResponseCache(LocalTTLCache(max_bytes=1024 * 1024, max_entries=100))
+        )
+
+    def tearDown(self):
+        response_cache.delete(response_cache.make_key("etf/SPY/holdings", (), namespace="unified_api"))
+
+    @patch("proxy_app.views_new.proxy")
+    def test_revalidations_skip_encoding_the_body(self, proxy):
+        proxy.fetch_raw.side_effect = self.proxy.fetch_raw
+        proxy.encode_response.side_effect = self.proxy.encode_response
+        view = FinancialAPIView.as_view()
+
+        live = view(self.factory.get("/api/v1/reference/exchanges"))
+        cached = view(self.factory.get("/api/v1/reference/exchanges"))
+        proxy.encode_response.reset_mock()
+        revalidated = view(self.factory.get("/api/v1/reference/exchanges", HTTP_IF_NONE_MATCH=cached["ETag"]))
+        changed = view(self.factory.get("/api/v1/reference/exchanges", HTTP_IF_NONE_MATCH='W/"other"'))
+
+        self.assertFalse(live.has_header("ETag"))
+        self.assertTrue(cached["ETag"].startswith('W/"'))
+        self.assertEqual(revalidated.status_code, 304)
+        self.assertEqual(revalidated.content, b"")
+        self.assertEqual((revalidated["ETag"], revalidated["X-Cache-Status"]), (cached["ETag"], "HIT"))
+        self.assertEqual(revalidated["Last-Modified"], cached["Last-Modified"])
+        self.assertEqual(changed.status_code, 200)
+        self.assertEqual(json.loads(changed.content)["exchanges"], ["NASDAQ"])
+        proxy.encode_response.assert_called_once()
+
+    @patch("proxy_app.views.UnifiedFinancialAPIView._fetch_unified_response")
+    def test_legacy_view_answers_revalidations_with_304(self, fetch):
+        fetch.return_value = ({"status_code": 200}, {"holdings": [{"asset": "AAPL"}]})
+        view = UnifiedFinancialAPIView.as_view()
+
+        view(self.factory.get("/etf/SPY/holdings"), path="etf/SPY/holdings")
+        cached = view(self.factory.get("/etf/SPY/holdings"), path="etf/SPY/holdings")
+        revalidated = view(self.factory.get("/etf/SPY/holdings", HTTP_IF_NONE_MATCH=cached["ETag"]), path="etf/SPY/holdings")
+
+        self.assertEqual(cached.status_code, 200)
+        self.assertEqual(revalidated.status_code, 304)
+        self.assertEqual(revalidated["ETag"], cached["ETag"])
+        fetch.assert_called_once()
+
+
+class RevalidationQuotaTest(SimpleTestCase):
+    """
+    Test suite for quota consumption of revalidations in DatabaseRateLimitMiddleware.
+
+    On plans with free revalidations a conditional GET is only charged once its
+    response shows it was not answered 304 Not Modified.
+    """
+
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.user = MagicMock(is_authenticated=True, payment_restrictions_applied=False)
+        self.user.consume_rate_limits.return_value = LimitDecision(True, "OK", None, {}, {}, {}, 0)
+        self.user.has_free_revalidations.return_value = True
+
+    def _run(self, response, **headers):
+        middleware = DatabaseRateLimitMiddleware(lambda request: response)
+        request = self.factory.get("/api/v1/fundamentals/AAPL/ratios", **headers)
+        request.user = AnonymousUser()
+        with patch.object(middleware, "_authenticate_user", return_value=self.user), patch.object(middleware, "track_usage_async"):
+            return middleware(request)
+
+    def test_not_modified_revalidations_are_free(self):
+        self._run(HttpResponseNotModified(), HTTP_IF_NONE_MATCH='W/"abc"')
+
+        self.user.consume_rate_limits.assert_called_once_with("fundamentals", cost=0)
+        self.user.increment_usage_counters.assert_not_called()
+
+    def test_revalidations_answered_with_a_body_are_charged_once(self):
+        self._run(HttpResponse(b"{}"), HTTP_IF_MODIFIED_SINCE="Wed, 21 Oct 2015 07:28:00 GMT")
+
+        self.user.increment_usage_counters.assert_called_once_with("fundamentals")
+
+    def test_plans_without_free_revalidations_are_charged_up_front(self):
+        self.user.has_free_revalidations.return_value = False
+
+        self._run(HttpResponseNotModified(), HTTP_IF_NONE_MATCH='W/"abc"')
+
+        self.user.consume_rate_limits.assert_called_once_with("fundamentals", cost=1)
+        self.user.increment_usage_counters.assert_not_called()
@@ -0,0 +1,52 @@
+from datetime import date, timedelta
+
+from django.test import SimpleTestCase
+
+from proxy_app.legacy_routes import LEGACY_ENDPOINT_MAPPINGS, legacy_router, render_endpoint
+from proxy_app.management.commands.benchmark_proxy import legacy_linear_lookup, sample_path
+from proxy_app.views import UnifiedFinancialAPIView
+
+
+class LegacyRouteTableTest(SimpleTestCase):
+    """
+    Test suite for the compiled legacy route table.
+
+    Covers parity with the old regex scan, named parameter extraction,
+    template defaults and immutability of the shared table.
+    """
+
+    def test_matches_the_same_config_as_the_regex_scan(self):
+        for pattern in LEGACY_ENDPOINT_MAPPINGS:
+            with self.subTest(pattern=pattern):
+                path = sample_path(pattern)
+                self.assertEqual(dict(legacy_router.match(path).config), legacy_linear_lookup(path))
+
+    def test_params_are_substituted_by_name(self):
+        view = UnifiedFinancialAPIView()
+
+        self.assertEqual(
+            view._substitute_path_parameters("/v3/profile/{symbol}", "reference/ticker/MSFT"), "/v3/profile/MSFT"
+        )
+        self.assertEqual(
+            view._substitute_path_parameters(
+                "/v2/aggs/ticker/{symbol}/range/{multiplier}/{timespan}/{from}/{to}",
+                "aggs/ticker/AAPL/range/5/minute/2024-01-02/2024-02-01",
+            ),
+            "/v2/aggs/ticker/AAPL/range/5/minute/2024-01-02/2024-02-01",
+        )
+
+    def test_missing_fields_fall_back_to_defaults(self):
+        endpoint = render_endpoint("/v2/aggs/ticker/{symbol}/range/{multiplier}/{timespan}/{from}/{to}", {"symbol": "AAPL"})
+        today = date.today()
+
+        self.assertEqual(
+            endpoint, f"/v2/aggs/ticker/AAPL/range/1/day/{(today - timedelta(days=30)).isoformat()}/{today.isoformat()}"
+        )
+
+    def test_unknown_fields_are_left_in_place(self):
+        self.assertEqual(render_endpoint("/v3/quote/{symbols}", {}), "/v3/quote/{symbols}")
+
+    def test_table_is_shared_and_immutable(self):
+        self.assertIs(UnifiedFinancialAPIView().endpoint_mappings, UnifiedFinancialAPIView().endpoint_mappings)
+        with self.assertRaises(TypeError):
+            LEGACY_ENDPOINT_MAPPINGS["quotes/{symbol}"]["provider"] = "polygon"
@@ -0,0 +1,123 @@
+import threading
+from unittest.mock import MagicMock
+
+from django.test import SimpleTestCase
+
+from proxy_app.cache import LocalTTLCache, ResponseCache
+from proxy_app.microbatch import MicroBatcher
+from proxy_app.proxy import FinancialDataProxy
+from proxy_app.singleflight import SingleFlight
+
+
+def run_concurrently(targets):
+    """Run each target on its own thread and collect results in order"""
+    results = [None] * len(targets)
+
+    def worker(index, target):
+        results[index] = target()
+
+    threads = [threading.Thread(target=worker, args=(i, target)) for i, target in enumerate(targets)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=5)
+    return results
+
+
+class MicroBatcherTest(SimpleTestCase):
+    """
+    Test suite for merging concurrent single-item calls.
+    """
+
+    def setUp(self):
+        self.calls = []
+
+    def _fetch_many(self, group, items):
+        self.calls.append(list(items))
+        return {item: item.lower() for item in items}
+
+    def test_concurrent_items_share_one_call(self):
+        batcher = MicroBatcher(window=0.2, max_length=100)
+
+        results = run_concurrently(
+            [lambda symbol=symbol: batcher.get("quotes", symbol, self._fetch_many) for symbol in ["AAPL", "MSFT", "TSLA"]]
+        )
+
+        self.assertEqual(results, ["aapl", "msft", "tsla"])
+        self.assertEqual(len(self.calls), 1)
+        self.assertEqual(sorted(self.calls[0]), ["AAPL", "MSFT", "TSLA"])
+
+    def test_batches_close_at_the_length_budget(self):
+        batcher = MicroBatcher(window=0.2, max_length=9)
+
+        run_concurrently(
+            [lambda symbol=symbol: batcher.get("quotes", symbol, self._fetch_many) for symbol in ["AAPL", "MSFT", "TSLA"]]
+        )
+
+        self.assertEqual(sorted(len(call) for call in self.calls), [1, 2])
+        self.assertTrue(all(len(",".join(call)) <= 9 for call in self.calls))
+
+    def test_errors_are_raised_to_every_waiter(self):
+        batcher = MicroBatcher(window=0.1, max_length=100)
+
+        def failing_fetch_many(group, items):
+            raise ConnectionError("down")
+
+        def caller(symbol):
+            try:
+                return batcher.get("quotes", symbol, failing_fetch_many)
+            except ConnectionError as e:
+                return e
+
+        results = run_concurrently([lambda: caller("AAPL"), lambda: caller("MSFT")])
+
+        self.assertTrue(all(isinstance(result, ConnectionError) for result in results))
+
+    def test_zero_window_calls_through(self):
+        batcher = MicroBatcher(window=0, max_length=100)
+
+        self.assertEqual(batcher.get("quotes", "AAPL", self._fetch_many), "aapl")
+        self.assertEqual(batcher.get_stats()["batches"], 0)
+
+
+class ProxyQuoteBatchingTest(SimpleTestCase):
+    """
+    Test suite for micro-batched quote requests in FinancialDataProxy.
+    """
+
+    def setUp(self):
+        self.fmp = MagicMock()
+        self.proxy = FinancialDataProxy(
+            providers={"fmp": self.fmp, "polygon": MagicMock()},
+            cache=ResponseCache(LocalTTLCache(max_bytes=1024 * 1024, max_entries=100)),
+            flight=SingleFlight(),
+            batcher=MicroBatcher(window=0.2, max_length=100),
+        )
+
+    def test_concurrent_quote_misses_make_one_merged_call(self):
+        self.fmp.make_request.return_value = [{"symbol": "AAPL", "price": 1}, {"symbol": "MSFT", "price": 2}]
+
+        results = run_concurrently(
+            [lambda path=path: self.proxy.process_request(path) for path in ["quotes/AAPL", "quotes/msft", "quotes/XXXX"]]
+        )
+
+        self.assertEqual(self.fmp.make_request.call_count, 1)
+        endpoint = self.fmp.make_request.call_args[0][0]
+        self.assertEqual(sorted(endpoint[len("/v3/quote/"):].split(",")), ["AAPL", "XXXX", "msft"])
+        self.assertEqual(results, [[{"symbol": "AAPL", "price": 1}], [{"symbol": "MSFT", "price": 2}], []])
+
+    def test_merged_call_fills_per_symbol_cache_entries(self):
+        self.fmp.make_request.return_value = [{"symbol": "AAPL", "price": 1}, {"symbol": "MSFT", "price": 2}]
+        run_concurrently([lambda path=path: self.proxy.process_request(path) for path in ["quotes/AAPL", "quotes/MSFT"]])
+
+        cached = self.proxy.cache.get(self.proxy.cache.make_key("quotes/MSFT", ()))
+
+        self.assertEqual(cached.decode(), [{"symbol": "MSFT", "price": 2}])
+
+    def test_requests_with_query_params_are_not_batched(self):
+        self.fmp.make_request.return_value = [{"symbol": "AAPL"}]
+
+        self.proxy.process_request("quotes/AAPL", {"extended": "true"})
+
+        self.assertEqual(self.proxy.batcher.get_stats()["batches"], 0)
+        self.assertEqual(self.fmp.make_request.call_args[0][0], "/v3/quote/AAPL")
@@ -0,0 +1,167 @@
+import asyncio
+import json
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from django.contrib.auth.models import AnonymousUser
+from django.http import StreamingHttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from proxy_app.config import ProviderError
+from proxy_app.pagination import AllPagesStreamer, PageLimits, PageWalk, page_limits_for, wants_all_pages
+from proxy_app.views import UnifiedFinancialAPIView
+
+
+def cursor_pages(count, rows=2):
+    """Polygon pages linked by next_url, keyed by the link that fetches them"""
+    pages = {}
+    for number in range(count):
+        url = f"https://api.polygon.io/v3/trades/AAPL?cursor=c{number}"
+        pages[url] = {
+            "results": [{"page": number, "row": row} for row in range(rows)],
+            "status": "OK",
+            "next_url": f"https://api.polygon.io/v3/trades/AAPL?cursor=c{number + 1}" if number + 1 < count else None,
+        }
+    return list(pages.values()), pages
+
+
+def ndjson(body):
+    return [json.loads(line) for line in body.splitlines()]
+
+
+class AllPagesStreamerTest(SimpleTestCase):
+    """
+    Test suite for walking cursor pages into NDJSON.
+
+    Pages are written whole and in order; the trailing _metadata line tells how far
+    the walk got and where to resume.
+    """
+
+    def setUp(self):
+        self.streamer = AllPagesStreamer(max_workers=2)
+
+    def _walk(self, max_pages=10, max_rows=100):
+        return PageWalk(PageLimits(max_pages, max_rows), lambda url: url.replace("api.polygon.io", "proxy"))
+
+    def test_every_page_is_streamed_as_rows(self):
+        first, pages = cursor_pages(3)
+
+        lines = ndjson(b"".join(self.streamer.stream(first[0], pages.__getitem__, self._walk())))
+
+        self.assertEqual([(line["page"], line["row"]) for line in lines[:-1]], [(page, row) for page in range(3) for row in range(2)])
+        self.assertEqual(lines[-1], {"_metadata": {"pages": 3, "rows": 6, "complete": True}})
+
+    def test_walks_stop_at_the_caps_with_a_link_to_resume_from(self):
+        first, pages = cursor_pages(5)
+
+        for walk, written in ((self._walk(max_pages=2), 2), (self._walk(max_rows=5), 2), (self._walk(max_rows=1), 1)):
+            fetched = []
+            lines = ndjson(b"".join(self.streamer.stream(first[0], lambda url: fetched.append(url) or pages[url], walk)))
+            with self.subTest(limits=walk.limits):
+                self.assertEqual(len(lines) - 1, written * 2)
+                self.assertEqual(lines[-1]["_metadata"]["next_url"], f"https://proxy/v3/trades/AAPL?cursor=c{written}")
+                self.assertFalse(lines[-1]["_metadata"]["complete"])
+                self.assertLessEqual(len(fetched), written)
+
+    def test_failed_pages_end_the_walk_with_their_error(self):
+        first, pages = cursor_pages(3)
+
+        def fetch(url):
+            if url.endswith("c2"):
+                raise ProviderError("polygon", "Upstream status 502", 502)
+            return pages[url]
+
+        metadata = ndjson(b"".join(self.streamer.stream(first[0], fetch, self._walk())))[-1]["_metadata"]
+
+        self.assertEqual((metadata["pages"], metadata["complete"]), (2, False))
+        self.assertEqual(metadata["error"]["status_code"], 502)
+        self.assertTrue(metadata["next_url"].endswith("cursor=c2"))
+
+    def test_async_walk(self):
+        first, pages = cursor_pages(3)
+
+        async def fetch(url):
+            return pages[url]
+
+        async def run():
+            return b"".join([chunk async for chunk in self.streamer.astream(first[0], fetch, self._walk())])
+
+        lines = ndjson(asyncio.run(run()))
+
+        self.assertEqual(len(lines), 7)
+        self.assertTrue(lines[-1]["_metadata"]["complete"])
+
+    @override_settings(PROXY_ALL_PAGES_MAX_PAGES=7, PROXY_ALL_PAGES_MAX_ROWS=700)
+    def test_plan_caps_fall_back_to_the_defaults(self):
+        plan = SimpleNamespace(max_pages_per_request=3, max_rows_per_request=None)
+
+        self.assertEqual(page_limits_for(SimpleNamespace(current_plan=plan)), PageLimits(3, 700))
+        self.assertEqual(page_limits_for(AnonymousUser()), PageLimits(7, 700))
+        self.assertTrue(wants_all_pages({"all_pages": "True"}))
+        self.assertFalse(wants_all_pages({"all_pages": "0"}))
+
+
+class LegacyAllPagesViewTest(SimpleTestCase):
+    """
+    Test suite for all_pages=true in the legacy unified view.
+    """
+
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.first, self.pages = cursor_pages(3)
+        self.calls = []
+
+    def _send(self, call, stream=False):
+        self.calls.append(call)
+        # The first call has its parameters apart; cursor links carry them in the URL
+        page = self.pages.get(call["url"], self.first[0])
+        return {"data": json.loads(json.dumps(page)), "provider": "polygon", "endpoint": call["endpoint"], "status_code": 200}
+
+    def _get(self, path, query="all_pages=true"):
+        return UnifiedFinancialAPIView.as_view()(self.factory.get(f"/{path}?{query}"), path=path)
+
+    @patch("proxy_app.views.UnifiedFinancialAPIView._check_rate_limit", return_value=True)
+    def test_cursor_pages_are_followed_server_side(self, check_rate_limit):
+        with patch("proxy_app.views.UnifiedFinancialAPIView._send_upstream_call", side_effect=self._send):
+            response = self._get("ticks/AAPL/trades", "all_pages=true&limit=2")
+            lines = ndjson(b"".join(response.streaming_content))
+
+        self.assertIsInstance(response, StreamingHttpResponse)
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        self.assertEqual(len(lines), 7)
+        self.assertTrue(lines[-1]["_metadata"]["complete"])
+        self.assertNotIn("all_pages", self.calls[0]["params"])
+        self.assertEqual(self.calls[0]["params"]["limit"], ["2"])
+        self.assertEqual([call["params"] for call in self.calls[1:]], [{"apiKey": self.calls[0]["params"]["apiKey"]}] * 2)
+        # One upstream token for the request and one per later page
+        self.assertEqual(check_rate_limit.call_count, 3)
+
+    @patch("proxy_app.views.UnifiedFinancialAPIView._check_rate_limit", return_value=True)
+    def test_links_to_other_hosts_are_not_followed(self, _):
+        self.first[0]["next_url"] = "https://example.com/v3/trades/AAPL?cursor=c1"
+
+        with patch("proxy_app.views.UnifiedFinancialAPIView._send_upstream_call", side_effect=self._send):
+            metadata = ndjson(b"".join(self._get("ticks/AAPL/trades").streaming_content))[-1]["_metadata"]
+
+        self.assertEqual(metadata["error"]["status_code"], 502)
+        self.assertEqual(len(self.calls), 1)
+
+    @patch("proxy_app.views.UnifiedFinancialAPIView._send_upstream_call")
+    def test_first_page_errors_and_other_routes_are_answered_as_json(self, send):
+        send.return_value = {"data": {"error": "x"}, "provider": "polygon", "endpoint": "", "status_code": 503}
+
+        failed = self._get("ticks/AAPL/trades")
+        unsupported = self._get("marketstatus/upcoming")
+
+        self.assertEqual((failed.status_code, failed.data), (503, {"error": "x"}))
+        self.assertEqual(unsupported.status_code, 400)
+        send.assert_called_once()
+
+    @patch("proxy_app.views.UnifiedFinancialAPIView._check_rate_limit", return_value=True)
+    def test_rows_are_mapped_to_the_compact_schema(self, _):
+        with patch("proxy_app.views.UnifiedFinancialAPIView._send_upstream_call", side_effect=self._send):
+            lines = ndjson(b"".join(self._get("ticks/AAPL/trades", "all_pages=true&schema=compact").streaming_content))
+
+        self.assertEqual(len(lines), 7)
+        self.assertEqual(set(lines[0]), {"t", "p", "z", "x", "c", "i"})
+        self.assertNotIn("schema", self.calls[0]["params"])
@@ -173,8 +173,7 @@ class DailyLimitPermissionLogicTest(TestCase):
         result = self.permission.has_permission(request, None)
 
         self.assertTrue(result)
-        user.refresh_from_db()
-        self.assertEqual(user.daily_requests_made, 0)  # Should be reset
+        self.assertEqual(user.requests_made_today(), 0)  # Yesterday's count no longer applies
 
     def test_unauthenticated_user_allowed_through_permission(self):
         """Unauthenticated users should be allowed through this permission (handled elsewhere)"""
@@ -294,8 +293,8 @@ class DailyLimitPermissionLogicTest(TestCase):
 
         self.assertTrue(result)
 
-    def test_last_request_date_updates_on_new_day_reset(self):
-        """Last request date should update when daily count is reset"""
+    def test_new_day_check_leaves_user_row_to_reconciliation(self):
+        """Checking the limit on a new day should not write the user row; the reconciliation task does"""
         plan = Plan.objects.create(
             name="Test Plan",
             daily_request_limit=10,
@@ -303,7 +302,6 @@ class DailyLimitPermissionLogicTest(TestCase):
         )
 
         yesterday = timezone.now().date() - timezone.timedelta(days=1)
-        today = timezone.now().date()
 
         user = User.objects.create_user(email="test@example.com")
         user.current_plan = plan
@@ -313,10 +311,11 @@ class DailyLimitPermissionLogicTest(TestCase):
         user.save()
 
         request = self.create_request_with_user(user)
-        self.permission.has_permission(request, None)
+        self.assertTrue(self.permission.has_permission(request, None))
 
         user.refresh_from_db()
-        self.assertEqual(user.last_request_date, today)
+        self.assertEqual((user.last_request_date, user.daily_requests_made), (yesterday, 5))
+        self.assertEqual(user.requests_made_today(), 0)
 
     def test_concurrent_requests_handled_safely(self):
         """Permission should handle concurrent requests without race conditions"""
@@ -535,8 +534,7 @@ class PermissionEdgeCaseHandlingTest(TestCase):
             result = self.permission.has_permission(request, None)
 
             self.assertTrue(result)
-            user.refresh_from_db()
-            self.assertEqual(user.daily_requests_made, 0)
+            self.assertEqual(user.requests_made_today(), 0)
 
     def test_daylight_saving_time_transitions_handled(self):
         """Permission should handle daylight saving time transitions"""
@@ -622,10 +620,9 @@ class PermissionEdgeCaseHandlingTest(TestCase):
         request.user = user
         result = self.permission.has_permission(request, None)
 
-        # Should reset because future date != today
+        # The mirror does not count because future date != today
         self.assertTrue(result)
-        user.refresh_from_db()
-        self.assertEqual(user.daily_requests_made, 0)
+        self.assertEqual(user.requests_made_today(), 0)
 
     def test_null_values_in_user_fields_handled(self):
         """Permission should handle null values in user fields gracefully"""
@@ -0,0 +1,107 @@
+from decimal import Decimal
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import caches
+from django.test import RequestFactory, TestCase, override_settings
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.request import Request
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from users.authentication import CachedJWTAuthentication, RequestTokenAuthentication
+from users.middleware import DatabaseRateLimitMiddleware
+from users.counters import usage_counters
+from users.models import Plan, RateLimitCounter, RateLimitService, User
+
+
+@override_settings(PRINCIPAL_CACHE_TIMEOUT=60)
+class PrincipalCacheTest(TestCase):
+    """
+    Test suite for the cross-request cache of authenticated principals.
+
+    Repeat requests with the same token authenticate without a user lookup, and changes to the
+    user drop their cached principals.
+    """
+
+    def setUp(self):
+        caches['default'].clear()
+        self.plan = Plan.objects.create(name="Cached", daily_request_limit=50, price_monthly=Decimal("5.00"))
+        self.user = User.objects.create_user(email="cached@example.com", current_plan=self.plan, subscription_status="active")
+        self.user.refresh_limits_cache()
+        self.factory = RequestFactory()
+
+    def _token_request(self, token=None):
+        return self.factory.get('/api/v1/quotes/AAPL', HTTP_X_REQUEST_TOKEN=str(token or self.user.request_token))
+
+    def test_repeat_requests_skip_the_user_lookup(self):
+        RequestTokenAuthentication().authenticate(self._token_request())
+
+        with self.assertNumQueries(0):
+            user, _ = RequestTokenAuthentication().authenticate(self._token_request())
+            limits = user.rate_limit_windows()
+
+        self.assertEqual((user.pk, user.current_plan, limits['day']), (self.user.pk, self.plan, 50))
+        # Fields left out of the cache load on first access
+        self.assertEqual(user.stripe_customer_id, None)
+
+    def test_token_regeneration_and_plan_changes_drop_cached_principals(self):
+        old_token = self.user.request_token
+        RequestTokenAuthentication().authenticate(self._token_request())
+        self.user.generate_new_request_token()
+
+        with self.assertRaisesMessage(AuthenticationFailed, "Invalid token"):
+            RequestTokenAuthentication().authenticate(self._token_request(old_token))
+
+        RequestTokenAuthentication().authenticate(self._token_request())
+        upgraded = Plan.objects.create(name="Upgraded", daily_request_limit=500, price_monthly=Decimal("20.00"))
+        self.user.upgrade_to_plan(upgraded)
+        user, _ = RequestTokenAuthentication().authenticate(self._token_request())
+
+        self.assertEqual(user.current_plan, upgraded)
+
+    # The deltas must still be in the counters when the counts are reconciled
+    @override_settings(USAGE_COUNTER_FLUSH_INTERVAL=0)
+    def test_reconciled_counts_drop_cached_principals(self):
+        # Drop counts other tests left to the shared counters
+        caches['rate_limit'].clear()
+        usage_counters.flush()
+        RateLimitCounter.objects.all().delete()
+        RequestTokenAuthentication().authenticate(self._token_request())
+        for _ in range(2):
+            self.user.increment_request_count()
+
+        RateLimitService.reconcile_daily_request_counts()
+        user, _ = RequestTokenAuthentication().authenticate(self._token_request())
+
+        self.assertEqual(user.daily_requests_made, 2)
+
+    def test_saving_a_cached_principal_keeps_newer_database_state(self):
+        RequestTokenAuthentication().authenticate(self._token_request())
+        user, _ = RequestTokenAuthentication().authenticate(self._token_request())
+        # A concurrent write, e.g. a Stripe webhook, lands after the principal was cached
+        User.objects.filter(pk=self.user.pk).update(subscription_status="canceled", daily_requests_made=9)
+
+        user.token_auto_renew = True
+        user.save()
+
+        saved = User.objects.get(pk=self.user.pk)
+        self.assertEqual((saved.subscription_status, saved.daily_requests_made, saved.token_auto_renew), ("canceled", 9, True))
+
+    def test_jwt_users_are_cached(self):
+        access = str(RefreshToken.for_user(self.user).access_token)
+        CachedJWTAuthentication().authenticate(self.factory.get('/', HTTP_AUTHORIZATION=f"Bearer {access}"))
+
+        with self.assertNumQueries(0):
+            user, _ = CachedJWTAuthentication().authenticate(self.factory.get('/', HTTP_AUTHORIZATION=f"Bearer {access}"))
+
+        self.assertEqual(user.pk, self.user.pk)
+
+    def test_the_view_reuses_what_the_middleware_authenticated(self):
+        request = self._token_request()
+        request.user = AnonymousUser()
+        with self.settings(PRINCIPAL_CACHE_TIMEOUT=0):
+            user = DatabaseRateLimitMiddleware(lambda request: None)._authenticate_user(request)
+
+            with self.assertNumQueries(0):
+                drf_request = Request(request, authenticators=[CachedJWTAuthentication(), RequestTokenAuthentication()])
+
+                self.assertIs(drf_request.user, user)
@@ -0,0 +1,112 @@
+import json
+from unittest.mock import MagicMock, patch
+
+from django.test import RequestFactory, SimpleTestCase
+
+from proxy_app.cache import LocalTTLCache, ResponseCache
+from proxy_app.config import InvalidParameterError
+from proxy_app.projection import parse_fields, project
+from proxy_app.proxy import FinancialDataProxy
+from proxy_app.rewrite import compile_field_paths
+from proxy_app.views_new import FinancialAPIView
+
+
+def profile():
+    return {
+        "symbol": "AAPL",
+        "price": 185.64,
+        "mktCap": 2900000000000,
+        "officers": [{"name": "Tim Cook", "title": "CEO", "pay": 3000000}, {"name": "Luca Maestri", "title": "CFO"}],
+        "address": {"city": "Cupertino", "state": "CA"},
+    }
+
+
+class ProjectionTest(SimpleTestCase):
+    """
+    Test suite for parsing fields= and projecting payloads.
+    """
+
+    def _project(self, data, fields):
+        return project(data, compile_field_paths(parse_fields(fields)))
+
+    def test_fields_are_canonicalised(self):
+        self.assertEqual(parse_fields(" price,symbol,price ,"), ("price", "symbol"))
+
+    def test_invalid_fields_are_rejected(self):
+        for value in ("", " , ", "a..b", "a.", ",".join(f"f{index}" for index in range(65)), ".".join("a" * 9)):
+            with self.subTest(value=value), self.assertRaises(InvalidParameterError):
+                parse_fields(value)
+
+    def test_selects_nested_paths_through_lists(self):
+        data = [profile(), profile()]
+
+        projected = self._project(data, "officers.name,address.city,symbol")
+
+        self.assertEqual(
+            projected[0],
+            {"symbol": "AAPL", "officers": [{"name": "Tim Cook"}, {"name": "Luca Maestri"}], "address": {"city": "Cupertino"}},
+        )
+        self.assertEqual(len(projected), 2)
+        self.assertEqual(list(projected[0]), ["symbol", "officers", "address"])
+        self.assertEqual(data[0], profile())
+
+    def test_wildcards_and_missing_paths(self):
+        data = profile()
+
+        self.assertEqual(self._project(data, "address.*"), {"address": {"city": "Cupertino", "state": "CA"}})
+        self.assertEqual(self._project(data, "*.title"), {"officers": [{"title": "CEO"}, {"title": "CFO"}], "address": {}})
+        self.assertEqual(self._project(data, "price.value,missing"), {})
+        self.assertEqual(self._project([1, 2], "symbol"), [])
+
+
+class ProjectedProxyTest(SimpleTestCase):
+    """
+    Test suite for projection-aware caching in FinancialDataProxy.
+
+    The full payload is fetched and cached once; each projection is cached
+    separately and expires along with the payload it was derived from.
+    """
+
+    def setUp(self):
+        self.fmp = MagicMock()
+        self.fmp.make_request.return_value = [profile()]
+        self.cache = ResponseCache(LocalTTLCache(max_bytes=1024 * 1024, max_entries=100))
+        self.proxy = FinancialDataProxy(providers={"fmp": self.fmp, "polygon": MagicMock()}, cache=self.cache)
+
+    def test_projections_share_one_upstream_fetch(self):
+        first = self.proxy.fetch_raw("reference/ticker/AAPL", {"fields": "symbol,price"})
+        second = self.proxy.fetch_raw("reference/ticker/AAPL", {"fields": "price,symbol"})
+        other = self.proxy.fetch_raw("reference/ticker/AAPL", {"fields": "officers.title"})
+        full = self.proxy.fetch("reference/ticker/AAPL")
+
+        self.assertEqual(json.loads(self.proxy.encode_response(first)), [{"symbol": "AAPL", "price": 185.64}])
+        self.assertEqual((first.source, second.source, other.source, full.source), ("live", "cache", "cache", "cache"))
+        self.assertEqual(second.body, first.body)
+        self.assertEqual(json.loads(other.body), [{"officers": [{"title": "CEO"}, {"title": "CFO"}]}])
+        self.assertEqual(full.data, [profile()])
+        self.fmp.make_request.assert_called_once_with("/v3/profile/AAPL", {})
+
+    def test_projections_expire_with_their_source(self):
+        self.proxy.fetch_raw("reference/ticker/AAPL")
+        self.proxy.fetch_raw("reference/ticker/AAPL", {"fields": "symbol"})
+        source = self.cache.get(self.cache.make_key("reference/ticker/AAPL", ()))
+        projected = self.cache.get(self.cache.make_key("reference/ticker/AAPL", (("fields", "symbol"),), namespace="projection"))
+
+        self.assertEqual(projected.expires_at, source.expires_at)
+        self.assertEqual(projected.stale_until, source.stale_until)
+
+        with patch("proxy_app.cache.time.time", return_value=source.expires_at + 1):
+            with patch.object(self.proxy.revalidator, "submit") as submit:
+                stale = self.proxy.fetch_raw("reference/ticker/AAPL", {"fields": "symbol"})
+
+        self.assertEqual(stale.source, "stale")
+        submit.assert_called_once()
+
+    @patch("proxy_app.views_new.proxy")
+    def test_view_rejects_invalid_fields(self, proxy):
+        proxy.fetch_raw.side_effect = InvalidParameterError("Invalid field path: a..b")
+
+        response = FinancialAPIView.as_view()(RequestFactory().get("/api/v1/quotes/AAPL", {"fields": "a..b"}))
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(json.loads(response.content)["error"], "Invalid parameter")
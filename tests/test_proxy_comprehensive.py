@@ -16,6 +16,8 @@ from users.models import Plan, TokenHistory, User
 User = get_user_model()
 
 
+# tearDown clears the default cache, which an in-process L1 would outlive
+@override_settings(PROXY_L1_CACHE_MAX_BYTES=0)
 class PolygonProxyTestCaseBase(APITestCase):
     """
     Base test case class for Polygon API proxy tests.
@@ -0,0 +1,179 @@
+import json
+from unittest.mock import MagicMock, patch
+
+from django.core.cache import cache
+from django.test import SimpleTestCase
+
+from proxy_app.cache import CacheEntry, LocalTTLCache, ResponseCache, SharedCache, response_cache
+from proxy_app.config import CACHE_TTL, STALE_WHILE_REVALIDATE
+from proxy_app.proxy import FinancialDataProxy
+
+
+class LocalTTLCacheTest(SimpleTestCase):
+    """
+    Test suite for the in-process L1 cache.
+
+    Covers per-entry expiry, LRU eviction by byte budget and entry count,
+    and hit/miss/byte accounting.
+    """
+
+    def _entry(self, value, size=10, ttl=60, now=1000.0):
+        return CacheEntry(value=value, size=size, stored_at=now, expires_at=now + ttl)
+
+    @patch("proxy_app.cache.time.time")
+    def test_entries_expire_after_their_ttl(self, mock_time):
+        mock_time.return_value = 1000.0
+        local = LocalTTLCache(max_bytes=1000, max_entries=10)
+        local.set("quote", self._entry({"price": 1}, ttl=30))
+
+        mock_time.return_value = 1029.0
+        self.assertEqual(local.get("quote").value, {"price": 1})
+
+        mock_time.return_value = 1030.0
+        self.assertIsNone(local.get("quote"))
+        self.assertEqual(local.current_bytes, 0)
+
+    def test_evicts_least_recently_used_entries_over_byte_budget(self):
+        local = LocalTTLCache(max_bytes=25, max_entries=10)
+        local.set("a", self._entry("a", now=9e9))
+        local.set("b", self._entry("b", now=9e9))
+        local.get("a")
+        local.set("c", self._entry("c", now=9e9))
+
+        self.assertIsNone(local.get("b"))
+        self.assertIsNotNone(local.get("a"))
+        self.assertIsNotNone(local.get("c"))
+        self.assertEqual(local.current_bytes, 20)
+        self.assertEqual(local.stats.evictions, 1)
+
+    def test_skips_entries_larger_than_the_budget(self):
+        local = LocalTTLCache(max_bytes=5, max_entries=10)
+        local.set("big", self._entry("big", size=6, now=9e9))
+
+        self.assertIsNone(local.get("big"))
+        self.assertEqual(local.current_bytes, 0)
+
+    def test_counts_hits_misses_and_bytes(self):
+        local = LocalTTLCache(max_bytes=1000, max_entries=10)
+        local.set("a", self._entry("a", size=42, now=9e9))
+        local.get("a")
+        local.get("missing")
+
+        stats = local.get_stats()
+        self.assertEqual(stats["hits"], 1)
+        self.assertEqual(stats["misses"], 1)
+        self.assertEqual(stats["bytes"], 42)
+        self.assertEqual(stats["bytes_written"], 42)
+
+    def test_overridden_settings_give_the_global_cache_a_new_l1(self):
+        response_cache.local.set("a", self._entry("a", now=9e9))
+
+        with self.settings(PROXY_L1_CACHE_MAX_BYTES=0):
+            self.assertFalse(response_cache.local.enabled)
+            self.assertIsNone(response_cache.local.get("a"))
+
+        self.assertTrue(response_cache.local.enabled)
+
+
+class ResponseCacheTest(SimpleTestCase):
+    """
+    Test suite for the two-tier response cache and its use by FinancialDataProxy.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.response_cache = ResponseCache(LocalTTLCache(max_bytes=1024 * 1024, max_entries=100), SharedCache("default"))
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_shared_tier_hits_are_promoted_to_local_tier(self):
+        self.response_cache.set("key", {"a": 1}, "daily")
+        self.response_cache.local.clear()
+
+        self.assertEqual(self.response_cache.get("key").decode(), {"a": 1})
+        self.assertEqual(self.response_cache.shared.stats.hits, 1)
+        self.assertIsNotNone(self.response_cache.local.get("key"))
+
+    def test_entry_lifetime_follows_cache_class(self):
+        entry = self.response_cache.set("quote", {"price": 1}, "real_time")
+
+        self.assertEqual(entry.expires_at - entry.stored_at, CACHE_TTL["real_time"])
+        self.assertGreater(entry.size, 0)
+
+    def test_shared_tier_errors_degrade_to_misses(self):
+        shared = SharedCache("default")
+        with patch.object(SharedCache, "backend", new_callable=MagicMock) as backend:
+            backend.get.side_effect = ConnectionError("redis down")
+            self.assertIsNone(shared.get("key"))
+        self.assertEqual(shared.stats.errors, 1)
+
+    @patch("proxy_app.cache.time.time")
+    def test_proxy_refetches_real_time_data_after_stale_window(self, mock_time):
+        mock_time.return_value = 1000.0
+        provider = MagicMock()
+        provider.make_request.side_effect = [{"price": 1}, {"price": 2}]
+        proxy = FinancialDataProxy(providers={"fmp": provider, "polygon": MagicMock()}, cache=self.response_cache)
+
+        first = proxy.process_request("quotes/AAPL")
+        second = proxy.process_request("quotes/AAPL")
+        mock_time.return_value = 1000.0 + CACHE_TTL["real_time"] + STALE_WHILE_REVALIDATE["real_time"]
+        third = proxy.process_request("quotes/AAPL")
+
+        self.assertEqual(first["_metadata"]["source"], "live")
+        self.assertEqual(second["_metadata"]["source"], "cache")
+        self.assertEqual(third["price"], 2)
+        self.assertEqual(provider.make_request.call_count, 2)
+
+    def test_proxy_metadata_does_not_leak_into_cached_data(self):
+        provider = MagicMock()
+        provider.make_request.return_value = {"price": 1}
+        proxy = FinancialDataProxy(providers={"fmp": provider, "polygon": MagicMock()}, cache=self.response_cache)
+
+        proxy.process_request("quotes/AAPL")
+
+        cached = self.response_cache.get(self.response_cache.make_key("quotes/AAPL", ()))
+        self.assertNotIn("_metadata", cached.decode())
+
+
+class EncodedResponseTest(SimpleTestCase):
+    """
+    Test suite for serving cached responses from their stored JSON bodies.
+    """
+
+    def setUp(self):
+        self.response_cache = ResponseCache(LocalTTLCache(max_bytes=1024 * 1024, max_entries=100))
+        self.proxy = FinancialDataProxy(providers={"fmp": MagicMock(), "polygon": MagicMock()}, cache=self.response_cache)
+
+    def _cached_result(self, value):
+        entry = self.response_cache.set("key", value, "daily")
+        return self.proxy.serve_cached(MagicMock(provider="fmp"), entry)
+
+    def test_cache_stores_the_encoded_body(self):
+        entry = self.response_cache.set("key", {"price": 1}, "daily")
+
+        self.assertEqual(entry.value, b'{"price":1}')
+        self.assertEqual(entry.size, len(entry.value))
+
+    def test_metadata_is_spliced_into_cached_bodies_without_decoding(self):
+        result = self._cached_result({"price": 1})
+
+        with patch("proxy_app.proxy.codec.loads") as decode:
+            body = self.proxy.encode_response(result)
+        decode.assert_not_called()
+
+        data = json.loads(body)
+        self.assertEqual(data["price"], 1)
+        self.assertEqual(data["_metadata"]["source"], "cache")
+        self.assertEqual(data["_metadata"]["provider"], "fmp")
+
+    def test_empty_objects_and_non_objects_are_handled(self):
+        self.assertEqual(json.loads(self.proxy.encode_response(self._cached_result({})))["_metadata"]["source"], "cache")
+        self.assertEqual(self.proxy.encode_response(self._cached_result([1, 2])), b"[1,2]")
+
+    def test_python_callers_get_decoded_data(self):
+        result = self.proxy.with_metadata(self._cached_result({"price": 1}))
+
+        self.assertIsNone(result.body)
+        self.assertEqual(result.data["price"], 1)
+        self.assertEqual(result.data["_metadata"]["source"], "cache")
@@ -0,0 +1,124 @@
+from unittest.mock import MagicMock
+
+from django.test import SimpleTestCase, override_settings
+
+from proxy_app.cache import LocalTTLCache, ResponseCache
+from proxy_app.proxy import FinancialDataProxy
+from proxy_app.rewrite import PolygonPaginationRewriter, ProviderURLRewriter, compile_field_paths
+
+
+@override_settings(FINANCIALDATA_BASE_URL="https://financialdata.online")
+class ProviderURLRewriterTest(SimpleTestCase):
+    """
+    Test suite for in-place provider URL rewriting.
+
+    Covers the full walk, containers under URL-named fields, and walks limited
+    to a route's declared url_fields.
+    """
+
+    def setUp(self):
+        self.rewriter = ProviderURLRewriter()
+
+    def test_rewrites_provider_urls_at_any_depth_in_place(self):
+        rows = [{"image": "https://financialmodelingprep.com/image-stock/AAPL.png", "price": 1}]
+        data = {"results": rows, "links": ["https://api.polygon.io/v3/trades/AAPL?cursor=abc"], "name": "Apple"}
+
+        result = self.rewriter.rewrite(data)
+
+        self.assertIs(result, data)
+        self.assertIs(result["results"], rows)
+        self.assertEqual(rows[0]["image"], "https://financialdata.online/api/v1/image-stock/AAPL.png")
+        self.assertEqual(data["links"], ["https://financialdata.online/api/v1/trades/AAPL?cursor=abc"])
+        self.assertEqual(data["name"], "Apple")
+
+    def test_leaves_other_urls_and_own_domain_alone(self):
+        data = {"url": "https://www.sec.gov/filing", "next_url": "https://financialdata.online/api/v1/x"}
+
+        self.assertEqual(self.rewriter.rewrite(dict(data)), data)
+
+    def test_containers_under_url_fields_are_not_walked(self):
+        nested = {"href": "https://api.polygon.io/v2/x"}
+
+        self.rewriter.rewrite({"link": nested})
+
+        self.assertEqual(nested["href"], "https://api.polygon.io/v2/x")
+
+    def test_scalar_payloads_are_converted(self):
+        self.assertEqual(self.rewriter.rewrite("https://api.polygon.io/v2/x"), "https://financialdata.online/api/v1/x")
+        self.assertEqual(self.rewriter.rewrite(42), 42)
+
+    def test_declared_url_fields_limit_the_walk(self):
+        data = {
+            "next_url": "https://api.polygon.io/v3/trades/AAPL?cursor=abc",
+            "results": [{"branding": {"logo_url": "https://api.polygon.io/v1/logo.svg"}, "homepage": "https://api.polygon.io/"}],
+        }
+
+        self.rewriter.rewrite(data, compile_field_paths(("next_url", "results.*.branding")))
+
+        self.assertEqual(data["next_url"], "https://financialdata.online/api/v1/trades/AAPL?cursor=abc")
+        self.assertEqual(data["results"][0]["branding"]["logo_url"], "https://financialdata.online/api/v1/logo.svg")
+        self.assertEqual(data["results"][0]["homepage"], "https://api.polygon.io/")
+
+    def test_empty_url_fields_skip_the_payload(self):
+        rows = [{"link": "https://financialmodelingprep.com/x"}]
+
+        self.rewriter.rewrite(rows, compile_field_paths(()))
+
+        self.assertEqual(rows[0]["link"], "https://financialmodelingprep.com/x")
+
+    def test_proxy_uses_the_routes_url_fields(self):
+        provider = MagicMock()
+        provider.make_request.return_value = [{"symbol": "AAPL", "note": "https://financialmodelingprep.com/x"}]
+        proxy = FinancialDataProxy(
+            providers={"fmp": provider, "polygon": MagicMock()},
+            cache=ResponseCache(LocalTTLCache(max_bytes=1024 * 1024, max_entries=100)),
+        )
+
+        data = proxy.process_request("bulk/eod-prices")
+
+        self.assertEqual(data[0]["note"], "https://financialmodelingprep.com/x")
+
+
+class PolygonPaginationRewriterTest(SimpleTestCase):
+    """
+    Test suite for the legacy view's Polygon pagination cleaning.
+    """
+
+    def setUp(self):
+        self.rewriter = PolygonPaginationRewriter("api.financialdata.online")
+
+    def test_cleans_pagination_links_and_bookkeeping_in_nested_dicts(self):
+        data = {
+            "status": "OK",
+            "next_url": "https://api.polygon.io/v3/trades/AAPL?cursor=abc&apiKey=secret",
+            "results": [{"request_id": "x", "next": "http://api.polygon.io/v2/aggs?apiKey=secret"}],
+        }
+
+        self.rewriter.rewrite(data)
+
+        self.assertNotIn("status", data)
+        self.assertEqual(data["next_url"], "https://api.financialdata.online/v1/trades/AAPL?cursor=abc")
+        self.assertEqual(data["results"][0], {"next": "https://api.financialdata.online/v1/aggs"})
+
+    def test_declared_url_fields_limit_rewriting_but_not_stripping(self):
+        rows = [{"request_id": "x", "price": 1, "next": "https://api.polygon.io/v2/aggs", "meta": {"queryCount": 1}}]
+        data = {"status": "OK", "next_url": "https://api.polygon.io/v3/trades/AAPL?cursor=abc", "results": rows}
+
+        self.rewriter.rewrite(data, compile_field_paths(("next_url",)))
+
+        self.assertNotIn("status", data)
+        self.assertEqual(data["next_url"], "https://api.financialdata.online/v1/trades/AAPL?cursor=abc")
+        self.assertEqual(rows, [{"price": 1, "next": "https://api.polygon.io/v2/aggs", "meta": {}}])
+
+    def test_empty_url_fields_still_strip_nested_bookkeeping(self):
+        data = {"status": "OK", "results": [{"request_id": "x", "price": 1}]}
+
+        self.rewriter.rewrite(data, compile_field_paths(()))
+
+        self.assertEqual(data, {"results": [{"price": 1}]})
+
+    def test_non_object_payloads_pass_through(self):
+        rows = [{"status": "OK"}]
+
+        self.assertIs(self.rewriter.rewrite(rows), rows)
+        self.assertEqual(rows, [{"status": "OK"}])
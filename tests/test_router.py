@@ -0,0 +1,75 @@
+from django.test import SimpleTestCase
+
+from proxy_app.config import ENDPOINT_ROUTES
+from proxy_app.management.commands.benchmark_proxy import sample_path
+from proxy_app.proxy import FinancialDataProxy
+from proxy_app.router import Router, router
+
+
+class RouterMatchingTest(SimpleTestCase):
+    """
+    Test suite for the segment trie router.
+
+    Covers literal and placeholder segments, precedence between them,
+    backtracking, and named parameter extraction.
+    """
+
+    def setUp(self):
+        self.router = Router(
+            {
+                "quotes/{symbol}": {"name": "quote"},
+                "quotes/gainers": {"name": "gainers"},
+                "quotes/{symbol}/last-trade": {"name": "last_trade"},
+                "options/chain/{symbol}": {"name": "chain"},
+                "options/{contract}/historical": {"name": "contract_history"},
+            }
+        )
+
+    def test_extracts_named_params(self):
+        match = self.router.match("quotes/AAPL/last-trade")
+
+        self.assertEqual(match.config["name"], "last_trade")
+        self.assertEqual(match.params, {"symbol": "AAPL"})
+
+    def test_literal_segment_wins_over_placeholder(self):
+        match = self.router.match("quotes/gainers")
+
+        self.assertEqual(match.config["name"], "gainers")
+        self.assertEqual(match.params, {})
+
+    def test_falls_back_to_placeholder_when_literal_branch_dead_ends(self):
+        match = self.router.match("quotes/gainers/last-trade")
+
+        self.assertEqual(match.config["name"], "last_trade")
+        self.assertEqual(match.params, {"symbol": "gainers"})
+
+    def test_returns_none_for_unknown_paths(self):
+        self.assertIsNone(self.router.match("quotes"))
+        self.assertIsNone(self.router.match("quotes/AAPL/unknown"))
+        self.assertIsNone(self.router.match("unknown/AAPL"))
+
+    def test_empty_segments_do_not_match_placeholders(self):
+        self.assertIsNone(self.router.match("quotes/"))
+        self.assertIsNone(self.router.match("quotes//last-trade"))
+
+
+class EndpointRouteTableTest(SimpleTestCase):
+    """
+    Test suite for the router built from ENDPOINT_ROUTES and its use by the proxy.
+    """
+
+    def test_every_configured_route_is_reachable(self):
+        for pattern in ENDPOINT_ROUTES:
+            with self.subTest(pattern=pattern):
+                match = router.match(sample_path(pattern))
+                self.assertIsNotNone(match)
+                self.assertEqual(match.route.pattern, pattern)
+
+    def test_proxy_transforms_request_with_extracted_params(self):
+        proxy = FinancialDataProxy(providers={})
+        route_match = router.match("analysts/MSFT/price-targets")
+
+        endpoint, params = proxy._transform_request(route_match.params, {"limit": "5"}, route_match.config)
+
+        self.assertEqual(endpoint, "/v4/price-target")
+        self.assertEqual(params, {"limit": "5", "symbol": "MSFT"})
@@ -0,0 +1,123 @@
+import json
+from unittest.mock import patch
+
+from django.http import StreamingHttpResponse
+from django.test import RequestFactory, SimpleTestCase
+
+from proxy_app.cache import response_cache
+from proxy_app.schemas import compile_mapper, exchange_time_to_ms, normalize_compact, parse_schema
+from proxy_app.views import UnifiedFinancialAPIView
+
+FMP_QUOTE = {
+    "symbol": "AAPL",
+    "name": "Apple Inc.",
+    "price": 185.64,
+    "changesPercentage": 1.2,
+    "change": 2.2,
+    "dayLow": 183.1,
+    "dayHigh": 186.0,
+    "open": 184.0,
+    "previousClose": 183.44,
+    "volume": 51000000,
+    "timestamp": 1704229200,
+}
+
+POLYGON_SNAPSHOT = {
+    "ticker": "AAPL",
+    "todaysChange": 2.2,
+    "todaysChangePerc": 1.2,
+    "updated": 1704229200000000000,
+    "day": {"o": 184.0, "h": 186.0, "l": 183.1, "c": 185.64, "v": 51000000, "vw": 185.1},
+    "lastTrade": {"p": 185.64, "s": 100},
+    "prevDay": {"c": 183.44},
+}
+
+
+class CompactSchemaTest(SimpleTestCase):
+    """
+    Test suite for compact normalizers.
+
+    The same market data from either provider must normalize to identical rows.
+    """
+
+    def test_quotes_from_both_providers_share_one_schema(self):
+        fmp = normalize_compact([FMP_QUOTE], ("quote", ()), "fmp")
+        polygon = normalize_compact({"status": "OK", "tickers": [POLYGON_SNAPSHOT]}, ("quote", ("tickers",)), "polygon")
+
+        self.assertEqual(fmp, polygon)
+        self.assertEqual(fmp["results"][0]["t"], 1704229200000)
+
+    def test_bars_from_both_providers_share_one_schema(self):
+        fmp = {"symbol": "AAPL", "historical": [{"date": "2024-01-02", "open": 1, "high": 2, "low": 0.5, "close": 1.5, "volume": 10}]}
+        polygon = {
+            "results": [{"t": 1704171600000, "o": 1, "h": 2, "l": 0.5, "c": 1.5, "v": 10}],
+            "next_url": "https://api.financialdata.online/v1/aggs?cursor=x",
+        }
+
+        fmp_rows = normalize_compact(fmp, ("bar", ("historical",)), "fmp")["results"]
+        polygon_compact = normalize_compact(polygon, ("bar", ("results",)), "polygon")
+
+        self.assertEqual(fmp_rows, polygon_compact["results"])
+        self.assertEqual(polygon_compact["next_url"], polygon["next_url"])
+        self.assertEqual(exchange_time_to_ms("2024-07-01 09:30:00"), 1719840600000)
+
+    def test_single_rows_missing_fields_and_errors(self):
+        profile = normalize_compact({"results": {"ticker": "AAPL", "name": "Apple Inc."}}, ("profile", ("results",)), "polygon")
+        mapper = compile_mapper((("a", "x.y.z"), ("b", None), ("c", "n", str)))
+
+        self.assertEqual(profile["results"][0]["n"], "Apple Inc.")
+        self.assertIsNone(profile["results"][0]["sec"])
+        self.assertEqual(mapper({"x": {"y": None}, "n": 1}), {"a": None, "b": None, "c": "1"})
+        self.assertEqual(normalize_compact({"Error Message": "Limit"}, ("quote", ()), "fmp"), {"Error Message": "Limit"})
+
+    def test_schema_param(self):
+        self.assertIsNone(parse_schema({}))
+        self.assertIsNone(parse_schema({"schema": "raw"}))
+        self.assertEqual(parse_schema({"schema": "compact"}), "compact")
+        with self.assertRaises(ValueError):
+            parse_schema({"schema": "short"})
+
+
+class LegacyCompactViewTest(SimpleTestCase):
+    """
+    Test suite for schema=compact in the legacy unified view.
+    """
+
+    def setUp(self):
+        self.factory = RequestFactory()
+
+    def tearDown(self):
+        for path, params in (("quotes/AAPL", [("schema", ["compact"])]), ("ticks/AAPL/trades", [("schema", ["compact"])])):
+            response_cache.delete(response_cache.make_key(path, tuple(params), namespace="unified_api"))
+
+    def _get(self, path, query="schema=compact"):
+        return UnifiedFinancialAPIView.as_view()(self.factory.get(f"/{path}?{query}"), path=path)
+
+    @patch("proxy_app.views.UnifiedFinancialAPIView._send_upstream_call")
+    def test_compact_responses_are_cached_separately(self, send):
+        send.return_value = {"data": [FMP_QUOTE], "provider": "fmp", "endpoint": "", "status_code": 200}
+
+        live = self._get("quotes/AAPL")
+        cached = self._get("quotes/AAPL")
+
+        self.assertEqual(live.data["results"][0]["p"], 185.64)
+        self.assertEqual(json.loads(cached.content), live.data)
+        self.assertEqual(cached["X-Cache-Status"], "HIT")
+        self.assertNotIn("schema", send.call_args.args[0]["params"])
+
+    @patch("proxy_app.views.UnifiedFinancialAPIView._send_upstream_call")
+    def test_streamed_routes_are_buffered_to_normalize(self, send):
+        trade = {"sip_timestamp": 1704229200123456789, "price": 185.64, "size": 100, "exchange": 4, "conditions": [12], "id": "1"}
+        send.return_value = {"data": {"results": [trade], "status": "OK"}, "provider": "polygon", "endpoint": "", "status_code": 200}
+
+        response = self._get("ticks/AAPL/trades")
+
+        self.assertNotIsInstance(response, StreamingHttpResponse)
+        self.assertEqual(response.data, {"results": [{"t": 1704229200123456789, "p": 185.64, "z": 100, "x": 4, "c": [12], "i": "1"}]})
+        self.assertFalse(send.call_args.kwargs.get("stream", False))
+
+    @patch("proxy_app.views.UnifiedFinancialAPIView._send_upstream_call")
+    def test_unknown_schemas_and_routes_without_one_are_rejected(self, send):
+        self.assertEqual(self._get("quotes/AAPL", "schema=short").status_code, 400)
+        self.assertEqual(self._get("fundamentals/AAPL/ratios").status_code, 400)
+        send.assert_not_called()
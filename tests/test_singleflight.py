@@ -0,0 +1,129 @@
+import threading
+import time
+from unittest.mock import MagicMock
+
+from django.core.cache import cache
+from django.test import SimpleTestCase
+
+from proxy_app.cache import LocalTTLCache, ResponseCache
+from proxy_app.proxy import FinancialDataProxy
+from proxy_app.singleflight import SingleFlight
+
+
+def run_concurrently(count, target):
+    """Start count threads on target and wait for all of them"""
+    results = [None] * count
+    errors = [None] * count
+
+    def worker(index):
+        try:
+            results[index] = target()
+        except Exception as e:
+            errors[index] = e
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=5)
+    return results, errors
+
+
+class SingleFlightTest(SimpleTestCase):
+    """
+    Test suite for single-flight coalescing of concurrent identical calls.
+    """
+
+    def setUp(self):
+        self.flight = SingleFlight()
+        self.started = threading.Event()
+        self.release = threading.Event()
+
+    def _slow_call(self, value):
+        self.started.set()
+        self.release.wait(timeout=5)
+        return value
+
+    def test_concurrent_callers_share_one_execution(self):
+        calls = []
+
+        def fetch():
+            calls.append(1)
+            return self._slow_call({"symbol": "AAPL"})
+
+        def caller():
+            return self.flight.do("quotes/AAPL", fetch)
+
+        leader = threading.Thread(target=caller)
+        leader.start()
+        self.started.wait(timeout=5)
+
+        followers = []
+        for _ in range(4):
+            follower = threading.Thread(target=caller)
+            follower.start()
+            followers.append(follower)
+        while self.flight.coalesced < 4:
+            time.sleep(0.001)
+        self.release.set()
+
+        for thread in [leader] + followers:
+            thread.join(timeout=5)
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(self.flight.get_stats()["executions"], 1)
+        self.assertEqual(self.flight.get_stats()["calls_saved"], 4)
+        self.assertEqual(self.flight.get_stats()["in_flight"], 0)
+
+    def test_followers_receive_the_leaders_exception(self):
+        def failing_fetch():
+            self.started.set()
+            self.release.wait(timeout=5)
+            raise ValueError("upstream failed")
+
+        def caller():
+            return self.flight.do("quotes/AAPL", failing_fetch)
+
+        threading.Timer(0.05, self.release.set).start()
+        results, errors = run_concurrently(3, caller)
+
+        self.assertTrue(all(isinstance(error, ValueError) for error in errors))
+        self.assertEqual(self.flight.executions + self.flight.coalesced, 3)
+
+    def test_different_keys_do_not_coalesce(self):
+        self.assertEqual(self.flight.do("a", lambda: 1), (1, False))
+        self.assertEqual(self.flight.do("b", lambda: 2), (2, False))
+        self.assertEqual(self.flight.executions, 2)
+
+
+class ProxyCoalescingTest(SimpleTestCase):
+    """
+    Test suite for upstream coalescing in FinancialDataProxy.
+    """
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_concurrent_misses_make_one_provider_call(self):
+        release = threading.Event()
+        provider = MagicMock()
+
+        def make_request(endpoint, params):
+            release.wait(timeout=5)
+            return [{"symbol": "AAPL", "price": 1}]
+
+        provider.make_request.side_effect = make_request
+        flight = SingleFlight()
+        proxy = FinancialDataProxy(
+            providers={"fmp": provider, "polygon": MagicMock()},
+            cache=ResponseCache(LocalTTLCache(max_bytes=1024 * 1024, max_entries=100)),
+            flight=flight,
+        )
+
+        threading.Timer(0.1, release.set).start()
+        results, errors = run_concurrently(5, lambda: proxy.process_request("quotes/AAPL"))
+
+        self.assertEqual(errors, [None] * 5)
+        self.assertTrue(all(result == [{"symbol": "AAPL", "price": 1}] for result in results))
+        self.assertEqual(provider.make_request.call_count, 1)
+        self.assertEqual(flight.executions, 1)
@@ -0,0 +1,132 @@
+from unittest.mock import MagicMock, patch
+
+from django.core.cache import cache
+from django.test import SimpleTestCase
+
+from proxy_app.cache import BackgroundRevalidator, LocalTTLCache, ResponseCache, cache_status_headers
+from proxy_app.config import CACHE_TTL, MAX_STALENESS, STALE_WHILE_REVALIDATE
+from proxy_app.proxy import FinancialDataProxy
+from proxy_app.singleflight import SingleFlight
+
+
+class InlineRevalidator(BackgroundRevalidator):
+    """Runs refreshes synchronously so tests can observe their effect"""
+
+    def __init__(self):
+        super().__init__(max_workers=1)
+        self.submitted = []
+
+    def submit(self, key, fn, *args):
+        self.submitted.append(key)
+        self._run(key, fn, args)
+        return True
+
+
+class StaleEntryTest(SimpleTestCase):
+    """
+    Test suite for stale windows on response cache entries.
+    """
+
+    def setUp(self):
+        self.response_cache = ResponseCache(LocalTTLCache(max_bytes=1024 * 1024, max_entries=100))
+
+    @patch("proxy_app.cache.time.time")
+    def test_stale_entries_are_only_returned_when_allowed(self, mock_time):
+        mock_time.return_value = 1000.0
+        self.response_cache.set("quote", {"price": 1}, "real_time")
+
+        mock_time.return_value = 1000.0 + CACHE_TTL["real_time"]
+        self.assertIsNone(self.response_cache.get("quote"))
+        entry = self.response_cache.get("quote", allow_stale=True)
+
+        self.assertFalse(entry.is_fresh())
+        self.assertEqual(entry.decode(), {"price": 1})
+        self.assertEqual(self.response_cache.get_stats()["stale_hits"], 1)
+
+    @patch("proxy_app.cache.time.time")
+    def test_entries_are_dropped_after_the_stale_window(self, mock_time):
+        mock_time.return_value = 1000.0
+        self.response_cache.set("quote", {"price": 1}, "real_time")
+
+        mock_time.return_value = 1000.0 + CACHE_TTL["real_time"] + STALE_WHILE_REVALIDATE["real_time"]
+        self.assertIsNone(self.response_cache.get("quote", allow_stale=True))
+
+    def test_stale_window_is_bounded_by_max_staleness(self):
+        for cache_class in STALE_WHILE_REVALIDATE:
+            self.assertLessEqual(ResponseCache.stale_window_for(cache_class), MAX_STALENESS)
+
+    def test_status_headers(self):
+        self.assertEqual(cache_status_headers("live"), {"X-Cache-Status": "MISS"})
+        self.assertEqual(cache_status_headers("cache", 5), {"X-Cache-Status": "HIT", "Age": "5"})
+        self.assertEqual(cache_status_headers("stale", 40)["Warning"], '110 - "Response is Stale"')
+
+
+class BackgroundRevalidatorTest(SimpleTestCase):
+    """
+    Test suite for the background refresh pool.
+    """
+
+    def test_skips_keys_with_a_pending_refresh(self):
+        revalidator = BackgroundRevalidator(max_workers=1)
+        revalidator._pending.add("quote")
+
+        self.assertFalse(revalidator.submit("quote", MagicMock()))
+        self.assertEqual(revalidator.scheduled, 0)
+
+    def test_failures_are_counted_and_release_the_key(self):
+        revalidator = BackgroundRevalidator(max_workers=1)
+        revalidator._run("quote", MagicMock(side_effect=ConnectionError("down")), ())
+
+        self.assertEqual(revalidator.failed, 1)
+        self.assertEqual(revalidator.get_stats()["pending"], 0)
+
+
+class ProxyStaleWhileRevalidateTest(SimpleTestCase):
+    """
+    Test suite for stale-while-revalidate serving in FinancialDataProxy.
+    """
+
+    def setUp(self):
+        self.provider = MagicMock()
+        self.revalidator = InlineRevalidator()
+        self.proxy = FinancialDataProxy(
+            providers={"fmp": self.provider, "polygon": MagicMock()},
+            cache=ResponseCache(LocalTTLCache(max_bytes=1024 * 1024, max_entries=100)),
+            flight=SingleFlight(),
+            revalidator=self.revalidator,
+        )
+
+    def tearDown(self):
+        cache.clear()
+
+    @patch("proxy_app.cache.time.time")
+    def test_serves_stale_data_and_refreshes_in_background(self, mock_time):
+        mock_time.return_value = 1000.0
+        self.provider.make_request.side_effect = [{"price": 1}, {"price": 2}]
+        self.proxy.fetch("quotes/AAPL")
+
+        mock_time.return_value = 1000.0 + CACHE_TTL["real_time"] + 1
+        stale = self.proxy.fetch("quotes/AAPL")
+        fresh = self.proxy.fetch("quotes/AAPL")
+
+        self.assertEqual(stale.source, "stale")
+        self.assertEqual(stale.data["price"], 1)
+        self.assertEqual(stale.data["_metadata"]["source"], "stale")
+        self.assertEqual(stale.age, CACHE_TTL["real_time"] + 1)
+        self.assertEqual(fresh.source, "cache")
+        self.assertEqual(fresh.data["price"], 2)
+        self.assertEqual(self.provider.make_request.call_count, 2)
+        self.assertEqual(len(self.revalidator.submitted), 1)
+
+    @patch("proxy_app.cache.time.time")
+    def test_failed_refresh_keeps_serving_stale_data(self, mock_time):
+        mock_time.return_value = 1000.0
+        self.provider.make_request.side_effect = [{"price": 1}, ConnectionError("down")]
+        self.proxy.fetch("quotes/AAPL")
+
+        mock_time.return_value = 1000.0 + CACHE_TTL["real_time"] + 1
+        result = self.proxy.fetch("quotes/AAPL")
+
+        self.assertEqual(result.source, "stale")
+        self.assertEqual(result.data["price"], 1)
+        self.assertEqual(self.revalidator.failed, 1)
@@ -0,0 +1,243 @@
+import asyncio
+import json
+import random
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from django.http import StreamingHttpResponse
+from django.test import RequestFactory, SimpleTestCase
+
+from proxy_app.cache import LocalTTLCache, ResponseCache, response_cache
+from proxy_app.config import ProviderError
+from proxy_app.providers import PolygonProvider
+from proxy_app.proxy import FinancialDataProxy
+from proxy_app.rewrite import PolygonPaginationRewriter, compile_field_paths
+from proxy_app.streaming import BodyCapture, JSONMemberFilter, MemberAppender, iter_transformed
+from proxy_app.views import UnifiedFinancialAPIView
+
+
+def trades_page(rows, symbol='te"st]{\\'):
+    """A Polygon trades page whose row strings contain brackets, quotes and escapes"""
+    return {
+        "results": [{"conditions": [12, 37], "id": str(index), "price": 185.64, "symbol": symbol} for index in range(rows)],
+        "status": "OK",
+        "request_id": "b3f1",
+        "next_url": "https://api.polygon.io/v3/trades/AAPL?cursor=abc&apiKey=secret",
+        "count": rows,
+        "nested": {"empty": {}, "list": []},
+    }
+
+
+def split_randomly(body, seed):
+    """Split body into chunks at random offsets, including single bytes"""
+    rng = random.Random(seed)
+    cuts = sorted(rng.sample(range(1, len(body)), min(len(body) - 1, rng.randint(1, 40))))
+    return [body[start:end] for start, end in zip([0] + cuts, cuts + [len(body)])]
+
+
+class JSONMemberFilterTest(SimpleTestCase):
+    """
+    Test suite for the incremental top-level member filter.
+
+    However the body is chunked, the streamed output must decode to the same
+    payload as rewriting the fully parsed response.
+    """
+
+    def _cleaner_filter(self):
+        return JSONMemberFilter.for_rewriter(PolygonPaginationRewriter("api.financialdata.online"), compile_field_paths(("next_url",)))
+
+    def _stream(self, chunks, *transforms):
+        return b"".join(iter_transformed(iter(chunks), list(transforms)))
+
+    def test_chunked_output_matches_the_buffered_rewrite(self):
+        for symbol in ('te"st]{\\', "plain"):
+            payload = trades_page(50, symbol)
+            body = json.dumps(payload, indent=1).encode()
+            expected = PolygonPaginationRewriter("api.financialdata.online").rewrite(payload, compile_field_paths(("next_url",)))
+
+            for seed in range(25):
+                with self.subTest(symbol=symbol, seed=seed):
+                    self.assertEqual(json.loads(self._stream(split_randomly(body, seed), self._cleaner_filter())), expected)
+
+    def test_unselected_members_are_forwarded_byte_for_byte(self):
+        body = b'{"results": [ {"a" : 1.50e3} ],"next_url":"https://api.polygon.io/v3/x?apiKey=k"}'
+
+        output = self._stream([body[:9], body[9:30], body[30:]], self._cleaner_filter())
+
+        self.assertEqual(output, b'{"results":[ {"a" : 1.50e3} ],"next_url":"https://api.financialdata.online/v1/x"}')
+
+    def test_non_object_documents_pass_through(self):
+        body = b' [{"status": "OK"}, 1]'
+
+        self.assertEqual(self._stream([body[:3], body[3:]], self._cleaner_filter()), body.lstrip())
+
+    def test_truncated_documents_fail_on_close(self):
+        with self.assertRaises(ValueError):
+            self._stream([b'{"results": [1, 2'], self._cleaner_filter())
+
+    def test_rewriters_with_nothing_to_do_need_no_filter(self):
+        self.assertIsNone(JSONMemberFilter.for_rewriter(PolygonPaginationRewriter("x", strip_fields=()), compile_field_paths(())))
+
+
+class StreamTransformsTest(SimpleTestCase):
+    """
+    Test suite for member appending and capture of streamed bodies.
+    """
+
+    def _stream(self, chunks, *transforms):
+        return b"".join(iter_transformed(iter(chunks), list(transforms)))
+
+    def test_members_are_appended_to_objects_only(self):
+        self.assertEqual(self._stream([b'{"a":', b"1} \n"], MemberAppender({"m": 1})), b'{"a":1,"m":1}')
+        self.assertEqual(json.loads(self._stream([b"{", b" }"], MemberAppender({"m": 1}))), {"m": 1})
+        self.assertEqual(self._stream([b"[1,", b"2]"], MemberAppender({"m": 1})), b"[1,2]")
+
+    def test_capture_keeps_bodies_within_its_budget(self):
+        captured = []
+
+        self._stream([b"[1,", b"2]"], BodyCapture(5, captured.append))
+        self._stream([b"[1,", b"2,3]"], BodyCapture(5, captured.append))
+
+        self.assertEqual(captured, [b"[1,2]"])
+
+    def test_abandoned_streams_are_not_captured_and_close_their_source(self):
+        captured = []
+        source = MagicMock()
+        source.__iter__.return_value = iter([b"[1,", b"2]"])
+
+        stream = iter_transformed(source, [BodyCapture(100, captured.append)])
+        next(stream)
+        stream.close()
+
+        self.assertEqual(captured, [])
+        source.close.assert_called_once()
+
+
+class StreamedProxyTest(SimpleTestCase):
+    """
+    Test suite for streamed routes in FinancialDataProxy.
+    """
+
+    def setUp(self):
+        self.polygon = MagicMock()
+        self.cache = ResponseCache(LocalTTLCache(max_bytes=1024 * 1024, max_entries=100))
+        self.proxy = FinancialDataProxy(providers={"polygon": self.polygon, "fmp": MagicMock()}, cache=self.cache)
+        self.body = json.dumps(trades_page(3)).encode()
+
+    def test_streamed_miss_rewrites_urls_and_caches_the_complete_body(self):
+        self.polygon.stream_request.return_value = iter(split_randomly(self.body, 1))
+
+        result = self.proxy.fetch_raw("ticks/AAPL/trades", stream=True)
+        data = json.loads(b"".join(self.proxy.stream_response(result)))
+
+        self.assertEqual(data["next_url"], "https://financialdata.online/api/v1/trades/AAPL?cursor=abc&apiKey=secret")
+        self.assertEqual(data["results"], trades_page(3)["results"])
+        self.assertEqual(data["_metadata"]["source"], "live")
+        self.polygon.make_request.assert_not_called()
+
+        cached = self.proxy.fetch_raw("ticks/AAPL/trades", stream=True)
+        self.assertEqual(cached.source, "cache")
+        self.assertNotIn("_metadata", json.loads(cached.body))
+        self.assertEqual(self.polygon.stream_request.call_count, 1)
+
+    @patch("proxy_app.proxy.stream_cache_max_bytes", return_value=100)
+    def test_bodies_over_the_capture_budget_are_not_cached(self, _):
+        self.polygon.stream_request.return_value = iter([self.body])
+
+        list(self.proxy.stream_response(self.proxy.fetch_raw("ticks/AAPL/trades", stream=True)))
+
+        self.assertIsNone(self.cache.get(self.cache.make_key("ticks/AAPL/trades", ())))
+
+    def test_other_routes_and_plain_fetches_are_buffered(self):
+        self.polygon.make_request.return_value = {"results": []}
+
+        self.assertIsNone(self.proxy.fetch_raw("ticks/AAPL/quotes", stream=True).chunks)
+        self.assertIsNone(self.proxy.fetch_raw("ticks/AAPL/trades").chunks)
+        self.polygon.stream_request.assert_not_called()
+
+    def test_async_streamed_miss(self):
+        async def chunks():
+            for chunk in split_randomly(self.body, 2):
+                yield chunk
+
+        self.polygon.stream_request_async = AsyncMock(return_value=chunks())
+
+        async def run():
+            result = await self.proxy.fetch_raw_async("ticks/AAPL/trades", stream=True)
+            return b"".join([chunk async for chunk in self.proxy.stream_response(result)])
+
+        data = json.loads(asyncio.run(run()))
+
+        self.assertEqual(data["count"], 3)
+        self.assertEqual(data["_metadata"]["provider"], "polygon")
+
+
+class ProviderStreamRequestTest(SimpleTestCase):
+    """
+    Test suite for opening streamed provider responses.
+    """
+
+    def _response(self, status_code=200, content_type="application/json"):
+        response = MagicMock(status_code=status_code, reason="Error", headers={"Content-Type": content_type})
+        response.iter_content.return_value = iter([b"[1,", b"2]"])
+        return response
+
+    @patch("proxy_app.providers.upstream_limiter")
+    def test_errors_are_raised_before_the_body_is_read(self, _):
+        provider = PolygonProvider("key")
+        for response in (self._response(status_code=404), self._response(content_type="text/csv")):
+            with patch.object(provider.session, "get", return_value=response):
+                with self.assertRaises(ProviderError):
+                    provider.stream_request("/v3/trades/AAPL")
+            response.close.assert_called_once()
+            response.iter_content.assert_not_called()
+
+    @patch("proxy_app.providers.upstream_limiter")
+    def test_body_is_streamed_and_the_response_closed(self, _):
+        provider = PolygonProvider("key")
+        response = self._response()
+
+        with patch.object(provider.session, "get", return_value=response) as get:
+            self.assertEqual(b"".join(provider.stream_request("/v3/trades/AAPL", {"limit": "5"})), b"[1,2]")
+
+        self.assertTrue(get.call_args.kwargs["stream"])
+        self.assertEqual(get.call_args.kwargs["params"], {"limit": "5", "apikey": "key"})
+        response.close.assert_called_once()
+
+
+class LegacyStreamedViewTest(SimpleTestCase):
+    """
+    Test suite for streamed routes in the legacy unified view.
+    """
+
+    def setUp(self):
+        self.factory = RequestFactory()
+
+    def tearDown(self):
+        response_cache.delete(response_cache.make_key("ticks/AAPL/trades", (), namespace="unified_api"))
+
+    @patch("proxy_app.views.UnifiedFinancialAPIView._send_upstream_call")
+    def test_polygon_pages_are_cleaned_as_they_stream(self, send):
+        body = json.dumps(trades_page(2)).encode()
+        send.return_value = {"chunks": iter(split_randomly(body, 3)), "provider": "polygon", "endpoint": "", "status_code": 200}
+
+        response = UnifiedFinancialAPIView.as_view()(self.factory.get("/ticks/AAPL/trades"), path="ticks/AAPL/trades")
+
+        self.assertIsInstance(response, StreamingHttpResponse)
+        self.assertEqual(response["X-Cache-Status"], "MISS")
+        data = json.loads(b"".join(response.streaming_content))
+        self.assertNotIn("status", data)
+        self.assertEqual(data["next_url"], "https://api.financialdata.online/v1/trades/AAPL?cursor=abc")
+        self.assertTrue(send.call_args.kwargs["stream"])
+
+        cached = UnifiedFinancialAPIView.as_view()(self.factory.get("/ticks/AAPL/trades"), path="ticks/AAPL/trades")
+        self.assertEqual(cached["X-Cache-Status"], "HIT")
+        self.assertEqual(json.loads(cached.content), data)
+
+    @patch("proxy_app.views.UnifiedFinancialAPIView._send_upstream_call")
+    def test_upstream_errors_are_answered_as_before(self, send):
+        send.return_value = {"data": {"error": "x"}, "provider": "polygon", "endpoint": "", "status_code": 503}
+
+        response = UnifiedFinancialAPIView.as_view()(self.factory.get("/ticks/AAPL/trades"), path="ticks/AAPL/trades")
+
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.data, {"error": "x"})
@@ -0,0 +1,106 @@
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from unittest.mock import MagicMock, patch
+
+from django.test import SimpleTestCase
+
+from proxy_app.providers import FMPProvider, PolygonProvider
+from proxy_app.transport import CachedDNSHTTPConnection, DNSCache, UpstreamTransport, dns_cache, upstream_transport
+
+
+class _KeepAliveHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        body = b'{"ok": true}'
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class UpstreamTransportTest(SimpleTestCase):
+    """
+    Test suite for the process-wide pooled upstream transport.
+    """
+
+    def test_providers_share_one_session_per_provider(self):
+        self.assertIs(FMPProvider("a").session, FMPProvider("b").session)
+        self.assertIs(FMPProvider("a").session, upstream_transport.session("fmp"))
+        self.assertIsNot(FMPProvider("a").session, PolygonProvider("a").session)
+
+    def test_pool_size_follows_max_connections_per_host(self):
+        transport = UpstreamTransport(max_connections_per_host=7)
+
+        adapter = transport.session("fmp").get_adapter("https://financialmodelingprep.com")
+
+        self.assertEqual(adapter._pool_maxsize, 7)
+
+    def test_connections_are_kept_alive_and_counted(self):
+        server = HTTPServer(("127.0.0.1", 0), _KeepAliveHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        transport = UpstreamTransport(max_connections_per_host=2)
+        url = f"http://127.0.0.1:{server.server_port}/v3/quote/AAPL"
+
+        for _ in range(3):
+            self.assertEqual(transport.session("fmp").get(url, timeout=5).json(), {"ok": True})
+
+        host_stats = transport.get_stats()["providers"]["fmp"][f"http://127.0.0.1:{server.server_port}"]
+        self.assertEqual(host_stats["requests"], 3)
+        self.assertEqual(host_stats["connections_opened"], 1)
+        self.assertEqual(host_stats["idle_connections"], 1)
+
+
+class DNSCacheTest(SimpleTestCase):
+    """
+    Test suite for the upstream DNS cache.
+    """
+
+    def _addrinfo(self, *addresses):
+        return [(2, 1, 6, "", (address, 443)) for address in addresses]
+
+    @patch("proxy_app.transport.time.time")
+    @patch("proxy_app.transport.socket.getaddrinfo")
+    def test_resolutions_are_cached_for_the_ttl(self, getaddrinfo, mock_time):
+        getaddrinfo.side_effect = [self._addrinfo("10.0.0.1"), self._addrinfo("10.0.0.2")]
+        mock_time.return_value = 1000.0
+        dns = DNSCache(ttl=60)
+
+        self.assertEqual(dns.resolve("api.polygon.io", 443), ("10.0.0.1",))
+        self.assertEqual(dns.resolve("api.polygon.io", 443), ("10.0.0.1",))
+        mock_time.return_value = 1060.0
+        self.assertEqual(dns.resolve("api.polygon.io", 443), ("10.0.0.2",))
+        self.assertEqual(dns.get_stats()["hits"], 1)
+
+    @patch("proxy_app.transport.socket.getaddrinfo")
+    def test_invalidated_entries_are_resolved_again(self, getaddrinfo):
+        getaddrinfo.side_effect = [self._addrinfo("10.0.0.1"), self._addrinfo("10.0.0.2")]
+        dns = DNSCache(ttl=60)
+
+        dns.resolve("api.polygon.io", 443)
+        dns.invalidate("api.polygon.io", 443)
+
+        self.assertEqual(dns.resolve("api.polygon.io", 443), ("10.0.0.2",))
+
+    @patch("proxy_app.transport.socket.getaddrinfo")
+    def test_connections_fall_back_to_the_hosts_other_addresses(self, getaddrinfo):
+        getaddrinfo.return_value = self._addrinfo("10.0.0.1", "10.0.0.1", "127.0.0.1")
+        self.addCleanup(dns_cache.invalidate, "api.polygon.io", 8443)
+        attempts = []
+
+        def create_connection(address, *args, **kwargs):
+            attempts.append(address[0])
+            if address[0] == "10.0.0.1":
+                raise OSError("unreachable")
+            return MagicMock()
+
+        with patch("urllib3.connection.connection.create_connection", side_effect=create_connection):
+            CachedDNSHTTPConnection("api.polygon.io", 8443)._new_conn()
+
+        self.assertEqual(attempts, ["10.0.0.1", "127.0.0.1"])
@@ -0,0 +1,148 @@
+import threading
+from unittest.mock import MagicMock, patch
+
+from django.test import RequestFactory, SimpleTestCase
+
+from proxy_app.cache import response_cache
+from proxy_app.config import RateLimitError
+from proxy_app.providers import FMPProvider
+from proxy_app.ratelimit import RateLimitDecision, TokenBucketLimiter
+from proxy_app.views import UnifiedFinancialAPIView
+
+
+class TokenBucketLimiterTest(SimpleTestCase):
+    """
+    Test suite for the upstream token-bucket limiter.
+
+    Exercises the in-process buckets used when the cache alias is not Redis;
+    the Redis script implements the same arithmetic.
+    """
+
+    def _limiter(self, limit=60, burst=3, max_wait=0.0):
+        return TokenBucketLimiter(alias="default", limits={"fmp": limit}, burst={"fmp": burst}, max_wait=max_wait)
+
+    def test_bucket_refill_keeps_every_minute_within_the_budget(self):
+        capacity, refill_per_ms = self._limiter(limit=1000, burst=100).bucket_for("fmp")
+
+        self.assertEqual(capacity, 100)
+        self.assertAlmostEqual(capacity + refill_per_ms * 60000, 1000)
+
+    @patch("proxy_app.ratelimit.time.time")
+    def test_rejects_once_the_burst_is_spent_and_reports_retry_time(self, mock_time):
+        mock_time.return_value = 1000.0
+        limiter = self._limiter(limit=63, burst=3)
+
+        decisions = [limiter.reserve("fmp") for _ in range(4)]
+
+        self.assertEqual([d.allowed for d in decisions], [True, True, True, False])
+        # Refill is one token per second once the burst is gone
+        self.assertAlmostEqual(decisions[-1].wait, 1.0)
+        self.assertEqual(limiter.get_stats()["rejected"], 1)
+
+    @patch("proxy_app.ratelimit.time.time")
+    def test_tokens_refill_over_time(self, mock_time):
+        mock_time.return_value = 1000.0
+        limiter = self._limiter(limit=63, burst=3)
+        for _ in range(3):
+            limiter.reserve("fmp")
+
+        mock_time.return_value = 1002.0
+
+        self.assertTrue(limiter.reserve("fmp").allowed)
+        self.assertTrue(limiter.reserve("fmp").allowed)
+        self.assertFalse(limiter.reserve("fmp").allowed)
+
+    @patch("proxy_app.ratelimit.time.time")
+    def test_short_bursts_queue_for_a_reserved_token(self, mock_time):
+        mock_time.return_value = 1000.0
+        limiter = self._limiter(limit=61, burst=1, max_wait=2.5)
+
+        waits = [limiter.reserve("fmp") for _ in range(4)]
+
+        self.assertEqual([d.allowed for d in waits], [True, True, True, False])
+        self.assertEqual([d.wait for d in waits[:3]], [0.0, 1.0, 2.0])
+        self.assertEqual(limiter.get_stats()["delayed"], 2)
+
+    def test_concurrent_callers_never_overdraw_the_bucket(self):
+        limiter = self._limiter(limit=60000, burst=50)
+        allowed = []
+
+        def worker():
+            for _ in range(20):
+                if limiter.reserve("fmp").allowed:
+                    allowed.append(1)
+
+        with patch("proxy_app.ratelimit.time.time", return_value=1000.0):
+            threads = [threading.Thread(target=worker) for _ in range(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join(timeout=5)
+
+        self.assertEqual(len(allowed), 50)
+
+    def test_unknown_providers_are_not_limited(self):
+        self.assertTrue(self._limiter().reserve("other").allowed)
+
+    def test_limiter_fails_open_when_redis_is_unavailable(self):
+        limiter = self._limiter()
+        script = MagicMock(side_effect=ConnectionError("redis down"))
+
+        with patch.object(limiter, "_redis_script", return_value=script):
+            decision = limiter.reserve("fmp")
+
+        self.assertTrue(decision.allowed)
+        self.assertEqual(limiter.errors, 1)
+
+
+class ProviderRateLimitTest(SimpleTestCase):
+    """
+    Test suite for providers drawing from the shared upstream limiter.
+    """
+
+    @patch("proxy_app.providers.upstream_limiter")
+    def test_provider_raises_when_the_bucket_is_empty(self, limiter):
+        limiter.acquire.return_value = RateLimitDecision(False, 1.5)
+        provider = FMPProvider("key")
+
+        with patch.object(provider.session, "get") as get:
+            with self.assertRaises(RateLimitError):
+                provider.make_request("/v3/quote/AAPL")
+            get.assert_not_called()
+        limiter.acquire.assert_called_once_with("fmp")
+
+
+@patch("proxy_app.views.upstream_limiter")
+@patch("proxy_app.views.UnifiedFinancialAPIView._send_upstream_call")
+class LegacyViewRateLimitTest(SimpleTestCase):
+    """
+    Test suite for the legacy view drawing from the shared upstream limiter.
+
+    Only requests that reach the provider take a token.
+    """
+
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.addCleanup(response_cache.delete, response_cache.make_key("etf/SPY/holdings", (), namespace="unified_api"))
+
+    def _get(self, **headers):
+        return UnifiedFinancialAPIView.as_view()(self.factory.get("/etf/SPY/holdings", **headers), path="etf/SPY/holdings")
+
+    def test_cache_hits_and_revalidations_leave_the_bucket_untouched(self, send, limiter):
+        send.return_value = {"data": {"holdings": []}, "provider": "fmp", "endpoint": "", "status_code": 200}
+        limiter.acquire.return_value = RateLimitDecision(True, 0.0)
+
+        self._get()
+        cached = self._get()
+        revalidated = self._get(HTTP_IF_NONE_MATCH=cached["ETag"])
+
+        self.assertEqual((cached.status_code, revalidated.status_code), (200, 304))
+        limiter.acquire.assert_called_once_with("fmp")
+
+    def test_misses_without_a_token_are_answered_429(self, send, limiter):
+        limiter.acquire.return_value = RateLimitDecision(False, 1.5)
+
+        response = self._get()
+
+        self.assertEqual((response.status_code, response.data), (429, {"error": "Rate limit exceeded", "provider": "fmp"}))
+        send.assert_not_called()
@@ -0,0 +1,356 @@
+import json
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from unittest.mock import MagicMock, patch
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import caches
+from django.http import HttpResponse
+from django.db import DataError, connection
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from users.counters import UsageCounters, execute_upsert, parse_delta_field, usage_counters, window_bounds
+from proxy_app.cache import response_cache
+from users.middleware import DatabaseRateLimitMiddleware
+from users.models import Plan, RateLimitCounter, RateLimitService, User
+
+NOW = datetime(2024, 1, 31, 23, 59, 30, tzinfo=timezone.utc)
+FEBRUARY = datetime(2024, 2, 1, tzinfo=timezone.utc)
+
+
+class UsageCountersTest(SimpleTestCase):
+    """
+    Test suite for the windowed usage counters.
+
+    Every window of a request is counted in one round trip, under a key named after the window.
+    """
+
+    def setUp(self):
+        caches['rate_limit'].clear()
+        self.counters = UsageCounters('rate_limit')
+
+    def test_windows_are_counted_together_and_roll_over(self):
+        windows = ('minute', 'hour', 'day', 'month')
+
+        self.counters.increment('user_1', 'quotes', windows, now=NOW)
+        counts = self.counters.increment('user_1', 'quotes', windows, now=NOW)
+        rolled = self.counters.increment('user_1', 'quotes', windows, now=FEBRUARY)
+
+        self.assertEqual(counts, {'minute': 2, 'hour': 2, 'day': 2, 'month': 2})
+        self.assertEqual(rolled, {'minute': 1, 'hour': 1, 'day': 1, 'month': 1})
+        self.assertEqual(self.counters.get_counts('user_1', 'quotes', windows, now=NOW), counts)
+        self.assertEqual(self.counters.get_counts('user_2', 'quotes', ('hour',), now=NOW), {'hour': 0})
+        self.assertEqual(window_bounds('month', NOW), (datetime(2024, 1, 1, tzinfo=timezone.utc), FEBRUARY))
+
+    def test_redis_increments_all_windows_in_one_transaction(self):
+        client = MagicMock()
+        pipe = client.pipeline.return_value
+        pipe.execute.return_value = [3, True, 1, 40, True, 1]
+
+        with patch.object(self.counters, '_redis', return_value=client):
+            counts = self.counters.increment('user_1', 'quotes', ('hour', 'day'), now=NOW)
+
+        self.assertEqual(counts, {'hour': 3, 'day': 40})
+        client.pipeline.assert_called_once_with(transaction=True)
+        pipe.execute.assert_called_once()
+        pipe.incrby.assert_any_call('usage:user_1:quotes:hour:202401312300', 1)
+        # Keys expire when the following window ends, plus a grace period
+        day_after = datetime(2024, 2, 2, tzinfo=timezone.utc)
+        pipe.expireat.assert_any_call('usage:user_1:quotes:day:202401310000', int(day_after.timestamp()) + 60)
+        # The delta for the write-behind flush goes out in the same round trip
+        field = pipe.hincrby.call_args_list[0].args[1]
+        self.assertEqual(parse_delta_field(field), ('user_1', 'quotes', 'hour', datetime(2024, 1, 31, 23, tzinfo=timezone.utc)))
+
+    def test_unreachable_redis_fails_open(self):
+        client = MagicMock()
+        client.pipeline.return_value.execute.side_effect = ConnectionError("down")
+        client.mget.side_effect = ConnectionError("down")
+
+        with patch.object(self.counters, '_redis', return_value=client):
+            self.assertEqual(self.counters.increment('user_1', 'quotes', ('hour',)), {'hour': 0})
+            self.assertEqual(self.counters.get_counts('user_1', 'quotes', ('hour',)), {'hour': 0})
+
+        self.assertEqual(self.counters.errors, 2)
+        self.assertEqual(self.counters._deltas, {})
+
+
+class ConsumeTest(SimpleTestCase):
+    """
+    Test suite for the atomic multi-window limiter decision.
+
+    Windows slide over the previous fixed window, and the burst limit paces requests at the hourly rate.
+    """
+
+    def setUp(self):
+        caches['rate_limit'].clear()
+        self.counters = UsageCounters('rate_limit')
+
+    def _consume(self, now, limits=None, **kwargs):
+        return self.counters.consume('user_1', 'quotes', limits or {'hour': 3, 'day': 100}, now=now, **kwargs)
+
+    def test_sliding_windows_allow_no_double_burst_at_a_boundary(self):
+        end_of_hour = datetime(2024, 1, 31, 23, 59, tzinfo=timezone.utc)
+
+        allowed = [self._consume(end_of_hour).allowed for _ in range(4)]
+        denied = self._consume(end_of_hour + timedelta(minutes=2))
+        later = self._consume(end_of_hour + timedelta(minutes=21))
+
+        self.assertEqual(allowed, [True, True, True, False])
+        self.assertEqual((denied.allowed, denied.exceeded, denied.reason), (False, 'hour', 'hourly limit reached (3/3)'))
+        # Room for one more request opens once a third of the previous hour has slid out
+        self.assertEqual(denied.retry_after, 19 * 60)
+        self.assertTrue(later.allowed)
+        self.assertEqual((later.usage['hour'], later.remaining['day']), (3, 96))
+        self.assertEqual(later.reset['hour'], int(datetime(2024, 2, 1, 1, tzinfo=timezone.utc).timestamp()))
+
+    def test_checks_do_not_count_and_denials_count_nothing(self):
+        self.assertTrue(self._consume(NOW, cost=0).allowed)
+        for _ in range(4):
+            self._consume(NOW)
+
+        self.assertEqual(self.counters.get_counts('user_1', 'quotes', ('hour', 'day'), now=NOW), {'hour': 3, 'day': 3})
+
+    def test_burst_limit_paces_requests_at_the_hourly_rate(self):
+        limits = {'hour': 60, 'day': 1000}
+
+        decisions = [self._consume(NOW, limits, burst=2) for _ in range(3)]
+        paced = self._consume(NOW + timedelta(minutes=1), limits, burst=2)
+
+        self.assertEqual([decision.allowed for decision in decisions], [True, True, False])
+        self.assertEqual((decisions[2].exceeded, decisions[2].retry_after), ('burst', 60))
+        self.assertTrue(paced.allowed)
+
+    def test_redis_decides_in_one_script_call(self):
+        script = MagicMock(return_value=[0, 0, 2, 5, 7, 0])
+
+        with patch.object(self.counters, '_script', return_value=script):
+            decision = self._consume(NOW, burst=10)
+
+        keys = script.call_args.kwargs['keys']
+        self.assertEqual(keys[:2], ['usage:user_1:quotes:hour:202401312300', 'usage:user_1:quotes:hour:202401312200'])
+        self.assertEqual(keys[-2:], ['usage:user_1:quotes:burst', 'usage:deltas'])
+        # 59.5 minutes into the hour, 1/120 of the previous hour's 5 requests still count
+        self.assertEqual((decision.allowed, decision.usage, decision.remaining), (True, {'hour': 3, 'day': 7}, {'hour': 0, 'day': 93}))
+        script.assert_called_once()
+
+    def test_tallies_count_allowed_requests_without_being_checked(self):
+        tallies = (('*', 'day'),)
+        decisions = [self._consume(NOW, tallies=tallies).allowed for _ in range(4)]
+        self._consume(NOW, cost=0, tallies=tallies)
+        script = MagicMock(return_value=[0, 0, 1, 0, 1, 0])
+
+        with patch.object(self.counters, '_script', return_value=script):
+            self._consume(NOW, tallies=tallies)
+
+        self.assertEqual(decisions, [True, True, True, False])
+        self.assertEqual(self.counters.get_counts('user_1', '*', ('day',), now=NOW), {'day': 3})
+        keys, args = script.call_args.kwargs['keys'], script.call_args.kwargs['args']
+        self.assertEqual(keys[4:], ['usage:user_1:*:day:202401310000', 'usage:user_1:quotes:burst', 'usage:deltas'])
+        self.assertEqual(args[4], 1)
+        self.assertEqual(parse_delta_field(args[-1])[:3], ('user_1', '*', 'day'))
+
+    def test_anonymous_requests_are_limited_per_window(self):
+        middleware = DatabaseRateLimitMiddleware(lambda request: HttpResponse())
+        factory = RequestFactory()
+
+        def get():
+            request = factory.get('/api/v1/quotes/AAPL', REMOTE_ADDR='10.0.0.1')
+            request.user = AnonymousUser()
+            with patch.object(middleware, 'track_usage_async'):
+                return middleware(request)
+
+        statuses = [get().status_code for _ in range(6)]
+        denied = get()
+
+        self.assertEqual(statuses, [200] * 5 + [429])
+        self.assertEqual(int(denied['Retry-After']), json.loads(denied.content)['retry_after'])
+        self.assertEqual(json.loads(denied.content)['window_type'], 'minute')
+
+
+class UsageFlushTest(TestCase):
+    """
+    Test suite for the write-behind flush of usage counters into RateLimitCounter.
+
+    Deltas gathered between flushes are added to their rows with one upsert per flush.
+    """
+
+    def setUp(self):
+        caches['rate_limit'].clear()
+        self.counters = UsageCounters('rate_limit')
+
+    def _rows(self):
+        return {(row.identifier, row.window_type): row.count for row in RateLimitCounter.objects.filter(endpoint='quotes')}
+
+    def test_deltas_are_upserted_once_per_flush(self):
+        for _ in range(3):
+            self.counters.increment('user_1', 'quotes', ('hour', 'day'), now=NOW)
+        self.counters.consume('user_1', 'quotes', {'hour': 10}, now=NOW)
+        self.counters.consume('user_2', 'quotes', {'hour': 10}, now=NOW, cost=0)
+
+        with CaptureQueriesContext(connection) as queries:
+            written = self.counters.flush()
+        self.counters.increment('user_1', 'quotes', ('hour',), now=NOW)
+        self.counters.flush()
+
+        self.assertEqual(written, 2)
+        self.assertEqual([query['sql'].split()[0] for query in queries if 'SAVEPOINT' not in query['sql']], ['INSERT'])
+        self.assertEqual(self._rows(), {('user_1', 'hour'): 5, ('user_1', 'day'): 3})
+        day = RateLimitCounter.objects.get(identifier='user_1', window_type='day')
+        self.assertEqual(day.window_start, datetime(2024, 1, 31, tzinfo=timezone.utc))
+        self.assertEqual(self.counters.flush(), 0)
+
+    def test_failed_flushes_hand_their_deltas_back(self):
+        self.counters.increment('user_1', 'quotes', ('hour',), now=NOW)
+
+        with patch('users.counters.upsert_usage', side_effect=RuntimeError('database down')), self.assertRaises(RuntimeError):
+            self.counters.flush()
+        self.counters.increment('user_1', 'quotes', ('hour',), now=NOW)
+        self.counters.flush()
+
+        self.assertEqual(self._rows(), {('user_1', 'hour'): 2})
+
+    def test_oversized_and_tabbed_names_are_counted_under_names_that_fit(self):
+        self.counters.increment('ip_1.2.3.4\tspoofed', 'quotes', ('hour',), now=NOW)
+        self.counters.increment('user_1', 'quotes/' + 'x' * 300, ('hour',), now=NOW)
+
+        self.assertEqual(self.counters.flush(), 2)
+
+        rows = RateLimitCounter.objects.values_list('identifier', 'endpoint')
+        self.assertIn(('ip_1.2.3.4 spoofed', 'quotes'), rows)
+        long_endpoint = RateLimitCounter.objects.get(identifier='user_1').endpoint
+        self.assertEqual((len(long_endpoint), long_endpoint[:7]), (200, 'quotes/'))
+
+    def test_rows_the_database_rejects_are_dropped_without_blocking_the_batch(self):
+
+        def reject_long_endpoints(cursor, rows):
+            # What Postgres does with a value over the column's max_length
+            if any(len(row[1]) > 200 for row in rows):
+                raise DataError('value too long for type character varying(200)')
+            execute_upsert(cursor, rows)
+
+        self.counters.increment('user_1', 'quotes', ('hour',), now=NOW)
+        self.counters._deltas[('user_1', 'x' * 300, 'hour', NOW.replace(minute=0, second=0, microsecond=0))] = 1
+
+        with patch('users.counters.execute_upsert', side_effect=reject_long_endpoints):
+            self.assertEqual(self.counters.flush(), 1)
+        self.assertEqual(self.counters.flush(), 0)
+
+        self.assertEqual(self._rows(), {('user_1', 'hour'): 1})
+
+    def test_malformed_redis_delta_fields_are_dropped(self):
+        take = MagicMock(return_value=[b'ip_1.2.3.4\tx', b'3', b'user_1\tquotes\thour\t1706742000000', b'4'])
+        release = MagicMock()
+
+        with patch.object(self.counters, '_script', side_effect=lambda source: take if 'HGETALL' in source else release):
+            self.assertEqual(self.counters.flush(), 1)
+
+        self.assertEqual(self._rows(), {('user_1', 'hour'): 4})
+        self.assertEqual(release.call_args.kwargs['args'][1], 1)
+
+    def test_redis_batches_are_deleted_only_once_written(self):
+        take, release = MagicMock(return_value=[b'user_1\tquotes\thour\t1706742000000', b'4']), MagicMock()
+        scripts = {'take': take, 'release': release}
+
+        with patch.object(self.counters, '_script', side_effect=lambda source: scripts['take' if 'HGETALL' in source else 'release']):
+            self.counters.flush()
+            with patch('users.counters.upsert_usage', side_effect=RuntimeError('database down')), self.assertRaises(RuntimeError):
+                self.counters.flush()
+            take.return_value = None
+            self.assertEqual(self.counters.flush(), 0)
+
+        self.assertEqual(self._rows(), {('user_1', 'hour'): 4})
+        self.assertEqual([call.kwargs['args'][1] for call in release.call_args_list], [1, 0])
+        self.assertEqual(release.call_args.kwargs['keys'], ['usage:deltas:flushing', 'usage:deltas:lock'])
+
+    def test_flush_thread_stops_when_the_interval_is_set_to_zero(self):
+        counters = UsageCounters('rate_limit', flush_interval=5)
+        counters._flusher = MagicMock()
+
+        with self.settings(USAGE_COUNTER_FLUSH_INTERVAL=0):
+            self.assertEqual(usage_counters.flush_interval, 0)
+        with patch('users.counters.time.sleep', side_effect=lambda seconds: setattr(counters, 'flush_interval', 0)):
+            with patch.object(counters, 'flush') as flush:
+                counters._flush_forever()
+
+        flush.assert_not_called()
+        self.assertIsNone(counters._flusher)
+
+
+# Deltas stay in the counters until a test flushes them
+@override_settings(USAGE_COUNTER_FLUSH_INTERVAL=0)
+class DailyRequestCountTest(TestCase):
+    """
+    Test suite for daily request counts kept in the usage counters.
+
+    Requests are counted without writing the user row; daily_requests_made is a mirror the reconciliation task keeps.
+    """
+
+    def setUp(self):
+        caches['rate_limit'].clear()
+        # Drop deltas other tests left to the shared counters
+        usage_counters.flush()
+        RateLimitCounter.objects.all().delete()
+        plan = Plan.objects.create(name="Daily", daily_request_limit=3, price_monthly=Decimal("5.00"))
+        self.user = User.objects.create_user(email="daily@example.com", current_plan=plan, subscription_status="active")
+
+    def test_requests_are_counted_without_user_row_writes(self):
+        with self.assertNumQueries(0):
+            for _ in range(3):
+                self.user.increment_request_count()
+            allowed, reason = self.user.can_make_request()
+
+        self.assertEqual((allowed, reason), (False, "daily request limit reached"))
+        # The last request admitted by the middleware is already in the count
+        self.assertEqual(self.user.can_make_request(counted=True), (True, "OK"))
+        self.assertEqual(User.objects.get(pk=self.user.pk).daily_requests_made, 0)
+        self.assertEqual(User.objects.get(pk=self.user.pk).requests_made_today(), 3)
+
+    def test_reconciliation_mirrors_todays_counts_and_rolls_over_old_ones(self):
+        idle = User.objects.create_user(email="idle@example.com", daily_requests_made=7, last_request_date=NOW.date())
+        for _ in range(2):
+            self.user.increment_request_count()
+
+        RateLimitService.reconcile_daily_request_counts()
+
+        self.user.refresh_from_db()
+        idle.refresh_from_db()
+        self.assertEqual(self.user.daily_requests_made, 2)
+        self.assertEqual(idle.daily_requests_made, 0)
+        self.assertEqual(RateLimitService.reconcile_daily_request_counts(), 0)
+
+    @patch("proxy_app.views.UnifiedFinancialAPIView._fetch_unified_response")
+    def test_api_requests_add_to_the_daily_total_once(self, fetch):
+        fetch.return_value = ({"status_code": 200}, {"holdings": [{"asset": "AAPL"}]})
+        self.addCleanup(response_cache.delete, response_cache.make_key("etf/SPY/holdings", (), namespace="unified_api"))
+        token = str(self.user.request_token)
+
+        def made_after(**headers):
+            response = self.client.get("/api/v1/etf/SPY/holdings", HTTP_X_REQUEST_TOKEN=token, **headers)
+            return response, User.objects.get(pk=self.user.pk).requests_made_today()
+
+        live, after_live = made_after()
+        cached, after_hit = made_after()
+        revalidated, after_revalidation = made_after(HTTP_IF_NONE_MATCH=cached["ETag"])
+        changed, after_change = made_after(HTTP_IF_NONE_MATCH='W/"other"')
+
+        self.assertEqual([response.status_code for response in (live, cached, revalidated, changed)], [200, 200, 304, 200])
+        # A free 304 revalidation counts nothing; one that is answered with a body counts once
+        self.assertEqual((after_live, after_hit, after_revalidation, after_change), (1, 2, 2, 3))
+
+    @patch("proxy_app.views.UnifiedFinancialAPIView._fetch_unified_response")
+    def test_api_requests_reach_the_mirror_only_through_reconciliation(self, fetch):
+        fetch.return_value = ({"status_code": 200}, {"holdings": [{"asset": "AAPL"}]})
+        self.addCleanup(response_cache.delete, response_cache.make_key("etf/SPY/holdings", (), namespace="unified_api"))
+        # Plan limits are re-cached on the row hourly, not per request
+        self.user.refresh_limits_cache()
+
+        with CaptureQueriesContext(connection) as queries:
+            for _ in range(2):
+                self.client.get("/api/v1/etf/SPY/holdings", HTTP_X_REQUEST_TOKEN=str(self.user.request_token))
+        mirrored = User.objects.get(pk=self.user.pk).daily_requests_made
+        RateLimitService.reconcile_daily_request_counts()
+
+        self.assertFalse([query for query in queries if query['sql'].startswith('UPDATE "users_user"')])
+        self.assertEqual(mirrored, 0)
+        self.assertEqual(User.objects.get(pk=self.user.pk).daily_requests_made, 2)
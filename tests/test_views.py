@@ -14,11 +14,11 @@ from django.urls import reverse
 from django.utils import timezone
 from freezegun import freeze_time
 from rest_framework import status
-from rest_framework.test import APIClient, APITestCase
+from rest_framework.test import APIClient, APITestCase, APIRequestFactory, force_authenticate
 
 from proxy_app.providers import PolygonProvider, FMPProvider
 from proxy_app.proxy import FinancialDataProxy
-from proxy_app.views_new import FinancialAPIView
+from proxy_app.views_new import FinancialAPIView, StatsView
 from users.models import Plan
 
 from .factories import (
@@ -713,4 +713,26 @@ class UnifiedFinancialAPITests(TestCase):
             {"apiKey": self.api_key}
         )
         self.assertEqual(response.status_code, 200)
-        self.assertEqual(response.json()["symbol"], "AAPL")
\ No newline at end of file
+        self.assertEqual(response.json()["symbol"], "AAPL")
+
+
+class StatsViewTest(TestCase):
+    """
+    Test suite for the worker statistics endpoint, which only staff may read.
+    """
+
+    def _get(self, user=None):
+        request = APIRequestFactory().get("/api/v1/stats/")
+        if user is not None:
+            force_authenticate(request, user=user)
+        return StatsView.as_view()(request)
+
+    def test_staff_read_the_statistics(self):
+        response = self._get(User.objects.create_user(email="staff@example.com", is_staff=True))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("upstream_rate_limits", json.loads(response.content))
+
+    def test_other_users_are_refused(self):
+        self.assertIn(self._get().status_code, (401, 403))
+        self.assertEqual(self._get(User.objects.create_user(email="user@example.com")).status_code, 403)
@@ -5,8 +5,11 @@ from django.contrib.auth.backends import ModelBackend
 from django.core.exceptions import ValidationError
 from rest_framework.authentication import BaseAuthentication
 from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt import authentication as jwt_authentication
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
 
 from .models import User
+from .principals import principal_cache, remember_authentication, remembered_authentication
 
 User = get_user_model()
 
@@ -49,26 +52,60 @@ class RequestTokenAuthentication(BaseAuthentication):
         if not token:
             return None
 
+        remembered = remembered_authentication(request, self)
+        if remembered is not None:
+            return remembered
+
         # Validate token format first
         try:
             uuid.UUID(token)
         except (ValueError, TypeError):
             raise AuthenticationFailed("Invalid token format")
 
-        try:
-            user = User.objects.get(request_token=token)
-        except User.DoesNotExist:
-            raise AuthenticationFailed("Invalid token")
-        except ValidationError:
-            raise AuthenticationFailed("Invalid token format")
+        user = principal_cache.get(token)
+        if user is None:
+            try:
+                user = User.objects.select_related("current_plan").get(request_token=token)
+            except User.DoesNotExist:
+                raise AuthenticationFailed("Invalid token")
+            except ValidationError:
+                raise AuthenticationFailed("Invalid token format")
+            principal_cache.set(token, user)
 
         if user.is_token_expired():
             raise AuthenticationFailed("Token has expired")
 
-        return (user, token)
+        return remember_authentication(request, self, (user, token))
 
     def get_token_from_request(self, request):
         return request.META.get("HTTP_X_REQUEST_TOKEN")
 
     def authenticate_header(self, request):
         return "X-Request-Token"
+
+
+class CachedJWTAuthentication(jwt_authentication.JWTAuthentication):
+    """JWTAuthentication that takes the token's user from the principal cache"""
+
+    def authenticate(self, request):
+        remembered = remembered_authentication(request, self)
+        if remembered is not None:
+            return remembered
+
+        result = super().authenticate(request)
+        if result is not None:
+            remember_authentication(request, self, result)
+        return result
+
+    def get_user(self, validated_token):
+        # Revocation compares the password hash, which is not cached
+        if jwt_settings.CHECK_REVOKE_TOKEN:
+            return super().get_user(validated_token)
+
+        user = principal_cache.get(validated_token.token)
+        if user is None:
+            user = super().get_user(validated_token)
+            principal_cache.set(validated_token.token, user)
+        elif not user.is_active:
+            raise jwt_authentication.AuthenticationFailed("User is inactive", code="user_inactive")
+        return user
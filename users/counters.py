@@ -0,0 +1,673 @@
+"""
+Usage counters behind the per-user and per-IP request quotas.
+
+Each (identifier, endpoint, window) count lives in its own Redis key named after the
+window it counts, e.g. usage:user_7:quotes:hour:202401151400, and the key expires
+once the following window ends. A request increments the keys of all its windows and
+reads back their new values in one pipelined MULTI/EXEC round trip, so counting a
+request runs no SQL. Without a Redis cache the counts are kept in the cache alias
+through add() and incr().
+
+consume() decides and counts in one step: an atomic Lua script checks every window
+and the burst limit, and increments all of them only if none is exceeded, so
+concurrent requests cannot all pass a check made before any of them is counted.
+Unchecked tallies, such as a user's daily total across endpoints, are counted in the
+same step.
+Windows slide: the previous fixed window's count is weighted by how much of it still
+overlaps the last window length, so no boundary lets through twice the limit. The
+burst limit is a GCRA (virtual scheduling) allowance of requests beyond the steady
+pace of the hourly limit. Without Redis the same algorithm runs in-process.
+
+RateLimitCounter rows are a write-behind copy for audits, billing and cleanup. Every
+count also adds its amount to a per-(identifier, endpoint, window) delta, in the same
+round trip, and flush() periodically upserts the deltas gathered since the last flush
+with one bulk INSERT ... ON CONFLICT DO UPDATE, so the database sees one write per
+counter per interval rather than one per request. On Redis the deltas hash is handed
+off by renaming it to a batch key that is only deleted once the upsert has committed:
+a flusher that dies mid-way leaves the batch for the next flush to retry, so no count
+is lost (a crash between commit and delete applies that batch twice). A cluster-wide
+lock keeps a batch with one flusher at a time. Without Redis the deltas are kept
+in-process and handed back to the next flush when an upsert fails.
+
+Identifiers and endpoints come from the client (X-Forwarded-For, request paths), so they
+are named to fit the RateLimitCounter columns before they are counted, and a batch the
+database rejects is upserted again row by row: rows it still rejects are logged and
+dropped rather than holding up every later flush.
+"""
+import atexit
+import hashlib
+import logging
+import math
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from datetime import timezone as dt_timezone
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.signals import setting_changed
+from django.db import DataError, IntegrityError, close_old_connections, connection, transaction
+from django.dispatch import receiver
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+# Keys outlive the window after theirs by this much, so workers with slightly skewed clocks agree on the count
+EXPIRY_GRACE_SECONDS = 60
+
+WINDOW_LABELS = {'minute': 'per-minute', 'hour': 'hourly', 'day': 'daily', 'month': 'monthly'}
+
+# Endpoint under which a user's requests to every endpoint are counted, for the daily total
+ALL_ENDPOINTS = '*'
+
+# KEYS: each window's current and previous counter, then each tally's counter, the burst key and
+# the deltas hash.
+# ARGV: now ms, cost, burst, emission interval ms, tally count, then per window: limit, start ms,
+# length ms, expire-at s and delta field, then per tally: expire-at s and delta field.
+# Returns the 1-based index of the first exceeded window (windows + 1 for the burst limit, 0 if
+# allowed), the ms until the burst allows a request, and each window's current and previous count.
+# A cost of 0 checks without counting. Tallies are counted with the windows but never checked.
+CONSUME_SCRIPT = """
+local now = tonumber(ARGV[1])
+local cost = tonumber(ARGV[2])
+local burst = tonumber(ARGV[3])
+local interval = tonumber(ARGV[4])
+local tallies = tonumber(ARGV[5])
+local windows = (#KEYS - 2 - tallies) / 2
+local counts = {}
+local exceeded = 0
+
+for i = 1, windows do
+    local arg = 5 + (i - 1) * 5
+    local current = tonumber(redis.call('GET', KEYS[2 * i - 1]) or 0)
+    local previous = tonumber(redis.call('GET', KEYS[2 * i]) or 0)
+    local weight = 1 - (now - tonumber(ARGV[arg + 2])) / tonumber(ARGV[arg + 3])
+    if exceeded == 0 and previous * weight + current + 1 > tonumber(ARGV[arg + 1]) then
+        exceeded = i
+    end
+    counts[2 * i - 1] = current
+    counts[2 * i] = previous
+end
+
+local tat = 0
+local retry_ms = 0
+if exceeded == 0 and burst > 0 then
+    tat = math.max(tonumber(redis.call('GET', KEYS[#KEYS - 1]) or 0), now) + math.max(cost, 1) * interval
+    retry_ms = tat - now - burst * interval
+    if retry_ms > 0 then
+        exceeded = windows + 1
+    end
+end
+
+if exceeded == 0 and cost > 0 then
+    for i = 1, windows do
+        local arg = 5 + (i - 1) * 5
+        counts[2 * i - 1] = redis.call('INCRBY', KEYS[2 * i - 1], cost)
+        redis.call('EXPIREAT', KEYS[2 * i - 1], ARGV[arg + 4])
+        redis.call('HINCRBY', KEYS[#KEYS], ARGV[arg + 5], cost)
+    end
+    for i = 1, tallies do
+        local key = KEYS[2 * windows + i]
+        local arg = 5 + windows * 5 + (i - 1) * 2
+        redis.call('INCRBY', key, cost)
+        redis.call('EXPIREAT', key, ARGV[arg + 1])
+        redis.call('HINCRBY', KEYS[#KEYS], ARGV[arg + 2], cost)
+    end
+    if burst > 0 then
+        redis.call('SET', KEYS[#KEYS - 1], tat, 'PX', tat - now)
+    end
+end
+
+table.insert(counts, 1, math.max(retry_ms, 0))
+table.insert(counts, 1, exceeded)
+return counts
+"""
+
+# KEYS: deltas hash, batch being flushed, flush lock; ARGV: lock token, lock ttl ms.
+# Returns nil while another flusher holds the lock, else the batch as field, value pairs: a batch
+# left by a flusher that died is returned again before new deltas are handed off.
+FLUSH_TAKE_SCRIPT = """
+if not redis.call('SET', KEYS[3], ARGV[1], 'NX', 'PX', ARGV[2]) then
+    return nil
+end
+if redis.call('EXISTS', KEYS[2]) == 0 then
+    if redis.call('EXISTS', KEYS[1]) == 0 then
+        return {}
+    end
+    redis.call('RENAME', KEYS[1], KEYS[2])
+end
+return redis.call('HGETALL', KEYS[2])
+"""
+
+# KEYS: batch being flushed, flush lock; ARGV: lock token, 1 once the batch is written.
+FLUSH_RELEASE_SCRIPT = """
+if redis.call('GET', KEYS[2]) == ARGV[1] then
+    if ARGV[2] == '1' then
+        redis.call('DEL', KEYS[1])
+    end
+    redis.call('DEL', KEYS[2])
+end
+return 0
+"""
+
+# A flusher holding the lock longer than this is presumed dead and its batch is retried
+FLUSH_LOCK_TTL_MS = 5 * 60 * 1000
+
+# Counter columns of the upsert, in VALUES order
+UPSERT_COLUMNS = ('identifier', 'endpoint', 'window_type', 'window_start', 'count', 'created_at', 'updated_at')
+
+# Lengths of RateLimitCounter's identifier and endpoint columns
+IDENTIFIER_MAX_LENGTH = 255
+ENDPOINT_MAX_LENGTH = 200
+
+
+def counter_name(value: str, max_length: int) -> str:
+    """
+    value as an identifier or endpoint that fits max_length and the deltas hash fields.
+
+    Tabs separate the parts of a delta field, so they become spaces. Longer values are cut
+    short and end in a hash of the whole, so distinct values stay apart.
+    """
+    value = value.replace('\t', ' ')
+    if len(value) <= max_length:
+        return value
+    digest = hashlib.blake2b(value.encode(), digest_size=8).hexdigest()
+    return f"{value[: max_length - len(digest) - 1]}~{digest}"
+
+
+def window_bounds(window_type: str, now: datetime) -> Tuple[datetime, datetime]:
+    """Start and end of the window of window_type holding now; unknown types count by the hour"""
+    if window_type == 'minute':
+        start = now.replace(second=0, microsecond=0)
+        return start, start + timedelta(minutes=1)
+    if window_type == 'day':
+        start = now.replace(hour=0, minute=0, second=0, microsecond=0)
+        return start, start + timedelta(days=1)
+    if window_type == 'month':
+        start = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+        return start, (start + timedelta(days=32)).replace(day=1)
+    start = now.replace(minute=0, second=0, microsecond=0)
+    return start, start + timedelta(hours=1)
+
+
+class Window(NamedTuple):
+    """One counted window of a request: its counter, the previous window's counter, and its bounds"""
+
+    window_type: str
+    key: str
+    previous_key: str
+    start: datetime
+    end: datetime
+    expires_at: int
+    delta_field: str
+
+    @property
+    def start_ms(self) -> int:
+        return int(self.start.timestamp() * 1000)
+
+    @property
+    def end_ms(self) -> int:
+        return int(self.end.timestamp() * 1000)
+
+    @property
+    def length_ms(self) -> int:
+        return self.end_ms - self.start_ms
+
+    def weight(self, now_ms: int) -> float:
+        """Share of the previous window still inside the sliding window ending at now_ms"""
+        return 1 - (now_ms - self.start_ms) / self.length_ms
+
+
+class LimitDecision(NamedTuple):
+    """
+    Outcome of consume(): whether the request may go ahead, and for every window its sliding
+    count, the requests left and when its fixed window rolls over (epoch seconds). When denied,
+    exceeded names the window (or 'burst') and retry_after is the wait in seconds.
+    """
+
+    allowed: bool
+    reason: str
+    exceeded: Optional[str]
+    usage: Dict[str, int]
+    remaining: Dict[str, int]
+    reset: Dict[str, int]
+    retry_after: int
+
+
+def delta_field(identifier: str, endpoint: str, window_type: str, window_start: datetime) -> str:
+    """Name of a counter's field in the deltas hash"""
+    return f"{identifier}\t{endpoint}\t{window_type}\t{int(window_start.timestamp() * 1000)}"
+
+
+def parse_delta_field(field: str) -> Tuple[str, str, str, datetime]:
+    """(identifier, endpoint, window type, window start) of a deltas hash field"""
+    identifier, rest = field.split('\t', 1)
+    # Endpoints come from request paths, so split them off from both ends
+    endpoint, window_type, start_ms = rest.rsplit('\t', 2)
+    return identifier, endpoint, window_type, datetime.fromtimestamp(int(start_ms) / 1000, tz=dt_timezone.utc)
+
+
+def upsert_usage(deltas: Dict[Tuple[str, str, str, datetime], int]) -> int:
+    """
+    Add deltas to their RateLimitCounter rows with bulk INSERT ... ON CONFLICT DO UPDATE statements.
+
+    If the database rejects the rows' values, they are upserted one by one and those it still
+    rejects are dropped, so one bad row cannot block the batch. Other errors (e.g. a lost
+    connection) roll everything back and are raised for the batch to be retried.
+    """
+    if not deltas:
+        return 0
+
+    now = connection.ops.adapt_datetimefield_value(timezone.now())
+    rows = [
+        (identifier, endpoint, window_type, connection.ops.adapt_datetimefield_value(start), amount, now, now)
+        for (identifier, endpoint, window_type, start), amount in deltas.items()
+    ]
+    batch_size = connection.ops.bulk_batch_size(UPSERT_COLUMNS, rows) or len(rows)
+
+    try:
+        with transaction.atomic(), connection.cursor() as cursor:
+            for offset in range(0, len(rows), batch_size):
+                execute_upsert(cursor, rows[offset : offset + batch_size])
+        return len(rows)
+    except (DataError, IntegrityError) as e:
+        logger.warning(f"Usage counter batch rejected, upserting its {len(rows)} rows one by one: {e}")
+
+    written = 0
+    with transaction.atomic(), connection.cursor() as cursor:
+        for row in rows:
+            try:
+                with transaction.atomic():
+                    execute_upsert(cursor, [row])
+            except (DataError, IntegrityError) as e:
+                logger.error(f"Dropping {row[4]} counted requests of {row[0]} on {row[1]} ({row[2]}): {e}")
+            else:
+                written += 1
+    return written
+
+
+def execute_upsert(cursor, rows: List[tuple]):
+    """Run one INSERT ... ON CONFLICT DO UPDATE adding rows to their counters"""
+    from .models import RateLimitCounter
+
+    quote = connection.ops.quote_name
+    table = quote(RateLimitCounter._meta.db_table)
+    placeholders = f"({', '.join(['%s'] * len(UPSERT_COLUMNS))})"
+    cursor.execute(
+        f"INSERT INTO {table} ({', '.join(map(quote, UPSERT_COLUMNS))}) "
+        f"VALUES {', '.join([placeholders] * len(rows))} "
+        f"ON CONFLICT ({', '.join(map(quote, UPSERT_COLUMNS[:4]))}) DO UPDATE SET "
+        f"{quote('count')} = {table}.{quote('count')} + EXCLUDED.{quote('count')}, "
+        f"{quote('updated_at')} = EXCLUDED.{quote('updated_at')}",
+        [value for row in rows for value in row],
+    )
+
+
+class UsageCounters:
+    """Windowed request counts held in a Redis cache alias, with the cache API as a fallback"""
+
+    key_prefix = "usage"
+
+    def __init__(self, alias: str, flush_interval: float = 0):
+        self.alias = alias
+        self.flush_interval = flush_interval
+        self.errors = 0
+        self.flushed = 0
+        self._client = None
+        self._client_lock = threading.Lock()
+        self._scripts = {}
+        self._local_lock = threading.Lock()
+        self._deltas: Dict[Tuple[str, str, str, datetime], int] = {}
+        self._flusher = None
+
+    @property
+    def deltas_key(self) -> str:
+        return f"{self.key_prefix}:deltas"
+
+    def _redis(self):
+        """The raw Redis client when the cache alias is Redis, otherwise None"""
+        if self._client is None:
+            with self._client_lock:
+                if self._client is None:
+                    try:
+                        from django_redis import get_redis_connection
+                        from django_redis.cache import RedisCache
+                    except ImportError:
+                        self._client = False
+                    else:
+                        if isinstance(caches[self.alias], RedisCache):
+                            self._client = get_redis_connection(self.alias)
+                        else:
+                            self._client = False
+        return self._client or None
+
+    def make_key(self, identifier: str, endpoint: str, window_type: str, window_start: datetime) -> str:
+        return f"{self.key_prefix}:{identifier}:{endpoint}:{window_type}:{window_start.strftime('%Y%m%d%H%M')}"
+
+    @staticmethod
+    def _names(identifier: str, endpoint: str) -> Tuple[str, str]:
+        """The identifier and endpoint a request is counted under, fitted to the RateLimitCounter columns"""
+        return counter_name(identifier, IDENTIFIER_MAX_LENGTH), counter_name(endpoint, ENDPOINT_MAX_LENGTH)
+
+    def _windows(self, identifier, endpoint, window_types, now) -> List[Window]:
+        """The windows of a request made at now"""
+        windows = []
+        for window_type in window_types:
+            start, end = window_bounds(window_type, now)
+            previous_start = window_bounds(window_type, start - timedelta(microseconds=1))[0]
+            # A window's count is still read as the previous one until the following window ends
+            expires_at = int(window_bounds(window_type, end)[1].timestamp()) + EXPIRY_GRACE_SECONDS
+            windows.append(
+                Window(
+                    window_type,
+                    self.make_key(identifier, endpoint, window_type, start),
+                    self.make_key(identifier, endpoint, window_type, previous_start),
+                    start,
+                    end,
+                    expires_at,
+                    delta_field(identifier, endpoint, window_type, start),
+                )
+            )
+        return windows
+
+    def increment(
+        self, identifier: str, endpoint: str, window_types: Iterable[str], amount: int = 1, now: Optional[datetime] = None
+    ) -> Dict[str, int]:
+        """Add amount to every window's count and return the new counts, in one round trip"""
+        identifier, endpoint = self._names(identifier, endpoint)
+        now = now or timezone.now()
+        windows = self._windows(identifier, endpoint, window_types, now)
+
+        client = self._redis()
+        if client is None:
+            counts = self._increment_cache(windows, amount, now)
+        else:
+            try:
+                pipe = client.pipeline(transaction=True)
+                for window in windows:
+                    pipe.incrby(window.key, amount)
+                    pipe.expireat(window.key, window.expires_at)
+                    pipe.hincrby(self.deltas_key, window.delta_field, amount)
+                counts = [int(count) for count in pipe.execute()[::3]]
+            except Exception as e:
+                # Fail open: an unreachable counter store should not take the API down with it
+                logger.warning(f"Usage counters unavailable for {identifier}: {e}")
+                self.errors += 1
+                return {window.window_type: 0 for window in windows}
+
+        self._start_flusher()
+        return {window.window_type: count for window, count in zip(windows, counts)}
+
+    def _increment_cache(self, windows, amount, now):
+        cache = caches[self.alias]
+        counts = []
+        with self._local_lock:
+            for window in windows:
+                timeout = window.expires_at - now.timestamp()
+                cache.add(window.key, 0, timeout=timeout)
+                try:
+                    counts.append(cache.incr(window.key, amount))
+                except ValueError:
+                    # Expired between add() and incr(): this request opens a new window
+                    cache.set(window.key, amount, timeout=timeout)
+                    counts.append(amount)
+            self._add_deltas(windows, amount)
+        return counts
+
+    def _add_deltas(self, windows, amount):
+        """Gather in-process deltas for the next flush; called with the local lock held"""
+        for window in windows:
+            key = parse_delta_field(window.delta_field)
+            self._deltas[key] = self._deltas.get(key, 0) + amount
+
+    def get_counts(self, identifier: str, endpoint: str, window_types: Iterable[str], now: Optional[datetime] = None) -> Dict[str, int]:
+        """Current count of every window, in one round trip"""
+        identifier, endpoint = self._names(identifier, endpoint)
+        windows = self._windows(identifier, endpoint, window_types, now or timezone.now())
+        keys = [window.key for window in windows]
+
+        client = self._redis()
+        if client is None:
+            found = caches[self.alias].get_many(keys)
+            values = [found.get(key) for key in keys]
+        else:
+            try:
+                values = client.mget(keys)
+            except Exception as e:
+                logger.warning(f"Usage counters unavailable for {identifier}: {e}")
+                self.errors += 1
+                values = [None] * len(keys)
+        return {window.window_type: int(value or 0) for window, value in zip(windows, values)}
+
+    def _script(self, source: str):
+        """source registered as a script when the cache alias is Redis, otherwise None"""
+        client = self._redis()
+        if client is None:
+            return None
+        if source not in self._scripts:
+            with self._client_lock:
+                if source not in self._scripts:
+                    self._scripts[source] = client.register_script(source)
+        return self._scripts[source]
+
+    def consume(
+        self,
+        identifier: str,
+        endpoint: str,
+        limits: Dict[str, int],
+        burst: int = 0,
+        cost: int = 1,
+        now: Optional[datetime] = None,
+        tallies: Iterable[Tuple[str, str]] = (),
+    ) -> LimitDecision:
+        """
+        Check every window in limits (window type: limit) and the burst allowance, and count cost
+        requests in all of them if none is exceeded, as one atomic operation.
+
+        A cost of 0 only checks whether one more request would be allowed. A burst of 0 leaves bursts
+        to the windows alone. Tallies are (endpoint, window type) counters of the same identifier that
+        an allowed request is also counted in, unchecked, e.g. a total across endpoints.
+        """
+        identifier, endpoint = self._names(identifier, endpoint)
+        now = now or timezone.now()
+        now_ms = int(now.timestamp() * 1000)
+        windows = self._windows(identifier, endpoint, limits, now)
+        tally_windows = [self._windows(identifier, tally_endpoint, (window_type,), now)[0] for tally_endpoint, window_type in tallies]
+        interval = self._burst_interval(windows, limits)
+        burst_key = f"{self.key_prefix}:{identifier}:{endpoint}:burst"
+
+        script = self._script(CONSUME_SCRIPT)
+        if script is None:
+            result = self._consume_cache(windows, tally_windows, limits, burst_key, burst, interval, cost, now_ms)
+        else:
+            args = [now_ms, cost, burst, interval, len(tally_windows)]
+            for window in windows:
+                args += [limits[window.window_type], window.start_ms, window.length_ms, window.expires_at, window.delta_field]
+            for window in tally_windows:
+                args += [window.expires_at, window.delta_field]
+            keys = [key for window in windows for key in (window.key, window.previous_key)]
+            keys += [window.key for window in tally_windows] + [burst_key, self.deltas_key]
+            try:
+                result = script(keys=keys, args=args)
+            except Exception as e:
+                # Fail open, like increment()
+                logger.warning(f"Usage counters unavailable for {identifier}: {e}")
+                self.errors += 1
+                return LimitDecision(True, "OK", None, {}, {}, {}, 0)
+
+        if cost > 0:
+            self._start_flusher()
+        return self._decide(windows, limits, burst, [int(value) for value in result], now_ms)
+
+    @staticmethod
+    def _burst_interval(windows, limits) -> int:
+        """Milliseconds between requests at the steady pace of the hourly (or else first) window"""
+        if not windows:
+            return 1
+        window = next((window for window in windows if window.window_type == 'hour'), windows[0])
+        return max(1, window.length_ms // max(limits[window.window_type], 1))
+
+    def _consume_cache(self, windows, tally_windows, limits, burst_key, burst, interval, cost, now_ms):
+        """In-process equivalent of CONSUME_SCRIPT for cache aliases without Redis"""
+        cache = caches[self.alias]
+        with self._local_lock:
+            keys = [key for window in windows for key in (window.key, window.previous_key)]
+            found = cache.get_many(keys + [window.key for window in tally_windows] + [burst_key])
+            counts = []
+            exceeded = 0
+            for index, window in enumerate(windows, 1):
+                current, previous = int(found.get(window.key) or 0), int(found.get(window.previous_key) or 0)
+                if not exceeded and previous * window.weight(now_ms) + current + 1 > limits[window.window_type]:
+                    exceeded = index
+                counts += [current, previous]
+
+            tat = retry_ms = 0
+            if not exceeded and burst > 0:
+                tat = max(int(found.get(burst_key) or 0), now_ms) + max(cost, 1) * interval
+                retry_ms = tat - now_ms - burst * interval
+                if retry_ms > 0:
+                    exceeded = len(windows) + 1
+
+            if not exceeded and cost > 0:
+                for index, window in enumerate(windows):
+                    counts[2 * index] += cost
+                    cache.set(window.key, counts[2 * index], timeout=window.expires_at - now_ms / 1000)
+                for window in tally_windows:
+                    cache.set(window.key, int(found.get(window.key) or 0) + cost, timeout=window.expires_at - now_ms / 1000)
+                if burst > 0:
+                    cache.set(burst_key, tat, timeout=(tat - now_ms) / 1000)
+                self._add_deltas(windows + tally_windows, cost)
+        return [exceeded, max(retry_ms, 0)] + counts
+
+    @staticmethod
+    def _decide(windows, limits, burst, result, now_ms) -> LimitDecision:
+        exceeded, retry_ms, counts = result[0], result[1], result[2:]
+        usage, remaining, reset = {}, {}, {}
+        for index, window in enumerate(windows):
+            current, previous = counts[2 * index], counts[2 * index + 1]
+            used = math.ceil(round(previous * window.weight(now_ms) + current, 6))
+            usage[window.window_type] = used
+            remaining[window.window_type] = max(0, limits[window.window_type] - used)
+            reset[window.window_type] = int(window.end.timestamp())
+
+        if not exceeded:
+            return LimitDecision(True, "OK", None, usage, remaining, reset, 0)
+        if exceeded > len(windows):
+            return LimitDecision(
+                False, f"burst limit reached ({burst} requests)", 'burst', usage, remaining, reset, max(1, math.ceil(retry_ms / 1000))
+            )
+
+        window = windows[exceeded - 1]
+        limit = limits[window.window_type]
+        current, previous = counts[2 * exceeded - 2], counts[2 * exceeded - 1]
+        room = limit - 1
+        if room < 0:
+            retry_at = window.end_ms + window.length_ms
+        elif current <= room:
+            # The previous window's share slides out until there is room for one more request
+            retry_at = window.start_ms + window.length_ms * (1 - (room - current) / previous)
+        else:
+            # Only once this window is the previous one and enough of it has slid out
+            retry_at = window.end_ms + window.length_ms * (1 - room / current)
+        return LimitDecision(
+            False,
+            f"{WINDOW_LABELS.get(window.window_type, window.window_type)} limit reached ({usage[window.window_type]}/{limit})",
+            window.window_type,
+            usage,
+            remaining,
+            reset,
+            max(1, math.ceil((retry_at - now_ms) / 1000)),
+        )
+
+    def flush(self) -> int:
+        """Upsert the deltas gathered since the last flush into RateLimitCounter, returning the rows written"""
+        take = self._script(FLUSH_TAKE_SCRIPT)
+        if take is None:
+            with self._local_lock:
+                batch, self._deltas = self._deltas, {}
+            try:
+                written = upsert_usage(batch)
+            except Exception:
+                # Hand the batch back so the next flush retries it
+                with self._local_lock:
+                    for key, amount in batch.items():
+                        self._deltas[key] = self._deltas.get(key, 0) + amount
+                raise
+            self.flushed += written
+            return written
+
+        batch_key, lock_key = f"{self.deltas_key}:flushing", f"{self.deltas_key}:lock"
+        token = uuid.uuid4().hex
+        pairs = take(keys=[self.deltas_key, batch_key, lock_key], args=[token, FLUSH_LOCK_TTL_MS])
+        if pairs is None:
+            return 0
+
+        written = False
+        try:
+            batch = {}
+            for field, amount in zip(pairs[::2], pairs[1::2]):
+                field = field.decode() if isinstance(field, bytes) else field
+                try:
+                    batch[parse_delta_field(field)] = int(amount)
+                except ValueError:
+                    # Not a field this module wrote; retrying it would only fail again
+                    logger.error(f"Dropping malformed usage delta field {field!r}")
+            count = upsert_usage(batch)
+            written = True
+        finally:
+            self._script(FLUSH_RELEASE_SCRIPT)(keys=[batch_key, lock_key], args=[token, int(written)])
+        self.flushed += count
+        return count
+
+    def _start_flusher(self):
+        """Start the background flush thread of this process, once, if a flush interval is set"""
+        if self._flusher is not None or not self.flush_interval:
+            return
+        with self._client_lock:
+            if self._flusher is None:
+                self._flusher = threading.Thread(target=self._flush_forever, name="usage-flusher", daemon=True)
+                self._flusher.start()
+                # Deltas kept in-process would otherwise be lost on a clean shutdown
+                atexit.register(self._flush_quietly)
+
+    def _flush_forever(self):
+        while True:
+            time.sleep(self.flush_interval)
+            # A flush interval set to 0 meanwhile stops the thread; counting again starts a new one
+            if not self.flush_interval:
+                break
+            self._flush_quietly()
+        with self._client_lock:
+            self._flusher = None
+
+    def _flush_quietly(self):
+        close_old_connections()
+        try:
+            self.flush()
+        except Exception as e:
+            # The counters stay authoritative; their deltas wait for the next flush
+            logger.warning(f"Failed to flush usage counters: {e}")
+            self.errors += 1
+        finally:
+            close_old_connections()
+
+
+def build_usage_counters() -> UsageCounters:
+    """Build the usage counters from the USAGE_COUNTER_* settings"""
+    return UsageCounters(
+        alias=getattr(settings, 'USAGE_COUNTER_CACHE_ALIAS', 'default'),
+        flush_interval=getattr(settings, 'USAGE_COUNTER_FLUSH_INTERVAL', 10),
+    )
+
+
+# Global usage counters, shared cluster-wide through Redis
+usage_counters = build_usage_counters()
+
+
+@receiver(setting_changed)
+def update_flush_interval(setting, **kwargs):
+    """Apply a changed USAGE_COUNTER_FLUSH_INTERVAL (e.g. under override_settings) to the global counters"""
+    if setting == 'USAGE_COUNTER_FLUSH_INTERVAL':
+        usage_counters.flush_interval = build_usage_counters().flush_interval
@@ -9,18 +9,21 @@ from django.http import JsonResponse
 from django.utils import timezone
 from django.utils.deprecation import MiddlewareMixin
 
-from .models import APIUsage, RateLimitService
+from .counters import WINDOW_LABELS, usage_counters
+from .models import APIUsage
 
 logger = logging.getLogger(__name__)
 
 
 class UserRequestCountMiddleware(MiddlewareMixin):
-    """Legacy middleware - maintained for backward compatibility"""
+    """
+    Legacy middleware - maintained for backward compatibility.
+
+    Daily request counts roll over with their usage counter window, so there is no longer anything
+    to reset per request.
+    """
 
     def process_request(self, request):
-        if hasattr(request, 'user') and request.user.is_authenticated:
-            # Reset daily requests if needed
-            request.user.reset_daily_requests_if_needed()
         return None
 
 
@@ -59,12 +62,14 @@ class DatabaseRateLimitMiddleware:
             # If response is a coroutine, we need to await it
             async def handle_async_response():
                 actual_response = await response
+                self.settle_deferred_usage(request, actual_response)
                 # Track usage after response (async for performance)
                 self.track_usage_async(request, actual_response, start_time)
                 return actual_response
 
             return handle_async_response()
         else:
+            self.settle_deferred_usage(request, response)
             # Track usage after response (async for performance)
             self.track_usage_async(request, response, start_time)
             return response
@@ -78,6 +83,7 @@ class DatabaseRateLimitMiddleware:
         # Continue with normal request processing
         start_time = time.time()
         response = await self.get_response(request)
+        self.settle_deferred_usage(request, response)
 
         # Track usage after response (async for performance)
         self.track_usage_async(request, response, start_time)
@@ -105,9 +111,7 @@ class DatabaseRateLimitMiddleware:
 
     def _authenticate_user(self, request):
         """Attempt to authenticate user using available methods"""
-        from rest_framework_simplejwt.authentication import JWTAuthentication
-
-        from users.authentication import RequestTokenAuthentication
+        from users.authentication import CachedJWTAuthentication, RequestTokenAuthentication
 
         # Check if user is already authenticated (e.g., via session)
         if hasattr(request, 'user') and request.user.is_authenticated:
@@ -124,7 +128,7 @@ class DatabaseRateLimitMiddleware:
             pass
 
         # Try JWT Authentication
-        jwt_auth = JWTAuthentication()
+        jwt_auth = CachedJWTAuthentication()
         try:
             auth_result = jwt_auth.authenticate(request)
             if auth_result:
@@ -175,33 +179,54 @@ class DatabaseRateLimitMiddleware:
         if self.has_payment_restrictions(user):
             return self.create_payment_failure_response()
 
-        # Use the enhanced rate limiting from User model
-        can_proceed, reason = user.check_rate_limits(endpoint)
+        # Revalidations are charged once the response shows they were not answered 304, if the plan allows
+        free_revalidation = self.is_revalidation(request) and user.has_free_revalidations()
+
+        # Check every window and count the request in one atomic step (free revalidations are only checked)
+        decision = user.consume_rate_limits(endpoint, cost=0 if free_revalidation else 1)
+        request.rate_limit_decision = decision
 
-        if not can_proceed:
-            return self.create_rate_limit_response(user, reason, endpoint)
+        if not decision.allowed:
+            return self.create_rate_limit_response(user, decision, endpoint)
 
-        # Increment counters
-        user.increment_usage_counters(endpoint)
+        if free_revalidation:
+            request._deferred_usage = (user, endpoint)
+        else:
+            # consume() counted the request in the user's daily total too, so views must not count it again
+            request._count_incremented = True
 
         return None
 
+    def is_revalidation(self, request):
+        """Whether request is a conditional GET that may be answered 304 Not Modified"""
+        return request.method in ('GET', 'HEAD') and (
+            'HTTP_IF_NONE_MATCH' in request.META or 'HTTP_IF_MODIFIED_SINCE' in request.META
+        )
+
+    def settle_deferred_usage(self, request, response):
+        """Charge a deferred revalidation unless it was answered 304 Not Modified"""
+        deferred = getattr(request, '_deferred_usage', None)
+        if deferred is None or getattr(response, 'status_code', None) == 304:
+            return
+        user, endpoint = deferred
+        try:
+            user.increment_usage_counters(endpoint)
+        except Exception as e:
+            logger.error(f"Failed to charge revalidation: {e}")
+
     def check_anonymous_limits(self, request):
         """Check rate limits for anonymous users (by IP)"""
         ip_address = self.get_client_ip(request)
         endpoint = self.get_endpoint_name(request)
         identifier = f"ip_{ip_address}"
 
-        # Check each time window
-        for window_type, limit in self.anonymous_limits.items():
-            usage = RateLimitService.get_usage_count(identifier, endpoint, window_type)
-            if usage >= limit:
-                return self.create_anonymous_rate_limit_response(ip_address, window_type, usage, limit)
-
-        # Increment counters
-        RateLimitService.check_and_increment(identifier, endpoint, 'minute')
-        RateLimitService.check_and_increment(identifier, endpoint, 'hour')
-        RateLimitService.check_and_increment(identifier, endpoint, 'day')
+        # Check each time window and count the request in one atomic step
+        decision = usage_counters.consume(identifier, endpoint, self.anonymous_limits)
+        if not decision.allowed:
+            window_type = decision.exceeded
+            return self.create_anonymous_rate_limit_response(
+                ip_address, window_type, decision.usage[window_type], self.anonymous_limits[window_type], decision.retry_after
+            )
 
         return None
 
@@ -252,24 +277,19 @@ class DatabaseRateLimitMiddleware:
 
         return request.META.get('REMOTE_ADDR', '127.0.0.1')
 
-    def create_rate_limit_response(self, user, reason, endpoint):
+    def create_rate_limit_response(self, user, decision, endpoint):
         """Create rate limit exceeded response for authenticated users"""
         limits = user.get_cached_limits()
 
-        # Get current usage for all windows
-        identifier = f"user_{user.id}"
-        current_usage = {
-            'hourly': RateLimitService.get_usage_count(identifier, endpoint, 'hour'),
-            'daily': RateLimitService.get_usage_count(identifier, endpoint, 'day'),
-            'monthly': RateLimitService.get_usage_count(identifier, endpoint, 'month'),
-        }
+        # Usage of every window as the limiter saw it when it made the decision
+        current_usage = {WINDOW_LABELS[window_type]: usage for window_type, usage in decision.usage.items()}
 
         # Calculate retry after based on the exceeded limit
-        retry_after = self.calculate_retry_after(reason)
+        retry_after = decision.retry_after or self.calculate_retry_after(decision.reason)
 
         response_data = {
             'error': 'Rate limit exceeded',
-            'message': f'API rate limit exceeded: {reason}',
+            'message': f'API rate limit exceeded: {decision.reason}',
             'limits': limits,
             'current_usage': current_usage,
             'retry_after': retry_after,
@@ -282,14 +302,14 @@ class DatabaseRateLimitMiddleware:
         response['Retry-After'] = str(retry_after)
         response['X-RateLimit-Limit-Hourly'] = str(limits['hourly'])
         response['X-RateLimit-Limit-Daily'] = str(limits['daily'])
-        response['X-RateLimit-Remaining-Hourly'] = str(max(0, limits['hourly'] - current_usage['hourly']))
-        response['X-RateLimit-Remaining-Daily'] = str(max(0, limits['daily'] - current_usage['daily']))
+        response['X-RateLimit-Remaining-Hourly'] = str(decision.remaining.get('hour', 0))
+        response['X-RateLimit-Remaining-Daily'] = str(decision.remaining.get('day', 0))
 
         return response
 
-    def create_anonymous_rate_limit_response(self, ip_address, window_type, usage, limit):
+    def create_anonymous_rate_limit_response(self, ip_address, window_type, usage, limit, retry_after=None):
         """Create rate limit response for anonymous users"""
-        retry_after = self.calculate_retry_after_anonymous(window_type)
+        retry_after = retry_after or self.calculate_retry_after_anonymous(window_type)
 
         response_data = {
             'error': 'Rate limit exceeded',
@@ -427,19 +447,26 @@ class RateLimitHeaderMiddleware(MiddlewareMixin):
         user = request.user
         endpoint = self.get_endpoint_name(request.path)
         limits = user.get_cached_limits()
-        identifier = f"user_{user.id}"
 
-        # Get current usage
-        hourly_usage = RateLimitService.get_usage_count(identifier, endpoint, 'hour')
-        daily_usage = RateLimitService.get_usage_count(identifier, endpoint, 'day')
+        # The rate limit middleware's decision already holds the usage it counted this request against
+        decision = getattr(request, 'rate_limit_decision', None)
+        if decision is not None and decision.usage:
+            remaining, reset = decision.remaining, decision.reset
+        else:
+            usage = usage_counters.get_counts(f"user_{user.id}", endpoint, ('hour', 'day'))
+            remaining = {window_type: max(0, limits[WINDOW_LABELS[window_type]] - count) for window_type, count in usage.items()}
+            reset = {
+                'hour': int(timezone.now().replace(minute=0, second=0, microsecond=0).timestamp()) + 3600,
+                'day': int(timezone.now().replace(hour=0, minute=0, second=0, microsecond=0).timestamp()) + 86400,
+            }
 
         # Add headers
         response['X-RateLimit-Limit-Hourly'] = str(limits['hourly'])
         response['X-RateLimit-Limit-Daily'] = str(limits['daily'])
-        response['X-RateLimit-Remaining-Hourly'] = str(max(0, limits['hourly'] - hourly_usage))
-        response['X-RateLimit-Remaining-Daily'] = str(max(0, limits['daily'] - daily_usage))
-        response['X-RateLimit-Reset-Hour'] = str(int(timezone.now().replace(minute=0, second=0, microsecond=0).timestamp()) + 3600)
-        response['X-RateLimit-Reset-Day'] = str(int(timezone.now().replace(hour=0, minute=0, second=0, microsecond=0).timestamp()) + 86400)
+        response['X-RateLimit-Remaining-Hourly'] = str(remaining['hour'])
+        response['X-RateLimit-Remaining-Daily'] = str(remaining['day'])
+        response['X-RateLimit-Reset-Hour'] = str(reset['hour'])
+        response['X-RateLimit-Reset-Day'] = str(reset['day'])
 
     def add_anonymous_headers(self, request, response):
         """Add rate limit headers for anonymous users"""
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-16 09:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("users", "0019_waitinglist_desired_billing_cycle"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="plan",
+            name="free_revalidations",
+            field=models.BooleanField(default=True),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 4.2.7 on 2026-10-16 10:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("users", "0020_plan_free_revalidations"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="plan",
+            name="max_pages_per_request",
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="plan",
+            name="max_rows_per_request",
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+    ]
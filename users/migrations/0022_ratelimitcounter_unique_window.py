@@ -0,0 +1,34 @@
+# Generated by Django 4.2.7 on 2026-10-17 09:00
+
+from django.db import migrations, models
+from django.db.models import Count, Min, Sum
+
+
+def merge_duplicate_counters(apps, schema_editor):
+    """Fold rows counting the same window, left by concurrent get_or_create calls, into one"""
+    RateLimitCounter = apps.get_model("users", "RateLimitCounter")
+    window = ("identifier", "endpoint", "window_type", "window_start")
+
+    duplicates = (
+        RateLimitCounter.objects.values(*window).annotate(rows=Count("id"), total=Sum("count"), keep=Min("id")).filter(rows__gt=1)
+    )
+    for duplicate in duplicates:
+        rows = RateLimitCounter.objects.filter(**{field: duplicate[field] for field in window})
+        rows.exclude(id=duplicate["keep"]).delete()
+        rows.filter(id=duplicate["keep"]).update(count=duplicate["total"])
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("users", "0021_plan_all_pages_caps"),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_counters, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="ratelimitcounter",
+            constraint=models.UniqueConstraint(
+                fields=("identifier", "endpoint", "window_type", "window_start"), name="unique_rate_limit_window"
+            ),
+        ),
+    ]
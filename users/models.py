@@ -5,9 +5,12 @@ from datetime import timezone as tz
 from django.contrib.auth.models import AbstractUser, BaseUserManager
 from django.core.cache import caches
 from django.core.validators import MinValueValidator
-from django.db import models
+from django.db import models, transaction
 from django.utils import timezone
 
+from .counters import ALL_ENDPOINTS, LimitDecision, usage_counters, window_bounds
+from .principals import fields_to_save, mark_saved, principal_cache
+
 
 class SubscriptionStatus(models.TextChoices):
     ACTIVE = "active", "Active"
@@ -41,6 +44,11 @@ class Plan(models.Model):
     hourly_request_limit = models.PositiveIntegerField(default=100)
     monthly_request_limit = models.PositiveIntegerField(default=30000)
     burst_limit = models.PositiveIntegerField(default=50)
+    # Conditional GETs answered 304 Not Modified do not count towards the request limits
+    free_revalidations = models.BooleanField(default=True)
+    # Caps on one all_pages=true walk over a cursor endpoint (unset uses the PROXY_ALL_PAGES_* defaults)
+    max_pages_per_request = models.PositiveIntegerField(null=True, blank=True)
+    max_rows_per_request = models.PositiveIntegerField(null=True, blank=True)
     features = models.ManyToManyField(Feature, blank=True)
     is_active = models.BooleanField(default=True)
     is_free = models.BooleanField(default=False)
@@ -78,6 +86,12 @@ class RateLimitCounter(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        # The conflict target of the write-behind upsert in users.counters
+        constraints = [
+            models.UniqueConstraint(fields=['identifier', 'endpoint', 'window_type', 'window_start'], name='unique_rate_limit_window')
+        ]
+
     def __str__(self):
         return f"{self.identifier} - {self.endpoint} - {self.count} ({self.window_type})"
 
@@ -129,80 +143,49 @@ class UsageSummary(models.Model):
 
 
 class RateLimitService:
+    """Windowed request counts, kept in the usage counters (see users.counters)"""
+
     @staticmethod
     def check_and_increment(identifier, endpoint, window_type='hour', window_duration_seconds=3600):
-        from django.core.cache import caches
-        from django.db import transaction
-
-        now = timezone.now()
-
-        if window_type == 'minute':
-            window_start = now.replace(second=0, microsecond=0)
-            cache_key = f"usage_{window_type}:{identifier}:{endpoint}:{window_start.strftime('%Y%m%d%H%M')}"
-        elif window_type == 'hour':
-            window_start = now.replace(minute=0, second=0, microsecond=0)
-            cache_key = f"usage_{window_type}:{identifier}:{endpoint}:{window_start.strftime('%Y%m%d%H')}"
-        elif window_type == 'day':
-            window_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
-            cache_key = f"usage_{window_type}:{identifier}:{endpoint}:{window_start.strftime('%Y%m%d')}"
-        elif window_type == 'month':
-            window_start = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-            cache_key = f"usage_{window_type}:{identifier}:{endpoint}:{window_start.strftime('%Y%m%d%H')}"
-        else:
-            window_start = now.replace(minute=0, second=0, microsecond=0)
-            cache_key = f"usage_{window_type}:{identifier}:{endpoint}:{window_start.strftime('%Y%m%d%H')}"
-
-        with transaction.atomic():
-            counter, created = RateLimitCounter.objects.get_or_create(
-                identifier=identifier, endpoint=endpoint, window_start=window_start, window_type=window_type, defaults={'count': 1}
-            )
-
-            if not created:
-                counter.count = models.F('count') + 1
-                counter.save(update_fields=['count', 'updated_at'])
-                counter.refresh_from_db()
+        return usage_counters.increment(identifier, endpoint, (window_type,))[window_type]
 
-        cache = caches['rate_limit']
-        cache_timeout = 300 if window_type in ['minute', 'hour'] else 3600
-        cache.set(cache_key, counter.count, timeout=cache_timeout)
-
-        return counter.count
+    @staticmethod
+    def increment_windows(identifier, endpoint, window_types):
+        """Count one request in every window at once and return the new counts"""
+        return usage_counters.increment(identifier, endpoint, window_types)
 
     @staticmethod
     def get_usage_count(identifier, endpoint, window_type='hour'):
-        from django.core.cache import caches
-
-        cache = caches['rate_limit']
-        now = timezone.now()
+        return usage_counters.get_counts(identifier, endpoint, (window_type,))[window_type]
 
-        if window_type == 'minute':
-            window_start = now.replace(second=0, microsecond=0)
-            cache_key = f"usage_{window_type}:{identifier}:{endpoint}:{window_start.strftime('%Y%m%d%H%M')}"
-        elif window_type == 'hour':
-            window_start = now.replace(minute=0, second=0, microsecond=0)
-            cache_key = f"usage_{window_type}:{identifier}:{endpoint}:{window_start.strftime('%Y%m%d%H')}"
-        elif window_type == 'day':
-            window_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
-            cache_key = f"usage_{window_type}:{identifier}:{endpoint}:{window_start.strftime('%Y%m%d')}"
-        else:
-            window_start = now.replace(minute=0, second=0, microsecond=0)
-            cache_key = f"usage_{window_type}:{identifier}:{endpoint}:{window_start.strftime('%Y%m%d%H')}"
+    @staticmethod
+    def reconcile_daily_request_counts():
+        """
+        Mirror today's flushed request counts into User.daily_requests_made, zeroing mirrors from earlier
+        days, and return how many users changed. The request path never writes the mirror.
+        """
+        usage_counters.flush()
 
-        count = cache.get(cache_key)
-        if count is not None:
-            return count
+        now = timezone.now()
+        today = now.date()
+        rows = RateLimitCounter.objects.filter(
+            identifier__startswith='user_', endpoint=ALL_ENDPOINTS, window_type='day', window_start=window_bounds('day', now)[0]
+        )
+        counts = {int(identifier[len('user_'):]): count for identifier, count in rows.values_list('identifier', 'count')}
 
-        try:
-            counter = RateLimitCounter.objects.get(
-                identifier=identifier, endpoint=endpoint, window_start=window_start, window_type=window_type
-            )
-            count = counter.count
-        except RateLimitCounter.DoesNotExist:
-            count = 0
+        stale = []
+        for user in User.objects.filter(id__in=counts).only('id', 'daily_requests_made', 'last_request_date'):
+            if (user.daily_requests_made, user.last_request_date) != (counts[user.id], today):
+                user.daily_requests_made, user.last_request_date = counts[user.id], today
+                stale.append(user)
 
-        cache_timeout = 300 if window_type in ['minute', 'hour'] else 3600
-        cache.set(cache_key, count, timeout=cache_timeout)
-        return count
+        with transaction.atomic():
+            User.objects.bulk_update(stale, ['daily_requests_made', 'last_request_date'], batch_size=500)
+            rolled_over = list(User.objects.filter(daily_requests_made__gt=0).exclude(last_request_date=today).values_list('id', flat=True))
+            User.objects.filter(id__in=rolled_over).update(daily_requests_made=0)
+        # Bulk writes skip save(), which is what drops cached principals
+        principal_cache.invalidate_many([user.id for user in stale] + rolled_over)
+        return len(stale) + len(rolled_over)
 
 
 class UserQuerySet(models.QuerySet):
@@ -296,7 +279,13 @@ class User(AbstractUser):
         if not self.token_never_expires and not self.request_token_expires:
             self.request_token_expires = timezone.now() + timedelta(days=self.token_validity_days)
 
+        if not args and kwargs.get('update_fields') is None:
+            # A user from the principal cache must not write its possibly stale values back
+            kwargs['update_fields'] = fields_to_save(self)
         super().save(*args, **kwargs)
+        mark_saved(self)
+        # Token, plan and subscription changes all end here, so cached principals cannot outlive them
+        principal_cache.invalidate(self.pk)
 
     @property
     def daily_request_limit(self):
@@ -335,39 +324,36 @@ class User(AbstractUser):
         self.limits_cache_updated = timezone.now()
         self.save(update_fields=['cached_hourly_limit', 'cached_daily_limit', 'cached_monthly_limit', 'limits_cache_updated'])
 
-    def check_rate_limits(self, endpoint='general'):
-        """Check if user can make request based on multiple time windows"""
-        if not self.is_subscription_active and not (self.current_plan and self.current_plan.is_free):
-            return False, "subscription not active"
-
+    def rate_limit_windows(self):
+        """Limit of each counted window, by window type"""
         limits = self.get_cached_limits()
-        identifier = f"user_{self.id}"
+        return {'hour': limits['hourly'], 'day': limits['daily'], 'month': limits['monthly']}
 
-        hourly_usage = RateLimitService.get_usage_count(identifier, endpoint, 'hour')
-        if hourly_usage >= limits['hourly']:
-            return False, f"hourly limit reached ({hourly_usage}/{limits['hourly']})"
+    def consume_rate_limits(self, endpoint='general', cost=1):
+        """Check every time window and the plan's burst limit, counting the request only if all allow it"""
+        if not self.is_subscription_active and not (self.current_plan and self.current_plan.is_free):
+            return LimitDecision(False, "subscription not active", None, {}, {}, {}, 0)
 
-        daily_usage = RateLimitService.get_usage_count(identifier, endpoint, 'day')
-        if daily_usage >= limits['daily']:
-            return False, f"daily limit reached ({daily_usage}/{limits['daily']})"
+        burst = self.current_plan.burst_limit if self.current_plan else 0
+        return usage_counters.consume(
+            f"user_{self.id}", endpoint, self.rate_limit_windows(), burst=burst, cost=cost, tallies=((ALL_ENDPOINTS, 'day'),)
+        )
 
-        monthly_usage = RateLimitService.get_usage_count(identifier, endpoint, 'month')
-        if monthly_usage >= limits['monthly']:
-            return False, f"monthly limit reached ({monthly_usage}/{limits['monthly']})"
+    def check_rate_limits(self, endpoint='general'):
+        """Check if user can make request based on multiple time windows"""
+        decision = self.consume_rate_limits(endpoint, cost=0)
+        return decision.allowed, decision.reason
 
-        return True, "OK"
+    def has_free_revalidations(self):
+        """Whether this user's plan lets 304 Not Modified revalidations go uncounted"""
+        return bool(self.current_plan and self.current_plan.free_revalidations)
 
     def increment_usage_counters(self, endpoint='general'):
         """Increment usage counters for all time windows"""
         identifier = f"user_{self.id}"
 
-        RateLimitService.check_and_increment(identifier, endpoint, 'hour')
-        RateLimitService.check_and_increment(identifier, endpoint, 'day')
-        RateLimitService.check_and_increment(identifier, endpoint, 'month')
-
-        self.reset_daily_requests_if_needed()
-        self.daily_requests_made += 1
-        self.save(update_fields=['daily_requests_made'])
+        RateLimitService.increment_windows(identifier, endpoint, ('hour', 'day', 'month'))
+        self.increment_request_count()
 
     def is_token_expired(self):
         if self.token_never_expires:
@@ -386,15 +372,31 @@ class User(AbstractUser):
             self.daily_requests_made = 0
             self.save(update_fields=["daily_requests_made"])
 
-    def increment_request_count(self):
-        self.reset_daily_requests_if_needed()
-        self.daily_requests_made += 1
-        self.save(update_fields=["daily_requests_made"])
+    def requests_made_today(self):
+        """
+        Requests counted today by the usage counters. daily_requests_made mirrors this count and is only
+        written by reconcile_daily_request_counts; a mirror from today still bounds it from below, should
+        the counter store have lost its keys.
+        """
+        today = timezone.now().date()
+        mirrored = self.daily_requests_made if self.last_request_date == today else 0
+        counted = usage_counters.get_counts(f"user_{self.id}", ALL_ENDPOINTS, ('day',))['day']
+        return max(counted, mirrored, 0)
 
-    def can_make_request(self):
-        """Check if user can make another API request today."""
-        self.reset_daily_requests_if_needed()
+    def increment_request_count(self):
+        """Count a request in today's total, without writing the user row"""
+        today = timezone.now().date()
+        mirrored = self.daily_requests_made if self.last_request_date == today else 0
+        counted = usage_counters.increment(f"user_{self.id}", ALL_ENDPOINTS, ('day',))['day']
+        # Only this instance's copy of the mirror follows the count
+        self.daily_requests_made = max(counted, mirrored + 1)
+        self.last_request_date = today
 
+    def can_make_request(self, counted=False):
+        """
+        Check if user can make another API request today. counted tells whether today's count already
+        includes this request, as it does once the rate limit middleware has admitted it.
+        """
         if not self.current_plan:
             return False, "no active plan"
 
@@ -404,7 +406,7 @@ class User(AbstractUser):
         if not self.is_subscription_active and not self.current_plan.is_free:
             return False, "subscription not active"
 
-        if self.daily_requests_made >= self.daily_request_limit:
+        if self.requests_made_today() - counted >= self.daily_request_limit:
             return False, "daily request limit reached"
 
         return True, "OK"
@@ -417,8 +419,7 @@ class User(AbstractUser):
 
     def has_reached_daily_limit(self):
         """Check if user has reached their daily API request limit."""
-        self.reset_daily_requests_if_needed()
-        return self.daily_requests_made >= self.daily_request_limit
+        return self.requests_made_today() >= self.daily_request_limit
 
     def get_token_info(self):
         return {
@@ -1,4 +1,3 @@
-from django.utils import timezone
 from rest_framework import permissions
 from rest_framework.permissions import BasePermission
 
@@ -8,11 +7,8 @@ class DailyLimitPermission(BasePermission):
         if not request.user or not request.user.is_authenticated:
             return True  # Allow unauthenticated users - authentication handled elsewhere
 
-        today = timezone.now().date()
-        if request.user.last_request_date != today:
-            request.user.reset_daily_requests_if_needed()
-
-        can_request, message = request.user.can_make_request()
+        # Daily counts roll over with their counter window, so nothing is reset (or written) here
+        can_request, message = request.user.can_make_request(counted=getattr(request, "_count_incremented", False))
 
         if not can_request:
             request._permission_error = message
@@ -0,0 +1,192 @@
+"""
+Cross-request cache of authenticated principals.
+
+Authenticating a request by X-Request-Token or JWT used to look the user up in the database,
+once in DatabaseRateLimitMiddleware and again in the DRF view. Principals are now cached,
+keyed by a SHA-256 of the token, for PRINCIPAL_CACHE_TIMEOUT seconds:
+
+    principal:<token hash>     the user fields rate limiting and authentication read (id, plan
+                               and cached limits, subscription status, token expiry) and the plan
+    principal_tokens:<user id> hashes of the user's cached tokens, so a user's entries can be
+                               dropped together
+
+A cached principal is rebuilt as a User with its other fields deferred, loading them on first
+access. Its cached values may be older than the row, so saving it writes only the fields changed
+since it was cached and those loaded since (see fields_to_save), never stale copies over newer
+state such as a concurrent Stripe webhook update. User.save() invalidates the user's entries,
+which covers token regeneration, plan changes and Stripe webhook updates; bulk writes invalidate
+theirs with invalidate_many(), and the timeout bounds anything else changed without a save.
+
+Within a request, authenticators remember their result on the HttpRequest, so the view reuses
+what the middleware found (see remember_authentication).
+"""
+import hashlib
+import logging
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.core.signals import setting_changed
+from django.db import DEFAULT_DB_ALIAS
+from django.dispatch import receiver
+
+logger = logging.getLogger(__name__)
+
+USER_FIELDS = (
+    'id',
+    'email',
+    'is_active',
+    'is_staff',
+    'is_superuser',
+    'request_token',
+    'request_token_expires',
+    'token_never_expires',
+    'current_plan_id',
+    'subscription_status',
+    'subscription_expires_at',
+    'payment_restrictions_applied',
+    'cached_hourly_limit',
+    'cached_daily_limit',
+    'cached_monthly_limit',
+    'limits_cache_updated',
+    'daily_requests_made',
+    'last_request_date',
+)
+
+
+def token_hash(token):
+    if isinstance(token, str):
+        token = token.encode()
+    return hashlib.sha256(token).hexdigest()
+
+
+def snapshot(instance, field_names=None):
+    """Attribute values of a model instance, by attname"""
+    if field_names is None:
+        field_names = [field.attname for field in instance._meta.concrete_fields]
+    return {name: getattr(instance, name) for name in field_names}
+
+
+def restore(model, values):
+    """A model instance from a snapshot, with the fields it lacks deferred"""
+    fields = [field.attname for field in model._meta.concrete_fields if field.attname in values]
+    instance = model.from_db(DEFAULT_DB_ALIAS, fields, [values[name] for name in fields])
+    instance._restored_values = dict(values)
+    return instance
+
+
+def fields_to_save(instance):
+    """
+    The fields a save() of a restored instance should write, or None for an ordinary instance.
+
+    Restored values left unchanged may be out of date, so only the fields changed since the
+    restore, and the deferred ones loaded from the database since, are written.
+    """
+    restored = getattr(instance, '_restored_values', None)
+    if restored is None:
+        return None
+    deferred = instance.get_deferred_fields()
+    return [
+        field.attname
+        for field in instance._meta.concrete_fields
+        if not field.primary_key
+        and field.attname not in deferred
+        and (field.attname not in restored or getattr(instance, field.attname) != restored[field.attname])
+    ]
+
+
+def mark_saved(instance):
+    """Take the values a restored instance was just saved with as its restored values"""
+    if getattr(instance, '_restored_values', None) is not None:
+        instance._restored_values = snapshot(instance, list(instance._restored_values))
+
+
+class PrincipalCache:
+    """Authenticated users by token hash, in a Django cache"""
+
+    def __init__(self, alias, timeout):
+        self.alias = alias
+        self.timeout = timeout
+
+    @property
+    def cache(self):
+        return caches[self.alias]
+
+    def get(self, token):
+        """The cached user for a token, or None"""
+        if not self.timeout:
+            return None
+        try:
+            entry = self.cache.get(f"principal:{token_hash(token)}")
+        except Exception as e:
+            logger.warning(f"Principal cache unavailable: {e}")
+            return None
+        if entry is None:
+            return None
+
+        user_model = get_user_model()
+        user = restore(user_model, entry['user'])
+        if entry['plan'] is not None:
+            user.current_plan = restore(user_model.current_plan.field.related_model, entry['plan'])
+        return user
+
+    def set(self, token, user):
+        if not self.timeout:
+            return
+        key = f"principal:{token_hash(token)}"
+        plan = user.current_plan
+        entry = {'user': snapshot(user, USER_FIELDS), 'plan': snapshot(plan) if plan else None}
+        index_key = f"principal_tokens:{user.pk}"
+        try:
+            keys = [cached for cached in self.cache.get(index_key, []) if cached != key]
+            self.cache.set_many({key: entry, index_key: keys + [key]}, self.timeout)
+        except Exception as e:
+            logger.warning(f"Principal cache unavailable: {e}")
+
+    def invalidate(self, user_id):
+        """Drop every cached principal of a user"""
+        self.invalidate_many([user_id])
+
+    def invalidate_many(self, user_ids):
+        """Drop every cached principal of the given users, in two round trips"""
+        index_keys = [f"principal_tokens:{user_id}" for user_id in user_ids]
+        if not index_keys:
+            return
+        try:
+            indexes = self.cache.get_many(index_keys)
+            self.cache.delete_many([key for keys in indexes.values() for key in keys] + index_keys)
+        except Exception as e:
+            logger.warning(f"Principal cache unavailable: {e}")
+
+
+def build_principal_cache():
+    return PrincipalCache(
+        getattr(settings, 'PRINCIPAL_CACHE_ALIAS', 'default'),
+        getattr(settings, 'PRINCIPAL_CACHE_TIMEOUT', 60),
+    )
+
+
+principal_cache = build_principal_cache()
+
+
+@receiver(setting_changed)
+def update_principal_cache(setting, **kwargs):
+    """Apply changed PRINCIPAL_CACHE_* settings (e.g. under override_settings) to the global cache"""
+    if setting in ('PRINCIPAL_CACHE_ALIAS', 'PRINCIPAL_CACHE_TIMEOUT'):
+        rebuilt = build_principal_cache()
+        principal_cache.alias, principal_cache.timeout = rebuilt.alias, rebuilt.timeout
+
+
+def remembered_authentication(request, authenticator):
+    """What an authenticator already returned for this request, or None"""
+    request = getattr(request, '_request', request)
+    return getattr(request, '_authentication_results', {}).get(type(authenticator).__name__)
+
+
+def remember_authentication(request, authenticator, result):
+    """Keep an authenticator's result on the HttpRequest, shared by the middleware and the DRF view"""
+    request = getattr(request, '_request', request)
+    if not hasattr(request, '_authentication_results'):
+        request._authentication_results = {}
+    request._authentication_results[type(authenticator).__name__] = result
+    return result
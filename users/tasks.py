@@ -28,6 +28,34 @@ logger = logging.getLogger(__name__)
 stripe.api_key = settings.STRIPE_SECRET_KEY
 
 
+def flush_usage_counters():
+    """Write usage counter deltas into RateLimitCounter rows, including batches left by a failed flush"""
+    from .counters import usage_counters
+
+    try:
+        written = usage_counters.flush()
+        logger.info(f"Flushed {written} usage counters")
+        return written
+
+    except Exception as e:
+        logger.error(f"Error flushing usage counters: {e}")
+        return 0
+
+
+def reconcile_daily_request_counts():
+    """Mirror today's request counts from the usage counters into User.daily_requests_made"""
+    from .models import RateLimitService
+
+    try:
+        reconciled = RateLimitService.reconcile_daily_request_counts()
+        logger.info(f"Reconciled {reconciled} daily request counts")
+        return reconciled
+
+    except Exception as e:
+        logger.error(f"Error reconciling daily request counts: {e}")
+        return 0
+
+
 def cleanup_rate_limit_counters():
     """Remove old rate limit counters to prevent database bloat"""
     try:
@@ -354,6 +382,8 @@ def run_hourly_tasks():
     logger.info("Starting hourly tasks")
 
     results = {
+        'flush_counters': flush_usage_counters(),
+        'reconcile_daily_counts': reconcile_daily_request_counts(),
         'cleanup_counters': cleanup_rate_limit_counters(),
         'update_summaries': update_hourly_usage_summaries(),
         'refresh_limits': refresh_user_limits_cache(),
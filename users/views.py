@@ -128,7 +128,7 @@ def profile(request):
     token_info["is_active"] = not request.user.is_token_expired()
 
     # Calculate usage percentage for progress bar
-    daily_requests_made = request.user.daily_requests_made
+    daily_requests_made = request.user.requests_made_today()
     daily_request_limit = request.user.daily_request_limit
     usage_percentage = 0
     if daily_request_limit > 0:
@@ -761,6 +761,7 @@ def handle_payment_action_required(invoice_data):
 @permission_classes(permissions_)
 def user_subscription(request):
     user = request.user
+    requests_made = user.requests_made_today()
     data = {
         "current_plan": PlanSerializer(user.current_plan).data if user.current_plan else None,
         "subscription_status": user.subscription_status,
@@ -768,8 +769,8 @@ def user_subscription(request):
         "subscription_days_remaining": user.subscription_days_remaining,
         "is_subscription_active": user.is_subscription_active,
         "daily_request_limit": user.daily_request_limit,
-        "daily_requests_made": user.daily_requests_made,
-        "requests_remaining": max(0, user.daily_request_limit - user.daily_requests_made),
+        "daily_requests_made": requests_made,
+        "requests_remaining": max(0, user.daily_request_limit - requests_made),
     }
     return Response(data)
 